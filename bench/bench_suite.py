@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Hermetic benchmark suite for fan_control.py and learn_thresholds.py.
+
+Builds a sandbox in a temporary directory: the stub ipmitool (fake_ipmitool),
+nvidia-smi, rocm-smi and sensors (fake_tools) are the only commands on PATH, the
+hwmon and drm readers point at a fake tree (fake_sysfs.py), and every state, log and
+cache file is private. Each scenario then runs in a fresh process and times:
+
+- main(): full one-shot cycles, in-process (warm caches) and as a new process each
+  time (what the systemd timer pays);
+- every get_* reader and collect_sensor_readings(), with the per-cycle lm-sensors
+  and IPMI snapshots invalidated before each call;
+- determine_fan_action() for the steps, curve and pid controllers;
+- learn_thresholds.py's full analysis of a synthetic data log (text and binary
+  backends; the NumPy engine too when it is installed).
+
+Scenarios: local (sysfs, lm-sensors, nvidia-smi), ipmi (no hwmon or lm-sensors
+readings, so the ipmitool sdr fallback over the subprocess transport) and ipmi-shell
+(the same over IPMI_TRANSPORT=shell). Stub delays and failure rates come from the
+FAKE_* variables (bench/README.md); the suite sets only those not already set.
+
+Results are written as JSON (--out) with the commit they were measured at.
+--baseline compares the run with an earlier file and exits 1 when a median got
+slower by more than --tolerance; --compare OLD NEW compares two files.
+
+Usage:
+  python3 bench/bench_suite.py --out bench-$(git rev-parse --short HEAD).json
+  python3 bench/bench_suite.py --quick --only get_ --baseline bench-1b464ca.json
+  python3 bench/bench_suite.py --compare bench-1b464ca.json bench-5330aef.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+FORMAT_VERSION = 1
+
+# Used unless already set in the environment
+STUB_DEFAULTS = {
+    'FAKE_IPMITOOL_SESSION_DELAY': '0.05',
+    'FAKE_IPMITOOL_DELAY': '0.02',
+    'FAKE_IPMITOOL_SDR_DELAY': '0.1',
+    'FAKE_NVIDIA_SMI_DELAY': '0.05',
+    'FAKE_ROCM_SMI_DELAY': '0.1',
+    'FAKE_SENSORS_DELAY': '0.01',
+}
+
+SCENARIOS = {
+    'local': {'HWMON_PATH': '{sandbox}/hwmon', 'DRM_PATH': '{sandbox}/drm'},
+    'ipmi': {'HWMON_PATH': '{sandbox}/empty', 'DRM_PATH': '{sandbox}/empty',
+             'FAKE_SENSORS_OUTPUT': '{sandbox}/sensors-empty.json', 'IPMI_TRANSPORT': 'subprocess'},
+    'ipmi-shell': {'HWMON_PATH': '{sandbox}/empty', 'DRM_PATH': '{sandbox}/empty',
+                   'FAKE_SENSORS_OUTPUT': '{sandbox}/sensors-empty.json', 'IPMI_TRANSPORT': 'shell'},
+    'learn-text': {'DATA_LOG_BACKEND': 'text', 'DATA_LOG_FILE': '{sandbox}/learn.log'},
+    'learn-binary': {'DATA_LOG_BACKEND': 'binary', 'DATA_LOG_FILE': '{sandbox}/learn.bin'},
+}
+
+READERS = {
+    'local': ['get_gpu_temperatures_nvidia', 'get_gpu_temperatures_amd', 'get_gpu_temperatures_sensors',
+              'get_gpu_temperatures_drm', 'get_gpu_temperatures', 'get_system_temperatures_sysfs',
+              'get_system_temperatures_sensors', 'get_system_temperatures', 'get_fan_speeds_sysfs',
+              'get_fan_speeds_sensors', 'get_fan_speeds', 'collect_sensor_readings'],
+    'ipmi': ['get_system_temperatures', 'get_fan_speeds', 'collect_sensor_readings'],
+    'ipmi-shell': ['get_system_temperatures', 'get_fan_speeds', 'collect_sensor_readings'],
+}
+
+
+def build_sandbox(sandbox):
+    """Stub commands in sandbox/bin, fake sysfs trees and an empty lm-sensors output."""
+    import fake_sysfs
+    bin_dir = os.path.join(sandbox, 'bin')
+    os.makedirs(bin_dir)
+    os.symlink(os.path.join(BENCH_DIR, 'fake_ipmitool'), os.path.join(bin_dir, 'ipmitool'))
+    for tool in ('nvidia-smi', 'rocm-smi', 'sensors'):
+        os.symlink(os.path.join(BENCH_DIR, 'fake_tools'), os.path.join(bin_dir, tool))
+    # The stubs start with "#!/usr/bin/env python3"; only this interpreter is on PATH
+    os.symlink(sys.executable, os.path.join(bin_dir, 'python3'))
+    fake_sysfs.create_fake_hwmon(os.path.join(sandbox, 'hwmon'))
+    fake_sysfs.create_fake_drm(os.path.join(sandbox, 'drm'))
+    os.makedirs(os.path.join(sandbox, 'empty'))
+    with open(os.path.join(sandbox, 'sensors-empty.json'), 'w') as f:
+        f.write('{}\n')
+
+
+def scenario_env(sandbox, scenario):
+    env = {
+        'PATH': os.path.join(sandbox, 'bin'),
+        'HOME': sandbox,
+        'LANG': 'C.UTF-8',
+        'IDRAC_IP': '127.0.0.1',
+        'LOG_FILE': os.path.join(sandbox, f'{scenario}.log'),
+        'LOG_LEVEL': 'INFO',
+        'DATA_LOG_FILE': os.path.join(sandbox, f'{scenario}-data.log'),
+        'DATA_LOG_BACKEND': 'text',
+        'DATA_COMPACT_INTERVAL': '0',
+        'ACTUATOR_STATE_FILE': os.path.join(sandbox, f'{scenario}-state.json'),
+        'THRESHOLD_STATE_FILE': os.path.join(sandbox, f'{scenario}-threshold.json'),
+        'HWMON_INDEX_FILE': os.path.join(sandbox, f'{scenario}-hwmon-index.json'),
+        'BACKEND_PROBE_FILE': os.path.join(sandbox, f'{scenario}-backends.json'),
+        'IPMI_SDR_CACHE_FILE': os.path.join(sandbox, f'{scenario}-sdr.cache'),
+        'LEARN_CHECKPOINT_FILE': os.path.join(sandbox, f'{scenario}-checkpoint.json'),
+        'NVML_LIBRARY': '',
+        'METRICS_PORT': '0',
+        'METRICS_TEXTFILE': '',
+        'FAN_CONTROLLER': 'steps',
+    }
+    if os.getenv('PYTHONPATH'):
+        env['PYTHONPATH'] = os.environ['PYTHONPATH']
+    for name, value in STUB_DEFAULTS.items():
+        env[name] = os.getenv(name, value)
+    env.update({name: value for name, value in os.environ.items() if name.startswith('FAKE_')})
+    env.update({name: value.format(sandbox=sandbox) for name, value in SCENARIOS[scenario].items()})
+    return env
+
+
+def summarize(seconds, per_call=1, **extra):
+    """Timing statistics in milliseconds per call."""
+    values = sorted(s / per_call * 1000 for s in seconds)
+    result = {
+        'n': len(values),
+        'mean_ms': round(sum(values) / len(values), 4),
+        'p50_ms': round(values[(len(values) - 1) // 2], 4),
+        'p95_ms': round(values[max(0, -(-95 * len(values) // 100) - 1)], 4),
+        'min_ms': round(values[0], 4),
+        'max_ms': round(values[-1], 4),
+    }
+    if per_call > 1:
+        result['ops_per_s'] = round(1000 / result['mean_ms'])
+    result.update(extra)
+    return result
+
+
+def measure(function, iterations, before=None, warmup=1):
+    seconds = []
+    result = None
+    for i in range(warmup + iterations):
+        if before:
+            before()
+        start = time.perf_counter()
+        result = function()
+        if i >= warmup:
+            seconds.append(time.perf_counter() - start)
+    return seconds, result
+
+
+# -- workers (one process per scenario) -------------------------------------
+
+def run_fan_control_worker(scenario, args, results):
+    import fan_control as fc
+    wanted = lambda name: not args.only or any(pattern in name for pattern in args.only)  # noqa: E731
+
+    name = f'main.inprocess.{scenario}'
+    if wanted(name):
+        argv = sys.argv
+        sys.argv = ['fan_control.py']
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                seconds, _ = measure(fc.main, args.iterations)
+        finally:
+            sys.argv = argv
+            fc.logging.getLogger().handlers.clear()
+        results[name] = summarize(seconds)
+
+    for reader in READERS.get(scenario, []):
+        name = f'{reader}.{scenario}'
+        if not wanted(name):
+            continue
+        function = getattr(fc, reader)
+        seconds, value = measure(function, args.iterations, before=fc.invalidate_sensor_snapshots)
+        if reader == 'collect_sensor_readings':
+            value = [v for values in value[0].values() for v in values]
+        results[name] = summarize(seconds, readings=len(value))
+
+    if scenario != 'local':
+        return
+    rng = random.Random(1)
+    # A slow random walk, like consecutive cycles (the threshold engine's hysteresis sees real transitions)
+    gpu, system = 50.0, 40.0
+    inputs = []
+    for _ in range(args.decisions):
+        gpu = min(100.0, max(25.0, gpu + rng.gauss(0, 1.5)))
+        system = min(90.0, max(20.0, system + rng.gauss(0, 0.5)))
+        inputs.append(([round(gpu), round(gpu) - 3], [round(system), round(system) + 2]))
+    batch = 500
+    for controller in ('steps', 'curve', 'pid'):
+        name = f'determine_fan_action.{controller}'
+        if not wanted(name):
+            continue
+        fc.FAN_CONTROLLER = controller
+        fc._fan_controller = None
+        fc._threshold_engine = None
+        seconds = []
+        for start in range(0, len(inputs) - batch + 1, batch):
+            chunk = inputs[start:start + batch]
+            begin = time.perf_counter()
+            for gpu_temps, system_temps in chunk:
+                fc.determine_fan_action(gpu_temps, system_temps)
+            seconds.append(time.perf_counter() - begin)
+        results[name] = summarize(seconds, per_call=batch)
+
+
+def run_learn_worker(scenario, args, results):
+    import data_store
+    import learn_bench
+    import learn_thresholds as learn
+    backend = os.environ['DATA_LOG_BACKEND']
+    engines = ['python'] + (['numpy'] if learn.learn_numpy is not None else [])
+    names = {engine: f'learn_thresholds.{engine}.{backend}' for engine in engines}
+    names = {engine: name for engine, name in names.items()
+             if not args.only or any(pattern in name for pattern in args.only)}
+    if not names:
+        return
+    now = time.time()
+    store = data_store.open_data_store(os.environ['DATA_LOG_FILE'], backend)
+    batch = []
+    for record in learn_bench.synthetic_records(now - args.learn_days * 86400, now, 5, 1):
+        batch.append(record)
+        if len(batch) >= 10000:
+            store.append_many(batch)
+            batch = []
+    store.append_many(batch)
+    store.close()
+    records = int(args.learn_days * 86400 / 5)
+
+    def python_engine():
+        data = learn.parse_data_log(args.learn_days)
+        return (learn.summarize_data(data), learn.analyze_fan_efficiency(data),
+                learn.analyze_temperature_trends(data))
+
+    def numpy_engine():
+        return learn.analyze_numpy(args.learn_days)
+
+    for engine, name in names.items():
+        seconds, _ = measure(python_engine if engine == 'python' else numpy_engine, args.learn_runs, warmup=0)
+        results[name] = summarize(seconds, records=records)
+
+
+def run_worker(args):
+    results = {}
+    if args.worker.startswith('learn-'):
+        run_learn_worker(args.worker, args, results)
+    else:
+        run_fan_control_worker(args.worker, args, results)
+    with open(args.worker_result, 'w') as f:
+        json.dump(results, f)
+
+
+# -- driver ------------------------------------------------------------------
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit or None, dirty
+    except OSError:
+        return None, None
+
+
+def run_scenario(sandbox, scenario, args):
+    env = scenario_env(sandbox, scenario)
+    result_file = os.path.join(sandbox, f'{scenario}-results.json')
+    command = [sys.executable, os.path.abspath(__file__), '--worker', scenario, '--worker-result', result_file,
+               '--iterations', str(args.iterations), '--decisions', str(args.decisions),
+               '--learn-days', str(args.learn_days), '--learn-runs', str(args.learn_runs)]
+    for pattern in args.only or []:
+        command += ['--only', pattern]
+    subprocess.run(command, env=env, cwd=sandbox, check=True)
+    with open(result_file) as f:
+        results = json.load(f)
+
+    # Cold one-shot runs: interpreter start, imports and one cycle
+    name = f'main.process.{scenario}'
+    if scenario in READERS and (not args.only or any(pattern in name for pattern in args.only)):
+        script = os.path.join(REPO_DIR, 'fan_control.py')
+        seconds, _ = measure(lambda: subprocess.run([sys.executable, script], env=env, cwd=sandbox,
+                                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+                             max(3, args.iterations // 4))
+        results[name] = summarize(seconds)
+    return results
+
+
+def compare(old, new, tolerance):
+    """Print the p50 change per benchmark; returns the names that got slower than tolerance."""
+    slower = []
+    names = [name for name in new['results'] if name in old['results']]
+    width = max([len(name) for name in names] + [9])
+    print(f"{'Benchmark':<{width}}  {'old p50 ms':>11}  {'new p50 ms':>11}  {'change':>8}")
+    for name in names:
+        before, after = old['results'][name]['p50_ms'], new['results'][name]['p50_ms']
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > tolerance:
+            flag = '  SLOWER'
+            slower.append(name)
+        elif change < -tolerance:
+            flag = '  faster'
+        print(f"{name:<{width}}  {before:>11.3f}  {after:>11.3f}  {change:>+7.1%}{flag}")
+    for name in sorted(set(old['results']) ^ set(new['results'])):
+        print(f"{name:<{width}}  only in {'old' if name in old['results'] else 'new'} results")
+    print(f"\n{old.get('commit') or '?'}{' (dirty)' if old.get('dirty') else ''} -> "
+          f"{new.get('commit') or '?'}{' (dirty)' if new.get('dirty') else ''}: "
+          f"{len(slower)} of {len(names)} slower by more than {tolerance:.0%}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hermetic fan_control.py / learn_thresholds.py benchmarks')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--only', action='append', metavar='SUBSTRING',
+                        help='Only benchmarks whose name contains this (repeatable)')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed calls per benchmark')
+    parser.add_argument('--decisions', type=int, default=20000, help='determine_fan_action() calls per controller')
+    parser.add_argument('--learn-days', type=float, default=7, help='Days of 5 s records in the synthetic data log')
+    parser.add_argument('--learn-runs', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help='Fewer iterations and a 1-day data log')
+    parser.add_argument('--out', metavar='FILE', help='Write the results as JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare with earlier results')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown (default 0.25)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two result files and exit')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--worker-result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+    if args.compare:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            sys.exit(1 if compare(json.load(f_old), json.load(f_new), args.tolerance) else 0)
+    if args.quick:
+        args.iterations, args.decisions, args.learn_days, args.learn_runs = 5, 5000, 1, 1
+
+    commit, dirty = git_revision()
+    output = {
+        'version': FORMAT_VERSION,
+        'commit': commit,
+        'dirty': dirty,
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {'iterations': args.iterations, 'decisions': args.decisions, 'learn_days': args.learn_days,
+                     'learn_runs': args.learn_runs, 'stubs': {name: os.getenv(name, value)
+                                                              for name, value in STUB_DEFAULTS.items()}},
+        'results': {},
+    }
+    if os.path.exists(os.path.join(REPO_DIR, '.env')):
+        # load_dotenv() fills in whatever the sandbox environment does not set
+        print("Warning: .env in the repository; settings the suite does not set come from it", file=sys.stderr)
+        output['settings']['dotenv'] = True
+
+    with tempfile.TemporaryDirectory(prefix='fan-control-bench-') as sandbox:
+        build_sandbox(sandbox)
+        for scenario in args.scenarios:
+            start = time.perf_counter()
+            results = run_scenario(sandbox, scenario, args)
+            output['results'].update(results)
+            print(f"{scenario}: {len(results)} benchmarks in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    width = max([len(name) for name in output['results']] + [9])
+    print(f"{'Benchmark':<{width}}  {'n':>5}  {'p50 ms':>10}  {'p95 ms':>10}  {'max ms':>10}")
+    for name, result in output['results'].items():
+        extra = f"  {result['ops_per_s']} ops/s" if 'ops_per_s' in result else ''
+        extra += f"  {result['readings']} readings" if 'readings' in result else ''
+        print(f"{name:<{width}}  {result['n']:>5}  {result['p50_ms']:>10.3f}  {result['p95_ms']:>10.3f}  "
+              f"{result['max_ms']:>10.3f}{extra}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(output, f, indent=2)
+            f.write('\n')
+    if args.baseline:
+        print()
+        with open(args.baseline) as f:
+            sys.exit(1 if compare(json.load(f), output, args.tolerance) else 0)
+
+
+if __name__ == '__main__':
+    main()
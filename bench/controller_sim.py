@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare the steps, curve and pid fan controllers on a simulated GPU workload.
+
+A first-order thermal model (heat in from GPU power, heat out proportional to
+fan speed and the difference to ambient) is stepped once per second; the
+controller is polled every --interval seconds, as in daemon mode. The workload
+idles, runs a GPU job at full power, then idles again.
+
+Reports peak/mean GPU temperature during the job, mean fan speed, time above
+--hot, and the number of fan speed changes (IPMI writes). With --feedforward the
+GPU power is also fed to FeedforwardFloor, and the report shows how many seconds
+the feedforward floor acted before the temperature-only decision. With --adaptive
+the controller is polled when AdaptiveInterval says so instead of every
+--interval seconds, and the report includes the number of polls per hour.
+
+Usage:
+  python3 bench/controller_sim.py
+  python3 bench/controller_sim.py --interval 5 --job-watts 300 --json
+  python3 bench/controller_sim.py --feedforward
+  python3 bench/controller_sim.py --adaptive
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import fan_control  # noqa: E402
+
+AMBIENT = 22.0
+HEAT_CAPACITY = 600.0  # J/°C
+AUTO_MODE_SPEED = 60   # what iDRAC runs the fans at when it takes over
+
+
+def conductance(fan_speed):
+    """W/°C removed from the GPU at a given fan speed (percent)."""
+    return 1.0 + 0.08 * fan_speed
+
+
+def simulate(controller, interval, idle_watts, job_watts, idle_seconds, job_seconds, hot, feedforward=None,
+             scheduler=None):
+    gpu_temp = AMBIENT + idle_watts / conductance(10)
+    fan_speed = 10
+    duration = 2 * idle_seconds + job_seconds
+    job_temps, fan_samples = [], []
+    changes = 0
+    seconds_hot = 0
+    polls = 0
+    next_poll = 0
+    for t in range(duration):
+        in_job = idle_seconds <= t < idle_seconds + job_seconds
+        power = job_watts if in_job else idle_watts
+        if t >= next_poll:
+            polls += 1
+            system_temp = 25 + 0.04 * power - 0.05 * fan_speed
+            action, speed, reason = controller.decide([round(gpu_temp, 1)], [round(system_temp, 1)], now=float(t))
+            if feedforward is not None:
+                gpu_load = [{'power_w': power, 'utilization': 100 if in_job else 5}]
+                action, speed, reason = feedforward.apply(action, speed, reason, gpu_load, now=float(t))
+            speed = AUTO_MODE_SPEED if action == 'auto' else speed
+            if speed != fan_speed:
+                changes += 1
+                fan_speed = speed
+            if scheduler is not None:
+                delay, _ = scheduler.update({'gpu': [round(gpu_temp, 1)], 'system': [round(system_temp, 1)]}, float(t))
+                next_poll = t + max(1, math.ceil(delay))
+            else:
+                next_poll = t + interval
+        gpu_temp += (power - conductance(fan_speed) * (gpu_temp - AMBIENT)) / HEAT_CAPACITY
+        fan_samples.append(fan_speed)
+        if in_job:
+            job_temps.append(gpu_temp)
+        if gpu_temp >= hot:
+            seconds_hot += 1
+    return {
+        'peak_gpu_c': round(max(job_temps), 1),
+        'mean_job_gpu_c': round(sum(job_temps) / len(job_temps), 1),
+        'mean_fan_pct': round(sum(fan_samples) / len(fan_samples), 1),
+        'seconds_above_hot': seconds_hot,
+        'speed_changes': changes,
+        'polls_per_hour': round(polls * 3600 / duration),
+        'feedforward_lead_s': feedforward.last_lead if feedforward is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fan controller comparison on a simulated GPU job')
+    parser.add_argument('--interval', type=int, default=5, help='Seconds between controller decisions')
+    parser.add_argument('--idle-watts', type=float, default=60)
+    parser.add_argument('--job-watts', type=float, default=250)
+    parser.add_argument('--idle-seconds', type=int, default=600)
+    parser.add_argument('--job-seconds', type=int, default=2400)
+    parser.add_argument('--hot', type=float, default=80, help='Temperature counted as "hot" (°C)')
+    parser.add_argument('--feedforward', action='store_true', help='Raise the fan floor from GPU power (FEEDFORWARD_*)')
+    parser.add_argument('--adaptive', action='store_true', help='Poll on the AdaptiveInterval schedule (ADAPTIVE_*)')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    controllers = {
+        'steps': fan_control.ThresholdEngine(state_file=''),
+        'curve': fan_control.FanCurveController(state_file=''),
+        'pid': fan_control.PidController(state_file=''),
+    }
+    results = {}
+    for name, controller in controllers.items():
+        feedforward = fan_control.FeedforwardFloor() if args.feedforward else None
+        fan_control.FAN_CONTROLLER = name  # AdaptiveInterval watches the level thresholds only for steps
+        scheduler = fan_control.AdaptiveInterval() if args.adaptive else None
+        results[name] = simulate(controller, args.interval, args.idle_watts, args.job_watts,
+                                 args.idle_seconds, args.job_seconds, args.hot, feedforward, scheduler)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'Controller':<11} {'Peak GPU':>9} {'Mean GPU':>9} {'Mean fan':>9} {'s >= hot':>9} {'Changes':>8} {'Polls/h':>8}"
+          + (f" {'FF lead':>8}" if args.feedforward else ""))
+    for name, result in results.items():
+        lead = result['feedforward_lead_s']
+        print(f"{name:<11} {result['peak_gpu_c']:>8}C {result['mean_job_gpu_c']:>8}C {result['mean_fan_pct']:>8}% "
+              f"{result['seconds_above_hot']:>9} {result['speed_changes']:>8} {result['polls_per_hour']:>8}"
+              + ((f" {lead:>7.0f}s" if lead is not None else f" {'-':>8}") if args.feedforward else ""))
+
+
+if __name__ == '__main__':
+    main()
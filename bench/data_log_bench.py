@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Query cost of the unified data log backends.
+
+Generates a synthetic text data log (--days of history, one record every
+--interval seconds), migrates it to the sqlite and binary backends with
+data_store.migrate(), then times reading the last --window-days from each
+backend, as learn_thresholds.py does. Also checks that every backend returns the
+same records and that exporting each one back to text reproduces the original log.
+
+Usage:
+  python3 bench/data_log_bench.py --days 30 --interval 5
+  python3 bench/data_log_bench.py --days 365 --interval 5 --window-days 7 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import data_store  # noqa: E402
+
+
+def write_synthetic_log(path, days, interval, seed=1):
+    """Text log ending now, with 2 GPUs, 20 system temperatures and 6 fans per record."""
+    rng = random.Random(seed)
+    end = int(datetime.now().timestamp())
+    start = end - days * 86400
+    records = 0
+    with open(path, 'w') as f:
+        batch = []
+        for timestamp in range(start, end, interval):
+            gpu = [rng.randint(35, 85) for _ in range(2)]
+            system = [rng.randint(25, 60) for _ in range(20)]
+            fans = [rng.randint(2000, 9000) for _ in range(6)]
+            record = data_store.make_record(gpu, system, fans, rng.choice((10, 15, 25, 35, 50)), float(timestamp))
+            batch.append(data_store.format_text_line(record))
+            if len(batch) >= 10000:
+                f.writelines(batch)
+                batch = []
+            records += 1
+        f.writelines(batch)
+    return records
+
+
+def time_query(path, backend, start):
+    begin = time.perf_counter()
+    store = data_store.open_data_store(path, backend, readonly=True)
+    records = list(store.query(start=start))
+    store.close()
+    return time.perf_counter() - begin, records
+
+
+def export_text(path, backend):
+    store = data_store.open_data_store(path, backend, readonly=True)
+    text = ''.join(data_store.format_text_line(record) for record in store.query())
+    store.close()
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Unified data log backend comparison')
+    parser.add_argument('--days', type=int, default=30, help='Days of synthetic history')
+    parser.add_argument('--interval', type=int, default=5, help='Seconds between records')
+    parser.add_argument('--window-days', type=float, default=7, help='Window to query (learn_thresholds ANALYSIS_DAYS)')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {backend: data_store.default_data_log_file(backend, tmp) for backend in data_store.BACKENDS}
+        records = write_synthetic_log(paths['text'], args.days, args.interval)
+
+        migration_s = {}
+        for backend in ('sqlite', 'binary'):
+            begin = time.perf_counter()
+            data_store.migrate(paths['text'], paths[backend], backend)
+            migration_s[backend] = round(time.perf_counter() - begin, 2)
+
+        start = datetime.now().timestamp() - args.window_days * 86400
+        results, windows = {}, {}
+        for backend, path in paths.items():
+            elapsed, windows[backend] = time_query(path, backend, start)
+            size = os.path.getsize(path) + (os.path.getsize(path + '.idx') if backend == 'binary' else 0)
+            results[backend] = {
+                'query_ms': round(elapsed * 1000, 1),
+                'records_returned': len(windows[backend]),
+                'file_mb': round(size / 1e6, 1),
+            }
+
+        original = open(paths['text']).read()
+        identical = {backend: windows[backend] == windows['text'] for backend in paths}
+        export_identical = {backend: export_text(path, backend) == original for backend, path in paths.items()}
+
+    result = {
+        'records': records,
+        'window_days': args.window_days,
+        'backends': results,
+        'migration_s': migration_s,
+        'same_records_as_text': identical,
+        'export_matches_original': export_identical,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{records} records, querying the last {args.window_days:g} days")
+    print(f"{'Backend':<8} {'Query':>10} {'Returned':>10} {'Size':>9} {'Same':>5} {'Export':>7}")
+    for backend, stats in results.items():
+        print(f"{backend:<8} {stats['query_ms']:>8}ms {stats['records_returned']:>10} {stats['file_mb']:>7}MB "
+              f"{'yes' if identical[backend] else 'NO':>5} {'yes' if export_identical[backend] else 'NO':>7}")
+    print("Migration: " + ', '.join(f"{backend} {seconds}s" for backend, seconds in migration_s.items()))
+
+
+if __name__ == '__main__':
+    main()
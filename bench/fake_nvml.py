@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Fake NVML library for exercising fan_control.NvmlReader without an NVIDIA GPU.
+
+FakeNvmlLibrary mimics the ctypes-loaded libnvidia-ml: every nvml* function takes
+ctypes arguments (byref() pointers are written through) and returns an NVML
+status code. Pass it as NvmlReader(library=FakeNvmlLibrary(...)).
+
+Usage:
+  python3 bench/fake_nvml.py --gpus 4 --reads 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+NVML_SUCCESS = 0
+NVML_ERROR_UNINITIALIZED = 1
+NVML_ERROR_INVALID_ARGUMENT = 2
+NVML_ERROR_NOT_SUPPORTED = 3
+
+ERROR_STRINGS = {
+    NVML_SUCCESS: b'Success',
+    NVML_ERROR_UNINITIALIZED: b'Uninitialized',
+    NVML_ERROR_INVALID_ARGUMENT: b'Invalid Argument',
+    NVML_ERROR_NOT_SUPPORTED: b'Not Supported',
+}
+
+
+def _target(pointer):
+    """The ctypes object behind a byref() argument."""
+    return getattr(pointer, '_obj', pointer)
+
+
+class FakeNvmlLibrary:
+    """
+    In-process stand-in for libnvidia-ml.so.
+    gpus: list of {'temperature': C, 'power_mw': mW or None, 'utilization': % or None};
+    None makes that query return NVML_ERROR_NOT_SUPPORTED.
+    """
+
+    def __init__(self, gpus=None):
+        self.gpus = gpus if gpus is not None else [
+            {'temperature': 45, 'power_mw': 85000, 'utilization': 12},
+            {'temperature': 52, 'power_mw': 210000, 'utilization': 97},
+        ]
+        self.initialized = False
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _device(self, handle):
+        index = _target(handle).value
+        if not self.initialized:
+            return None, NVML_ERROR_UNINITIALIZED
+        if index is None or not 1 <= index <= len(self.gpus):
+            return None, NVML_ERROR_INVALID_ARGUMENT
+        return self.gpus[index - 1], NVML_SUCCESS
+
+    def nvmlErrorString(self, code):
+        return ERROR_STRINGS.get(code, b'Unknown Error')
+
+    def nvmlInit_v2(self):
+        self._count('nvmlInit_v2')
+        self.initialized = True
+        return NVML_SUCCESS
+
+    def nvmlShutdown(self):
+        self._count('nvmlShutdown')
+        self.initialized = False
+        return NVML_SUCCESS
+
+    def nvmlDeviceGetCount_v2(self, count):
+        self._count('nvmlDeviceGetCount_v2')
+        if not self.initialized:
+            return NVML_ERROR_UNINITIALIZED
+        _target(count).value = len(self.gpus)
+        return NVML_SUCCESS
+
+    def nvmlDeviceGetHandleByIndex_v2(self, index, handle):
+        self._count('nvmlDeviceGetHandleByIndex_v2')
+        if not self.initialized:
+            return NVML_ERROR_UNINITIALIZED
+        if not 0 <= index.value < len(self.gpus):
+            return NVML_ERROR_INVALID_ARGUMENT
+        _target(handle).value = index.value + 1  # Handles are opaque; never NULL
+        return NVML_SUCCESS
+
+    def nvmlDeviceGetTemperature(self, handle, sensor, temperature):
+        self._count('nvmlDeviceGetTemperature')
+        gpu, code = self._device(handle)
+        if code == NVML_SUCCESS:
+            _target(temperature).value = gpu['temperature']
+        return code
+
+    def nvmlDeviceGetPowerUsage(self, handle, power):
+        self._count('nvmlDeviceGetPowerUsage')
+        gpu, code = self._device(handle)
+        if code != NVML_SUCCESS:
+            return code
+        if gpu.get('power_mw') is None:
+            return NVML_ERROR_NOT_SUPPORTED
+        _target(power).value = gpu['power_mw']
+        return NVML_SUCCESS
+
+    def nvmlDeviceGetUtilizationRates(self, handle, utilization):
+        self._count('nvmlDeviceGetUtilizationRates')
+        gpu, code = self._device(handle)
+        if code != NVML_SUCCESS:
+            return code
+        if gpu.get('utilization') is None:
+            return NVML_ERROR_NOT_SUPPORTED
+        _target(utilization).gpu = gpu['utilization']
+        _target(utilization).memory = gpu['utilization'] // 2
+        return NVML_SUCCESS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read GPUs through fan_control.NvmlReader and a fake NVML')
+    parser.add_argument('--gpus', type=int, default=4)
+    parser.add_argument('--reads', type=int, default=1000)
+    args = parser.parse_args()
+
+    import fan_control
+    library = FakeNvmlLibrary([
+        {'temperature': 40 + i * 3, 'power_mw': 100000 + i * 25000, 'utilization': (i * 30) % 100}
+        for i in range(args.gpus)
+    ])
+    reader = fan_control.NvmlReader(library=library)
+    for reading in reader.read():
+        print(reading)
+
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        reader.read()
+    per_read_us = (time.perf_counter() - start) / args.reads * 1e6
+    print(f"\n{args.gpus} GPUs: {per_read_us:.1f} us per read (library calls only; nvmlInit ran "
+          f"{library.calls['nvmlInit_v2']} time)")
+    reader.shutdown()
+
+
+if __name__ == '__main__':
+    main()
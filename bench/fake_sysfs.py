@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Build a fake /sys/class/hwmon tree for running fan_control.py's sysfs readers
+without real hardware. Point HWMON_PATH at the generated directory.
+With --drm, also build a fake /sys/class/drm tree with amdgpu/xe cards (DRM_PATH).
+
+Usage:
+  python3 bench/fake_sysfs.py /tmp/fake-hwmon
+  HWMON_PATH=/tmp/fake-hwmon python3 fan_control.py --temps
+  python3 bench/fake_sysfs.py /tmp/fake-hwmon --drm /tmp/fake-drm
+  DRM_PATH=/tmp/fake-drm python3 fan_control.py --temps
+"""
+
+import argparse
+import os
+
+# (hwmon name, [(temp label, millidegrees)], [(fan label, rpm)])
+DEFAULT_DEVICES = [
+    ('coretemp', [('Package id 0', 41000)] + [(f'Core {i}', 38000 + i * 500) for i in range(8)], []),
+    ('coretemp', [('Package id 1', 43000)] + [(f'Core {i}', 39000 + i * 500) for i in range(8)], []),
+    ('dell_smm', [('Ambient', 22000), ('Exhaust', 31000)], [(f'Fan{i + 1}', 2400 + i * 60) for i in range(6)]),
+    ('nvme', [('Composite', 36850)], []),
+]
+
+# (hwmon name, [(temp label, millidegrees)]) per card
+DEFAULT_GPUS = [
+    ('amdgpu', [('edge', 52000), ('junction', 61000), ('mem', 58000)]),
+    ('amdgpu', [('edge', 47000), ('junction', 55000), ('mem', 54000)]),
+    ('xe', [('pkg', 44000), ('vram', 49000)]),
+]
+
+
+def write_attribute(path, value):
+    with open(path, 'w') as f:
+        f.write(f'{value}\n')
+
+
+def create_fake_hwmon(root, devices=None):
+    """Create hwmonN directories under root. Returns the list of device paths."""
+    os.makedirs(root, exist_ok=True)
+    paths = []
+    for number, (name, temps, fans) in enumerate(devices or DEFAULT_DEVICES):
+        device = os.path.join(root, f'hwmon{number}')
+        os.makedirs(device, exist_ok=True)
+        write_attribute(os.path.join(device, 'name'), name)
+        for i, (label, millidegrees) in enumerate(temps, start=1):
+            write_attribute(os.path.join(device, f'temp{i}_input'), millidegrees)
+            write_attribute(os.path.join(device, f'temp{i}_label'), label)
+            write_attribute(os.path.join(device, f'temp{i}_max'), 90000)
+            write_attribute(os.path.join(device, f'temp{i}_crit'), 100000)
+        for i, (label, rpm) in enumerate(fans, start=1):
+            write_attribute(os.path.join(device, f'fan{i}_input'), rpm)
+            write_attribute(os.path.join(device, f'fan{i}_label'), label)
+            write_attribute(os.path.join(device, f'fan{i}_min'), 600)
+        paths.append(device)
+    return paths
+
+
+def create_fake_drm(root, gpus=None, first_hwmon=10):
+    """
+    Create cardN/device/hwmon/hwmonM directories under root, plus a connector
+    entry (card0-DP-1) that readers must skip. Returns the list of hwmon paths.
+    """
+    os.makedirs(os.path.join(root, 'card0-DP-1'), exist_ok=True)
+    write_attribute(os.path.join(root, 'card0-DP-1', 'status'), 'disconnected')
+    paths = []
+    for number, (name, temps) in enumerate(gpus or DEFAULT_GPUS):
+        hwmon = os.path.join(root, f'card{number}', 'device', 'hwmon', f'hwmon{first_hwmon + number}')
+        os.makedirs(hwmon, exist_ok=True)
+        write_attribute(os.path.join(hwmon, 'name'), name)
+        for i, (label, millidegrees) in enumerate(temps, start=1):
+            write_attribute(os.path.join(hwmon, f'temp{i}_input'), millidegrees)
+            write_attribute(os.path.join(hwmon, f'temp{i}_label'), label)
+            write_attribute(os.path.join(hwmon, f'temp{i}_crit'), 100000)
+        # amdgpu also exposes power and fan inputs; only temperatures are GPU readings
+        write_attribute(os.path.join(hwmon, 'power1_average'), 120000000)
+        paths.append(hwmon)
+    return paths
+
+
+def scaled_devices(device_count, temps_per_device, fans_per_device):
+    """Generate a larger synthetic device list for benchmarks."""
+    return [
+        (f'chip{d}',
+         [(f'temp{t}', 30000 + (d * 7 + t) % 40 * 1000) for t in range(temps_per_device)],
+         [(f'fan{f}', 2000 + f * 100) for f in range(fans_per_device)])
+        for d in range(device_count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create a fake /sys/class/hwmon tree')
+    parser.add_argument('root', help='Directory to create (use as HWMON_PATH)')
+    parser.add_argument('--devices', type=int, help='Generate N synthetic devices instead of the default R730-like set')
+    parser.add_argument('--temps', type=int, default=8, help='Temperature inputs per synthetic device')
+    parser.add_argument('--fans', type=int, default=2, help='Fan inputs per synthetic device')
+    parser.add_argument('--drm', metavar='DIR', help='Also create a fake /sys/class/drm tree here (use as DRM_PATH)')
+    args = parser.parse_args()
+
+    devices = scaled_devices(args.devices, args.temps, args.fans) if args.devices else None
+    paths = create_fake_hwmon(args.root, devices)
+    print(f"Created {len(paths)} hwmon devices under {args.root}")
+    if args.drm:
+        paths = create_fake_drm(args.drm)
+        print(f"Created {len(paths)} GPU hwmon nodes under {args.drm}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Fleet mode under load: --hosts mock BMCs (mock_bmc.py --count) and an inventory
+pointing fleet.py at them, then --rounds of one cycle on every host at once.
+
+Reports the wall time per round, host cycle p50/p95/max (including the wait for
+a session slot), the results (ok / failed / deadline), the peak number of IPMI
+commands in flight and what the mock BMCs saw. The first round opens the
+sessions and reads the SDR repositories; later rounds are the steady state.
+With --transport subprocess the hosts are driven through bench/fake_ipmitool
+instead (its FAKE_IPMITOOL_* delays apply).
+
+Usage:
+  python3 bench/fleet_bench.py --hosts 100 --rounds 3
+  python3 bench/fleet_bench.py --hosts 200 --max-sessions 32 --latency 0.02 --json
+  python3 bench/fleet_bench.py --hosts 50 --transport subprocess
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+async def run_rounds(fleet_module, hosts, args):
+    fleet = fleet_module.Fleet(hosts, args.max_sessions, interval=1)
+    rounds = []
+    try:
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            results = await fleet.run_once()
+            wall = time.perf_counter() - start
+            durations = [host.last['duration'] for host in hosts]
+            rounds.append({
+                'wall_s': round(wall, 3),
+                'p50_ms': round(percentile(durations, 0.5) * 1000, 1),
+                'p95_ms': round(percentile(durations, 0.95) * 1000, 1),
+                'max_ms': round(max(durations) * 1000, 1),
+                'results': {result: list(results.values()).count(result) for result in set(results.values())},
+            })
+    finally:
+        await fleet.close()
+    return rounds, fleet.peak_sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='fleet.py against many mock BMCs')
+    parser.add_argument('--hosts', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--transport', choices=('native', 'subprocess'), default='native')
+    parser.add_argument('--base-port', type=int, default=16000)
+    parser.add_argument('--latency', type=float, default=0.005, help='Mock BMC seconds per response')
+    parser.add_argument('--max-sessions', type=int, default=16)
+    parser.add_argument('--deadline', type=float, default=20)
+    parser.add_argument('--rate', type=float, default=5, help='IPMI commands per second per host')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'LOG_FILE': os.path.join(tmp, 'fan_control.log'),
+            'FLEET_STATE_DIR': os.path.join(tmp, 'state'),
+            'FLEET_CYCLE_DEADLINE': str(args.deadline),
+            'FLEET_HOST_RATE': str(args.rate),
+        })
+        if args.transport == 'subprocess':
+            bin_dir = os.path.join(tmp, 'bin')
+            os.makedirs(bin_dir)
+            os.symlink(os.path.join(BENCH_DIR, 'fake_ipmitool'), os.path.join(bin_dir, 'ipmitool'))
+            os.environ['PATH'] = bin_dir + os.pathsep + os.environ['PATH']
+        logging.basicConfig(level=logging.WARNING, format='%(message)s')
+        import fleet
+        import ipmi_lanplus
+
+        mock = None
+        if args.transport == 'native':
+            mock = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, 'mock_bmc.py'), '--port', str(args.base_port),
+                                     '--count', str(args.hosts), '--latency', str(args.latency)],
+                                    stdout=subprocess.PIPE, text=True)
+            mock.stdout.readline()  # Listening
+        inventory = os.path.join(tmp, 'fleet.json')
+        with open(inventory, 'w') as f:
+            json.dump({
+                'defaults': {'transport': args.transport, 'cipher_suite': 3 if ipmi_lanplus.Cipher else 2},
+                'hosts': [{'name': f'r730-{i:03d}', 'address': '127.0.0.1', 'port': args.base_port + i}
+                          for i in range(args.hosts)],
+            }, f)
+        try:
+            hosts = fleet.load_inventory(inventory, os.environ['FLEET_STATE_DIR'])
+            rounds, peak_sessions = asyncio.run(run_rounds(fleet, hosts, args))
+        finally:
+            mock_stats = None
+            if mock:
+                mock.send_signal(signal.SIGINT)
+                mock_stats = mock.communicate(timeout=10)[0].strip()
+
+    result = {
+        'hosts': args.hosts,
+        'transport': args.transport,
+        'max_sessions': args.max_sessions,
+        'rate': args.rate,
+        'latency_s': args.latency,
+        'peak_sessions': peak_sessions,
+        'rounds': rounds,
+        'mock_bmcs': mock_stats,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{args.hosts} hosts over {args.transport}, {args.max_sessions} sessions, {args.rate:g} commands/s per host")
+    for i, r in enumerate(rounds, 1):
+        results = ', '.join(f"{count} {name}" for name, count in sorted(r['results'].items()))
+        print(f"round {i}: {r['wall_s']:.2f}s; host cycle p50 {r['p50_ms']:.0f}ms, "
+              f"p95 {r['p95_ms']:.0f}ms, max {r['max_ms']:.0f}ms; {results}")
+    print(f"peak IPMI commands in flight: {peak_sessions}/{args.max_sessions}")
+    if mock_stats:
+        print(f"mock BMCs: {mock_stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Time and memory of --history / --history-detailed on a large synthetic log.
+
+Writes a fan control log of --size-mb (daemon cycles every --interval seconds,
+ending now), then runs the original readers (verbatim copies below: readlines()
+the whole file / strptime every line) and the current tail-seek readers in
+fan_control.py, each in a fresh process, and reports wall time, peak RSS and
+whether the outputs match. With --rotate the same log is also split into
+LOG, LOG.1 and LOG.2.gz (logrotate layout) and the current readers are checked
+against the single-file output.
+
+Usage:
+  python3 bench/history_bench.py                       # 1 GB log
+  python3 bench/history_bench.py --size-mb 200 --rotate
+  python3 bench/history_bench.py --skip-legacy --json
+"""
+
+import argparse
+import contextlib
+import gzip
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+
+def legacy_show_temperature_history(LOG_FILE, lines=50):
+    """Show temperature history from log file."""
+    print("=" * 60)
+    print(f"Temperature History (last {lines} entries)")
+    print("=" * 60)
+
+    if not os.path.exists(LOG_FILE):
+        print(f"Log file not found: {LOG_FILE}")
+        return
+
+    try:
+        with open(LOG_FILE, 'r') as f:
+            all_lines = f.readlines()
+
+        # Extract temperature entries
+        temp_entries = []
+        for line in all_lines:
+            if 'GPU Temperatures:' in line or 'System Temperatures:' in line:
+                temp_entries.append(line.strip())
+
+        # Show last N entries
+        for entry in temp_entries[-lines:]:
+            print(entry)
+
+        if not temp_entries:
+            print("No temperature entries found in log file.")
+
+    except Exception as e:
+        print(f"Error reading log file: {e}")
+
+
+def legacy_show_detailed_history(LOG_FILE, hours=24):
+    """Show detailed temperature history with timestamps."""
+    print("=" * 60)
+    print(f"Detailed Temperature History (last {hours} hours)")
+    print("=" * 60)
+
+    if not os.path.exists(LOG_FILE):
+        print(f"Log file not found: {LOG_FILE}")
+        return
+
+    try:
+        cutoff_time = datetime.now().timestamp() - (hours * 3600)
+        gpu_temps_history = []
+        system_temps_history = []
+        fan_speeds_history = []
+
+        with open(LOG_FILE, 'r') as f:
+            for line in f:
+                # Parse timestamp
+                try:
+                    # Log format: YYYY-MM-DD HH:MM:SS,XXX - LEVEL - message
+                    timestamp_str = line[:19]  # First 19 chars are YYYY-MM-DD HH:MM:SS
+                    timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S').timestamp()
+
+                    if timestamp < cutoff_time:
+                        continue
+
+                    # Extract GPU temps
+                    if 'GPU Temperatures:' in line:
+                        match = re.search(r'GPU Temperatures: ([\d\s,]+)°C', line)
+                        if match:
+                            temps_str = match.group(1)
+                            temps = [int(t.strip()) for t in temps_str.split(',') if t.strip().isdigit()]
+                            if temps:
+                                gpu_temps_history.append((timestamp, temps))
+
+                    # Extract system temps
+                    if 'System Temperatures:' in line:
+                        match = re.search(r'System Temperatures: ([\d\s,]+)°C', line)
+                        if match:
+                            temps_str = match.group(1)
+                            temps = [int(t.strip()) for t in temps_str.split(',') if t.strip().isdigit()]
+                            if temps:
+                                system_temps_history.append((timestamp, temps))
+
+                    # Extract fan speeds
+                    if 'Current Fan Speeds:' in line:
+                        match = re.search(r'Current Fan Speeds: ([\d\s,]+)', line)
+                        if match:
+                            speeds_str = match.group(1)
+                            speeds = [int(s.strip()) for s in speeds_str.split(',') if s.strip().isdigit()]
+                            if speeds:
+                                fan_speeds_history.append((timestamp, speeds))
+
+                except (ValueError, IndexError):
+                    continue
+
+        # Display history
+        print("\nGPU Temperature History:")
+        if gpu_temps_history:
+            for timestamp, temps in gpu_temps_history[-20:]:  # Last 20 entries
+                dt = datetime.fromtimestamp(timestamp)
+                max_temp = max(temps)
+                print(f"  {dt.strftime('%Y-%m-%d %H:%M:%S')}: {', '.join(map(str, temps))}°C (max: {max_temp}°C)")
+        else:
+            print("  No GPU temperature data found")
+
+        print("\nSystem Temperature History:")
+        if system_temps_history:
+            for timestamp, temps in system_temps_history[-20:]:  # Last 20 entries
+                dt = datetime.fromtimestamp(timestamp)
+                max_temp = max(temps)
+                print(f"  {dt.strftime('%Y-%m-%d %H:%M:%S')}: {', '.join(map(str, temps))}°C (max: {max_temp}°C)")
+        else:
+            print("  No system temperature data found")
+
+        print("\nFan Speed History:")
+        if fan_speeds_history:
+            for timestamp, speeds in fan_speeds_history[-20:]:  # Last 20 entries
+                dt = datetime.fromtimestamp(timestamp)
+                avg_speed = sum(speeds) // len(speeds)
+                print(f"  {dt.strftime('%Y-%m-%d %H:%M:%S')}: {', '.join(map(str, speeds))} RPM (avg: {avg_speed} RPM)")
+        else:
+            print("  No fan speed data found")
+
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"Error reading log file: {e}")
+
+
+def cycle_lines(timestamp, rng):
+    """One daemon cycle as fan_control.py logs it (plus an occasional traceback)."""
+    stamp = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+    millis = rng.randint(0, 999)
+    gpu = [rng.randint(35, 85) for _ in range(2)]
+    system = [rng.randint(25, 60) for _ in range(20)]
+    fans = [rng.randint(2000, 9000) for _ in range(6)]
+    speed = rng.choice((10, 15, 25, 35, 50))
+    prefix = f"{stamp},{millis:03d} - INFO - "
+    lines = [
+        prefix + "=" * 60,
+        prefix + "Dell R730 Fan Control",
+        prefix + "iDRAC IP: 192.168.1.100",
+        prefix + "=" * 60,
+        prefix + f"GPU Temperatures: {', '.join(map(str, gpu))}°C (max: {max(gpu)}°C)",
+        prefix + f"System Temperatures: {', '.join(map(str, system))}°C (max: {max(system)}°C)",
+        prefix + f"Current Fan Speeds: {', '.join(map(str, fans))} RPM (avg: {sum(fans) // len(fans)} RPM)",
+        prefix + f"Decision: GPU temperature {max(gpu)}°C >= LOW threshold (40°C)",
+        prefix + f"ACTION: Setting fan speed to {speed}% (Target: {speed}%)",
+        prefix + f"Fan speed already {speed}% in manual mode, skipping IPMI writes",
+        prefix + "IPMI writes: 0 sent, 1 skipped (total: 12 sent, 3410 skipped)",
+        prefix + "Check complete",
+    ]
+    if rng.random() < 0.001:
+        lines += [f"{stamp},{millis:03d} - ERROR - Failed to read sensors",
+                  "Traceback (most recent call last):",
+                  '  File "fan_control.py", line 1, in <module>',
+                  "TimeoutError: sensor read timed out"]
+    return '\n'.join(lines) + '\n'
+
+
+def write_log(path, size_mb, interval, seed=1):
+    """Write about size_mb of log ending now; returns (bytes, cycles)."""
+    rng = random.Random(seed)
+    sample = cycle_lines(0, rng)
+    cycles = int(size_mb * 1024 * 1024 / len(sample.encode()))
+    end = int(time.time())
+    written = 0
+    with open(path, 'w') as f:
+        chunk = []
+        for i in range(cycles):
+            chunk.append(cycle_lines(end - (cycles - i) * interval, rng))
+            if len(chunk) >= 2000:
+                text = ''.join(chunk)
+                f.write(text)
+                written += len(text.encode())
+                chunk = []
+        text = ''.join(chunk)
+        f.write(text)
+        written += len(text.encode())
+    return written, cycles
+
+
+def rotate(path, directory):
+    """Split path into LOG (newest third), LOG.1 and LOG.2.gz in directory; returns the new LOG path."""
+    size = os.path.getsize(path)
+    rotated = os.path.join(directory, os.path.basename(path))
+    with open(path, 'rb') as f:
+        boundaries = [0]
+        for fraction in (1 / 3, 2 / 3):
+            f.seek(int(size * fraction))
+            f.readline()
+            boundaries.append(f.tell())
+        boundaries.append(size)
+        parts = [(rotated + '.2.gz', boundaries[0], boundaries[1]),
+                 (rotated + '.1', boundaries[1], boundaries[2]),
+                 (rotated, boundaries[2], boundaries[3])]
+        for mtime_offset, (target, begin, end) in enumerate(parts):
+            f.seek(begin)
+            opener = gzip.open if target.endswith('.gz') else open
+            with opener(target, 'wb') as out:
+                remaining = end - begin
+                while remaining:
+                    block = f.read(min(remaining, 1 << 20))
+                    out.write(block)
+                    remaining -= len(block)
+            os.utime(target, (time.time() - 100 + mtime_offset, time.time() - 100 + mtime_offset))
+    return rotated
+
+
+def run_child(mode, log_path, entries, hours):
+    """Run one reader in a fresh process; returns (seconds, peak RSS MB, stdout)."""
+    with tempfile.TemporaryFile() as out:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', mode, '--log', log_path,
+                                    '--entries', str(entries), '--hours', str(hours)], stdout=out)
+        _, _, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        out.seek(0)
+        return elapsed, usage.ru_maxrss / 1024, out.read().decode()
+
+
+def child(mode, log_path, entries, hours):
+    if mode == 'legacy-history':
+        legacy_show_temperature_history(log_path, entries)
+    elif mode == 'legacy-detailed':
+        legacy_show_detailed_history(log_path, hours)
+    else:
+        import fan_control
+        fan_control.LOG_FILE = log_path
+        if mode == 'history':
+            fan_control.show_temperature_history(entries)
+        else:
+            fan_control.show_detailed_history(hours)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='History reader cost on a large synthetic log')
+    parser.add_argument('--size-mb', type=float, default=1024)
+    parser.add_argument('--interval', type=int, default=5, help='Seconds between logged cycles')
+    parser.add_argument('--entries', type=int, default=50, help='--history N')
+    parser.add_argument('--hours', type=int, default=24, help='--history-detailed HOURS')
+    parser.add_argument('--rotate', action='store_true', help='Also check a LOG / LOG.1 / LOG.2.gz split')
+    parser.add_argument('--skip-legacy', action='store_true', help='Do not run the original readers')
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--log', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.log, args.entries, args.hours)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'fan-control.log')
+        size, cycles = write_log(log_path, args.size_mb, args.interval)
+        results = {'log_mb': round(size / 1e6), 'cycles': cycles, 'readers': {}}
+        outputs = {}
+        modes = ['history', 'detailed'] + ([] if args.skip_legacy else ['legacy-history', 'legacy-detailed'])
+        for mode in modes:
+            elapsed, rss_mb, outputs[mode] = run_child(mode, log_path, args.entries, args.hours)
+            results['readers'][mode] = {'seconds': round(elapsed, 3), 'peak_rss_mb': round(rss_mb)}
+        if not args.skip_legacy:
+            results['history_matches_legacy'] = outputs['history'] == outputs['legacy-history']
+            results['detailed_matches_legacy'] = outputs['detailed'] == outputs['legacy-detailed']
+        if args.rotate:
+            rotated_dir = os.path.join(tmp, 'rotated')
+            os.makedirs(rotated_dir)
+            rotated = rotate(log_path, rotated_dir)
+            with contextlib.suppress(OSError):
+                os.remove(log_path)
+            for mode, window in (('history', args.entries), ('detailed', args.hours)):
+                elapsed, rss_mb, output = run_child(mode, rotated, args.entries, args.hours)
+                results['readers'][f'{mode}-rotated'] = {'seconds': round(elapsed, 3), 'peak_rss_mb': round(rss_mb)}
+                results[f'{mode}_rotated_matches_single_file'] = output == outputs[mode]
+            shutil.rmtree(rotated_dir)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"Log: {results['log_mb']} MB, {cycles} cycles")
+    print(f"{'Reader':<20} {'Time':>10} {'Peak RSS':>10}")
+    for mode, stats in results['readers'].items():
+        print(f"{mode:<20} {stats['seconds']:>9.3f}s {stats['peak_rss_mb']:>8} MB")
+    for key, value in results.items():
+        if key.endswith('matches_legacy') or key.endswith('matches_single_file'):
+            print(f"{key}: {'yes' if value else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
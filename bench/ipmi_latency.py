@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Compare per-cycle IPMI latency of the subprocess, shell and native transports.
+
+One "cycle" is what a normal fan_control.py run sends: enable manual mode,
+set fan speed, and one `sdr list`.
+
+Without --host the native transport talks to a local mock BMC and the ipmitool
+transports use bench/fake_ipmitool (whose delays are simulated, see
+FAKE_IPMITOOL_* in bench/README.md). With --host all transports talk to the
+real iDRAC.
+
+Usage:
+  python3 bench/ipmi_latency.py --cycles 20
+  python3 bench/ipmi_latency.py --host 10.1.10.20 --user root --password calvin
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+CYCLE_COMMANDS = [
+    ['raw', '0x30', '0x30', '0x01', '0x00'],
+    ['raw', '0x30', '0x30', '0x02', '0xff', '0x14'],
+    ['sdr', 'list'],
+]
+
+
+def time_cycles(fan_control, transport, cycles):
+    fan_control.IPMI_TRANSPORT = transport
+    samples = []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        for cmd_args in CYCLE_COMMANDS:
+            success, _, stderr = fan_control.run_ipmi_command(cmd_args)
+            if not success:
+                raise RuntimeError(f"{transport}: {' '.join(cmd_args)} failed: {stderr}")
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'transport': transport,
+        'cycles': cycles,
+        'first_ms': round(samples[0], 2),
+        'median_ms': round(statistics.median(samples), 2),
+        'max_ms': round(max(samples), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IPMI transport latency comparison')
+    parser.add_argument('--cycles', type=int, default=10)
+    parser.add_argument('--host', help='Real iDRAC address (default: local mock BMC + fake ipmitool)')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='calvin')
+    parser.add_argument('--cipher-suite', type=int, default=3 if _has_aes() else 2)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    bmc = None
+    if args.host is None:
+        from mock_bmc import MockBMC
+        bmc = MockBMC(username=args.user, password=args.password).start()
+    os.environ.update({
+        'IDRAC_IP': args.host or '127.0.0.1',
+        'IDRAC_USER': args.user,
+        'IDRAC_PASS': args.password,
+        'IPMI_PORT': str(bmc.port if bmc else 623),
+        'IPMI_CIPHER_SUITE': str(args.cipher_suite),
+    })
+
+    import fan_control
+    if bmc is not None:
+        fake_ipmitool = os.path.join(BENCH_DIR, 'fake_ipmitool')
+        fan_control.ipmitool_base_command = lambda: [fake_ipmitool, '-I', 'lanplus',
+                                                     '-H', '127.0.0.1', '-U', args.user, '-P', args.password]
+
+    results = [time_cycles(fan_control, transport, args.cycles) for transport in ('subprocess', 'shell', 'native')]
+    if bmc is not None:
+        bmc.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'Transport':<12} {'First (ms)':>12} {'Median (ms)':>12} {'Max (ms)':>12}")
+    for result in results:
+        print(f"{result['transport']:<12} {result['first_ms']:>12} {result['median_ms']:>12} {result['max_ms']:>12}")
+    if bmc is not None:
+        print("\nNote: subprocess/shell used bench/fake_ipmitool (simulated delays); native used the mock BMC.")
+
+
+def _has_aes():
+    import ipmi_lanplus
+    return ipmi_lanplus.Cipher is not None
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Full vs incremental learn_thresholds.py analysis.
+
+Writes a synthetic data log (--days of history, one record every --interval
+seconds, fan speed following the temperature with slow drifts so the trend
+analysis has something to find), then:
+
+1. runs the full analysis (parse_data_log + analyze_*) and the first
+   --incremental run, and checks that both produce the same report;
+2. appends --append-minutes of new records and times a second full run against
+   a second incremental run (which only reads the appended records), checking
+   the reports again.
+
+With --days below ANALYSIS_DAYS (the default) no bucket straddles the window
+edge, so the reports must be identical.
+
+Usage:
+  python3 bench/learn_bench.py
+  python3 bench/learn_bench.py --days 6 --interval 5 --backend binary --json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import data_store  # noqa: E402
+
+
+def synthetic_records(start, end, interval, seed):
+    rng = random.Random(seed)
+    for timestamp in range(int(start), int(end), interval):
+        hours = timestamp / 3600
+        base = 45 + 15 * math.sin(hours / 5) + 0.02 * (hours % 240)
+        gpu = [round(base + rng.gauss(0, 2)), round(base - 3 + rng.gauss(0, 2))]
+        system = [round(base - 15 + rng.gauss(0, 1)) for _ in range(4)]
+        fan_pct = 10 if max(gpu) < 40 else 15 if max(gpu) < 50 else 25 if max(gpu) < 60 else 35
+        fans = [int(1500 + fan_pct * 80 + rng.gauss(0, 40)) for _ in range(6)]
+        yield data_store.make_record(gpu, system, fans, fan_pct, float(timestamp))
+
+
+def report(learn, summary, efficiency, trends):
+    suggestions, message = learn.suggest_threshold_adjustments(summary['count'], efficiency, {
+        'system_temp_very_low': 30, 'system_temp_low': 40, 'system_temp_med_low': 50, 'system_temp_med': 60,
+    })
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        learn.generate_report(summary, efficiency, suggestions, trends)
+        print(message)
+    return output.getvalue()
+
+
+def full_run(learn):
+    data = learn.parse_data_log()
+    return report(learn, learn.summarize_data(data), learn.analyze_fan_efficiency(data),
+                  learn.analyze_temperature_trends(data))
+
+
+def incremental_run(learn):
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary, efficiency, trends = learn.analyze_incremental()
+    return report(learn, summary, efficiency, trends)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full vs incremental threshold learning')
+    parser.add_argument('--days', type=float, default=6)
+    parser.add_argument('--interval', type=int, default=5)
+    parser.add_argument('--append-minutes', type=int, default=60)
+    parser.add_argument('--backend', choices=data_store.BACKENDS, default='text')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = data_store.default_data_log_file(args.backend, tmp)
+        os.environ['DATA_LOG_BACKEND'] = args.backend
+        os.environ['DATA_LOG_FILE'] = path
+        os.environ['LEARN_CHECKPOINT_FILE'] = os.path.join(tmp, 'checkpoint.json')
+        import learn_thresholds as learn
+
+        now = time.time()
+        append_start = now - args.append_minutes * 60
+        store = data_store.open_data_store(path, args.backend)
+        store.append_many(list(synthetic_records(now - args.days * 86400, append_start, args.interval, 1)))
+        records = store.end_position() if args.backend != 'text' else None
+
+        full_s, full_report = timed(full_run, learn)
+        first_s, first_report = timed(incremental_run, learn)
+
+        store.append_many(list(synthetic_records(append_start, now, args.interval, 2)))
+        store.close()
+        full2_s, full2_report = timed(full_run, learn)
+        update_s, update_report = timed(incremental_run, learn)
+        checkpoint_kb = os.path.getsize(os.environ['LEARN_CHECKPOINT_FILE']) / 1024
+
+    result = {
+        'backend': args.backend,
+        'days': args.days,
+        'records': records,
+        'full_s': round(full_s, 3),
+        'incremental_first_s': round(first_s, 3),
+        'full_after_append_s': round(full2_s, 3),
+        'incremental_after_append_s': round(update_s, 4),
+        'checkpoint_kb': round(checkpoint_kb),
+        'first_report_identical': full_report == first_report,
+        'report_after_append_identical': full2_report == update_report,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{args.days:g} days, {args.backend} backend, +{args.append_minutes} min appended")
+    print(f"full analysis:                {result['full_s']:.3f}s")
+    print(f"incremental (no checkpoint):  {result['incremental_first_s']:.3f}s")
+    print(f"full analysis after append:   {result['full_after_append_s']:.3f}s")
+    print(f"incremental after append:     {result['incremental_after_append_s']:.4f}s "
+          f"(checkpoint {result['checkpoint_kb']} KB)")
+    print(f"reports identical:            {result['first_report_identical']} / {result['report_after_append_identical']}")
+    if not (result['first_report_identical'] and result['report_after_append_identical']):
+        print("\n--- full ---\n" + full2_report + "\n--- incremental ---\n" + update_report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Pure-Python vs NumPy learn_thresholds.py analysis engines.
+
+Writes a synthetic data log (--days of history, one record every --interval
+seconds, 2 GPUs and --system-sensors system temperatures, some of them with
+decimals), optionally sprinkled with the oddities a real log collects (--mess:
+blank and truncated lines, empty and unparsable values, a line with an extra
+field, an unterminated last line), then runs the full analysis with --sensors
+over the whole log with each engine, checks that the reports are identical and
+times them (the NumPy engine also without --sensors).
+
+Usage:
+  python3 bench/learn_engine_bench.py --days 7 --mess
+  python3 bench/learn_engine_bench.py --days 365 --backend binary --skip-python --json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import data_store  # noqa: E402
+
+
+def synthetic_records(start, end, interval, system_sensors, seed=1):
+    rng = random.Random(seed)
+    for timestamp in range(int(start), int(end), interval):
+        hours = timestamp / 3600
+        base = 45 + 15 * math.sin(hours / 5)
+        gpu = [round(base + rng.gauss(0, 2)), round(base - 3 + rng.gauss(0, 2))]
+        system = [round(base - 15 + 2 * i + rng.gauss(0, 1), 1 if i % 4 == 0 else None) for i in range(system_sensors)]
+        hottest = max(gpu + system)
+        fan_pct = 10 if hottest < 40 else 15 if hottest < 50 else 25 if hottest < 60 else 35
+        fans = [int(1500 + fan_pct * 80 + rng.gauss(0, 40)) for _ in range(6)]
+        yield data_store.make_record(gpu, system, fans, fan_pct, float(timestamp))
+
+
+def messy_lines(lines, rng):
+    """Damage about one line in a thousand the ways a real log gets damaged."""
+    damage = [
+        lambda line: '\n',
+        lambda line: line[:len(line) // 2] + '\n',
+        lambda line: line.replace('|', '||', 1),
+        lambda line: line.replace(',', ',,', 1),
+        lambda line: line.replace(',', ',n/a,', 1),
+        lambda line: line.rstrip('\n') + '|extra\n',
+        lambda line: line.replace('|', '|-', 1),
+        lambda line: line.replace('|', '| ', 1),
+        lambda line: line[:20] + '|' + line[20:],
+    ]
+    for line in lines:
+        if rng.random() < 0.001:
+            line = rng.choice(damage)(line)
+        yield line
+
+
+def write_log(path, backend, records, mess):
+    if backend == 'text':
+        lines = (data_store.format_text_line(record) for record in records)
+        with open(path, 'w') as f:
+            if mess:
+                lines = messy_lines(lines, random.Random(2))
+            batch = []
+            for line in lines:
+                batch.append(line)
+                if len(batch) >= 10000:
+                    f.writelines(batch)
+                    batch = []
+            f.writelines(batch)
+            if mess:
+                f.write(batch[-1][:30] if batch else '')
+        return
+    store = data_store.open_data_store(path, backend)
+    batch = []
+    for record in records:
+        if mess and random.random() < 0.001:
+            record = record._replace(gpu_temps=record.gpu_temps + ',,', system_temps='n/a,' + record.system_temps)
+        batch.append(record)
+        if len(batch) >= 10000:
+            store.append_many(batch)
+            batch = []
+    store.append_many(batch)
+    store.close()
+
+
+def run(learn, engine, days, sensors=True):
+    """Report text and seconds for one engine (the same steps as learn_thresholds.main())."""
+    start = time.perf_counter()
+    if engine == 'numpy':
+        summary, efficiency, trends, drivers = learn.analyze_numpy(days, sensors)
+    else:
+        data = learn.parse_data_log(days, sensors)
+        summary, efficiency = learn.summarize_data(data), learn.analyze_fan_efficiency(data)
+        trends = learn.analyze_temperature_trends(data)
+        drivers = learn.analyze_sensor_drivers(data) if sensors else None
+    elapsed = time.perf_counter() - start
+    suggestions, message = learn.suggest_threshold_adjustments(summary['count'], efficiency, {
+        'system_temp_very_low': 30, 'system_temp_low': 40, 'system_temp_med_low': 50, 'system_temp_med': 60,
+    })
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        learn.generate_report(summary, efficiency, suggestions, trends, drivers)
+        print(message)
+    return output.getvalue(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pure-Python vs NumPy threshold learning')
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--interval', type=int, default=5)
+    parser.add_argument('--system-sensors', type=int, default=8)
+    parser.add_argument('--backend', choices=data_store.BACKENDS, default='text')
+    parser.add_argument('--mess', action='store_true', help='Damage some records to exercise the fallback parser')
+    parser.add_argument('--skip-python', action='store_true', help='Only time the NumPy engine')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = data_store.default_data_log_file(args.backend, tmp)
+        os.environ['DATA_LOG_BACKEND'] = args.backend
+        os.environ['DATA_LOG_FILE'] = path
+        import learn_thresholds as learn
+        if learn.learn_numpy is None:
+            sys.exit('NumPy is not installed')
+
+        now = int(time.time())
+        write_log(path, args.backend, synthetic_records(now - args.days * 86400, now, args.interval, args.system_sensors),
+                  args.mess)
+        size_mb = sum(os.path.getsize(p) for p in (path, path + '.idx') if os.path.exists(p)) / 1e6
+        # Analyze the whole log (plus a day, so nothing sits on the window edge)
+        _, plain_s = run(learn, 'numpy', args.days + 1, sensors=False)
+        numpy_report, numpy_s = run(learn, 'numpy', args.days + 1)
+        numpy_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        python_report, python_s = (None, None) if args.skip_python else run(learn, 'python', args.days + 1)
+
+    result = {
+        'backend': args.backend,
+        'days': args.days,
+        'records': int(args.days * 86400 / args.interval),
+        'log_mb': round(size_mb, 1),
+        'numpy_without_sensors_s': round(plain_s, 2),
+        'numpy_s': round(numpy_s, 2),
+        'numpy_max_rss_mb': round(numpy_rss),
+        'python_s': round(python_s, 2) if python_s is not None else None,
+        'reports_identical': None if python_report is None else numpy_report == python_report,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{args.days:g} days, {result['records']} records, {args.backend} backend ({result['log_mb']} MB)"
+          f"{', damaged' if args.mess else ''}")
+    print(f"numpy engine:  {result['numpy_s']:.2f}s (max RSS {result['numpy_max_rss_mb']} MB), "
+          f"{result['numpy_without_sensors_s']:.2f}s without --sensors")
+    if python_report is not None:
+        print(f"python engine: {result['python_s']:.2f}s")
+        print(f"reports identical: {result['reports_identical']}")
+        if not result['reports_identical']:
+            print("\n--- python ---\n" + python_report + "\n--- numpy ---\n" + numpy_report)
+    else:
+        print(numpy_report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Mock iDRAC BMC speaking IPMI v2.0 RMCP+ over UDP.
+Implements just enough for fan_control.py's native transport (ipmi_lanplus.py):
+session establishment (Open Session + RAKP 1-4), Set Session Privilege, Close
+Session, the Dell 0x30/0x30 fan commands, SDR repository reads and Get Sensor
+Reading. Simulated fan RPM follows the commanded fan speed.
+
+Usage:
+  python3 bench/mock_bmc.py --port 6230
+  python3 bench/mock_bmc.py --port 16000 --count 100 --latency 0.01   # fleet.py load tests
+  IPMI_TRANSPORT=native IDRAC_IP=127.0.0.1 IPMI_PORT=6230 python3 fan_control.py
+"""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import ipmi_lanplus as ipmi  # noqa: E402
+
+# (sensor number, name, sensor type, base unit, M, initial raw reading)
+DEFAULT_SENSORS = [
+    (0x04, 'Inlet Temp', ipmi.SENSOR_TYPE_TEMPERATURE, 1, 1, 22),
+    (0x01, 'Exhaust Temp', ipmi.SENSOR_TYPE_TEMPERATURE, 1, 1, 31),
+    (0x0E, 'Temp', ipmi.SENSOR_TYPE_TEMPERATURE, 1, 1, 41),
+    (0x0F, 'Temp', ipmi.SENSOR_TYPE_TEMPERATURE, 1, 1, 39),
+] + [
+    (0x30 + i, f'Fan{i + 1}', ipmi.SENSOR_TYPE_FAN, 18, 120, 20) for i in range(6)
+]
+
+
+def build_full_sensor_record(record_id, number, name, sensor_type, unit, m):
+    """Build a linear Full Sensor Record (type 0x01) with B=0 and no exponents."""
+    body = bytearray(43)
+    body[0] = ipmi.BMC_ADDRESS          # sensor owner
+    body[2] = number
+    body[7] = sensor_type
+    body[15] = 0x00                     # unsigned analog reading
+    body[16] = unit
+    body[19] = m & 0xFF
+    body[20] = (m >> 2) & 0xC0
+    name_bytes = name.encode()
+    body[42] = 0xC0 | len(name_bytes)   # 8-bit ASCII
+    body += name_bytes
+    return struct.pack('<HBBB', record_id, 0x51, ipmi.SDR_RECORD_FULL_SENSOR, len(body)) + bytes(body)
+
+
+class MockBMC:
+    """
+    Single-threaded UDP BMC. start() runs it in a background thread.
+    Attributes worth inspecting: fan_mode ('auto'/'manual'), fan_speed (percent),
+    sessions_opened, commands (count of IPMI requests handled).
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, username='root', password='calvin', latency=0.0, sensors=None):
+        self.username = username.encode()
+        self.kuid = password.encode()[:20]
+        self.latency = latency
+        self.guid = os.urandom(16)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.address = self.sock.getsockname()
+        self.sessions = {}
+        self.pending = {}
+        self.fan_mode = 'auto'
+        self.fan_speed = None
+        self.sessions_opened = 0
+        self.commands = 0
+        self.thread = None
+        self.running = False
+        self.sensors = {}
+        self.sdr = []
+        for record_id, (number, name, sensor_type, unit, m, raw) in enumerate(sensors or DEFAULT_SENSORS, start=1):
+            self.sensors[number] = {'type': sensor_type, 'm': m, 'raw': raw}
+            self.sdr.append(build_full_sensor_record(record_id, number, name, sensor_type, unit, m))
+
+    @property
+    def port(self):
+        return self.address[1]
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def set_temperature(self, number, celsius):
+        self.sensors[number]['raw'] = int(celsius)
+
+    def serve_forever(self):
+        while self.running:
+            try:
+                packet, peer = self.sock.recvfrom(4096)
+            except OSError:
+                break
+            try:
+                response = self.handle_packet(packet)
+            except ipmi.IpmiError:
+                continue  # Drop malformed packets like a real BMC would
+            if response is not None:
+                if self.latency:
+                    time.sleep(self.latency)
+                try:
+                    self.sock.sendto(response, peer)
+                except OSError:
+                    break
+
+    # -- session establishment ------------------------------------------------
+
+    def handle_packet(self, packet):
+        if len(packet) < 16 or packet[:4] != ipmi.RMCP_HEADER or packet[4] != ipmi.AUTH_TYPE_RMCPP:
+            return None
+        payload_type = packet[5] & 0x3F
+        session_id = struct.unpack('<I', packet[6:10])[0]
+        if session_id == 0:
+            _, _, _, payload = ipmi.parse_session_packet(packet)
+            if payload_type == ipmi.PAYLOAD_OPEN_SESSION_REQUEST:
+                return self.open_session(payload)
+            if payload_type == ipmi.PAYLOAD_RAKP1:
+                return self.rakp1(payload)
+            if payload_type == ipmi.PAYLOAD_RAKP3:
+                return self.rakp3(payload)
+            return None
+        session = self.sessions.get(session_id)
+        if session is None or payload_type != ipmi.PAYLOAD_IPMI:
+            return None
+        _, _, _, payload = ipmi.parse_session_packet(packet, session['k1'], session['k2'])
+        request = ipmi.parse_ipmi_request(payload)
+        self.commands += 1
+        completion_code, data = self.handle_command(session_id, request)
+        session['sequence'] += 1
+        response = ipmi.build_ipmi_response(request, completion_code, data)
+        return ipmi.build_session_packet(ipmi.PAYLOAD_IPMI, session['console_sid'], session['sequence'],
+                                         response, session['k1'], session['k2'])
+
+    def open_session(self, payload):
+        tag, console_sid = payload[0], struct.unpack('<I', payload[4:8])[0]
+        algorithms = (payload[12], payload[20], payload[28])
+        suite = next((n for n, algs in ipmi.CIPHER_SUITES.items() if algs == algorithms), None)
+        status = 0 if suite is not None and (algorithms[2] == 0 or ipmi.Cipher is not None) else 0x11
+        bmc_sid = struct.unpack('<I', os.urandom(4))[0] | 1
+        if status == 0:
+            self.pending[bmc_sid] = {'console_sid': console_sid, 'algorithms': algorithms}
+        response = bytes([tag, status, ipmi.PRIV_ADMIN, 0]) + struct.pack('<II', console_sid, bmc_sid) + payload[12:36]
+        return ipmi.build_session_packet(ipmi.PAYLOAD_OPEN_SESSION_RESPONSE, 0, 0, response)
+
+    def rakp1(self, payload):
+        tag, bmc_sid = payload[0], struct.unpack('<I', payload[4:8])[0]
+        pending = self.pending.get(bmc_sid)
+        if pending is None:
+            return None
+        rm, role, username = payload[8:24], payload[24], payload[28:28 + payload[27]]
+        rc = os.urandom(16)
+        status = 0 if username == self.username else 0x0D  # Invalid name
+        pending.update({'rm': rm, 'rc': rc, 'role': role, 'username': username})
+        auth_code = ipmi.rakp2_auth_code(self.kuid, pending['console_sid'], bmc_sid, rm, rc, self.guid, role, username)
+        response = (bytes([tag, status, 0, 0]) + struct.pack('<I', pending['console_sid']) +
+                    rc + self.guid + auth_code)
+        return ipmi.build_session_packet(ipmi.PAYLOAD_RAKP2, 0, 0, response)
+
+    def rakp3(self, payload):
+        tag, bmc_sid = payload[0], struct.unpack('<I', payload[4:8])[0]
+        pending = self.pending.pop(bmc_sid, None)
+        if pending is None:
+            return None
+        expected = ipmi.rakp3_auth_code(self.kuid, pending['rc'], pending['console_sid'], pending['role'], pending['username'])
+        if payload[8:28] != expected:
+            response = bytes([tag, 0x0F, 0, 0]) + struct.pack('<I', pending['console_sid'])  # Invalid integrity check
+            return ipmi.build_session_packet(ipmi.PAYLOAD_RAKP4, 0, 0, response)
+        sik, k1, k2 = ipmi.derive_session_keys(self.kuid, pending['rm'], pending['rc'], pending['role'], pending['username'])
+        _, integrity_alg, confidentiality_alg = pending['algorithms']
+        self.sessions[bmc_sid] = {
+            'console_sid': pending['console_sid'],
+            'k1': k1 if integrity_alg else None,
+            'k2': k2 if confidentiality_alg else None,
+            'sequence': 0,
+        }
+        self.sessions_opened += 1
+        response = (bytes([tag, 0, 0, 0]) + struct.pack('<I', pending['console_sid']) +
+                    ipmi.rakp4_integrity_check(sik, pending['rm'], bmc_sid, self.guid))
+        return ipmi.build_session_packet(ipmi.PAYLOAD_RAKP4, 0, 0, response)
+
+    # -- commands -------------------------------------------------------------
+
+    def handle_command(self, session_id, request):
+        """Returns (completion_code, response_data)."""
+        netfn, cmd, data = request['netfn'], request['cmd'], request['data']
+        if netfn == ipmi.NETFN_APP and cmd == ipmi.CMD_SET_SESSION_PRIVILEGE:
+            return 0, bytes([data[0] if data else ipmi.PRIV_ADMIN])
+        if netfn == ipmi.NETFN_APP and cmd == ipmi.CMD_CLOSE_SESSION:
+            self.sessions.pop(session_id, None)
+            return 0, b''
+        if netfn == 0x30 and cmd == 0x30:
+            return self.dell_fan_command(data)
+        if netfn == ipmi.NETFN_STORAGE and cmd == ipmi.CMD_GET_SDR_REPOSITORY_INFO:
+            return 0, bytes([0x51]) + struct.pack('<H', len(self.sdr)) + bytes(11)
+        if netfn == ipmi.NETFN_STORAGE and cmd == ipmi.CMD_RESERVE_SDR_REPOSITORY:
+            return 0, struct.pack('<H', 1)
+        if netfn == ipmi.NETFN_STORAGE and cmd == ipmi.CMD_GET_SDR:
+            record_id, offset, count = struct.unpack('<HBB', data[2:6])
+            index = max(record_id, 1) - 1
+            if index >= len(self.sdr):
+                return 0xCB, b''  # Requested record not present
+            next_id = index + 2 if index + 1 < len(self.sdr) else 0xFFFF
+            return 0, struct.pack('<H', next_id) + self.sdr[index][offset:offset + count]
+        if netfn == ipmi.NETFN_SENSOR and cmd == ipmi.CMD_GET_SENSOR_READING:
+            sensor = self.sensors.get(data[0]) if data else None
+            if sensor is None:
+                return 0xCB, b''
+            return 0, bytes([sensor['raw'] & 0xFF, 0xC0, 0x00])
+        return 0xC1, b''  # Invalid command
+
+    def dell_fan_command(self, data):
+        if data[:2] == b'\x01\x00':
+            self.fan_mode = 'manual'
+        elif data[:2] == b'\x01\x01':
+            self.fan_mode = 'auto'
+            self.fan_speed = None
+        elif data[:2] == b'\x02\xff' and len(data) >= 3:
+            self.fan_speed = data[2]
+            # Simulated fans follow the commanded speed: 1200 RPM + 120 RPM per percent
+            for sensor in self.sensors.values():
+                if sensor['type'] == ipmi.SENSOR_TYPE_FAN:
+                    sensor['raw'] = min(255, (1200 + 120 * data[2]) // sensor['m'])
+        else:
+            return 0xCC, b''  # Invalid data field
+        return 0, b''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock iDRAC BMC (IPMI v2.0 RMCP+ over UDP)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6230)
+    parser.add_argument('--count', type=int, default=1, help='Start this many BMCs on consecutive ports (fleet load tests)')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='calvin')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each response')
+    args = parser.parse_args()
+
+    if args.count > 1:
+        bmcs = [MockBMC(args.host, args.port + i, args.user, args.password, args.latency).start()
+                for i in range(args.count)]
+        print(f"{args.count} mock BMCs listening on {args.host}:{args.port}-{args.port + args.count - 1} "
+              f"(user {args.user})", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        # The serving threads are daemons; exiting stops them
+        print(f"Sessions opened: {sum(bmc.sessions_opened for bmc in bmcs)}, "
+              f"commands handled: {sum(bmc.commands for bmc in bmcs)}")
+        return
+
+    bmc = MockBMC(args.host, args.port, args.user, args.password, args.latency)
+    print(f"Mock BMC listening on {bmc.address[0]}:{bmc.port} (user {args.user})", flush=True)
+    bmc.running = True
+    try:
+        bmc.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Sessions opened: {bmc.sessions_opened}, commands handled: {bmc.commands}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Data log compaction: rollup tiers and retention.
+
+Writes a synthetic data log (--days of history, one record every --interval
+seconds), then:
+
+1. compacts it (data_store.compact_files) with --raw-days / --minute-weeks and
+   reports the time taken and the disk use before and after;
+2. appends an hour of new records and times the next compaction (the steady
+   state, as fan_control.py runs it every DATA_COMPACT_INTERVAL);
+3. times the learn_thresholds.py analysis of the last --window-days from the raw
+   records (pure-Python engine) and from the rollup tiers, and compares the per fan
+   speed statistics. The rollup window starts on a whole hour, so the sample counts
+   differ by less than an hour of records. Keep --window-days within --raw-days
+   for the raw analysis to see the whole window.
+
+Usage:
+  python3 bench/rollup_bench.py
+  python3 bench/rollup_bench.py --days 90 --backend binary --json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import data_store  # noqa: E402
+
+
+def synthetic_records(start, end, interval, seed=1):
+    rng = random.Random(seed)
+    for timestamp in range(int(start), int(end), interval):
+        hours = timestamp / 3600
+        base = 45 + 15 * math.sin(hours / 5)
+        gpu = [round(base + rng.gauss(0, 2)), round(base - 3 + rng.gauss(0, 2))]
+        system = [round(base - 15 + rng.gauss(0, 1)) for _ in range(4)]
+        fan_pct = 10 if max(gpu) < 40 else 15 if max(gpu) < 50 else 25 if max(gpu) < 60 else 35
+        fans = [int(1500 + fan_pct * 80 + rng.gauss(0, 40)) for _ in range(6)]
+        yield data_store.make_record(gpu, system, fans, fan_pct, float(timestamp))
+
+
+def append(store, records, batch_size=10000):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            store.append_many(batch)
+            batch = []
+    store.append_many(batch)
+
+
+def disk_mb(*paths):
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path)) / 1e6
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def raw_analysis(learn, days):
+    data = learn.parse_data_log(days)
+    return learn.summarize_data(data), learn.analyze_fan_efficiency(data)
+
+
+def rollup_analysis(learn, days):
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary, efficiency, _ = learn.analyze_rollups(days)
+    return summary, efficiency
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Data log rollups and retention')
+    parser.add_argument('--days', type=float, default=60)
+    parser.add_argument('--interval', type=int, default=5)
+    parser.add_argument('--backend', choices=data_store.BACKENDS, default='text')
+    parser.add_argument('--raw-days', type=float, default=data_store.RAW_DAYS)
+    parser.add_argument('--minute-weeks', type=float, default=data_store.MINUTE_WEEKS)
+    parser.add_argument('--window-days', type=float, default=30)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = data_store.default_data_log_file(args.backend, tmp)
+        rollup_path = data_store.default_rollup_file(path)
+        os.environ['DATA_LOG_BACKEND'] = args.backend
+        os.environ['DATA_LOG_FILE'] = path
+        os.environ['DATA_ROLLUP_FILE'] = rollup_path
+        import learn_thresholds as learn
+
+        now = time.time()
+        store = data_store.open_data_store(path, args.backend)
+        append(store, synthetic_records(now - args.days * 86400, now - 3600, args.interval))
+        log_files = (path, path + '.idx')
+        before_mb = disk_mb(*log_files)
+
+        # The first compaction runs as if an hour ago, so the appended hour is new to the second one
+        first_s, first = timed(data_store.compact_files, path, args.backend, rollup_path,
+                               args.raw_days, args.minute_weeks, now - 3600)
+        append(store, synthetic_records(now - 3600, now, args.interval, seed=2))
+        store.close()
+        update_s, update = timed(data_store.compact_files, path, args.backend, rollup_path,
+                                 args.raw_days, args.minute_weeks, now)
+        after_mb = disk_mb(*log_files)
+        rollup_mb = disk_mb(rollup_path)
+
+        raw_s, (raw_summary, raw_efficiency) = timed(raw_analysis, learn, args.window_days)
+        rollup_s, (rollup_summary, rollup_efficiency) = timed(rollup_analysis, learn, args.window_days)
+        store = data_store.open_data_store(path, args.backend, readonly=True)
+        rollups = data_store.RollupStore(rollup_path, readonly=True)
+        window_s, rows = timed(data_store.read_window, store, rollups, now - args.window_days * 86400)
+        minute_rows, hour_rows = rollups.tier_info(data_store.MINUTE)[0], rollups.tier_info(data_store.HOUR)[0]
+        store.close()
+        rollups.close()
+
+    shared = set(raw_efficiency) & set(rollup_efficiency)
+    result = {
+        'backend': args.backend,
+        'days': args.days,
+        'records': int(args.days * 86400 / args.interval),
+        'log_mb_before': round(before_mb, 1),
+        'log_mb_after': round(after_mb, 1),
+        'rollup_mb': round(rollup_mb, 1),
+        'minute_rows': minute_rows,
+        'hour_rows': hour_rows,
+        'raw_pruned': first['raw_pruned'],
+        'first_compaction_s': round(first_s, 2),
+        'compaction_after_append_s': round(update_s, 3),
+        'records_rolled_up_after_append': update['raw_rolled_up'],
+        'window_days': args.window_days,
+        'raw_analysis_s': round(raw_s, 2),
+        'rollup_analysis_s': round(rollup_s, 4),
+        'read_window_ms': round(window_s * 1000, 1),
+        'window_rows': len(rows),
+        'raw_samples': raw_summary['count'],
+        'rollup_samples': rollup_summary['count'],
+        'max_avg_temp_difference': max((abs(raw_efficiency[pct]['avg_temp'] - rollup_efficiency[pct]['avg_temp'])
+                                        for pct in shared), default=None),
+        'max_temp_std_difference': max((abs(raw_efficiency[pct]['temp_std'] - rollup_efficiency[pct]['temp_std'])
+                                        for pct in shared), default=None),
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{args.days:g} days, {result['records']} records, {args.backend} backend; "
+          f"raw {args.raw_days:g} days, minute rollups {args.minute_weeks:g} weeks")
+    print(f"disk:       {result['log_mb_before']} MB -> {result['log_mb_after']} MB "
+          f"+ {result['rollup_mb']} MB rollups ({minute_rows} minute, {hour_rows} hourly rows)")
+    print(f"compaction: {result['first_compaction_s']:.2f}s first, "
+          f"{result['compaction_after_append_s']:.3f}s after an hour of new records "
+          f"({result['records_rolled_up_after_append']} rolled up)")
+    print(f"{args.window_days:g}-day analysis: raw {result['raw_analysis_s']:.2f}s ({result['raw_samples']} samples), "
+          f"rollups {result['rollup_analysis_s'] * 1000:.1f}ms ({result['rollup_samples']} samples, "
+          f"read_window {result['read_window_ms']}ms for {len(rows)} rows)")
+    print(f"largest per fan speed difference: avg temp {result['max_avg_temp_difference']:.4f}°C, "
+          f"stdev {result['max_temp_std_difference']:.4f}°C")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Per-cycle cost of the sysfs temperature + fan reads.
+
+Compares the original directory walk (listdir every hwmon device, then
+open/read/close every input on each call) against the cached HwmonIndex with
+held-open descriptors, on a fake hwmon tree (or the real one with --real).
+
+Usage:
+  python3 bench/sysfs_bench.py --devices 16 --cycles 500
+  python3 bench/sysfs_bench.py --real
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_sysfs import create_fake_hwmon, scaled_devices  # noqa: E402
+
+
+def walk_read(root, prefix):
+    """The pre-index reader: full walk and open/read/close per input, every call."""
+    values = []
+    for hwmon_dir in os.listdir(root):
+        hwmon_full_path = os.path.join(root, hwmon_dir)
+        if not os.path.isdir(hwmon_full_path):
+            continue
+        for file in os.listdir(hwmon_full_path):
+            if file.startswith(prefix) and file.endswith('_input'):
+                try:
+                    with open(os.path.join(hwmon_full_path, file), 'r') as f:
+                        values.append(int(f.read().strip()))
+                except (ValueError, OSError):
+                    continue
+    return values
+
+
+def time_per_cycle(read_cycle, cycles):
+    read_cycle()  # warm up (index build / page cache)
+    start = time.perf_counter()
+    for _ in range(cycles):
+        read_cycle()
+    return (time.perf_counter() - start) / cycles * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='sysfs read cost per cycle')
+    parser.add_argument('--devices', type=int, default=8)
+    parser.add_argument('--temps', type=int, default=8)
+    parser.add_argument('--fans', type=int, default=2)
+    parser.add_argument('--cycles', type=int, default=200)
+    parser.add_argument('--real', action='store_true', help='Benchmark /sys/class/hwmon instead of a fake tree')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = '/sys/class/hwmon' if args.real else os.path.join(tmp, 'hwmon')
+        if not args.real:
+            create_fake_hwmon(root, scaled_devices(args.devices, args.temps, args.fans))
+        os.environ['HWMON_PATH'] = root
+        os.environ['HWMON_INDEX_FILE'] = os.path.join(tmp, 'hwmon_index.json')
+
+        import fan_control
+        index = fan_control.HwmonIndex(root, os.path.join(tmp, 'hwmon_index.json'))
+
+        walk_us = time_per_cycle(lambda: (walk_read(root, 'temp'), walk_read(root, 'fan')), args.cycles)
+        index_us = time_per_cycle(lambda: (index.read('temp'), index.read('fan')), args.cycles)
+
+        # Fresh process with a persisted index: load + open, no directory walk
+        cold_start = time.perf_counter()
+        cold = fan_control.HwmonIndex(root, os.path.join(tmp, 'hwmon_index.json'))
+        cold.read('temp'), cold.read('fan')
+        cold_us = (time.perf_counter() - cold_start) * 1e6
+        inputs = len(index.entries)
+        index.close()
+        cold.close()
+
+    result = {
+        'inputs': inputs,
+        'cycles': args.cycles,
+        'walk_us_per_cycle': round(walk_us, 1),
+        'index_us_per_cycle': round(index_us, 1),
+        'index_first_cycle_from_cache_us': round(cold_us, 1),
+        'speedup': round(walk_us / index_us, 1) if index_us else None,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"hwmon inputs:                  {inputs}")
+        print(f"directory walk:                {result['walk_us_per_cycle']} us/cycle")
+        print(f"cached index (pread):          {result['index_us_per_cycle']} us/cycle ({result['speedup']}x)")
+        print(f"first cycle from index file:   {result['index_first_cycle_from_cache_us']} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Parity check for the table-driven threshold engine.
+
+Runs the original 7-level determine_fan_action() cascade and ThresholdEngine with
+hysteresis and dwell at zero over a grid of GPU/system temperatures (including
+values just around every threshold), for the configured tables and a set of random
+ones, with the GPU override on and off. Every (action, speed, reason) must match.
+Then replays a sensor flapping around a threshold to show the writes hysteresis saves.
+
+Usage:
+  python3 bench/threshold_parity.py
+  python3 bench/threshold_parity.py --random-tables 20 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import fan_control  # noqa: E402
+
+LEVEL_SUFFIXES = ['VERY_LOW', 'LOW', 'MED_LOW', 'MED', 'MED_HIGH', 'HIGH', 'VERY_HIGH']
+
+
+def legacy_determine_fan_action(gpu_temps, system_temps, c):
+    """
+    The determine_fan_action() if/elif cascade from before ThresholdEngine, unchanged
+    except that the thresholds come from `c` (and without the debug log line).
+    """
+    # Get maximum temperatures
+    max_gpu_temp = max(gpu_temps) if gpu_temps else 0
+    max_system_temp = max(system_temps) if system_temps else 0
+    
+    # GPU Temperature Priority Override logic
+    # If enabled and GPU temps are above LOW threshold, prioritize GPU temps
+    if c.GPU_TEMP_OVERRIDE and gpu_temps and max_gpu_temp >= c.GPU_TEMP_LOW:
+        # Use GPU temperature for fan control (GPU takes priority)
+        decision_temp = max_gpu_temp
+        use_gpu_thresholds = True
+    else:
+        # Use the higher of GPU or system temperature (default behavior)
+        decision_temp = max(max_gpu_temp, max_system_temp)
+        use_gpu_thresholds = False
+    
+    # If temperatures exceed auto mode threshold, let iDRAC handle it
+    if max_gpu_temp >= c.AUTO_MODE_THRESHOLD or max_system_temp >= c.AUTO_MODE_THRESHOLD:
+        reason = f"Temperature exceeds auto mode threshold ({c.AUTO_MODE_THRESHOLD}°C): GPU={max_gpu_temp}°C, System={max_system_temp}°C"
+        return ('auto', None, reason)
+    
+    # Determine fan speed based on 7-level thresholds
+    # Checks from highest to lowest temperature (Very-High down to Very-Low)
+    if use_gpu_thresholds:
+        # Use GPU thresholds when GPU is prioritized
+        if decision_temp >= c.GPU_TEMP_VERY_HIGH:
+            reason = f"GPU temperature {decision_temp}°C >= VERY-HIGH threshold ({c.GPU_TEMP_VERY_HIGH}°C) - GPU override active"
+            return ('manual', c.FAN_SPEED_VERY_HIGH, reason)
+        elif decision_temp >= c.GPU_TEMP_HIGH:
+            reason = f"GPU temperature {decision_temp}°C >= HIGH threshold ({c.GPU_TEMP_HIGH}°C) - GPU override active"
+            return ('manual', c.FAN_SPEED_HIGH, reason)
+        elif decision_temp >= c.GPU_TEMP_MED_HIGH:
+            reason = f"GPU temperature {decision_temp}°C >= MEDIUM-HIGH threshold ({c.GPU_TEMP_MED_HIGH}°C) - GPU override active"
+            return ('manual', c.FAN_SPEED_MED_HIGH, reason)
+        elif decision_temp >= c.GPU_TEMP_MED:
+            reason = f"GPU temperature {decision_temp}°C >= MEDIUM threshold ({c.GPU_TEMP_MED}°C) - GPU override active"
+            return ('manual', c.FAN_SPEED_MED, reason)
+        elif decision_temp >= c.GPU_TEMP_MED_LOW:
+            reason = f"GPU temperature {decision_temp}°C >= MEDIUM-LOW threshold ({c.GPU_TEMP_MED_LOW}°C) - GPU override active"
+            return ('manual', c.FAN_SPEED_MED_LOW, reason)
+        elif decision_temp >= c.GPU_TEMP_LOW:
+            reason = f"GPU temperature {decision_temp}°C >= LOW threshold ({c.GPU_TEMP_LOW}°C) - GPU override active"
+            return ('manual', c.FAN_SPEED_LOW, reason)
+        elif decision_temp >= c.GPU_TEMP_VERY_LOW:
+            reason = f"GPU temperature {decision_temp}°C >= VERY-LOW threshold ({c.GPU_TEMP_VERY_LOW}°C) - GPU override active"
+            return ('manual', c.FAN_SPEED_VERY_LOW, reason)
+        else:
+            reason = f"GPU temperature {decision_temp}°C < VERY-LOW threshold ({c.GPU_TEMP_VERY_LOW}°C) - GPU override active"
+            return ('manual', c.FAN_SPEED_VERY_LOW, reason)
+    else:
+        # Use both GPU and system thresholds (check highest of either)
+        # Check from highest to lowest threshold
+        if max_gpu_temp >= c.GPU_TEMP_VERY_HIGH or max_system_temp >= c.SYSTEM_TEMP_VERY_HIGH:
+            if max_gpu_temp >= c.GPU_TEMP_VERY_HIGH:
+                reason = f"GPU temperature {max_gpu_temp}°C >= VERY-HIGH threshold ({c.GPU_TEMP_VERY_HIGH}°C)"
+            else:
+                reason = f"System temperature {max_system_temp}°C >= VERY-HIGH threshold ({c.SYSTEM_TEMP_VERY_HIGH}°C)"
+            return ('manual', c.FAN_SPEED_VERY_HIGH, reason)
+        elif max_gpu_temp >= c.GPU_TEMP_HIGH or max_system_temp >= c.SYSTEM_TEMP_HIGH:
+            if max_gpu_temp >= c.GPU_TEMP_HIGH:
+                reason = f"GPU temperature {max_gpu_temp}°C >= HIGH threshold ({c.GPU_TEMP_HIGH}°C)"
+            else:
+                reason = f"System temperature {max_system_temp}°C >= HIGH threshold ({c.SYSTEM_TEMP_HIGH}°C)"
+            return ('manual', c.FAN_SPEED_HIGH, reason)
+        elif max_gpu_temp >= c.GPU_TEMP_MED_HIGH or max_system_temp >= c.SYSTEM_TEMP_MED_HIGH:
+            if max_gpu_temp >= c.GPU_TEMP_MED_HIGH:
+                reason = f"GPU temperature {max_gpu_temp}°C >= MEDIUM-HIGH threshold ({c.GPU_TEMP_MED_HIGH}°C)"
+            else:
+                reason = f"System temperature {max_system_temp}°C >= MEDIUM-HIGH threshold ({c.SYSTEM_TEMP_MED_HIGH}°C)"
+            return ('manual', c.FAN_SPEED_MED_HIGH, reason)
+        elif max_gpu_temp >= c.GPU_TEMP_MED or max_system_temp >= c.SYSTEM_TEMP_MED:
+            if max_gpu_temp >= c.GPU_TEMP_MED:
+                reason = f"GPU temperature {max_gpu_temp}°C >= MEDIUM threshold ({c.GPU_TEMP_MED}°C)"
+            else:
+                reason = f"System temperature {max_system_temp}°C >= MEDIUM threshold ({c.SYSTEM_TEMP_MED}°C)"
+            return ('manual', c.FAN_SPEED_MED, reason)
+        elif max_gpu_temp >= c.GPU_TEMP_MED_LOW or max_system_temp >= c.SYSTEM_TEMP_MED_LOW:
+            if max_gpu_temp >= c.GPU_TEMP_MED_LOW:
+                reason = f"GPU temperature {max_gpu_temp}°C >= MEDIUM-LOW threshold ({c.GPU_TEMP_MED_LOW}°C)"
+            else:
+                reason = f"System temperature {max_system_temp}°C >= MEDIUM-LOW threshold ({c.SYSTEM_TEMP_MED_LOW}°C)"
+            return ('manual', c.FAN_SPEED_MED_LOW, reason)
+        elif max_gpu_temp >= c.GPU_TEMP_LOW or max_system_temp >= c.SYSTEM_TEMP_LOW:
+            if max_gpu_temp >= c.GPU_TEMP_LOW:
+                reason = f"GPU temperature {max_gpu_temp}°C >= LOW threshold ({c.GPU_TEMP_LOW}°C)"
+            else:
+                reason = f"System temperature {max_system_temp}°C >= LOW threshold ({c.SYSTEM_TEMP_LOW}°C)"
+            return ('manual', c.FAN_SPEED_LOW, reason)
+        elif max_gpu_temp >= c.GPU_TEMP_VERY_LOW or max_system_temp >= c.SYSTEM_TEMP_VERY_LOW:
+            if max_gpu_temp >= c.GPU_TEMP_VERY_LOW:
+                reason = f"GPU temperature {max_gpu_temp}°C >= VERY-LOW threshold ({c.GPU_TEMP_VERY_LOW}°C)"
+            else:
+                reason = f"System temperature {max_system_temp}°C >= VERY-LOW threshold ({c.SYSTEM_TEMP_VERY_LOW}°C)"
+            return ('manual', c.FAN_SPEED_VERY_LOW, reason)
+        else:
+            reason = f"Temperatures below all thresholds (GPU: {max_gpu_temp}°C, System: {max_system_temp}°C)"
+            return ('manual', c.FAN_SPEED_VERY_LOW, reason)
+
+
+def legacy_config(gpu_levels, system_levels, speeds, auto_threshold, gpu_override):
+    config = {'AUTO_MODE_THRESHOLD': auto_threshold, 'GPU_TEMP_OVERRIDE': gpu_override}
+    for suffix, gpu, system, speed in zip(LEVEL_SUFFIXES, gpu_levels, system_levels, speeds):
+        config[f'GPU_TEMP_{suffix}'] = gpu
+        config[f'SYSTEM_TEMP_{suffix}'] = system
+        config[f'FAN_SPEED_{suffix}'] = speed
+    return SimpleNamespace(**config)
+
+
+def temperature_grid(thresholds):
+    values = {t / 2 for t in range(-10, 221)}  # -5 .. 110 in 0.5 steps
+    for threshold in thresholds:
+        values.update((threshold - 0.1, threshold, threshold + 0.1))
+    return sorted(values)
+
+
+def random_tables(rng):
+    gpu = sorted(rng.sample(range(20, 100), 7))
+    system = sorted(rng.sample(range(15, 90), 7))
+    speeds = sorted(rng.sample(range(5, 101), 7))
+    if rng.random() < 0.3:
+        rng.shuffle(gpu)  # misconfigured (unsorted) tables must behave the same too
+    if rng.random() < 0.3:
+        system[3] = system[4]  # duplicate thresholds
+    auto_threshold = rng.choice([max(gpu + system), max(gpu + system) - 5, 100])
+    return gpu, system, speeds, auto_threshold
+
+
+def check_parity(gpu_levels, system_levels, speeds, auto_threshold):
+    """Return (cases, mismatches) for one table over the temperature grid, override on and off."""
+    cases = 0
+    mismatches = []
+    gpu_grid = temperature_grid(gpu_levels + [auto_threshold])
+    system_grid = temperature_grid(system_levels + [auto_threshold])
+    for gpu_override in (True, False):
+        config = legacy_config(gpu_levels, system_levels, speeds, auto_threshold, gpu_override)
+        engine = fan_control.ThresholdEngine(gpu_levels, system_levels, speeds, hysteresis=[0], min_dwell=0,
+                                             auto_threshold=auto_threshold, gpu_override=gpu_override,
+                                             state_file='')
+        for gpu_temps in [[]] + [[t] for t in gpu_grid]:
+            for system_temps in [[]] + [[t, t - 7] for t in system_grid]:
+                cases += 1
+                expected = legacy_determine_fan_action(gpu_temps, system_temps, config)
+                actual = engine.decide(gpu_temps, system_temps)
+                if actual != expected and len(mismatches) < 10:
+                    mismatches.append({'gpu': gpu_temps, 'system': system_temps, 'override': gpu_override,
+                                       'expected': expected, 'actual': actual})
+    return cases, mismatches
+
+
+def count_speed_changes(hysteresis, cycles):
+    """Replay a GPU reading alternating 44.9/45.0°C and count fan speed changes (IPMI writes)."""
+    engine = fan_control.ThresholdEngine(hysteresis=[hysteresis], min_dwell=0, state_file='')
+    changes = 0
+    last_speed = None
+    for cycle in range(cycles):
+        _, speed, _ = engine.decide([45.0 if cycle % 2 else 44.9], [30])
+        if speed != last_speed:
+            changes += 1
+            last_speed = speed
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ThresholdEngine vs. original cascade parity check')
+    parser.add_argument('--random-tables', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=730)
+    parser.add_argument('--cycles', type=int, default=100, help='Cycles for the flapping replay')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tables = [(fan_control.GPU_TEMP_LEVELS, fan_control.SYSTEM_TEMP_LEVELS, fan_control.FAN_SPEED_LEVELS,
+               fan_control.AUTO_MODE_THRESHOLD)]
+    if len(fan_control.FAN_SPEED_LEVELS) != 7:
+        tables = []  # The cascade only knows seven levels
+    tables += [random_tables(rng) for _ in range(args.random_tables)]
+
+    total_cases = 0
+    mismatches = []
+    for table in tables:
+        cases, table_mismatches = check_parity(*table)
+        total_cases += cases
+        mismatches += table_mismatches
+
+    result = {
+        'tables': len(tables),
+        'cases': total_cases,
+        'mismatches': len(mismatches),
+        'examples': mismatches[:5],
+        'flapping_writes': {
+            'cycles': args.cycles,
+            'hysteresis_0': count_speed_changes(0, args.cycles),
+            'hysteresis_configured': count_speed_changes(fan_control.THRESHOLD_HYSTERESIS[0], args.cycles),
+        },
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Compared {total_cases} decisions over {len(tables)} tables: {len(mismatches)} mismatches")
+        for mismatch in mismatches[:5]:
+            print(f"  {mismatch}")
+        flapping = result['flapping_writes']
+        print(f"Sensor flapping 44.9/45.0°C for {args.cycles} cycles: {flapping['hysteresis_0']} speed changes "
+              f"without hysteresis, {flapping['hysteresis_configured']} with THRESHOLD_HYSTERESIS="
+              f"{fan_control.THRESHOLD_HYSTERESIS[0]:g}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
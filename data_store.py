@@ -0,0 +1,1023 @@
+#!/usr/bin/env python3
+"""
+Storage backends for the unified data log
+fan_control.py appends one record per control cycle and learn_thresholds.py reads
+back a time window. The original pipe-delimited text file has to be read and
+parsed from the first line for every query, so two indexed backends are offered
+(DATA_LOG_BACKEND):
+
+- text:   timestamp|max_gpu|max_system|avg_fan_rpm|fan_speed_pct|gpu_csv|system_csv|fan_csv
+- sqlite: SQLite database in WAL mode with an index on the timestamp
+- binary: append-only record file plus a fixed-size (timestamp, offset) index that
+          is binary searched, so a range query only reads the requested window
+
+The text format stays available as an export of any backend:
+  python3 data_store.py migrate fan_control_data.log fan_control_data.db --to sqlite
+  python3 data_store.py export fan_control_data.db > fan_control_data.log
+  python3 data_store.py info fan_control_data.bin
+
+compact() keeps the log bounded: raw records for RAW_DAYS, 1-minute rollups for
+MINUTE_WEEKS and hourly rollups forever, in a SQLite file next to the log
+(<data log>.rollup.db). read_window() answers a time window from the coarsest tier
+that has each part of it:
+  python3 data_store.py compact fan_control_data.log --raw-days 30 --minute-weeks 8
+"""
+
+import argparse
+import contextlib
+import fcntl
+import math
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+BACKENDS = ('text', 'sqlite', 'binary')
+DEFAULT_FILENAMES = {
+    'text': 'fan_control_data.log',
+    'sqlite': 'fan_control_data.db',
+    'binary': 'fan_control_data.bin',
+}
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Retention defaults for compact(); hourly rollups are kept forever
+RAW_DAYS = 30
+MINUTE_WEEKS = 8
+MINUTE = 60
+HOUR = 3600
+
+# One control cycle. timestamp is epoch seconds; the per-sensor lists are kept as
+# the comma-separated text fan_control.py logs, and only split when asked for.
+DataRecord = namedtuple('DataRecord', [
+    'timestamp', 'max_gpu', 'max_system', 'avg_fan_rpm', 'fan_speed_pct',
+    'gpu_temps', 'system_temps', 'fan_speeds',
+])
+
+
+# One rollup bucket of `seconds` (MINUTE or HOUR) at one fan speed %: the number of
+# records, their first/last timestamp, count/mean/M2/min/max of the max temperature
+# (Welford, so buckets merge into exact means and standard deviations) and
+# min/mean/max of the logged values.
+Rollup = namedtuple('Rollup', [
+    'seconds', 'start', 'fan_speed_pct', 'count', 'first', 'last',
+    'temp_mean', 'temp_m2', 'temp_min', 'temp_max',
+    'gpu_min', 'gpu_mean', 'gpu_max', 'system_min', 'system_mean', 'system_max',
+    'rpm_min', 'rpm_mean', 'rpm_max',
+])
+
+
+def default_data_log_file(backend, directory=None):
+    """Default data log path for a backend (next to the scripts)."""
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(directory, DEFAULT_FILENAMES.get(backend, DEFAULT_FILENAMES['text']))
+
+
+def default_rollup_file(path):
+    """Rollup database of a data log."""
+    return path + '.rollup.db'
+
+
+@contextlib.contextmanager
+def file_lock(path, blocking=True):
+    """
+    Exclusive flock() on path (created if missing). Yields True once held, or False
+    straight away when blocking=False and another process holds it.
+    """
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def detect_backend(path):
+    """Guess the backend of an existing file from its contents (falls back to the extension)."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(16)
+    except OSError:
+        head = b''
+    if head.startswith(b'SQLite format 3'):
+        return 'sqlite'
+    if head.startswith(BinaryDataStore.MAGIC):
+        return 'binary'
+    if head:
+        return 'text'
+    for backend, filename in DEFAULT_FILENAMES.items():
+        if path.endswith(os.path.splitext(filename)[1]):
+            return backend
+    return 'text'
+
+
+def format_number(value):
+    """Print whole numbers without a trailing .0, as the text log always has."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def parse_number(text):
+    value = float(text)
+    return int(value) if value.is_integer() and '.' not in text else value
+
+
+def split_values(csv):
+    """Split a per-sensor CSV field into numbers, skipping anything unparsable."""
+    values = []
+    for item in csv.split(','):
+        try:
+            values.append(parse_number(item))
+        except ValueError:
+            continue
+    return values
+
+
+def make_record(gpu_temps, system_temps, fan_speeds, fan_speed_pct, timestamp=None):
+    """Build the record fan_control.py logs for one cycle."""
+    if timestamp is None:
+        timestamp = float(int(datetime.now().timestamp()))  # Text log has one-second resolution
+    return DataRecord(
+        timestamp,
+        max(gpu_temps) if gpu_temps else 0,
+        max(system_temps) if system_temps else 0,
+        int(sum(fan_speeds) / len(fan_speeds)) if fan_speeds else 0,
+        fan_speed_pct if fan_speed_pct is not None else 0,
+        ','.join(map(str, gpu_temps)) if gpu_temps else '',
+        ','.join(map(str, system_temps)) if system_temps else '',
+        ','.join(map(str, fan_speeds)) if fan_speeds else '',
+    )
+
+
+def format_text_line(record):
+    timestamp = datetime.fromtimestamp(record.timestamp).strftime(TIMESTAMP_FORMAT)
+    return (f"{timestamp}|{format_number(record.max_gpu)}|{format_number(record.max_system)}|"
+            f"{record.avg_fan_rpm}|{record.fan_speed_pct}|"
+            f"{record.gpu_temps}|{record.system_temps}|{record.fan_speeds}\n")
+
+
+def parse_text_line(line):
+    """Parse one text log line; returns None for blank or malformed lines."""
+    parts = line.rstrip('\n').split('|')
+    if len(parts) < 5:
+        return None
+    try:
+        timestamp = datetime.strptime(parts[0], TIMESTAMP_FORMAT).timestamp()
+        return DataRecord(
+            timestamp,
+            parse_number(parts[1]) if parts[1] else 0,
+            parse_number(parts[2]) if parts[2] else 0,
+            int(parts[3]) if parts[3] else 0,
+            int(parts[4]) if parts[4] else 0,
+            parts[5] if len(parts) > 5 else '',
+            parts[6] if len(parts) > 6 else '',
+            parts[7] if len(parts) > 7 else '',
+        )
+    except (ValueError, IndexError):
+        return None
+
+
+class TextDataStore:
+    """The original pipe-delimited log. Queries read the file from the start."""
+
+    backend = 'text'
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.lock_path = path + '.lock'
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Held while prune() swaps in the trimmed file, so no line lands in the old one
+        with file_lock(self.lock_path), open(self.path, 'a') as f:
+            f.writelines(format_text_line(record) for record in records)
+
+    @staticmethod
+    def line_after(f, position):
+        """(offset, line) of the first line starting at or after position."""
+        if position:
+            f.seek(position - 1)
+            f.readline()
+        else:
+            f.seek(0)
+        return f.tell(), f.readline()
+
+    def seek_offset(self, f, start_text):
+        """
+        Offset of the first line whose timestamp is >= start_text, by binary search.
+        Assumes the log is in time order: lines before it that only got an older
+        timestamp because the clock was stepped back are not found.
+        """
+        low, high = 0, os.fstat(f.fileno()).st_size
+        while low < high:
+            middle = (low + high) // 2
+            _, line = self.line_after(f, middle)
+            if not line or line[:19].decode('utf-8', 'replace') >= start_text:
+                high = middle
+            else:
+                low = middle + 1
+        return self.line_after(f, low)[0]
+
+    def query(self, start=None, end=None, seek=False):
+        """
+        Yield records with start <= timestamp < end (epoch seconds), oldest first.
+        seek=True binary searches for start instead of reading the file from the top
+        (see seek_offset()).
+        """
+        if not os.path.exists(self.path):
+            return
+        # Timestamps sort as strings, so lines outside the window are skipped unparsed.
+        # Lines have whole seconds: timestamp >= start is timestamp >= ceil(start).
+        start_text = datetime.fromtimestamp(math.ceil(start)).strftime(TIMESTAMP_FORMAT) if start is not None else None
+        end_text = datetime.fromtimestamp(math.ceil(end)).strftime(TIMESTAMP_FORMAT) if end is not None else None
+        offset = 0
+        if seek and start_text is not None:
+            with open(self.path, 'rb') as f:
+                offset = self.seek_offset(f, start_text)
+        with open(self.path, 'r', errors='replace') as f:
+            f.seek(offset)
+            for line in f:
+                prefix = line[:19]
+                if start_text is not None and prefix < start_text:
+                    continue
+                if end_text is not None and prefix >= end_text:
+                    continue
+                record = parse_text_line(line)
+                if record is not None:
+                    yield record
+
+    def end_position(self):
+        """Position after the last record (a byte offset for the text backend)."""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def position_at(self, timestamp):
+        """Position from which read_after() yields the records with timestamp >= timestamp."""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb') as f:
+            return self.seek_offset(f, datetime.fromtimestamp(math.ceil(timestamp)).strftime(TIMESTAMP_FORMAT))
+
+    def read_after(self, position=0):
+        """
+        Yield (record, position) for every record after position, where position is
+        where the next read_after() should resume. A partly written last line is left
+        for the next call.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(position)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                position += len(line)
+                record = parse_text_line(line.decode('utf-8', 'replace'))
+                if record is not None:
+                    yield record, position
+
+    def prune(self, before):
+        """
+        Drop the records older than before (epoch seconds) by writing the rest to a
+        new file and renaming it over the log; returns the number of lines dropped.
+        The bulk of the copy runs unlocked, only the catch-up with lines appended
+        meanwhile and the rename hold the writers' lock.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        before_text = datetime.fromtimestamp(math.ceil(before)).strftime(TIMESTAMP_FORMAT)
+        tmp_path = self.path + '.tmp'
+        with open(self.path, 'rb') as source:
+            offset = self.seek_offset(source, before_text)
+            if not offset:
+                return 0
+            dropped = 0
+            source.seek(0)
+            while source.tell() < offset:
+                dropped += source.read(min(1 << 20, offset - source.tell())).count(b'\n')
+            with open(tmp_path, 'wb') as target:
+                source.seek(offset)
+                shutil.copyfileobj(source, target)
+                with file_lock(self.lock_path):
+                    shutil.copyfileobj(source, target)
+                    target.flush()
+                    os.fsync(target.fileno())
+                    shutil.copymode(self.path, tmp_path)
+                    os.replace(tmp_path, self.path)
+        return dropped
+
+    def close(self):
+        pass
+
+
+class SqliteDataStore:
+    """SQLite database in WAL mode; range queries use the timestamp index."""
+
+    backend = 'sqlite'
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        if readonly:
+            self.connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=10)
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # WAL + NORMAL: a power loss can drop the last few cycles, never corrupt the file
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS samples ('
+            ' timestamp REAL NOT NULL, max_gpu REAL, max_system REAL,'
+            ' avg_fan_rpm INTEGER, fan_speed_pct INTEGER,'
+            ' gpu_temps TEXT, system_temps TEXT, fan_speeds TEXT)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS samples_timestamp ON samples (timestamp)')
+        self.connection.commit()
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        with self.connection:
+            self.connection.executemany('INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)', records)
+
+    def query(self, start=None, end=None):
+        """Yield records with start <= timestamp < end (epoch seconds), oldest first."""
+        sql = 'SELECT * FROM samples'
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('timestamp >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('timestamp < ?')
+            params.append(end)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY timestamp, rowid'
+        for row in self.connection.execute(sql, params):
+            yield DataRecord(*row)
+
+    def end_position(self):
+        """Position after the last record (the highest rowid)."""
+        return self.connection.execute('SELECT COALESCE(MAX(rowid), 0) FROM samples').fetchone()[0]
+
+    def position_at(self, timestamp):
+        """Position from which read_after() yields the records with timestamp >= timestamp."""
+        return self.connection.execute('SELECT COALESCE(MAX(rowid), 0) FROM samples WHERE timestamp < ?',
+                                       (timestamp,)).fetchone()[0]
+
+    def read_after(self, position=0):
+        """Yield (record, position) for every record after position (rowid order)."""
+        for row in self.connection.execute('SELECT rowid, * FROM samples WHERE rowid > ? ORDER BY rowid', (position,)):
+            yield DataRecord(*row[1:]), row[0]
+
+    def prune(self, before):
+        """Delete the records older than before (freed pages are reused); returns how many."""
+        with self.connection:
+            return self.connection.execute('DELETE FROM samples WHERE timestamp < ?', (before,)).rowcount
+
+    def close(self):
+        self.connection.close()
+
+
+class BinaryDataStore:
+    """
+    Append-only record file plus a time index.
+    Data file: MAGIC, then per record a fixed header (timestamp, max_gpu, max_system,
+    avg_fan_rpm, fan_speed_pct, payload length) followed by the per-sensor CSVs.
+    Index file (<path>.idx): one fixed (timestamp, offset) entry per record, which
+    query() binary searches with pread. Timestamps must not go backwards; a record
+    older than the last one is stored with the last timestamp. Readers open the
+    files read-only and only see records that are already indexed. Writers append
+    under <path>.lock and reopen the files when prune() has replaced them.
+    """
+
+    backend = 'binary'
+    MAGIC = b'FCDLOG1\n'
+    HEADER = struct.Struct('<dddIHH')
+    INDEX_ENTRY = struct.Struct('<dQ')
+    READ_BLOCK = 1 << 20
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.lock_path = path + '.lock'
+        if readonly:
+            self.open(readonly)
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with file_lock(self.lock_path):
+            self.open(readonly)
+
+    def open(self, readonly):
+        """Open the files; a writer (holding the lock) also creates and recover()s them."""
+        path = self.path
+        if readonly:
+            self.data_fd = os.open(path, os.O_RDONLY)
+            self.index_fd = os.open(self.index_path, os.O_RDONLY)
+        else:
+            self.data_fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            self.index_fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT, 0o644)
+            if os.fstat(self.data_fd).st_size == 0:
+                os.write(self.data_fd, self.MAGIC)
+        if os.pread(self.data_fd, len(self.MAGIC), 0) != self.MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a binary data log")
+        if not readonly:
+            self.recover()
+
+    def reopen_if_replaced(self):
+        """
+        Switch to the new files after prune() renamed them over the ones this writer
+        has open (called with the lock held).
+        """
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self.data_fd).st_ino
+        except FileNotFoundError:
+            return
+        if replaced:
+            self.close()
+            self.open(readonly=False)
+
+    def index_entries(self):
+        return os.fstat(self.index_fd).st_size // self.INDEX_ENTRY.size
+
+    def index_entry(self, position):
+        return self.INDEX_ENTRY.unpack(os.pread(self.index_fd, self.INDEX_ENTRY.size, position * self.INDEX_ENTRY.size))
+
+    def read_record(self, offset):
+        """Return (record, next offset), or (None, offset) for a missing/partial record."""
+        header = os.pread(self.data_fd, self.HEADER.size, offset)
+        if len(header) < self.HEADER.size:
+            return None, offset
+        timestamp, max_gpu, max_system, avg_fan_rpm, fan_pct, length = self.HEADER.unpack(header)
+        payload = os.pread(self.data_fd, length, offset + self.HEADER.size)
+        if len(payload) < length:
+            return None, offset
+        fields = payload.decode('utf-8', 'replace').split('|')
+        fields += [''] * (3 - len(fields))
+        record = DataRecord(timestamp, max_gpu, max_system, avg_fan_rpm, fan_pct, *fields[:3])
+        return record, offset + self.HEADER.size + length
+
+    def recover(self):
+        """
+        Make the index and the data file agree after a crash: drop a torn index entry,
+        index records written after the last index entry, and cut off a partial record.
+        """
+        index_size = os.fstat(self.index_fd).st_size
+        if index_size % self.INDEX_ENTRY.size:
+            os.ftruncate(self.index_fd, index_size - index_size % self.INDEX_ENTRY.size)
+        data_size = os.fstat(self.data_fd).st_size
+        entries = self.index_entries()
+        if entries:
+            first, _ = self.read_record(len(self.MAGIC))
+            if first is None or first.timestamp != self.index_entry(0)[0]:
+                entries = 0  # Index of other data (prune() was interrupted between its renames): rebuild it
+        while entries:
+            _, offset = self.index_entry(entries - 1)
+            if self.read_record(offset)[0] is not None:
+                break
+            entries -= 1  # Index points past the data that actually reached the disk
+        os.ftruncate(self.index_fd, entries * self.INDEX_ENTRY.size)
+        if entries:
+            last_timestamp, offset = self.index_entry(entries - 1)
+            _, offset = self.read_record(offset)
+        else:
+            last_timestamp, offset = float('-inf'), len(self.MAGIC)
+        missing = []
+        while offset < data_size:
+            record, next_offset = self.read_record(offset)
+            if record is None:
+                break
+            last_timestamp = max(last_timestamp, record.timestamp)
+            missing.append(self.INDEX_ENTRY.pack(last_timestamp, offset))
+            offset = next_offset
+        if missing:
+            os.pwrite(self.index_fd, b''.join(missing), entries * self.INDEX_ENTRY.size)
+        if offset < data_size:
+            os.ftruncate(self.data_fd, offset)
+        self.end = offset
+        self.last_timestamp = last_timestamp
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        with file_lock(self.lock_path):
+            self.reopen_if_replaced()
+            self.append_locked(records)
+
+    def append_locked(self, records):
+        data, index = [], []
+        offset = self.end
+        for record in records:
+            payload = f"{record.gpu_temps}|{record.system_temps}|{record.fan_speeds}".encode()
+            self.last_timestamp = max(self.last_timestamp, record.timestamp)
+            chunk = self.HEADER.pack(self.last_timestamp, record.max_gpu, record.max_system,
+                                     record.avg_fan_rpm, record.fan_speed_pct, len(payload)) + payload
+            data.append(chunk)
+            index.append(self.INDEX_ENTRY.pack(self.last_timestamp, offset))
+            offset += len(chunk)
+        if not data:
+            return
+        # Data first: an index entry never points at bytes that were not written
+        os.pwrite(self.data_fd, b''.join(data), self.end)
+        os.pwrite(self.index_fd, b''.join(index), self.index_entries() * self.INDEX_ENTRY.size)
+        self.end = offset
+
+    def bisect(self, timestamp):
+        """First index position whose timestamp is >= timestamp."""
+        low, high = 0, self.index_entries()
+        while low < high:
+            middle = (low + high) // 2
+            if self.index_entry(middle)[0] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def query(self, start=None, end=None):
+        """Yield records with start <= timestamp < end (epoch seconds), oldest first."""
+        entries = self.index_entries()
+        first = self.bisect(start) if start is not None else 0
+        last = self.bisect(end) if end is not None else entries
+        if first < last:
+            yield from self.read_records(first, last - first)
+
+    def end_position(self):
+        """Position after the last record (the number of indexed records)."""
+        return self.index_entries()
+
+    def position_at(self, timestamp):
+        """Position from which read_after() yields the records with timestamp >= timestamp."""
+        return self.bisect(timestamp)
+
+    def read_after(self, position=0):
+        """Yield (record, position) for every record after position (record number)."""
+        for record in self.read_records(position, self.index_entries() - position):
+            position += 1
+            yield record, position
+
+    def read_records(self, first, remaining):
+        """Yield `remaining` records starting at record number first."""
+        if remaining <= 0:
+            return
+        offset = self.index_entry(first)[1]
+        # Records are read in READ_BLOCK-sized chunks rather than one pread per record
+        buffer = b''
+        while remaining:
+            block = os.pread(self.data_fd, self.READ_BLOCK, offset + len(buffer))
+            if not block:
+                return
+            buffer += block
+            position = 0
+            while remaining and position + self.HEADER.size <= len(buffer):
+                timestamp, max_gpu, max_system, avg_fan_rpm, fan_pct, length = self.HEADER.unpack_from(buffer, position)
+                payload_start = position + self.HEADER.size
+                if payload_start + length > len(buffer):
+                    break
+                fields = buffer[payload_start:payload_start + length].decode('utf-8', 'replace').split('|')
+                fields += [''] * (3 - len(fields))
+                yield DataRecord(timestamp, max_gpu, max_system, avg_fan_rpm, fan_pct, *fields[:3])
+                position = payload_start + length
+                remaining -= 1
+            offset += position
+            buffer = buffer[position:]
+
+    def copy_records(self, data, index, first, last, shift):
+        """Append records [first, last) to the open data/index files, offsets moved down by shift."""
+        if first >= last:
+            return
+        start = self.index_entry(first)[1]
+        end = self.index_entry(last)[1] if last < self.index_entries() else os.fstat(self.data_fd).st_size
+        for block_start in range(start, end, self.READ_BLOCK):
+            data.write(os.pread(self.data_fd, min(self.READ_BLOCK, end - block_start), block_start))
+        entries = os.pread(self.index_fd, (last - first) * self.INDEX_ENTRY.size, first * self.INDEX_ENTRY.size)
+        index.write(b''.join(self.INDEX_ENTRY.pack(timestamp, offset - shift)
+                             for timestamp, offset in self.INDEX_ENTRY.iter_unpack(entries)))
+
+    def prune(self, before):
+        """
+        Drop the records older than before (epoch seconds) by writing new data and
+        index files and renaming them over the old ones; returns how many. Records
+        appended while the bulk is copied are caught up under the writers' lock.
+        """
+        first = self.bisect(before)
+        if not first:
+            return 0
+        shift = self.index_entry(first)[1] - len(self.MAGIC)
+        data_tmp, index_tmp = self.path + '.tmp', self.index_path + '.tmp'
+        with open(data_tmp, 'wb') as data, open(index_tmp, 'wb') as index:
+            data.write(self.MAGIC)
+            # Copied up to the last indexed record, whose data end is only known under the lock
+            copied = max(first, self.index_entries() - 1)
+            self.copy_records(data, index, first, copied, shift)
+            with file_lock(self.lock_path):
+                self.copy_records(data, index, copied, self.index_entries(), shift)
+                for f in (data, index):
+                    f.flush()
+                    os.fsync(f.fileno())
+                shutil.copymode(self.path, data_tmp)
+                shutil.copymode(self.index_path, index_tmp)
+                # Data first: recover() rebuilds an index that does not match the data
+                os.replace(data_tmp, self.path)
+                os.replace(index_tmp, self.index_path)
+        return first
+
+    def close(self):
+        for fd in (self.data_fd, self.index_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+STORE_CLASSES = {
+    'text': TextDataStore,
+    'sqlite': SqliteDataStore,
+    'binary': BinaryDataStore,
+}
+
+
+def open_data_store(path, backend=None, readonly=False):
+    """
+    Open (or create) a data log. backend=None detects it from the file.
+    Readers should pass readonly=True so they never repair a file a writer is appending to.
+    """
+    backend = backend or detect_backend(path)
+    if backend not in STORE_CLASSES:
+        raise ValueError(f"Unknown data log backend '{backend}' (expected one of: {', '.join(BACKENDS)})")
+    return STORE_CLASSES[backend](path, readonly=readonly)
+
+
+def query_from(store, start, end=None):
+    """store.query(start, end); a text log is binary searched for start instead of read from the top."""
+    if store.backend == 'text':
+        return store.query(start, end, seek=True)
+    return store.query(start, end)
+
+
+class RollupBucket:
+    """Accumulates records (add) or finer Rollup rows (merge) into one Rollup."""
+
+    __slots__ = ('count', 'first', 'last', 'temp_mean', 'temp_m2', 'minimums', 'sums', 'maximums')
+
+    def __init__(self):
+        self.count = 0
+        self.first = self.last = None
+        self.temp_mean = self.temp_m2 = 0.0
+        # max temperature, max_gpu, max_system, avg_fan_rpm
+        self.minimums = [math.inf] * 4
+        self.sums = [0.0] * 4
+        self.maximums = [-math.inf] * 4
+
+    def update_range(self, first, last):
+        self.first = first if self.first is None else min(self.first, first)
+        self.last = last if self.last is None else max(self.last, last)
+
+    def add(self, record):
+        temp = float(max(record.max_gpu, record.max_system))
+        self.count += 1
+        self.update_range(record.timestamp, record.timestamp)
+        delta = temp - self.temp_mean
+        self.temp_mean += delta / self.count
+        self.temp_m2 += delta * (temp - self.temp_mean)
+        for i, value in enumerate((temp, record.max_gpu, record.max_system, record.avg_fan_rpm)):
+            self.sums[i] += value
+            if value < self.minimums[i]:
+                self.minimums[i] = value
+            if value > self.maximums[i]:
+                self.maximums[i] = value
+
+    def merge(self, row):
+        """Fold in a finer rollup (Chan et al. parallel variance for the max temperature)."""
+        count = self.count + row.count
+        delta = row.temp_mean - self.temp_mean
+        self.temp_m2 += row.temp_m2 + delta * delta * self.count * row.count / count
+        self.temp_mean += delta * row.count / count
+        self.count = count
+        self.update_range(row.first, row.last)
+        values = ((row.temp_min, row.temp_mean, row.temp_max), (row.gpu_min, row.gpu_mean, row.gpu_max),
+                  (row.system_min, row.system_mean, row.system_max), (row.rpm_min, row.rpm_mean, row.rpm_max))
+        for i, (minimum, mean, maximum) in enumerate(values):
+            self.sums[i] += mean * row.count
+            self.minimums[i] = min(self.minimums[i], minimum)
+            self.maximums[i] = max(self.maximums[i], maximum)
+
+    def rollup(self, seconds, start, fan_speed_pct):
+        means = [total / self.count for total in self.sums]
+        return Rollup(seconds, start, fan_speed_pct, self.count, self.first, self.last,
+                      self.temp_mean, self.temp_m2, self.minimums[0], self.maximums[0],
+                      self.minimums[1], means[1], self.maximums[1], self.minimums[2], means[2], self.maximums[2],
+                      self.minimums[3], means[3], self.maximums[3])
+
+
+def roll_up(records, seconds):
+    """Rollup rows (oldest first) of records in `seconds` buckets."""
+    buckets = {}
+    for record in records:
+        key = (int(record.timestamp // seconds * seconds), record.fan_speed_pct)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = RollupBucket()
+        bucket.add(record)
+    return [bucket.rollup(seconds, start, pct) for (start, pct), bucket in sorted(buckets.items())]
+
+
+class RollupStore:
+    """
+    The rollup tiers of a data log, in SQLite: one row per bucket (MINUTE or HOUR)
+    and fan speed %, plus how far each tier reaches. Every raw record before
+    'minute_until' is in the minute tier, every minute before 'hour_until' is in the
+    hour tier; compact() only moves those marks forward.
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        if readonly:
+            self.connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=10)
+            return
+        self.connection = sqlite3.connect(path, timeout=10)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS rollups ('
+            ' seconds INTEGER NOT NULL, start INTEGER NOT NULL, fan_speed_pct INTEGER NOT NULL,'
+            ' count INTEGER, first REAL, last REAL, temp_mean REAL, temp_m2 REAL, temp_min REAL, temp_max REAL,'
+            ' gpu_min REAL, gpu_mean REAL, gpu_max REAL, system_min REAL, system_mean REAL, system_max REAL,'
+            ' rpm_min REAL, rpm_mean REAL, rpm_max REAL,'
+            ' PRIMARY KEY (seconds, start, fan_speed_pct)) WITHOUT ROWID'
+        )
+        self.connection.execute('CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value REAL)')
+        self.connection.commit()
+
+    def get_state(self, name):
+        row = self.connection.execute('SELECT value FROM state WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, name, value):
+        self.connection.execute('INSERT OR REPLACE INTO state VALUES (?, ?)', (name, value))
+
+    def query(self, seconds, start=None, end=None):
+        """Rollups of one tier with start <= bucket start < end, oldest first."""
+        sql = 'SELECT * FROM rollups WHERE seconds = ?'
+        params = [seconds]
+        if start is not None:
+            sql += ' AND start >= ?'
+            params.append(start)
+        if end is not None:
+            sql += ' AND start < ?'
+            params.append(end)
+        return [Rollup(*row) for row in self.connection.execute(sql + ' ORDER BY start, fan_speed_pct', params)]
+
+    def merge(self, rows):
+        """Add rollup rows, merging any that already exist (a bucket filled across two compactions)."""
+        for row in rows:
+            existing = self.connection.execute(
+                'SELECT * FROM rollups WHERE seconds = ? AND start = ? AND fan_speed_pct = ?',
+                (row.seconds, row.start, row.fan_speed_pct)).fetchone()
+            if existing:
+                bucket = RollupBucket()
+                bucket.merge(Rollup(*existing))
+                bucket.merge(row)
+                row = bucket.rollup(row.seconds, row.start, row.fan_speed_pct)
+            self.connection.execute(f"INSERT OR REPLACE INTO rollups VALUES ({', '.join('?' * len(row))})", row)
+
+    def delete_before(self, seconds, before):
+        return self.connection.execute('DELETE FROM rollups WHERE seconds = ? AND start < ?', (seconds, before)).rowcount
+
+    def tier_info(self, seconds):
+        """(rows, first bucket start, last bucket start) of a tier."""
+        return self.connection.execute(
+            'SELECT COUNT(*), MIN(start), MAX(start) FROM rollups WHERE seconds = ?', (seconds,)).fetchone()
+
+    def close(self):
+        self.connection.close()
+
+
+def compact(store, rollups, now=None, raw_days=RAW_DAYS, minute_weeks=MINUTE_WEEKS, batch_size=100000):
+    """
+    Roll the raw records of every complete minute not rolled up yet into the minute
+    tier and every complete hour of minutes into the hour tier, then apply the
+    retention: raw records older than raw_days (cut at midnight UTC, so text and
+    binary logs are rewritten at most once a day) and minute rollups older than
+    minute_weeks are dropped, but never before they are in the next tier (0 keeps
+    them). A record that turns up older than what was already rolled up (clock
+    stepped back) is not counted. Returns counts of what was done.
+    """
+    now = time.time() if now is None else now
+    result = {'raw_rolled_up': 0, 'minute_rows': 0, 'hour_rows': 0, 'raw_pruned': 0, 'minute_rows_pruned': 0}
+    minute_until = rollups.get_state('minute_until')
+    hour_until = rollups.get_state('hour_until')
+    new_minute_until = now // MINUTE * MINUTE
+    new_hour_until = new_minute_until // HOUR * HOUR
+    with rollups.connection:
+        batch = []
+        for record in query_from(store, minute_until, new_minute_until):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                rows = roll_up(batch, MINUTE)
+                rollups.merge(rows)
+                result['raw_rolled_up'] += len(batch)
+                result['minute_rows'] += len(rows)
+                batch = []
+        rows = roll_up(batch, MINUTE)
+        rollups.merge(rows)
+        result['raw_rolled_up'] += len(batch)
+        result['minute_rows'] += len(rows)
+        rollups.set_state('minute_until', new_minute_until)
+
+        hours = {}
+        for row in rollups.query(MINUTE, hour_until, new_hour_until):
+            key = (row.start // HOUR * HOUR, row.fan_speed_pct)
+            if key not in hours:
+                hours[key] = RollupBucket()
+            hours[key].merge(row)
+        rows = [bucket.rollup(HOUR, start, pct) for (start, pct), bucket in sorted(hours.items())]
+        rollups.merge(rows)
+        result['hour_rows'] = len(rows)
+        rollups.set_state('hour_until', new_hour_until)
+
+        if minute_weeks > 0:
+            before = min(new_hour_until, now - minute_weeks * 7 * 86400)
+            result['minute_rows_pruned'] = rollups.delete_before(MINUTE, before)
+    if raw_days > 0:
+        before = min(new_minute_until, (now - raw_days * 86400) // 86400 * 86400)
+        result['raw_pruned'] = store.prune(before)
+    return result
+
+
+def compact_files(path, backend=None, rollup_path=None, raw_days=RAW_DAYS, minute_weeks=MINUTE_WEEKS, now=None):
+    """
+    compact() a data log and its rollup database; None if another compaction of the
+    same rollup database is still running.
+    """
+    rollup_path = rollup_path or default_rollup_file(path)
+    with file_lock(rollup_path + '.lock', blocking=False) as locked:
+        if not locked:
+            return None
+        store = open_data_store(path, backend)
+        rollups = RollupStore(rollup_path)
+        try:
+            return compact(store, rollups, now, raw_days, minute_weeks)
+        finally:
+            store.close()
+            rollups.close()
+
+
+def read_window(store, rollups, start, end=None):
+    """
+    Rollup rows covering start <= timestamp < end, oldest first, each part of the
+    window from the coarsest tier that has it: hourly rollups up to 'hour_until',
+    then minute rollups up to 'minute_until', then the raw records after that rolled
+    up on the fly. The window start moves in whole buckets of the tier it falls in.
+    """
+    rows = []
+    cursor = start
+    for seconds, until in ((HOUR, rollups.get_state('hour_until')), (MINUTE, rollups.get_state('minute_until'))):
+        if until is None:
+            continue
+        limit = until if end is None else min(until, end)
+        if cursor >= limit:
+            continue
+        rows.extend(rollups.query(seconds, math.ceil(cursor / seconds) * seconds, limit))
+        cursor = limit
+    rows.extend(roll_up(query_from(store, cursor, end), MINUTE))
+    return rows
+
+
+def migrate(source_path, target_path, target_backend, batch_size=10000):
+    """Copy every record from source into target; returns the number of records copied."""
+    source = open_data_store(source_path, readonly=True)
+    target = open_data_store(target_path, target_backend)
+    copied = 0
+    batch = []
+    try:
+        for record in source.query():
+            batch.append(record)
+            if len(batch) >= batch_size:
+                target.append_many(batch)
+                copied += len(batch)
+                batch = []
+        if batch:
+            target.append_many(batch)
+            copied += len(batch)
+    finally:
+        source.close()
+        target.close()
+    return copied
+
+
+def parse_time_argument(value):
+    """Accept 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM:SS' or epoch seconds."""
+    for fmt in (TIMESTAMP_FORMAT, '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            pass
+    return float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate, export and inspect fan control data logs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='Copy a data log into another backend')
+    migrate_parser.add_argument('source', help='Existing data log (backend detected from the file)')
+    migrate_parser.add_argument('target', help='New data log (must not exist yet)')
+    migrate_parser.add_argument('--to', choices=BACKENDS, required=True, dest='backend')
+
+    export_parser = subparsers.add_parser('export', help='Write a data log in the text format')
+    export_parser.add_argument('source')
+    export_parser.add_argument('--since', type=parse_time_argument, help="'YYYY-MM-DD[ HH:MM:SS]' or epoch seconds")
+    export_parser.add_argument('--until', type=parse_time_argument)
+    export_parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+
+    info_parser = subparsers.add_parser('info', help='Show backend, record count, time range and rollup tiers')
+    info_parser.add_argument('source')
+    info_parser.add_argument('--rollup-file', help='Rollup database (default: <source>.rollup.db)')
+
+    compact_parser = subparsers.add_parser('compact', help='Roll up old records and drop what is past the retention')
+    compact_parser.add_argument('source')
+    compact_parser.add_argument('--rollup-file', help='Rollup database (default: <source>.rollup.db)')
+    compact_parser.add_argument('--raw-days', type=float, default=RAW_DAYS,
+                                help=f'Days of raw records to keep (default: {RAW_DAYS}, 0 = all)')
+    compact_parser.add_argument('--minute-weeks', type=float, default=MINUTE_WEEKS,
+                                help=f'Weeks of 1-minute rollups to keep (default: {MINUTE_WEEKS}, 0 = all)')
+
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        if os.path.exists(args.target) and os.path.getsize(args.target) > 0:
+            parser.error(f"{args.target} already exists; migrate into a new file")
+        copied = migrate(args.source, args.target, args.backend)
+        print(f"Copied {copied} records from {args.source} to {args.target} ({args.backend})")
+        print(f"Set DATA_LOG_BACKEND={args.backend} and DATA_LOG_FILE={os.path.abspath(args.target)} in .env")
+    elif args.command == 'export':
+        store = open_data_store(args.source, readonly=True)
+        output = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            for record in store.query(args.since, args.until):
+                output.write(format_text_line(record))
+        finally:
+            store.close()
+            if args.output:
+                output.close()
+    elif args.command == 'info':
+        store = open_data_store(args.source, readonly=True)
+        try:
+            count, first, last = 0, None, None
+            for record in store.query():
+                count += 1
+                first = first or record
+                last = record
+            print(f"Backend: {store.backend}")
+            print(f"Records: {count}")
+            if count:
+                print(f"First:   {datetime.fromtimestamp(first.timestamp).strftime(TIMESTAMP_FORMAT)}")
+                print(f"Last:    {datetime.fromtimestamp(last.timestamp).strftime(TIMESTAMP_FORMAT)}")
+        finally:
+            store.close()
+        rollup_path = args.rollup_file or default_rollup_file(args.source)
+        if os.path.exists(rollup_path):
+            rollups = RollupStore(rollup_path, readonly=True)
+            try:
+                for name, seconds in (('1-minute', MINUTE), ('Hourly', HOUR)):
+                    rows, first_start, last_start = rollups.tier_info(seconds)
+                    if rows:
+                        print(f"{name} rollups: {rows} rows, "
+                              f"{datetime.fromtimestamp(first_start).strftime(TIMESTAMP_FORMAT)} to "
+                              f"{datetime.fromtimestamp(last_start).strftime(TIMESTAMP_FORMAT)}")
+                    else:
+                        print(f"{name} rollups: none")
+            finally:
+                rollups.close()
+    elif args.command == 'compact':
+        result = compact_files(args.source, rollup_path=args.rollup_file, raw_days=args.raw_days,
+                               minute_weeks=args.minute_weeks)
+        if result is None:
+            sys.exit('Another compaction of this data log is running')
+        print(f"Rolled up {result['raw_rolled_up']} records into {result['minute_rows']} minute "
+              f"and {result['hour_rows']} hourly rows")
+        print(f"Dropped {result['raw_pruned']} raw records and {result['minute_rows_pruned']} minute rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,12 @@ Monitors GPU temperatures from NVIDIA, AMD, and Intel GPUs, and system temperatu
 then adjusts fan speeds accordingly to keep noise low while maintaining safe temperatures.
 
 GPU Support:
-- NVIDIA: Uses nvidia-smi
-- AMD: Uses rocm-smi or sensors (lm-sensors)
-- Intel: Uses intel_gpu_top or sensors (lm-sensors)
+- NVIDIA: Uses NVML (libnvidia-ml) or nvidia-smi
+- AMD: Uses amdgpu hwmon (sysfs), sensors (lm-sensors) or rocm-smi
+- Intel: Uses i915/xe hwmon (sysfs), sensors (lm-sensors) or intel_gpu_top
 
-Designed to run periodically via cron or systemd service.
+Designed to run periodically via cron or systemd service, or as a long-running
+daemon (--daemon) that keeps the control loop in-process.
 """
 
 import subprocess
@@ -19,10 +20,28 @@ import sys
 import os
 import logging
 import argparse
+import signal
+import socket
+import threading
+import queue
+import atexit
+import shutil
+import bisect
+import ctypes
+import gzip
+import json
+import math
+import random
+import concurrent.futures
+import contextvars
+import contextlib
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
 from dotenv import load_dotenv
 
+import data_store
+import metrics
+
 # Load environment variables
 load_dotenv()
 
@@ -59,6 +78,61 @@ FAN_SPEED_MED_HIGH = int(os.getenv('FAN_SPEED_MED_HIGH', '50'))
 FAN_SPEED_HIGH = int(os.getenv('FAN_SPEED_HIGH', '65'))
 FAN_SPEED_VERY_HIGH = int(os.getenv('FAN_SPEED_VERY_HIGH', '80'))
 
+# Threshold tables (any number of levels, lowest first, comma-separated).
+# When unset, the seven GPU_TEMP_* / SYSTEM_TEMP_* / FAN_SPEED_* values above are used.
+GPU_TEMP_LEVELS = [int(v) for v in os.getenv('GPU_TEMP_LEVELS', '').split(',') if v.strip()] or [
+    GPU_TEMP_VERY_LOW, GPU_TEMP_LOW, GPU_TEMP_MED_LOW, GPU_TEMP_MED, GPU_TEMP_MED_HIGH, GPU_TEMP_HIGH, GPU_TEMP_VERY_HIGH]
+SYSTEM_TEMP_LEVELS = [int(v) for v in os.getenv('SYSTEM_TEMP_LEVELS', '').split(',') if v.strip()] or [
+    SYSTEM_TEMP_VERY_LOW, SYSTEM_TEMP_LOW, SYSTEM_TEMP_MED_LOW, SYSTEM_TEMP_MED, SYSTEM_TEMP_MED_HIGH, SYSTEM_TEMP_HIGH, SYSTEM_TEMP_VERY_HIGH]
+FAN_SPEED_LEVELS = [int(v) for v in os.getenv('FAN_SPEED_LEVELS', '').split(',') if v.strip()] or [
+    FAN_SPEED_VERY_LOW, FAN_SPEED_LOW, FAN_SPEED_MED_LOW, FAN_SPEED_MED, FAN_SPEED_MED_HIGH, FAN_SPEED_HIGH, FAN_SPEED_VERY_HIGH]
+
+# Hysteresis: after reaching a level, stay there until the temperature drops this many
+# degrees below its threshold (one value for all levels, or one per level, comma-separated).
+THRESHOLD_HYSTERESIS = [float(v) for v in os.getenv('THRESHOLD_HYSTERESIS', '2').split(',') if v.strip()]
+# Minimum seconds at a level before stepping down (stepping up is always immediate)
+THRESHOLD_MIN_DWELL = float(os.getenv('THRESHOLD_MIN_DWELL', '0'))
+# Current level and when it was entered, so cron runs keep hysteresis/dwell ('' = in-memory only).
+# The curve/pid controllers keep their state (integral, last output) in the same file.
+THRESHOLD_STATE_FILE = os.getenv('THRESHOLD_STATE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fan_control_threshold_state.json'))
+
+# Fan controller:
+#   steps - discrete FAN_SPEED levels from the threshold tables (default)
+#   curve - piecewise-linear interpolation between the FAN_CURVE_* points
+#   pid   - PID loop holding temperatures at PID_SETPOINT / PID_SYSTEM_SETPOINT
+# AUTO_MODE_THRESHOLD always hands control back to iDRAC, whatever the controller.
+FAN_CONTROLLER = os.getenv('FAN_CONTROLLER', 'steps').lower()
+# Curve points "temp:speed,temp:speed,..." (default: the threshold tables)
+FAN_CURVE_GPU = [tuple(float(x) for x in point.split(':')) for point in os.getenv('FAN_CURVE_GPU', '').split(',') if point.strip()] or \
+    list(zip(GPU_TEMP_LEVELS, FAN_SPEED_LEVELS))
+FAN_CURVE_SYSTEM = [tuple(float(x) for x in point.split(':')) for point in os.getenv('FAN_CURVE_SYSTEM', '').split(',') if point.strip()] or \
+    list(zip(SYSTEM_TEMP_LEVELS, FAN_SPEED_LEVELS))
+# Output limits and rate limits (percent per second) for the curve/pid controllers
+FAN_CONTROLLER_MIN_SPEED = float(os.getenv('FAN_CONTROLLER_MIN_SPEED', str(min(FAN_SPEED_LEVELS))))
+FAN_CONTROLLER_MAX_SPEED = float(os.getenv('FAN_CONTROLLER_MAX_SPEED', str(max(FAN_SPEED_LEVELS))))
+FAN_RATE_LIMIT_UP = float(os.getenv('FAN_RATE_LIMIT_UP', '5'))      # 0 = unlimited
+FAN_RATE_LIMIT_DOWN = float(os.getenv('FAN_RATE_LIMIT_DOWN', '1'))  # 0 = unlimited
+# Ignore output changes smaller than this many percent (each change is an IPMI write)
+FAN_CONTROLLER_MIN_CHANGE = float(os.getenv('FAN_CONTROLLER_MIN_CHANGE', '2'))
+# curve/pid state (last output, PID integral) is written to THRESHOLD_STATE_FILE when the
+# fan speed changes, otherwise at most every this many seconds
+FAN_CONTROLLER_SAVE_INTERVAL = float(os.getenv('FAN_CONTROLLER_SAVE_INTERVAL', '300'))
+# PID: setpoints (°C), gains (% per °C, % per °C*s, % per °C/s) and the output at zero error
+PID_SETPOINT = float(os.getenv('PID_SETPOINT', '70'))
+PID_SYSTEM_SETPOINT = float(os.getenv('PID_SYSTEM_SETPOINT', '55'))
+PID_KP = float(os.getenv('PID_KP', '2.0'))
+PID_KI = float(os.getenv('PID_KI', '0.05'))
+PID_KD = float(os.getenv('PID_KD', '0'))
+PID_BASE_SPEED = float(os.getenv('PID_BASE_SPEED', str(FAN_SPEED_MED)))
+
+# Feedforward: raise the fan floor from GPU power draw / utilization (NVIDIA, via NVML
+# or nvidia-smi) before the temperature rises. floor = gain * (watts - idle watts),
+# or util gain * utilization %, whichever is higher. Both gains 0 = disabled.
+FEEDFORWARD_GAIN = float(os.getenv('FEEDFORWARD_GAIN', '0.1'))  # % per W
+FEEDFORWARD_IDLE_WATTS = float(os.getenv('FEEDFORWARD_IDLE_WATTS', '100'))
+FEEDFORWARD_UTIL_GAIN = float(os.getenv('FEEDFORWARD_UTIL_GAIN', '0'))  # % per utilization %
+FEEDFORWARD_MAX_SPEED = float(os.getenv('FEEDFORWARD_MAX_SPEED', str(max(FAN_SPEED_LEVELS))))
+
 # Temperature threshold for switching to automatic mode (let iDRAC handle it)
 # If temps exceed this, disable manual mode and let iDRAC take over
 # Default to VERY_HIGH threshold if not specified
@@ -67,17 +141,112 @@ AUTO_MODE_THRESHOLD = int(os.getenv('AUTO_MODE_THRESHOLD', str(max(GPU_TEMP_VERY
 # IPMI timeout and retry settings (for slow ipmitool responses)
 IPMI_TIMEOUT = int(os.getenv('IPMI_TIMEOUT', '20'))  # seconds
 IPMI_RETRIES = int(os.getenv('IPMI_RETRIES', '2'))  # number of retries
+# Delay before retry n (0-based): random in [0, min(IPMI_BACKOFF_MAX, IPMI_BACKOFF_BASE * 2**n)]
+# The jitter keeps retries from hammering a struggling BMC in lockstep
+IPMI_BACKOFF_BASE = float(os.getenv('IPMI_BACKOFF_BASE', '0.5'))  # seconds
+IPMI_BACKOFF_MAX = float(os.getenv('IPMI_BACKOFF_MAX', '8'))  # seconds
+
+# IPMI transport:
+#   subprocess - one ipmitool process (and lanplus session) per command (default)
+#   shell      - one long-lived "ipmitool shell" session reused for every command
+#   native     - built-in RMCP+ client (ipmi_lanplus.py), no ipmitool processes
+IPMI_TRANSPORT = os.getenv('IPMI_TRANSPORT', 'subprocess').lower()
+IPMI_PORT = int(os.getenv('IPMI_PORT', '623'))  # native transport only
+IPMI_CIPHER_SUITE = int(os.getenv('IPMI_CIPHER_SUITE', '3'))  # native transport only (1, 2 or 3)
 
 # GPU Temperature Priority Override
 # When enabled, GPU temperatures take priority over system temperatures
 # If GPU temps are above GPU_TEMP_LOW, they will be used for fan control
 GPU_TEMP_OVERRIDE = os.getenv('GPU_TEMP_OVERRIDE', 'true').lower() in ('true', '1', 'yes', 'on')
 
+# Daemon mode (--daemon): seconds between control cycles (fractions allowed)
+CONTROL_INTERVAL = float(os.getenv('CONTROL_INTERVAL', '30'))
+# Hand fan control back to iDRAC when the daemon stops
+RESTORE_AUTO_ON_EXIT = os.getenv('RESTORE_AUTO_ON_EXIT', 'true').lower() in ('true', '1', 'yes', 'on')
+# Adaptive polling (daemon mode): poll every ADAPTIVE_MIN_INTERVAL seconds while temperatures
+# move faster than ADAPTIVE_SLOPE (°C/min) or sit within ADAPTIVE_MARGIN °C of a threshold;
+# otherwise multiply the interval by ADAPTIVE_BACKOFF per stable cycle, up to ADAPTIVE_MAX_INTERVAL.
+ADAPTIVE_INTERVAL = os.getenv('ADAPTIVE_INTERVAL', 'false').lower() in ('true', '1', 'yes', 'on')
+ADAPTIVE_MIN_INTERVAL = float(os.getenv('ADAPTIVE_MIN_INTERVAL', '2'))
+ADAPTIVE_MAX_INTERVAL = float(os.getenv('ADAPTIVE_MAX_INTERVAL', '60'))
+ADAPTIVE_BACKOFF = float(os.getenv('ADAPTIVE_BACKOFF', '1.5'))
+ADAPTIVE_SLOPE = float(os.getenv('ADAPTIVE_SLOPE', '1.0'))  # °C per minute
+ADAPTIVE_SLOPE_WINDOW = float(os.getenv('ADAPTIVE_SLOPE_WINDOW', '60'))  # seconds the slope is measured over
+ADAPTIVE_MARGIN = float(os.getenv('ADAPTIVE_MARGIN', '1.0'))  # °C
+
+# Actuator state cache: skip IPMI writes when iDRAC already has the target mode/speed.
+# The last applied state is persisted so oneshot (timer/cron) runs benefit too.
+# The mode is re-sent at least every ACTUATOR_REASSERT_INTERVAL seconds, however often the
+# speed changes, in case iDRAC reverted to automatic mode on its own (0 = always write).
+ACTUATOR_STATE_FILE = os.getenv('ACTUATOR_STATE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fan_control_state.json'))
+ACTUATOR_REASSERT_INTERVAL = int(os.getenv('ACTUATOR_REASSERT_INTERVAL', '300'))  # seconds
+
+# Sensor acquisition: read GPU temps, system temps and fan speeds concurrently
+# ('concurrent', default) or one after another ('sequential').
+# Each source has its own deadline, and the whole acquisition has a cycle deadline;
+# sources that miss it are reported as timed out and treated as "no reading".
+SENSOR_ACQUISITION = os.getenv('SENSOR_ACQUISITION', 'concurrent').lower()
+SENSOR_CYCLE_DEADLINE = float(os.getenv('SENSOR_CYCLE_DEADLINE', '60'))  # seconds
+SENSOR_SOURCE_DEADLINES = {
+    'gpu': float(os.getenv('SENSOR_DEADLINE_GPU', '15')),
+    'system': float(os.getenv('SENSOR_DEADLINE_SYSTEM', '60')),
+    'fans': float(os.getenv('SENSOR_DEADLINE_FANS', '60')),
+}
+
+# IPMI SDR fallback (used when sysfs and lm-sensors have no readings)
+# The SDR repository is dumped once to IPMI_SDR_CACHE_FILE and passed to ipmitool
+# with -S, so later reads skip the repository walk ('' disables the cache).
+IPMI_SDR_CACHE_FILE = os.getenv('IPMI_SDR_CACHE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fan_control_sdr.cache'))
+IPMI_SDR_CACHE_MAX_AGE = int(os.getenv('IPMI_SDR_CACHE_MAX_AGE', '86400'))  # seconds before re-dumping
+IPMI_SDR_CACHE_RETRY = int(os.getenv('IPMI_SDR_CACHE_RETRY', '900'))  # seconds before retrying a failed dump
+# Optional comma-separated sensor IDs to read instead of the full "sdr list",
+# e.g. "Inlet Temp,Exhaust Temp,Temp,Fan1,Fan2,Fan3,Fan4,Fan5,Fan6"
+IPMI_SDR_SENSORS = [name.strip() for name in os.getenv('IPMI_SDR_SENSORS', '').split(',') if name.strip()]
+
+# DRM class directory; amdgpu/i915/xe GPU temperatures are read from
+# card*/device/hwmon below it
+DRM_PATH = os.getenv('DRM_PATH', '/sys/class/drm')
+
+# NVIDIA Management Library, loaded once per process via ctypes.
+# nvidia-smi is only used when the library cannot be loaded ('' disables NVML).
+NVML_LIBRARY = os.getenv('NVML_LIBRARY', 'libnvidia-ml.so.1')
+
+# sysfs hwmon root and the persisted sensor index (see HwmonIndex)
+HWMON_PATH = os.getenv('HWMON_PATH', '/sys/class/hwmon')
+HWMON_INDEX_FILE = os.getenv('HWMON_INDEX_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fan_control_hwmon_index.json'))
+
+# Which acquisition backends work on this host, persisted between runs (see BackendProbes).
+# Everything is re-probed every BACKEND_PROBE_INTERVAL seconds and whenever the hardware
+# or installed tools change (0 = probe every read, '' file = don't persist)
+BACKEND_PROBE_FILE = os.getenv('BACKEND_PROBE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fan_control_backends.json'))
+BACKEND_PROBE_INTERVAL = float(os.getenv('BACKEND_PROBE_INTERVAL', '3600'))
+
 # Log file path
 LOG_FILE = os.getenv('LOG_FILE', '/var/log/dell-r730-fan-control.log')
+# Log level for control cycles; DEBUG adds one JSON line of timing spans per cycle
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# Unified data log for learning (temperatures + fan speeds together)
+# Backend: text (pipe-delimited, default), sqlite (WAL, indexed) or binary (record file + time index)
+DATA_LOG_BACKEND = os.getenv('DATA_LOG_BACKEND', 'text').lower()
+DATA_LOG_FILE = os.getenv('DATA_LOG_FILE') or data_store.default_data_log_file(DATA_LOG_BACKEND)
+
+# Data log retention (data_store.compact): raw records for DATA_RAW_DAYS, 1-minute min/mean/max
+# rollups for DATA_MINUTE_WEEKS, hourly rollups forever (in DATA_ROLLUP_FILE). Compaction runs
+# after a control cycle at most every DATA_COMPACT_INTERVAL seconds (0 = never; a background
+# thread in daemon mode)
+DATA_ROLLUP_FILE = os.getenv('DATA_ROLLUP_FILE') or data_store.default_rollup_file(DATA_LOG_FILE)
+DATA_RAW_DAYS = float(os.getenv('DATA_RAW_DAYS', str(data_store.RAW_DAYS)))
+DATA_MINUTE_WEEKS = float(os.getenv('DATA_MINUTE_WEEKS', str(data_store.MINUTE_WEEKS)))
+DATA_COMPACT_INTERVAL = float(os.getenv('DATA_COMPACT_INTERVAL', '3600'))
 
-# Unified data log file for learning (temperatures + fan speeds together)
-DATA_LOG_FILE = os.getenv('DATA_LOG_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fan_control_data.log'))
+# Prometheus/OpenMetrics exporter (metrics.py), filled from each cycle's own readings.
+# METRICS_PORT serves /metrics on METRICS_ADDRESS in daemon mode; METRICS_TEXTFILE is
+# rewritten atomically after every cycle, for the node_exporter textfile collector
+# (0 / empty = off)
+METRICS_ADDRESS = os.getenv('METRICS_ADDRESS', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE', '')
 
 # Setup logging (will be reconfigured in main() for read-only modes)
 log_dir = os.path.dirname(LOG_FILE)
@@ -100,7 +269,7 @@ def setup_logging(read_only=False):
     else:
         # Full logging for normal operations
         logging.basicConfig(
-            level=logging.INFO,
+            level=getattr(logging, LOG_LEVEL, logging.INFO),
             format='%(asctime)s - %(levelname)s - %(message)s',
             handlers=[
                 logging.FileHandler(LOG_FILE),
@@ -108,50 +277,791 @@ def setup_logging(read_only=False):
             ],
             force=True  # Reconfigure if already set up
         )
+    # asyncio logs "Using selector" at DEBUG for every event loop run_ipmi_sync() creates
+    logging.getLogger('asyncio').setLevel(logging.INFO)
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Metrics (see METRICS_PORT / METRICS_TEXTFILE); set from what the cycle already read
+metrics_registry = metrics.Registry()
+METRIC_TEMPERATURE = metrics_registry.gauge(
+    'fan_control_temperature_celsius', 'Temperature read this cycle', ['source', 'sensor'])
+METRIC_FAN_RPM = metrics_registry.gauge('fan_control_fan_speed_rpm', 'Fan speed read this cycle', ['fan'])
+METRIC_GPU_POWER = metrics_registry.gauge('fan_control_gpu_power_watts', 'GPU power draw', ['gpu'])
+METRIC_GPU_UTILIZATION = metrics_registry.gauge('fan_control_gpu_utilization_percent', 'GPU utilization', ['gpu'])
+METRIC_COMMANDED_SPEED = metrics_registry.gauge(
+    'fan_control_commanded_fan_speed_percent', 'Fan speed commanded in manual mode')
+METRIC_MODE = metrics_registry.gauge('fan_control_mode', 'Fan mode chosen this cycle (1 = active)', ['mode'])
+METRIC_DECISION = metrics_registry.gauge(
+    'fan_control_decision', 'Action and reason of the last decision (numbers masked as N)', ['action', 'reason'])
+METRIC_CYCLES = metrics_registry.counter('fan_control_cycles', 'Control cycles run', ['result'])
+METRIC_CYCLE_DURATION = metrics_registry.histogram(
+    'fan_control_cycle_duration_seconds', 'Control cycle duration')
+METRIC_LAST_CYCLE = metrics_registry.gauge(
+    'fan_control_last_cycle_timestamp_seconds', 'Unix time the last control cycle finished')
+METRIC_SENSOR_DURATION = metrics_registry.histogram(
+    'fan_control_sensor_read_duration_seconds', 'Time to read one acquisition source', ['source'])
+METRIC_SENSOR_TIMEOUTS = metrics_registry.counter(
+    'fan_control_sensor_timeouts', 'Acquisition sources that missed their deadline', ['source'])
+METRIC_SENSOR_ERRORS = metrics_registry.counter(
+    'fan_control_sensor_errors', 'Acquisition sources that raised an error', ['source'])
+METRIC_IPMI_COMMANDS = metrics_registry.counter(
+    'fan_control_ipmi_commands', 'IPMI commands by transport and outcome', ['transport', 'result'])
+METRIC_IPMI_RETRIES = metrics_registry.counter(
+    'fan_control_ipmi_retries', 'IPMI attempts repeated after a failure or timeout', ['transport'])
+METRIC_IPMI_TIMEOUTS = metrics_registry.counter(
+    'fan_control_ipmi_timeouts', 'IPMI attempts that timed out', ['transport'])
+METRIC_IPMI_DURATION = metrics_registry.histogram(
+    'fan_control_ipmi_command_duration_seconds', 'IPMI call latency including retries (a whole batch on the shell transport)',
+    ['transport'])
+METRIC_IPMI_WRITES = metrics_registry.counter(
+    'fan_control_ipmi_writes', 'Fan mode/speed writes sent or skipped by the actuator cache', ['result'])
 
-def run_ipmi_command(cmd_args, retries=None, timeout=None):
+
+class CycleTrace:
     """
-    Execute an IPMI command with retry logic and increased timeout.
-    ipmitool can be slow, especially over network, so we use longer timeout and retries.
+    Timing spans of one control cycle: the acquisition backends, every IPMI attempt,
+    the decision, the writes and the logging, plus which backend answered for each
+    source. Spans can finish in sensor worker threads; spans and answers that arrive
+    after the cycle (from a read that missed its deadline) are dropped.
+    """
+    
+    def __init__(self):
+        self.start = time.monotonic()
+        self.time = time.time()
+        self.duration = None
+        self.spans = []  # (name, start offset, duration, attributes)
+        self.backends = {}  # source -> backend that returned its readings
+        self.lock = threading.Lock()
+    
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """Time the with-block; the yielded dict takes attributes to record with it."""
+        start = time.monotonic()
+        try:
+            yield attrs
+        finally:
+            self.add(name, start, time.monotonic(), attrs)
+    
+    def add(self, name, start, end, attrs):
+        with self.lock:
+            if self.duration is None:
+                self.spans.append((name, start - self.start, end - start, attrs))
+    
+    def answered(self, source, backend):
+        with self.lock:
+            if self.duration is None:
+                self.backends.setdefault(source, backend)  # The innermost reader notes it first
+    
+    def finish(self):
+        with self.lock:
+            self.duration = time.monotonic() - self.start
+    
+    def as_dict(self):
+        return {
+            'time': round(self.time, 3),
+            'duration_ms': round((self.duration or 0) * 1000, 3),
+            'backends': self.backends,
+            'spans': [dict(name=name, start_ms=round(offset * 1000, 3), ms=round(duration * 1000, 3), **attrs)
+                      for name, offset, duration, attrs in self.spans],
+        }
+
+
+# CycleTrace of the cycle the code runs for (see run_monitored_cycle). A context variable,
+# copied into each sensor worker, so a read left running by an earlier cycle keeps
+# reporting to that cycle's trace rather than to the current one.
+_cycle_trace = contextvars.ContextVar('cycle_trace', default=None)
+last_cycle_trace = None
+
+
+@contextlib.contextmanager
+def trace_span(name, **attrs):
+    """A span in the running cycle's trace; outside a cycle (e.g. --temps) only the dict is yielded."""
+    trace = _cycle_trace.get()
+    if trace is None:
+        yield attrs
+        return
+    with trace.span(name, **attrs) as record:
+        yield record
+
+
+def record_span(name, start, **attrs):
+    """Add a span from start (time.monotonic()) until now to the running cycle's trace."""
+    trace = _cycle_trace.get()
+    if trace is not None:
+        trace.add(name, start, time.monotonic(), attrs)
+
+
+def read_backend(source, backend, reader):
+    """Call one acquisition backend inside a span, noting it as the answer for source if it returned readings."""
+    with trace_span(f'{source}.{backend}') as span:
+        values = reader()
+        span['readings'] = len(values)
+    if values:
+        note_backend(source, backend)
+    return values
+
+
+def note_backend(source, backend):
+    """Record which backend answered for source in the running cycle's trace."""
+    trace = _cycle_trace.get()
+    if trace is not None:
+        trace.answered(source, backend)
+
+
+class BackendProbes:
+    """
+    Which acquisition backends work on this host, per source ('gpu', 'system', 'fans'),
+    persisted in BACKEND_PROBE_FILE so a cron run starts from the last run's findings.
+    The backend that last returned readings is tried first, backends whose tool is not
+    installed are skipped and backends that returned nothing go after the untested ones.
+    A source is probed again in the default order every BACKEND_PROBE_INTERVAL seconds,
+    after its known-good backend stops answering, and when the hardware or tool set
+    (current_signature) changes.
+    """
+    
+    # Executables behind the process-based backends
+    TOOLS = {'nvidia': 'nvidia-smi', 'rocm-smi': 'rocm-smi', 'intel_gpu_top': 'intel_gpu_top',
+             'sensors': 'sensors', 'ipmi': 'ipmitool'}
+    
+    def __init__(self, probe_file=None, interval=None):
+        self.probe_file = BACKEND_PROBE_FILE if probe_file is None else probe_file
+        self.interval = BACKEND_PROBE_INTERVAL if interval is None else interval
+        self.signature = None
+        self.checked = False  # signature checked since invalidate()
+        self.sources = {}  # source -> {'good', 'missing', 'empty', 'probed_at'}
+        self.lock = threading.Lock()
+    
+    def invalidate(self):
+        """Start a new cycle: the next read checks the hardware and tool set again."""
+        self.checked = False
+    
+    @staticmethod
+    def path_signature():
+        """Modification times of the PATH directories: installing or removing a tool changes them."""
+        signature = []
+        for directory in os.environ.get('PATH', os.defpath).split(os.pathsep):
+            try:
+                signature.append([directory, os.stat(directory).st_mtime_ns])
+            except OSError:
+                continue
+        return signature
+    
+    def current_signature(self):
+        """Identify the hardware and tool set: hwmon and DRM devices, PATH and the IPMI target."""
+        signature = {'path': self.path_signature(), 'ipmi': [IPMI_TRANSPORT, IDRAC_IP]}
+        for name, index in (('hwmon', get_hwmon_index()), ('drm', get_drm_gpu_index())):
+            try:
+                signature[name] = index.current_signature()
+            except OSError:
+                signature[name] = []
+        return signature
+    
+    def missing(self, backend):
+        """True if the tool a backend runs is not installed (its reads fail with FileNotFoundError)."""
+        if backend == 'ipmi' and IPMI_TRANSPORT == 'native':
+            return False
+        if backend == 'nvidia' and get_nvml_reader() is not None:
+            return False
+        tool = self.TOOLS.get(backend)
+        return tool is not None and shutil.which(tool) is None
+    
+    def load(self):
+        if not self.probe_file:
+            return
+        try:
+            with open(self.probe_file, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cached.get('signature') != self.signature:
+            return
+        keys = {'good', 'missing', 'empty', 'probed_at'}
+        self.sources = {source: state for source, state in (cached.get('sources') or {}).items()
+                        if isinstance(state, dict) and keys <= state.keys()}
+    
+    def save(self):
+        if not self.probe_file:
+            return
+        try:
+            tmp_file = self.probe_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump({'signature': self.signature, 'sources': self.sources}, f)
+            os.replace(tmp_file, self.probe_file)
+        except OSError as e:
+            logger.debug(f"Failed to write backend probe file: {e}")
+    
+    def refresh(self):
+        """Load the probe file on first use; forget everything if the hardware or tool set changed."""
+        if self.checked:
+            return
+        self.checked = True
+        signature = self.current_signature()
+        if signature == self.signature:
+            return
+        if self.signature is not None:
+            logger.info("Hardware or installed tools changed, probing all acquisition backends again")
+        first_use = self.signature is None
+        self.signature = signature
+        self.sources = {}
+        if first_use:
+            self.load()
+    
+    def order(self, source, backends):
+        """Return backends [(name, ...)] in the order to try them for source."""
+        if self.interval <= 0:
+            return backends
+        with self.lock:
+            self.refresh()
+            state = self.sources.get(source)
+            if state is None or not 0 <= time.time() - state['probed_at'] < self.interval:
+                self.sources[source] = {'good': None, 'missing': [], 'empty': [], 'probed_at': time.time()}
+                return backends
+            good = [b for b in backends if b[0] == state['good']]
+            untested = [b for b in backends if b[0] != state['good']
+                        and b[0] not in state['missing'] and b[0] not in state['empty']]
+            empty = [b for b in backends if b[0] != state['good'] and b[0] in state['empty']]
+            return good + untested + empty
+    
+    def record(self, source, backend, found):
+        """Note whether backend returned readings for source."""
+        if self.interval <= 0:
+            return
+        outcome = 'good' if found else 'missing' if self.missing(backend) else 'empty'
+        with self.lock:
+            state = self.sources.get(source)
+            if state is None:
+                return
+            before = (state['good'], list(state['missing']), list(state['empty']), state['probed_at'])
+            for key in ('missing', 'empty'):
+                if backend in state[key]:
+                    state[key].remove(backend)
+            if outcome == 'good':
+                state['good'] = backend
+            else:
+                if state['good'] == backend:
+                    # It worked before: something changed, probe everything on the next read
+                    logger.debug(f"Backend '{backend}' stopped answering for {source}, re-probing next time")
+                    state['good'] = None
+                    state['probed_at'] = 0
+                state[outcome].append(backend)
+            if (state['good'], state['missing'], state['empty'], state['probed_at']) != before:
+                self.save()
+
+
+backend_probes = BackendProbes()
+
+
+# What each source reads, for log messages
+SOURCE_DESCRIPTIONS = {'gpu': 'GPU temperatures', 'system': 'System temperatures', 'fans': 'Fan speeds'}
+
+
+def read_preferred_backend(source, backends):
+    """
+    Return the readings of the first backend in backends [(name, reader, description)],
+    listed in default order, that has any, trying them in the order backend_probes
+    prefers; [] if none has.
+    """
+    for name, reader, description in backend_probes.order(source, backends):
+        values = read_backend(source, name, reader)
+        backend_probes.record(source, name, bool(values))
+        if values:
+            logger.debug(f"{SOURCE_DESCRIPTIONS[source]} obtained via {description}")
+            return values
+    return []
+
+
+def ipmitool_base_command():
+    """Base ipmitool argv for the configured iDRAC (lanplus), using the local SDR cache if present."""
+    command = ['ipmitool', '-I', 'lanplus', '-H', IDRAC_IP, '-U', IDRAC_USER, '-P', IDRAC_PASS]
+    if IPMI_SDR_CACHE_FILE and os.path.exists(IPMI_SDR_CACHE_FILE):
+        command += ['-S', IPMI_SDR_CACHE_FILE]
+    return command
+
+
+class IpmiShellSession:
+    """
+    A persistent "ipmitool shell" process.
+    The lanplus session is opened once and reused for every command, instead of
+    paying the RMCP+ open/auth/close handshake per ipmitool invocation.
+    Each command is followed by an "echo <marker>" so its output can be framed.
+    """
+    
+    # ipmitool prints these on failure (the shell has no per-command exit status)
+    ERROR_PATTERN = re.compile(r'^(Unable to|Error|Invalid|Close Session command failed|Set Session)', re.IGNORECASE)
+    PROMPT = 'ipmitool> '
+    
+    def __init__(self, base_command=None):
+        self.base_command = base_command
+        self.process = None
+        self.lines = None
+        self.marker_seq = 0
+        self.lock = threading.Lock()
+        self.aborted = False
+    
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+    
+    def start(self):
+        """Start (or restart) the ipmitool shell process."""
+        self.close()
+        self.process = subprocess.Popen(
+            (self.base_command or ipmitool_base_command()) + ['shell'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        self.lines = queue.Queue()
+        reader = threading.Thread(target=self._read_output, args=(self.process, self.lines), daemon=True)
+        reader.start()
+        logger.debug("Started persistent ipmitool shell session")
+    
+    @staticmethod
+    def _read_output(process, lines):
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)  # EOF
+    
+    def close(self, graceful=True):
+        """Stop the shell: 'quit' (waiting up to 2s) if graceful, otherwise kill it."""
+        if self.process is None:
+            return
+        try:
+            if not graceful:
+                self.process.kill()
+            elif self.process.poll() is None:
+                self.process.stdin.write('quit\n')
+                self.process.stdin.flush()
+                self.process.wait(timeout=2)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            self.process.kill()
+        finally:
+            self.process = None
+    
+    def abort(self):
+        """
+        Kill the shell if a batch is in progress (from another thread); that batch
+        raises InterruptedError and the next one reconnects. Returns True if it did.
+        """
+        process = self.process
+        if not self.lock.locked() or process is None:
+            return False
+        self.aborted = True
+        process.kill()
+        return True
+    
+    def run_batch(self, commands, timeout):
+        """
+        Send several commands in one write and collect their outputs.
+        Returns a list of (success, output) tuples, one per command.
+        Raises TimeoutError if the deadline passes, InterruptedError if abort() was
+        called and OSError if the shell died; the session is closed in each case so
+        the next call reconnects.
+        """
+        with self.lock:
+            self.aborted = False
+            if not self.is_alive():
+                self.start()
+            
+            markers = []
+            script = ''
+            for cmd_args in commands:
+                self.marker_seq += 1
+                marker = f'__FAN_CONTROL_END_{self.marker_seq}__'
+                markers.append(marker)
+                # The shell splits on whitespace, so quote sensor names like "Inlet Temp"
+                line = ' '.join(f'"{arg}"' if ' ' in arg else arg for arg in cmd_args)
+                script += line + '\n' + f'echo {marker}\n'
+            
+            try:
+                self.process.stdin.write(script)
+                self.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                self.close()
+                if self.aborted:
+                    raise InterruptedError("ipmitool shell command cancelled")
+                raise OSError(f"ipmitool shell write failed: {e}")
+            
+            results = []
+            for marker in markers:
+                # Each command gets its own deadline
+                deadline = time.monotonic() + timeout
+                output = []
+                while True:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        line = self.lines.get(timeout=max(0, remaining))
+                    except queue.Empty:
+                        self.close(graceful=False)  # Still busy with the command: quit would wait too
+                        raise TimeoutError(f"ipmitool shell command timed out after {timeout}s")
+                    if line is None:
+                        self.close()
+                        if self.aborted:
+                            raise InterruptedError("ipmitool shell command cancelled")
+                        raise OSError("ipmitool shell exited unexpectedly")
+                    line = line.replace(self.PROMPT, '').rstrip('\n')
+                    if line.strip() == marker:
+                        break
+                    output.append(line)
+                failed = any(self.ERROR_PATTERN.match(l.strip()) for l in output)
+                results.append((not failed, '\n'.join(output) + ('\n' if output else '')))
+            
+            if not any(ok for ok, _ in results):
+                # Everything failed - most likely the lanplus session itself is gone
+                self.close()
+            return results
+
+
+_ipmi_shell_session = None
+
+
+def get_ipmi_shell_session():
+    """Return the process-wide ipmitool shell session (created on first use)."""
+    global _ipmi_shell_session
+    if _ipmi_shell_session is None:
+        _ipmi_shell_session = IpmiShellSession()
+        atexit.register(_ipmi_shell_session.close)
+    return _ipmi_shell_session
+
+
+_native_ipmi_client = None
+
+
+def get_native_ipmi_client():
+    """Return the process-wide RMCP+ client (created on first use)."""
+    global _native_ipmi_client
+    if _native_ipmi_client is None:
+        import ipmi_lanplus
+        _native_ipmi_client = ipmi_lanplus.LanplusClient(
+            IDRAC_IP, IDRAC_USER, IDRAC_PASS,
+            port=IPMI_PORT,
+            cipher_suite=IPMI_CIPHER_SUITE,
+            # Per-datagram timeout; lost packets are retransmitted rather than waited out
+            timeout=min(IPMI_TIMEOUT, 2),
+            retries=IPMI_RETRIES
+        )
+        atexit.register(_native_ipmi_client.close)
+    return _native_ipmi_client
+
+
+def ipmi_command_name(cmd_args):
+    """Short name of an IPMI command for traces: "raw 0x30 0x30", "sdr list", ..."""
+    return ' '.join(cmd_args[:3] if cmd_args[:1] == ['raw'] else cmd_args[:2])
+
+
+def record_ipmi_call(transport, start, **results):
+    """Count an IPMI call's commands by outcome (ok/error/timeout/cancelled=count) and observe its latency."""
+    for result, count in results.items():
+        if count:
+            METRIC_IPMI_COMMANDS.inc(count, transport=transport, result=result)
+    METRIC_IPMI_DURATION.observe(time.monotonic() - start, transport=transport)
+
+
+def run_native_command(client, cmd_args):
+    """
+    Execute an ipmitool-style command on an RMCP+ client, returning (success, stdout, stderr).
+    Supports "raw <netfn> <cmd> [data...]", "sdr list" and "sensor reading <id>...";
+    output is formatted like ipmitool's so callers parse it the same way.
+    Raises ValueError for malformed arguments and IpmiError/OSError if the BMC fails.
+    """
+    import ipmi_lanplus
+    if cmd_args[:1] == ['raw'] and len(cmd_args) >= 3:
+        values = [int(arg, 16) for arg in cmd_args[1:]]
+        response = client.raw(values[0], values[1], bytes(values[2:]))
+        return True, (' ' + ' '.join(f'{b:02x}' for b in response) + '\n') if response else '', ''
+    if cmd_args[:2] == ['sdr', 'list']:
+        return True, ipmi_lanplus.format_sdr_list(client.read_sensors()), ''
+    if cmd_args[:2] == ['sensor', 'reading'] and len(cmd_args) > 2:
+        return True, ipmi_lanplus.format_sensor_reading(client.read_sensors(names=cmd_args[2:])), ''
+    return False, '', f"Command not supported by native IPMI transport: {' '.join(cmd_args)}"
+
+
+def run_ipmi_native(cmd_args, deadline=None):
+    """
+    Execute an ipmitool-style command over the process-wide RMCP+ client (see run_native_command).
+    Once deadline (seconds) has passed, an SDR or sensor scan stops before its next request.
+    """
+    import ipmi_lanplus
+    start = time.monotonic()
+    client = None
+    timer = None
+    expired = threading.Event()
+    outcome = 'error'
+    try:
+        client = get_native_ipmi_client()
+        # The client serializes requests anyway; holding its lock keeps the retransmit count ours
+        with client.lock, trace_span('ipmi', transport='native', command=ipmi_command_name(cmd_args)) as span:
+            retransmits = client.retransmits
+            if deadline is not None:
+                def expire():
+                    expired.set()
+                    client.abort()
+                timer = threading.Timer(max(0, start + deadline - time.monotonic()), expire)
+                timer.daemon = True
+                timer.start()
+            try:
+                success, stdout, stderr = run_native_command(client, cmd_args)
+                if success:
+                    outcome = 'ok'
+                return success, stdout, stderr
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                retried = client.retransmits - retransmits
+                span.update(result=outcome, retransmits=retried)
+                if retried:
+                    METRIC_IPMI_RETRIES.inc(retried, transport='native')
+                    METRIC_IPMI_TIMEOUTS.inc(retried, transport='native')
+    except ValueError as e:
+        return False, '', f"Invalid IPMI command {cmd_args}: {e}"
+    except (ipmi_lanplus.IpmiError, OSError) as e:
+        message = f'Command deadline ({deadline:g}s) reached' if expired.is_set() else str(e)
+        if message.startswith(('No response', 'Command deadline')):
+            outcome = 'timeout'
+            METRIC_IPMI_TIMEOUTS.inc(transport='native')
+            if client is not None:
+                span['result'] = outcome
+        logger.warning(f"Native IPMI command failed: {message}")
+        return False, '', message
+    finally:
+        record_ipmi_call('native', start, **{outcome: 1})
+
+
+# stderr of a command abandoned by cancel_ipmi_commands()
+IPMI_CANCELLED = 'Cancelled'
+
+
+def run_ipmi_batch(commands, retries=None, timeout=None, deadline=None):
+    """
+    Execute several IPMI commands, returning a list of (success, stdout, stderr).
+    With IPMI_TRANSPORT=shell they are pipelined over the persistent session in
+    one round trip; otherwise each command runs through run_ipmi_command().
+    deadline (seconds) bounds the whole batch, retries and backoff included.
     """
-    # Use configured values or defaults
     if retries is None:
         retries = IPMI_RETRIES
     if timeout is None:
         timeout = IPMI_TIMEOUT
+    start = time.monotonic()
+    end = start + deadline if deadline is not None else math.inf
+    
+    if IPMI_TRANSPORT != 'shell':
+        # One process (or RMCP+ exchange) per command; stop at the first failure (e.g. manual mode
+        # not enabled) instead of waiting out the remaining timeouts
+        results = []
+        for cmd_args in commands:
+            if results and not results[-1][0]:
+                results.append((False, '', 'Skipped: earlier command in batch failed'))
+            else:
+                results.append(run_ipmi_command(cmd_args, retries, timeout,
+                                                None if deadline is None else max(0, end - time.monotonic())))
+        return results
     
+    session = get_ipmi_shell_session()
+    last_error = 'Command failed after all retries'
+    timed_out = False
     for attempt in range(retries + 1):
+        if attempt:
+            METRIC_IPMI_RETRIES.inc(transport='shell')
+        attempt_timeout = min(timeout, end - time.monotonic())
+        if attempt_timeout <= 0:
+            last_error, timed_out = f'Command deadline ({deadline:g}s) reached', True
+            break
         try:
-            result = subprocess.run(
-                ['ipmitool', '-I', 'lanplus', '-H', IDRAC_IP, '-U', IDRAC_USER, '-P', IDRAC_PASS] + cmd_args,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            if result.returncode == 0:
-                return True, result.stdout, result.stderr
-            elif attempt < retries:
-                logger.debug(f"IPMI command failed (attempt {attempt + 1}/{retries + 1}), retrying...")
-                time.sleep(1)  # Brief delay before retry
-        except subprocess.TimeoutExpired:
+            with trace_span('ipmi', transport='shell', command=', '.join(map(ipmi_command_name, commands)),
+                            attempt=attempt + 1, result='error') as span:
+                results = session.run_batch(commands, attempt_timeout)
+                span['result'] = 'ok' if all(ok for ok, _ in results) else 'error'
+            succeeded = sum(1 for ok, _ in results if ok)
+            record_ipmi_call('shell', start, ok=succeeded, error=len(results) - succeeded)
+            return [(ok, output, '' if ok else output.strip()) for ok, output in results]
+        except InterruptedError:
+            # cancel_ipmi_commands(): give up now rather than retrying
+            span['result'] = 'cancelled'
+            record_ipmi_call('shell', start, cancelled=len(commands))
+            return [(False, '', IPMI_CANCELLED) for _ in commands]
+        except (TimeoutError, OSError) as e:
+            # Session is closed on failure; next attempt reconnects
+            last_error = str(e)
+            timed_out = isinstance(e, TimeoutError)
+            if timed_out:
+                span['result'] = 'timeout'
+                METRIC_IPMI_TIMEOUTS.inc(transport='shell')
             if attempt < retries:
-                logger.debug(f"IPMI command timed out (attempt {attempt + 1}/{retries + 1}), retrying...")
-                time.sleep(1)
+                delay = min(ipmi_backoff(attempt), max(0, end - time.monotonic()))
+                logger.debug(f"IPMI shell session error (attempt {attempt + 1}/{retries + 1}): {e}, "
+                             f"reconnecting in {delay:.2f}s...")
+                time.sleep(delay)
             else:
-                logger.warning(f"IPMI command timed out after {retries + 1} attempts")
-                return False, '', 'Command timed out after retries'
-        except Exception as e:
+                logger.warning(f"IPMI shell session failed after {retries + 1} attempts: {e}")
+    record_ipmi_call('shell', start, **{'timeout' if timed_out else 'error': len(commands)})
+    return [(False, '', last_error) for _ in commands]
+
+
+def ipmi_backoff(attempt):
+    """Seconds to wait before retrying after failed attempt n (0-based): exponential with full jitter."""
+    return random.uniform(0, min(IPMI_BACKOFF_MAX, IPMI_BACKOFF_BASE * 2 ** attempt))
+
+
+async def run_process_async(argv, timeout):
+    """
+    Run a command as an asyncio subprocess, returning (returncode, stdout, stderr) as text;
+    returncode is None if it timed out. The process is killed on timeout and when the
+    calling task is cancelled. Raises OSError if the command cannot be started.
+    """
+    import asyncio
+    process = await asyncio.create_subprocess_exec(
+        *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        return None, '', ''
+    return process.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+
+
+async def run_ipmi_command_async(cmd_args, retries=None, timeout=None, deadline=None):
+    """
+    Execute an ipmitool command without blocking the event loop, returning (success, stdout, stderr).
+    Failed attempts are retried up to retries times after ipmi_backoff(); deadline (seconds)
+    bounds the whole command, retries and backoff included. Cancelling the task kills ipmitool.
+    """
+    import asyncio
+    if retries is None:
+        retries = IPMI_RETRIES
+    if timeout is None:
+        timeout = IPMI_TIMEOUT
+    
+    start = time.monotonic()
+    end = start + deadline if deadline is not None else math.inf
+    outcome = 'error'
+    error = 'Command failed after all retries'
+    try:
+        for attempt in range(retries + 1):
+            if attempt:
+                METRIC_IPMI_RETRIES.inc(transport='subprocess')
+            attempt_timeout = min(timeout, end - time.monotonic())
+            if attempt_timeout <= 0:
+                outcome = 'timeout'
+                error = f'Command deadline ({deadline:g}s) reached'
+                break
+            with trace_span('ipmi', transport='subprocess', command=ipmi_command_name(cmd_args),
+                            attempt=attempt + 1, result='error') as span:
+                try:
+                    returncode, stdout, stderr = await run_process_async(
+                        ipmitool_base_command() + cmd_args, attempt_timeout)
+                except asyncio.CancelledError:
+                    span['result'] = outcome = 'cancelled'
+                    raise
+                except FileNotFoundError as e:
+                    # No point retrying a missing ipmitool
+                    logger.warning(f"IPMI command error: {e}")
+                    return False, '', str(e)
+                except OSError as e:
+                    returncode, stderr = -1, str(e)
+                if returncode == 0:
+                    span['result'] = outcome = 'ok'
+                    return True, stdout, stderr
+                if returncode is None:
+                    span['result'] = outcome = 'timeout'
+                    METRIC_IPMI_TIMEOUTS.inc(transport='subprocess')
+                    error = 'Command timed out after retries'
+                else:
+                    outcome = 'error'
+                    error = stderr.strip() or 'Command failed after all retries'
             if attempt < retries:
-                logger.debug(f"IPMI command error (attempt {attempt + 1}/{retries + 1}): {e}, retrying...")
-                time.sleep(1)
-            else:
-                return False, '', str(e)
+                delay = min(ipmi_backoff(attempt), max(0, end - time.monotonic()))
+                logger.debug(f"IPMI command {'timed out' if outcome == 'timeout' else 'failed'} "
+                             f"(attempt {attempt + 1}/{retries + 1}), retrying in {delay:.2f}s...")
+                await asyncio.sleep(delay)
+        if outcome == 'timeout':
+            logger.warning(f"IPMI command timed out after {attempt + 1} attempts")
+        return False, '', error
+    finally:
+        record_ipmi_call('subprocess', start, **{outcome: 1})
+
+
+# Subprocess-transport commands in flight: task -> its event loop (for cancel_ipmi_commands)
+_ipmi_tasks = {}
+_ipmi_tasks_lock = threading.Lock()
+
+
+def run_ipmi_sync(coro):
+    """
+    Run an IPMI coroutine to completion from synchronous code, on an event loop private
+    to this call. cancel_ipmi_commands() can abandon it from any thread, in which case
+    (False, '', IPMI_CANCELLED) is returned.
+    """
+    import asyncio  # Imported lazily: it costs a one-shot run more than the rest of startup
+    async def tracked():
+        task = asyncio.current_task()
+        with _ipmi_tasks_lock:
+            _ipmi_tasks[task] = asyncio.get_running_loop()
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            return False, '', IPMI_CANCELLED
+        finally:
+            with _ipmi_tasks_lock:
+                _ipmi_tasks.pop(task, None)
+    
+    return asyncio.run(tracked())
+
+
+def cancel_ipmi_commands():
+    """
+    Abandon every IPMI command in flight in other threads, on any transport: subprocesses
+    are killed, the ipmitool shell is restarted and a native SDR/sensor scan stops before its
+    next request. The interrupted callers see a failure. Returns the number cancelled.
+    """
+    with _ipmi_tasks_lock:
+        tasks = list(_ipmi_tasks.items())
+    cancelled = 0
+    for task, loop in tasks:
+        try:
+            loop.call_soon_threadsafe(task.cancel)
+            cancelled += 1
+        except RuntimeError:
+            pass  # Finished and its loop closed in the meantime
+    if _ipmi_shell_session is not None and _ipmi_shell_session.abort():
+        cancelled += 1
+    client = _native_ipmi_client
+    if client is not None:
+        if client.lock.acquire(blocking=False):
+            client.lock.release()  # Idle
+        else:
+            client.abort()
+            cancelled += 1
+    return cancelled
+
+
+def run_ipmi_command(cmd_args, retries=None, timeout=None, deadline=None):
+    """
+    Execute an IPMI command with retry logic and increased timeout.
+    ipmitool can be slow, especially over network, so we use longer timeout and retries.
+    deadline (seconds) bounds the whole command, retries included, on every transport.
+    The subprocess transport runs run_ipmi_command_async() to completion (see run_ipmi_sync).
+    """
+    # Use configured values or defaults
+    if retries is None:
+        retries = IPMI_RETRIES
+    if timeout is None:
+        timeout = IPMI_TIMEOUT
+    
+    if IPMI_TRANSPORT == 'shell':
+        return run_ipmi_batch([cmd_args], retries, timeout, deadline)[0]
+    if IPMI_TRANSPORT == 'native':
+        # Retransmits and session re-establishment are handled by the client
+        return run_ipmi_native(cmd_args, deadline)
     
-    return False, '', 'Command failed after all retries'
+    return run_ipmi_sync(run_ipmi_command_async(cmd_args, retries, timeout, deadline))
 
 
 def enable_manual_fan_mode():
@@ -166,7 +1076,13 @@ def enable_manual_fan_mode():
 
 
 def enable_automatic_fan_mode():
-    """Put iDRAC fans into automatic mode (let iDRAC control)."""
+    """
+    Put iDRAC fans into automatic mode (let iDRAC control).
+    This is the safety path, so IPMI commands still in flight (a slow sensor read
+    left behind by the cycle) are cancelled first instead of queueing in front of it.
+    """
+    if cancel_ipmi_commands():
+        logger.debug("Cancelled in-flight IPMI commands before switching to automatic mode")
     success, stdout, stderr = run_ipmi_command(['raw', '0x30', '0x30', '0x01', '0x01'])
     if success:
         logger.info("Automatic fan mode enabled (iDRAC control)")
@@ -191,23 +1107,253 @@ def set_fan_speed(percentage):
         return False
 
 
+def set_manual_fan_speed(percentage):
+    """
+    Enable manual fan mode and set the fan speed in a single batch.
+    Returns (manual_mode_ok, fan_speed_ok).
+    """
+    percentage = max(0, min(100, percentage))
+    hex_value = f'0x{percentage:02x}'
+    
+    (mode_ok, _, mode_err), (speed_ok, _, speed_err) = run_ipmi_batch([
+        ['raw', '0x30', '0x30', '0x01', '0x00'],
+        ['raw', '0x30', '0x30', '0x02', '0xff', hex_value],
+    ])
+    if mode_ok:
+        logger.info("Manual fan mode enabled")
+    else:
+        logger.error(f"Failed to enable manual fan mode: {mode_err}")
+        return False, False
+    if speed_ok:
+        logger.debug(f"IPMI command successful: Fan speed set to {percentage}%")
+    else:
+        logger.error(f"Failed to set fan speed: {speed_err}")
+    return True, speed_ok
+
+
+# Cumulative IPMI write counters (per process; see run_control_cycle)
+actuator_stats = {'writes_sent': 0, 'writes_skipped': 0}
+
+_actuator_state = None
+
+
+def load_actuator_state():
+    """Return the last applied actuator state {'mode', 'speed', 'applied_at', 'mode_applied_at'} or {}."""
+    global _actuator_state
+    if _actuator_state is None:
+        try:
+            with open(ACTUATOR_STATE_FILE, 'r') as f:
+                _actuator_state = json.load(f)
+        except (OSError, ValueError):
+            _actuator_state = {}
+    return _actuator_state
+
+
+def save_actuator_state(mode, speed, mode_written=True):
+    """Record (and persist) the mode/speed that was just written to iDRAC.
+    mode_written=False for a speed-only write: the mode keeps its previous write time."""
+    global _actuator_state
+    now = time.time()
+    mode_applied_at = now
+    if not mode_written:
+        previous = load_actuator_state()
+        mode_applied_at = previous.get('mode_applied_at', previous.get('applied_at', now))
+    _actuator_state = {'mode': mode, 'speed': speed, 'applied_at': now, 'mode_applied_at': mode_applied_at}
+    try:
+        tmp_file = ACTUATOR_STATE_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(_actuator_state, f)
+        os.replace(tmp_file, ACTUATOR_STATE_FILE)
+    except OSError as e:
+        logger.debug(f"Failed to write actuator state file: {e}")
+
+
+def clear_actuator_state():
+    """Forget the cached state after a failed write, so the next cycle re-sends everything."""
+    global _actuator_state
+    _actuator_state = {}
+    try:
+        os.remove(ACTUATOR_STATE_FILE)
+    except OSError:
+        pass
+
+
+def cached_actuator_state():
+    """Return the cached state if the mode was written recently enough to trust it, otherwise {}."""
+    state = load_actuator_state()
+    if ACTUATOR_REASSERT_INTERVAL <= 0 or not state:
+        return {}
+    age = time.time() - state.get('mode_applied_at', state.get('applied_at', 0))
+    if age < 0 or age >= ACTUATOR_REASSERT_INTERVAL:
+        return {}
+    return state
+
+
+def log_actuator_stats(writes_sent, writes_skipped):
+    """Add this cycle's IPMI write counts to the totals and log both."""
+    actuator_stats['writes_sent'] += writes_sent
+    actuator_stats['writes_skipped'] += writes_skipped
+    METRIC_IPMI_WRITES.inc(writes_sent, result='sent')
+    METRIC_IPMI_WRITES.inc(writes_skipped, result='skipped')
+    logger.info(f"IPMI writes: {writes_sent} sent, {writes_skipped} skipped "
+                f"(total: {actuator_stats['writes_sent']} sent, {actuator_stats['writes_skipped']} skipped)")
+
+
+class NvmlError(Exception):
+    """An NVML call returned something other than NVML_SUCCESS."""
+    
+    def __init__(self, function, code, message=None):
+        super().__init__(f"{function} failed: {message or f'NVML error {code}'}")
+        self.code = code
+
+
+class NvmlUtilization(ctypes.Structure):
+    _fields_ = [('gpu', ctypes.c_uint), ('memory', ctypes.c_uint)]
+
+
+class NvmlReader:
+    """
+    NVIDIA GPU readings through libnvidia-ml (the library behind nvidia-smi).
+    nvmlInit runs once and the device handles are kept, so a read is a few
+    library calls instead of a process spawn that wakes every driver context.
+    `library` may be any object exposing the NVML functions (for tests).
+    """
+    
+    SUCCESS = 0
+    ERROR_NOT_SUPPORTED = 3
+    TEMPERATURE_GPU = 0
+    
+    def __init__(self, library=None):
+        if library is None:
+            library = ctypes.CDLL(NVML_LIBRARY)
+            library.nvmlErrorString.restype = ctypes.c_char_p
+        self.library = library
+        self.call('nvmlInit_v2')
+        self.handles = []
+        count = ctypes.c_uint()
+        self.call('nvmlDeviceGetCount_v2', ctypes.byref(count))
+        for index in range(count.value):
+            handle = ctypes.c_void_p()
+            self.call('nvmlDeviceGetHandleByIndex_v2', ctypes.c_uint(index), ctypes.byref(handle))
+            self.handles.append(handle)
+        self.last_readings = []
+    
+    def call(self, function, *args):
+        code = getattr(self.library, function)(*args)
+        if code != self.SUCCESS:
+            message = self.library.nvmlErrorString(code)
+            raise NvmlError(function, code, message.decode() if isinstance(message, bytes) else message)
+    
+    def optional(self, function, *args):
+        """Like call(), but returns False when the GPU does not support the query."""
+        try:
+            self.call(function, *args)
+            return True
+        except NvmlError as e:
+            if e.code == self.ERROR_NOT_SUPPORTED:
+                return False
+            raise
+    
+    def read(self):
+        """Return [{'index', 'temperature', 'power_w', 'utilization'}] per GPU (None if unsupported)."""
+        readings = []
+        for index, handle in enumerate(self.handles):
+            temperature = ctypes.c_uint()
+            self.call('nvmlDeviceGetTemperature', handle, ctypes.c_int(self.TEMPERATURE_GPU), ctypes.byref(temperature))
+            power = ctypes.c_uint()
+            utilization = NvmlUtilization()
+            readings.append({
+                'index': index,
+                'temperature': temperature.value,
+                'power_w': power.value / 1000.0 if self.optional('nvmlDeviceGetPowerUsage', handle, ctypes.byref(power)) else None,
+                'utilization': utilization.gpu if self.optional('nvmlDeviceGetUtilizationRates', handle, ctypes.byref(utilization)) else None,
+            })
+        self.last_readings = readings
+        return readings
+    
+    def shutdown(self):
+        try:
+            self.call('nvmlShutdown')
+        except NvmlError:
+            pass
+
+
+_nvml_reader = None
+_nvml_unavailable = False
+
+
+def get_nvml_reader():
+    """Process-wide NvmlReader, or None if NVML is disabled or cannot be loaded (not retried)."""
+    global _nvml_reader, _nvml_unavailable
+    if _nvml_reader is None and not _nvml_unavailable:
+        if not NVML_LIBRARY:
+            _nvml_unavailable = True
+            return None
+        try:
+            _nvml_reader = NvmlReader()
+            atexit.register(_nvml_reader.shutdown)
+            logger.debug(f"NVML initialized with {len(_nvml_reader.handles)} GPU(s)")
+        except (OSError, AttributeError, NvmlError) as e:
+            _nvml_unavailable = True
+            logger.debug(f"NVML not available, using nvidia-smi: {e}")
+    return _nvml_reader
+
+
+# Max-temperature inputs of the latest control cycle (for the adaptive scheduler)
+last_cycle_temperatures = {}
+
+# Power draw / utilization per GPU from this cycle's NVIDIA read (for feedforward)
+gpu_load_readings = []
+
+
+def parse_nvidia_smi_number(value):
+    """nvidia-smi prints "[N/A]" / "[Not Supported]" for missing values."""
+    try:
+        return float(value.strip())
+    except ValueError:
+        return None
+
+
 def get_gpu_temperatures_nvidia():
-    """Get GPU temperatures from nvidia-smi (NVIDIA GPUs)."""
+    """Get GPU temperatures from NVML, falling back to nvidia-smi (NVIDIA GPUs)."""
+    global gpu_load_readings
+    reader = get_nvml_reader()
+    if reader is not None:
+        try:
+            with trace_span('gpu.nvidia.nvml'):
+                readings = reader.read()
+            gpu_load_readings = [{'power_w': r['power_w'], 'utilization': r['utilization']} for r in readings]
+            if readings:
+                note_backend('gpu', 'nvml')
+            return [reading['temperature'] for reading in readings]
+        except NvmlError as e:
+            logger.debug(f"NVML read failed, falling back to nvidia-smi: {e}")
+    
     try:
-        result = subprocess.run(
-            ['nvidia-smi', '--query-gpu=temperature.gpu', '--format=csv,noheader,nounits'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
+        # Power and utilization come with the same call (no extra process for feedforward)
+        with trace_span('gpu.nvidia.smi'):
+            result = subprocess.run(
+                ['nvidia-smi', '--query-gpu=temperature.gpu,power.draw,utilization.gpu', '--format=csv,noheader,nounits'],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
         if result.returncode == 0:
             temps = []
+            load = []
             for line in result.stdout.strip().split('\n'):
                 if line.strip():
+                    fields = line.split(',')
                     try:
-                        temps.append(int(line.strip()))
+                        temps.append(int(fields[0].strip()))
                     except ValueError:
-                        pass
+                        continue
+                    if len(fields) >= 3:
+                        load.append({'power_w': parse_nvidia_smi_number(fields[1]),
+                                     'utilization': parse_nvidia_smi_number(fields[2])})
+            gpu_load_readings = load
+            if temps:
+                note_backend('gpu', 'nvidia-smi')
             return temps
         return []
     except (subprocess.TimeoutExpired, FileNotFoundError):
@@ -248,35 +1394,116 @@ def get_gpu_temperatures_amd():
         return []
 
 
-def get_gpu_temperatures_sensors():
-    """Get GPU temperatures from sensors (lm-sensors) - works for AMD and some Intel GPUs."""
-    try:
-        result = subprocess.run(
-            ['sensors'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            temps = []
-            # Look for GPU temperature readings in sensors output
-            # Common patterns: "temp1:", "edge:", "junction:", "Tdie:", etc.
-            for line in result.stdout.split('\n'):
-                line_lower = line.lower()
-                # Look for GPU-related temperature sensors
-                if any(keyword in line_lower for keyword in ['gpu', 'radeon', 'amdgpu', 'intel', 'graphics']):
-                    # Extract temperature value (format: "temp1: +45.0°C" or "edge: +65.0°C")
-                    match = re.search(r'[+\-]?(\d+\.?\d*)\s*°?C', line)
-                    if match:
-                        try:
-                            temp = int(float(match.group(1)))
-                            temps.append(temp)
-                        except ValueError:
-                            pass
-            return temps
-        return []
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        return []
+# lm-sensors chip name prefixes that belong to GPUs
+GPU_SENSOR_CHIPS = ('amdgpu', 'radeon', 'nouveau', 'i915', 'xe')
+
+
+class SensorsSnapshot:
+    """
+    One lm-sensors reading per cycle, shared by the GPU, system and fan extractors.
+    Runs `sensors -j` at most once until invalidate() is called, and parses the JSON
+    into a flat table of (chip, adapter, feature, kind, value) rows. Falls back to the
+    plain-text `sensors` output for lm-sensors versions without -j.
+    """
+    
+    INPUT_PATTERN = re.compile(r'^(temp|fan|in|power|curr|energy|humidity)\d+_input$')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.invalidate()
+    
+    def invalidate(self):
+        """Forget the current reading; the next access runs sensors again."""
+        self.taken = False
+        self.rows = None   # parsed -j output
+        self.text = None   # plain-text fallback output
+    
+    def take(self):
+        with self.lock:
+            if self.taken:
+                return
+            self.taken = True
+            with trace_span('sensors.read'):
+                self.read()
+    
+    def read(self):
+        try:
+            result = subprocess.run(['sensors', '-j'], capture_output=True, text=True, timeout=5)
+            if result.returncode == 0:
+                self.rows = self.parse_json(result.stdout)
+                return
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            return
+        except (ValueError, OSError):
+            pass
+        try:
+            # Old lm-sensors without -j (or unparsable JSON)
+            result = subprocess.run(['sensors'], capture_output=True, text=True, timeout=5)
+            if result.returncode == 0:
+                self.text = result.stdout
+        except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+            pass
+    
+    @classmethod
+    def parse_json(cls, output):
+        rows = []
+        for chip, features in json.loads(output).items():
+            if not isinstance(features, dict):
+                continue
+            adapter = features.get('Adapter', '')
+            for feature, subfeatures in features.items():
+                if not isinstance(subfeatures, dict):
+                    continue
+                for subfeature, value in subfeatures.items():
+                    match = cls.INPUT_PATTERN.match(subfeature)
+                    if match and isinstance(value, (int, float)):
+                        rows.append({
+                            'chip': chip,
+                            'adapter': adapter,
+                            'feature': feature,
+                            'kind': match.group(1),
+                            'value': value,
+                        })
+        return rows
+    
+    def values(self, kind, chip_prefixes=None):
+        """Input values of one kind ('temp', 'fan', ...), optionally only from matching chips."""
+        self.take()
+        return [row['value'] for row in self.rows or []
+                if row['kind'] == kind and (chip_prefixes is None or row['chip'].startswith(chip_prefixes))]
+    
+    def output_text(self):
+        """Plain-text output; None unless `sensors -j` was unavailable and plain `sensors` worked."""
+        self.take()
+        return self.text
+
+
+sensors_snapshot = SensorsSnapshot()
+
+
+def get_gpu_temperatures_sensors():
+    """Get GPU temperatures from sensors (lm-sensors) - works for AMD and some Intel GPUs."""
+    try:
+        text = sensors_snapshot.output_text()
+        if text is None:  # JSON snapshot (or sensors not installed)
+            return [int(value) for value in sensors_snapshot.values('temp', GPU_SENSOR_CHIPS)]
+        
+        temps = []
+        # Look for GPU temperature readings in sensors output
+        # Common patterns: "temp1:", "edge:", "junction:", "Tdie:", etc.
+        for line in text.split('\n'):
+            line_lower = line.lower()
+            # Look for GPU-related temperature sensors
+            if any(keyword in line_lower for keyword in ['gpu', 'radeon', 'amdgpu', 'intel', 'graphics']):
+                # Extract temperature value (format: "temp1: +45.0°C" or "edge: +65.0°C")
+                match = re.search(r'[+\-]?(\d+\.?\d*)\s*°?C', line)
+                if match:
+                    try:
+                        temp = int(float(match.group(1)))
+                        temps.append(temp)
+                    except ValueError:
+                        pass
+        return temps
     except Exception:
         return []
 
@@ -310,66 +1537,244 @@ def get_gpu_temperatures_intel():
         return []
 
 
+def get_gpu_temperatures_drm():
+    """Get GPU temperatures from the amdgpu/i915/xe hwmon nodes under /sys/class/drm."""
+    temps = []
+    try:
+        for entry, temp_millidegrees in get_drm_gpu_index().read('temp'):
+            temp_celsius = temp_millidegrees // 1000  # Convert from millidegrees
+            if temp_celsius > -50 and temp_celsius < 200:  # Sanity check
+                temps.append(temp_celsius)
+    except (OSError, PermissionError):
+        pass
+    
+    return temps
+
+
 def get_gpu_temperatures():
     """
     Get GPU temperatures from available GPU monitoring tools.
-    Tries multiple methods to support NVIDIA, AMD, and Intel GPUs.
+    Tries multiple methods to support NVIDIA, AMD, and Intel GPUs
+    (the one that worked last time first, see BackendProbes).
     Returns list of temperatures in Celsius.
     """
-    # Try NVIDIA first (most common in servers)
-    temps = get_gpu_temperatures_nvidia()
-    if temps:
-        logger.debug("GPU temperatures obtained via nvidia-smi (NVIDIA)")
-        return temps
+    return read_preferred_backend('gpu', [
+        # NVIDIA first (most common in servers)
+        ('nvidia', get_gpu_temperatures_nvidia, 'NVML/nvidia-smi (NVIDIA)'),
+        # The AMD/Intel hwmon nodes directly (no subprocess)
+        ('drm', get_gpu_temperatures_drm, 'sysfs (/sys/class/drm)'),
+        # sensors (works for AMD and some Intel)
+        ('sensors', get_gpu_temperatures_sensors, 'sensors (lm-sensors)'),
+        # Last resort: vendor tools (slow; intel_gpu_top samples before printing)
+        ('rocm-smi', get_gpu_temperatures_amd, 'rocm-smi (AMD)'),
+        ('intel_gpu_top', get_gpu_temperatures_intel, 'intel_gpu_top (Intel)'),
+    ])
+
+
+class HwmonIndex:
+    """
+    Index of hwmon temperature and fan inputs, with their files held open.
+    Discovery (listing every hwmon device) happens once, or is loaded from
+    HWMON_INDEX_FILE; each cycle then only re-reads the open descriptors with
+    os.pread(). The index is rebuilt when the set of hwmon devices changes.
+    """
     
-    # Try AMD
-    temps = get_gpu_temperatures_amd()
-    if temps:
-        logger.debug("GPU temperatures obtained via rocm-smi (AMD)")
-        return temps
+    DEVICES = None  # hwmon "name" values to index (None = all)
+    KINDS = ('temp', 'fan')
     
-    # Try Intel
-    temps = get_gpu_temperatures_intel()
-    if temps:
-        logger.debug("GPU temperatures obtained via intel_gpu_top (Intel)")
-        return temps
+    def __init__(self, root=None, index_file=None):
+        self.root = root or HWMON_PATH
+        self.index_file = index_file if index_file is not None else HWMON_INDEX_FILE
+        self.signature = None
+        self.entries = []  # [{'kind', 'device', 'label', 'path'}]
+        self.fds = {}      # path -> file descriptor
+        self.lock = threading.Lock()
     
-    # Try sensors (works for AMD and some Intel)
-    temps = get_gpu_temperatures_sensors()
-    if temps:
-        logger.debug("GPU temperatures obtained via sensors (lm-sensors)")
-        return temps
+    def device_dirs(self):
+        """[(name, path)] of the hwmon device directories under root."""
+        return [(name, os.path.join(self.root, name)) for name in sorted(os.listdir(self.root))]
     
-    # No GPU temperatures found
-    return []
+    def current_signature(self):
+        """Identify the hwmon device set: each hwmonN and the device it points to."""
+        signature = []
+        for name, path in self.device_dirs():
+            try:
+                target = os.readlink(path)
+            except OSError:
+                target = ''
+            signature.append([name, target])
+        return signature
+    
+    def discover(self):
+        """Walk every hwmon device and collect temp*_input / fan*_input files."""
+        entries = []
+        for hwmon_dir, hwmon_full_path in self.device_dirs():
+            if not os.path.isdir(hwmon_full_path):
+                continue
+            device = read_sysfs_text(os.path.join(hwmon_full_path, 'name')) or hwmon_dir
+            if self.DEVICES is not None and device not in self.DEVICES:
+                continue
+            for file in sorted(os.listdir(hwmon_full_path)):
+                if not file.endswith('_input'):
+                    continue
+                kind = next((k for k in self.KINDS if file.startswith(k)), None)
+                if kind is None:
+                    continue
+                label_file = os.path.join(hwmon_full_path, file[:-len('_input')] + '_label')
+                entries.append({
+                    'kind': kind,
+                    'device': device,
+                    'label': read_sysfs_text(label_file) or file[:-len('_input')],
+                    'path': os.path.join(hwmon_full_path, file),
+                })
+        return entries
+    
+    def load(self, signature):
+        """Load entries from the index file if it matches the current hwmon set."""
+        if not self.index_file:
+            return None
+        try:
+            with open(self.index_file, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get('root') != self.root or cached.get('signature') != signature:
+            return None
+        return cached.get('entries')
+    
+    def save(self):
+        if not self.index_file:
+            return
+        try:
+            tmp_file = self.index_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump({'root': self.root, 'signature': self.signature, 'entries': self.entries}, f)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            logger.debug(f"Failed to write hwmon index file: {e}")
+    
+    def close(self):
+        for fd in self.fds.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.fds = {}
+    
+    def refresh(self):
+        """Rebuild the index if the hwmon device set changed (or on first use)."""
+        signature = self.current_signature()
+        if signature == self.signature:
+            return
+        self.close()
+        entries = self.load(signature)
+        if entries is None:
+            entries = self.discover()
+            self.signature = signature
+            self.entries = entries
+            self.save()
+            logger.debug(f"hwmon index rebuilt: {len(entries)} inputs")
+        else:
+            self.signature = signature
+            self.entries = entries
+            logger.debug(f"hwmon index loaded from {self.index_file}: {len(entries)} inputs")
+    
+    def read(self, kind):
+        """Return [(entry, raw_value)] for all inputs of the given kind ('temp' or 'fan')."""
+        with self.lock:
+            if not os.path.isdir(self.root):
+                return []
+            self.refresh()
+            values = []
+            stale = False
+            for entry in self.entries:
+                if entry['kind'] != kind:
+                    continue
+                path = entry['path']
+                try:
+                    fd = self.fds.get(path)
+                    if fd is None:
+                        fd = self.fds[path] = os.open(path, os.O_RDONLY)
+                    values.append((entry, int(os.pread(fd, 32, 0).strip())))
+                except FileNotFoundError:
+                    stale = True
+                except (ValueError, OSError):
+                    continue  # e.g. ENODATA for an unconnected sensor
+            if stale:
+                # A device went away without the hwmon set changing - rediscover next time
+                self.signature = None
+            return values
+
+
+_hwmon_index = None
+
+
+def get_hwmon_index():
+    """Return the process-wide hwmon index (created on first use)."""
+    global _hwmon_index
+    if _hwmon_index is None:
+        _hwmon_index = HwmonIndex()
+        atexit.register(_hwmon_index.close)
+    return _hwmon_index
+
+
+class DrmGpuIndex(HwmonIndex):
+    """
+    GPU temperature inputs (edge/junction/mem, pkg/vram, ...) from the hwmon nodes
+    of amdgpu, i915 and xe cards under /sys/class/drm/card*/device/hwmon.
+    Same held-open reads as HwmonIndex; discovery is cheap, so it is not persisted.
+    """
+    
+    DEVICES = ('amdgpu', 'i915', 'xe')
+    KINDS = ('temp',)
+    CARD_PATTERN = re.compile(r'^card\d+$')  # skips connectors such as card0-DP-1
+    
+    def __init__(self, root=None):
+        super().__init__(root or DRM_PATH, index_file='')
+    
+    def device_dirs(self):
+        dirs = []
+        for card in sorted(os.listdir(self.root)):
+            if not self.CARD_PATTERN.match(card):
+                continue
+            hwmon_root = os.path.join(self.root, card, 'device', 'hwmon')
+            try:
+                hwmon_dirs = sorted(os.listdir(hwmon_root))
+            except OSError:
+                continue  # No hwmon node (e.g. nouveau without sensors, virtual GPU)
+            dirs.extend((f'{card}/{name}', os.path.join(hwmon_root, name)) for name in hwmon_dirs)
+        return dirs
+
+
+_drm_gpu_index = None
+
+
+def get_drm_gpu_index():
+    """Return the process-wide DRM GPU hwmon index (created on first use)."""
+    global _drm_gpu_index
+    if _drm_gpu_index is None:
+        _drm_gpu_index = DrmGpuIndex()
+        atexit.register(_drm_gpu_index.close)
+    return _drm_gpu_index
+
+
+def read_sysfs_text(path):
+    """Read a small sysfs text attribute, or None."""
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
 
 
 def get_system_temperatures_sysfs():
     """Get system temperatures from /sys/class/hwmon (faster than ipmitool)."""
     temps = []
     try:
-        # Check all hwmon devices
-        hwmon_path = '/sys/class/hwmon'
-        if not os.path.exists(hwmon_path):
-            return []
-        
-        for hwmon_dir in os.listdir(hwmon_path):
-            hwmon_full_path = os.path.join(hwmon_path, hwmon_dir)
-            if not os.path.isdir(hwmon_full_path):
-                continue
-            
-            # Look for temperature files (temp*_input)
-            for file in os.listdir(hwmon_full_path):
-                if file.startswith('temp') and file.endswith('_input'):
-                    temp_file = os.path.join(hwmon_full_path, file)
-                    try:
-                        with open(temp_file, 'r') as f:
-                            temp_millidegrees = int(f.read().strip())
-                            temp_celsius = temp_millidegrees // 1000  # Convert from millidegrees
-                            if temp_celsius > -50 and temp_celsius < 200:  # Sanity check
-                                temps.append(temp_celsius)
-                    except (ValueError, IOError, OSError):
-                        continue
+        for entry, temp_millidegrees in get_hwmon_index().read('temp'):
+            temp_celsius = temp_millidegrees // 1000  # Convert from millidegrees
+            if temp_celsius > -50 and temp_celsius < 200:  # Sanity check
+                temps.append(temp_celsius)
     except (OSError, PermissionError):
         pass
     
@@ -380,100 +1785,208 @@ def get_system_temperatures_sensors():
     """Get system temperatures from sensors command (lm-sensors)."""
     temps = []
     try:
-        result = subprocess.run(
-            ['sensors'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            # Parse sensors output for temperature readings
-            for line in result.stdout.split('\n'):
-                # Look for temperature patterns: "temp1: +45.0°C" or "Core 0: +50.0°C"
-                if '°C' in line or '°F' in line:
-                    # Extract temperature value
-                    match = re.search(r'[+\-]?(\d+\.?\d*)\s*°C', line)
-                    if match:
-                        try:
-                            temp = int(float(match.group(1)))
-                            if temp > -50 and temp < 200:  # Sanity check
-                                temps.append(temp)
-                        except ValueError:
-                            pass
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        pass
+        text = sensors_snapshot.output_text()
+        if text is None:  # JSON snapshot (or sensors not installed)
+            for value in sensors_snapshot.values('temp'):
+                temp = int(value)
+                if temp > -50 and temp < 200:  # Sanity check
+                    temps.append(temp)
+            return temps
+        
+        # Parse sensors output for temperature readings
+        for line in text.split('\n'):
+            # Look for temperature patterns: "temp1: +45.0°C" or "Core 0: +50.0°C"
+            if '°C' in line or '°F' in line:
+                # Extract temperature value
+                match = re.search(r'[+\-]?(\d+\.?\d*)\s*°C', line)
+                if match:
+                    try:
+                        temp = int(float(match.group(1)))
+                        if temp > -50 and temp < 200:  # Sanity check
+                            temps.append(temp)
+                    except ValueError:
+                        pass
     except Exception:
         pass
     
     return temps
 
 
-def get_system_temperatures():
+# What ipmitool prints when the -S cache is unreadable or lacks a sensor, as opposed to a
+# timeout or an unreachable BMC (where dropping a good cache would only add another read)
+SDR_CACHE_ERROR_PATTERN = re.compile(r'\bSDR\b|Unable to open|Unable to find sensor|parse error', re.IGNORECASE)
+
+
+def sdr_cache_error(stderr):
+    """True if a failed ipmitool read blamed the SDR cache."""
+    return bool(SDR_CACHE_ERROR_PATTERN.search(stderr or ''))
+
+
+def drop_sdr_cache(cache_file):
+    try:
+        os.remove(cache_file)
+    except OSError:
+        pass  # Already gone (e.g. removed by a concurrent run)
+
+
+def sdr_cache_due(cache_file):
     """
-    Get system temperatures from multiple sources.
-    Tries faster methods first (sysfs, sensors), then falls back to ipmitool.
+    True if cache_file is missing or older than IPMI_SDR_CACHE_MAX_AGE, unless a dump
+    failed (cache_file.failed) less than IPMI_SDR_CACHE_RETRY seconds ago.
+    """
+    now = time.time()
+    try:
+        if now - os.path.getmtime(cache_file + '.failed') < IPMI_SDR_CACHE_RETRY:
+            return False
+    except OSError:
+        pass
+    try:
+        return now - os.path.getmtime(cache_file) >= IPMI_SDR_CACHE_MAX_AGE
+    except OSError:
+        return True
+
+
+def finish_sdr_dump(cache_file, success):
+    """Install a dump written to cache_file.tmp, or record that it failed (see sdr_cache_due)."""
+    try:
+        if success:
+            os.replace(cache_file + '.tmp', cache_file)
+            drop_sdr_cache(cache_file + '.failed')
+        else:
+            drop_sdr_cache(cache_file + '.tmp')
+            with open(cache_file + '.failed', 'w'):
+                pass
+    except OSError as e:
+        logger.debug(f"Failed to update SDR cache {cache_file}: {e}")
+
+
+class IpmiSdrSnapshot:
+    """
+    One IPMI sensor read per cycle, shared by the system temperature and fan readers.
+    Reads the full "sdr list" (or only IPMI_SDR_SENSORS via "sensor reading") once
+    until invalidate() is called, and parses it by column into
+    {'name', 'value', 'unit'} rows.
     """
-    # Try sysfs first (fastest, no network)
-    temps = get_system_temperatures_sysfs()
-    if temps:
-        logger.debug("System temperatures obtained via sysfs")
-        return temps
     
-    # Try sensors command (fast, local)
-    temps = get_system_temperatures_sensors()
-    if temps:
-        logger.debug("System temperatures obtained via sensors command")
-        return temps
+    VALUE_PATTERN = re.compile(r'^(-?\d+(?:\.\d+)?)\s*(.*)$')
     
-    # Fall back to ipmitool (slower, network-based)
-    logger.debug("Falling back to ipmitool for system temperatures")
-    success, stdout, stderr = run_ipmi_command(['sdr', 'list'])
-    if not success:
-        return []
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.invalidate()
     
-    temps = []
-    # Parse temperature readings from SDR output
-    for line in stdout.split('\n'):
-        if 'Temp' in line or 'temperature' in line.lower():
-            # Try to extract temperature value
-            match = re.search(r'(\d+)\s*degrees', line, re.IGNORECASE)
+    def invalidate(self):
+        self.taken = False
+        self.rows = []
+    
+    def ensure_cache(self, end=math.inf):
+        """
+        Dump the SDR repository to IPMI_SDR_CACHE_FILE if it is missing or too old (see sdr_cache_due),
+        giving up at time.monotonic() end.
+        """
+        if not IPMI_SDR_CACHE_FILE or IPMI_TRANSPORT == 'native':
+            return  # The native client caches the SDR repository itself
+        if not sdr_cache_due(IPMI_SDR_CACHE_FILE):
+            return
+        drop_sdr_cache(IPMI_SDR_CACHE_FILE)  # Otherwise ipmitool -S would dump the old cache
+        cache_dir = os.path.dirname(IPMI_SDR_CACHE_FILE)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+        # One attempt: the cache is an optimization, and a failed dump is only retried after IPMI_SDR_CACHE_RETRY
+        success, _, stderr = run_ipmi_command(['sdr', 'dump', IPMI_SDR_CACHE_FILE + '.tmp'], retries=0,
+                                              deadline=None if end == math.inf else max(0, end - time.monotonic()))
+        finish_sdr_dump(IPMI_SDR_CACHE_FILE, success)
+        if success:
+            logger.debug(f"SDR repository cached to {IPMI_SDR_CACHE_FILE}")
+            if IPMI_TRANSPORT == 'shell':
+                get_ipmi_shell_session().close()  # Reopen with -S on the next command
+        else:
+            logger.debug(f"Failed to cache SDR repository (retrying in {IPMI_SDR_CACHE_RETRY}s): {stderr}")
+    
+    def take(self):
+        with self.lock:
+            if self.taken:
+                return
+            self.taken = True
+            # Serves both the system and the fans source: done within the shorter of their deadlines
+            end = time.monotonic() + min(SENSOR_SOURCE_DEADLINES['system'], SENSOR_SOURCE_DEADLINES['fans'])
+            with trace_span('ipmi.sensors'):
+                self.ensure_cache(end)
+                command = ['sensor', 'reading'] + IPMI_SDR_SENSORS if IPMI_SDR_SENSORS else ['sdr', 'list']
+                success, stdout, stderr = run_ipmi_command(command, deadline=max(0, end - time.monotonic()))
+                if (not success and IPMI_SDR_CACHE_FILE and sdr_cache_error(stderr)
+                        and os.path.exists(IPMI_SDR_CACHE_FILE)):
+                    # A stale or corrupt cache makes ipmitool fail - drop it and read from the BMC
+                    logger.debug("IPMI sensor read with SDR cache failed, retrying without cache")
+                    drop_sdr_cache(IPMI_SDR_CACHE_FILE)
+                    success, stdout, stderr = run_ipmi_command(command, deadline=max(0, end - time.monotonic()))
+                if success:
+                    self.rows = self.parse(stdout)
+    
+    @classmethod
+    def parse(cls, output):
+        """Parse "name | value [unit] | status" (sdr list) or "name | value" (sensor reading) lines."""
+        rows = []
+        for line in output.split('\n'):
+            parts = [part.strip() for part in line.split('|')]
+            if len(parts) < 2:
+                continue
+            match = cls.VALUE_PATTERN.match(parts[1])
             if match:
-                try:
-                    temp = int(match.group(1))
-                    temps.append(temp)
-                except ValueError:
-                    pass
+                rows.append({'name': parts[0], 'value': float(match.group(1)), 'unit': match.group(2).strip()})
+        return rows
     
-    if temps:
-        logger.debug("System temperatures obtained via ipmitool")
+    @staticmethod
+    def is_temperature(row):
+        return row['unit'].startswith('degrees C') or (not row['unit'] and 'temp' in row['name'].lower())
     
-    return temps
+    @staticmethod
+    def is_fan(row):
+        return 'fan' in row['name'].lower() and row['unit'] in ('RPM', 'percent', '%', '')
+    
+    def temperatures(self):
+        self.take()
+        return [int(row['value']) for row in self.rows if self.is_temperature(row)]
+    
+    def fan_speeds(self):
+        self.take()
+        return [int(row['value']) for row in self.rows if self.is_fan(row)]
+
+
+ipmi_sdr_snapshot = IpmiSdrSnapshot()
+
+
+def invalidate_sensor_snapshots():
+    """Start a new cycle: the next readers run lm-sensors / the IPMI sensor read again."""
+    global gpu_load_readings
+    sensors_snapshot.invalidate()
+    ipmi_sdr_snapshot.invalidate()
+    backend_probes.invalidate()
+    gpu_load_readings = []
+
+
+def get_system_temperatures():
+    """
+    Get system temperatures from multiple sources.
+    Tries faster methods first (sysfs, sensors), then falls back to ipmitool
+    (or the one that worked last time first, see BackendProbes).
+    """
+    return read_preferred_backend('system', [
+        # sysfs first (fastest, no network)
+        ('sysfs', get_system_temperatures_sysfs, 'sysfs'),
+        # sensors command (fast, local)
+        ('sensors', get_system_temperatures_sensors, 'sensors command'),
+        # ipmitool (slower, network-based; one read shared with get_fan_speeds)
+        ('ipmi', ipmi_sdr_snapshot.temperatures, 'ipmitool'),
+    ])
 
 
 def get_fan_speeds_sysfs():
     """Get fan speeds from /sys/class/hwmon (faster than ipmitool)."""
     speeds = []
     try:
-        hwmon_path = '/sys/class/hwmon'
-        if not os.path.exists(hwmon_path):
-            return []
-        
-        for hwmon_dir in os.listdir(hwmon_path):
-            hwmon_full_path = os.path.join(hwmon_path, hwmon_dir)
-            if not os.path.isdir(hwmon_full_path):
-                continue
-            
-            # Look for fan speed files (fan*_input)
-            for file in os.listdir(hwmon_full_path):
-                if file.startswith('fan') and file.endswith('_input'):
-                    fan_file = os.path.join(hwmon_full_path, file)
-                    try:
-                        with open(fan_file, 'r') as f:
-                            speed = int(f.read().strip())
-                            if speed > 0 and speed < 50000:  # Sanity check (RPM)
-                                speeds.append(speed)
-                    except (ValueError, IOError, OSError):
-                        continue
+        for entry, speed in get_hwmon_index().read('fan'):
+            if speed > 0 and speed < 50000:  # Sanity check (RPM)
+                speeds.append(speed)
     except (OSError, PermissionError):
         pass
     
@@ -484,106 +1997,624 @@ def get_fan_speeds_sensors():
     """Get fan speeds from sensors command (lm-sensors)."""
     speeds = []
     try:
-        result = subprocess.run(
-            ['sensors'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            # Parse sensors output for fan speeds
-            for line in result.stdout.split('\n'):
-                if 'fan' in line.lower() and ('RPM' in line.upper() or 'rpm' in line):
-                    # Extract RPM value
-                    match = re.search(r'(\d+)\s*RPM', line, re.IGNORECASE)
-                    if match:
-                        try:
-                            speed = int(match.group(1))
-                            if speed > 0:
-                                speeds.append(speed)
-                        except ValueError:
-                            pass
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        pass
+        text = sensors_snapshot.output_text()
+        if text is None:  # JSON snapshot (or sensors not installed)
+            return [int(value) for value in sensors_snapshot.values('fan') if int(value) > 0]
+        
+        # Parse sensors output for fan speeds
+        for line in text.split('\n'):
+            if 'fan' in line.lower() and ('RPM' in line.upper() or 'rpm' in line):
+                # Extract RPM value
+                match = re.search(r'(\d+)\s*RPM', line, re.IGNORECASE)
+                if match:
+                    try:
+                        speed = int(match.group(1))
+                        if speed > 0:
+                            speeds.append(speed)
+                    except ValueError:
+                        pass
     except Exception:
         pass
     
     return speeds
 
 
+_data_store = None
+
+
+def get_data_store():
+    """Return the process-wide data log (opened on first use, kept open in daemon mode)."""
+    global _data_store
+    if _data_store is None:
+        _data_store = data_store.open_data_store(DATA_LOG_FILE, DATA_LOG_BACKEND)
+        atexit.register(_data_store.close)
+    return _data_store
+
+
 def log_unified_data(gpu_temps, system_temps, fan_speeds, fan_speed_pct):
     """
     Log unified data (temperatures + fan speeds) for learning/analysis.
-    Format: timestamp|max_gpu_temp|max_system_temp|avg_fan_rpm|fan_speed_pct|gpu_temps_csv|system_temps_csv|fan_speeds_csv
+    One record per cycle in the DATA_LOG_BACKEND store; in the text backend:
+    timestamp|max_gpu_temp|max_system_temp|avg_fan_rpm|fan_speed_pct|gpu_temps_csv|system_temps_csv|fan_speeds_csv
+    """
+    try:
+        with trace_span('log.data'):
+            get_data_store().append(data_store.make_record(gpu_temps, system_temps, fan_speeds, fan_speed_pct))
+    except Exception as e:
+        logger.debug(f"Failed to write unified data log: {e}")
+
+
+_compaction_thread = None
+_compaction_attempted = None  # monotonic time of the last attempt in this process
+
+
+def compact_data_log():
+    """Roll up the data log and apply the retention (skipped while another process is compacting it)."""
+    try:
+        start = time.monotonic()
+        result = data_store.compact_files(DATA_LOG_FILE, DATA_LOG_BACKEND, DATA_ROLLUP_FILE,
+                                          DATA_RAW_DAYS, DATA_MINUTE_WEEKS)
+        if result is not None:
+            logger.info(f"Data log compacted in {time.monotonic() - start:.1f}s: "
+                        f"{result['raw_rolled_up']} records rolled up, {result['raw_pruned']} raw records and "
+                        f"{result['minute_rows_pruned']} minute rollups dropped")
+    except Exception as e:
+        logger.warning(f"Data log compaction failed: {e}")
+
+
+def compact_data_log_if_due(background=False):
+    """Run compact_data_log() when the rollups are older than DATA_COMPACT_INTERVAL."""
+    global _compaction_thread, _compaction_attempted
+    if DATA_COMPACT_INTERVAL <= 0 or not os.path.exists(DATA_LOG_FILE):
+        return
+    if _compaction_thread is not None and _compaction_thread.is_alive():
+        return
+    # A failed compaction is retried after the interval too, not every cycle
+    if _compaction_attempted is not None and time.monotonic() - _compaction_attempted < DATA_COMPACT_INTERVAL:
+        return
+    try:
+        if time.time() - os.path.getmtime(DATA_ROLLUP_FILE) < DATA_COMPACT_INTERVAL:
+            return
+    except OSError:
+        pass  # Never compacted
+    _compaction_attempted = time.monotonic()
+    if background:
+        _compaction_thread = threading.Thread(target=compact_data_log, name='data-log-compaction', daemon=True)
+        _compaction_thread.start()
+    else:
+        compact_data_log()
+
+
+def get_fan_speeds():
     """
+    Get current fan speeds from multiple sources.
+    Tries faster methods first (sysfs, sensors), then falls back to ipmitool
+    (or the one that worked last time first, see BackendProbes).
+    """
+    return read_preferred_backend('fans', [
+        # sysfs first (fastest, no network)
+        ('sysfs', get_fan_speeds_sysfs, 'sysfs'),
+        # sensors command (fast, local)
+        ('sensors', get_fan_speeds_sensors, 'sensors command'),
+        # ipmitool (slower, network-based, but may have more info)
+        ('ipmi', ipmi_sdr_snapshot.fan_speeds, 'ipmitool'),
+    ])
+
+
+_sensor_executor = None
+_sensor_futures = {}
+
+
+def timed_sensor_read(name, reader):
+    """Call reader() and record how long it took, even if the cycle stopped waiting for it."""
+    start = time.monotonic()
     try:
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        max_gpu = max(gpu_temps) if gpu_temps else 0
-        max_system = max(system_temps) if system_temps else 0
-        avg_fan_rpm = int(sum(fan_speeds) / len(fan_speeds)) if fan_speeds else 0
-        fan_pct = fan_speed_pct if fan_speed_pct is not None else 0
+        with trace_span(name):
+            return reader()
+    finally:
+        METRIC_SENSOR_DURATION.observe(time.monotonic() - start, source=name)
+
+
+def collect_sensor_readings():
+    """
+    Read GPU temperatures, system temperatures and fan speeds.
+    In concurrent mode all three run at once in a thread pool, so the cycle waits
+    for the slowest source instead of the sum of all of them.
+    Returns (readings, timed_out): readings maps 'gpu'/'system'/'fans' to a list
+    (empty if the source failed or timed out), timed_out lists sources that missed
+    their deadline.
+    """
+    global _sensor_executor
+    sources = {'gpu': get_gpu_temperatures, 'system': get_system_temperatures, 'fans': get_fan_speeds}
+    
+    if SENSOR_ACQUISITION != 'concurrent':
+        return {name: timed_sensor_read(name, reader) for name, reader in sources.items()}, []
+    
+    if _sensor_executor is None:
+        _sensor_executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='sensor')
+    
+    start = time.monotonic()
+    cycle_deadline = start + SENSOR_CYCLE_DEADLINE
+    readings = {}
+    timed_out = []
+    futures = {}
+    for name, reader in sources.items():
+        previous = _sensor_futures.get(name)
+        if previous is not None and not previous.done():
+            # A timed-out read from an earlier cycle is still stuck; don't pile up more
+            logger.warning(f"Sensor source '{name}' is still busy from a previous cycle, skipping")
+            readings[name] = []
+            timed_out.append(name)
+            METRIC_SENSOR_TIMEOUTS.inc(source=name)
+            continue
+        # In a copy of this cycle's context: its spans go to this cycle's trace, however late they end
+        futures[name] = _sensor_futures[name] = _sensor_executor.submit(
+            contextvars.copy_context().run, timed_sensor_read, name, reader)
+    
+    for name, future in futures.items():
+        deadline = min(start + SENSOR_SOURCE_DEADLINES.get(name, SENSOR_CYCLE_DEADLINE), cycle_deadline)
+        try:
+            readings[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"Sensor source '{name}' missed its deadline ({deadline - start:.1f}s)")
+            readings[name] = []
+            timed_out.append(name)
+            METRIC_SENSOR_TIMEOUTS.inc(source=name)
+        except Exception as e:
+            logger.warning(f"Sensor source '{name}' failed: {e}")
+            readings[name] = []
+            METRIC_SENSOR_ERRORS.inc(source=name)
+    
+    if timed_out and cancel_ipmi_commands():
+        # Whatever IPMI is still in flight belongs to a source the cycle gave up on
+        logger.debug("Cancelled IPMI commands left behind by timed-out sensor sources")
+    
+    logger.debug(f"Sensor acquisition took {time.monotonic() - start:.3f}s"
+                 + (f" (timed out: {', '.join(timed_out)})" if timed_out else ""))
+    return readings, timed_out
+
+
+class ThresholdEngine:
+    """
+    Table-driven fan level selection.
+    Thresholds are compiled into sorted arrays and searched with bisect; a level is
+    held until the temperature falls below its threshold minus the level's hysteresis,
+    and for at least min_dwell seconds. With hysteresis and dwell at zero the decisions
+    match the original 7-level if/elif cascade (see bench/threshold_parity.py).
+    """
+    
+    SEVEN_LEVEL_NAMES = ['VERY-LOW', 'LOW', 'MEDIUM-LOW', 'MEDIUM', 'MEDIUM-HIGH', 'HIGH', 'VERY-HIGH']
+    
+    def __init__(self, gpu_levels=None, system_levels=None, speeds=None, hysteresis=None,
+                 min_dwell=None, auto_threshold=None, gpu_override=None, state_file=None):
+        self.gpu_levels = list(gpu_levels if gpu_levels is not None else GPU_TEMP_LEVELS)
+        self.system_levels = list(system_levels if system_levels is not None else SYSTEM_TEMP_LEVELS)
+        self.speeds = list(speeds if speeds is not None else FAN_SPEED_LEVELS)
+        count = len(self.speeds)
+        if count == 0 or len(self.gpu_levels) != count or len(self.system_levels) != count:
+            raise ValueError(f"Threshold tables must have the same, non-zero number of levels "
+                             f"(GPU: {len(self.gpu_levels)}, system: {len(self.system_levels)}, speeds: {count})")
+        hysteresis = list(hysteresis if hysteresis is not None else THRESHOLD_HYSTERESIS) or [0.0]
+        if len(hysteresis) == 1:
+            hysteresis = hysteresis * count
+        if len(hysteresis) != count:
+            raise ValueError(f"THRESHOLD_HYSTERESIS needs 1 or {count} values, got {len(hysteresis)}")
+        self.hysteresis = hysteresis
+        self.min_dwell = THRESHOLD_MIN_DWELL if min_dwell is None else min_dwell
+        self.auto_threshold = AUTO_MODE_THRESHOLD if auto_threshold is None else auto_threshold
+        self.gpu_override = GPU_TEMP_OVERRIDE if gpu_override is None else gpu_override
+        # GPU override engages at the second level (LOW in the 7-level table)
+        self.override_temp = self.gpu_levels[1] if count > 1 else self.gpu_levels[0]
+        self.names = self.SEVEN_LEVEL_NAMES if count == 7 else [f'LEVEL-{i + 1}' for i in range(count)]
+        
+        # Compiled search arrays. The suffix minimum makes each array non-decreasing, so
+        # bisect finds "the highest level whose threshold is <= temp" even for unsorted tables.
+        self.gpu_search = self.compile(self.gpu_levels)
+        self.system_search = self.compile(self.system_levels)
+        self.gpu_release = self.compile([t - h for t, h in zip(self.gpu_levels, self.hysteresis)])
+        self.system_release = self.compile([t - h for t, h in zip(self.system_levels, self.hysteresis)])
+        
+        self.state_file = THRESHOLD_STATE_FILE if state_file is None else state_file
+        self.level = None        # index of the current level (None = no manual level yet)
+        self.level_since = None  # time.time() when it was entered
+        self.load_state()
+    
+    @staticmethod
+    def compile(thresholds):
+        search = list(thresholds)
+        for i in range(len(search) - 2, -1, -1):
+            search[i] = min(search[i], search[i + 1])
+        return search
+    
+    @staticmethod
+    def level_for(search, temp):
+        """Highest level index whose threshold is <= temp, or -1 below all levels."""
+        return bisect.bisect_right(search, temp) - 1
+    
+    def load_state(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('speeds') == self.speeds and isinstance(state.get('level'), int):
+            self.level = state['level']
+            self.level_since = state.get('level_since')
+    
+    def save_state(self):
+        if not self.state_file:
+            return
+        try:
+            tmp_file = self.state_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump({'level': self.level, 'level_since': self.level_since, 'speeds': self.speeds}, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.debug(f"Failed to write threshold state file: {e}")
+    
+    def set_level(self, level, now):
+        if level != self.level:
+            self.level = level
+            self.level_since = now
+            self.save_state()
+    
+    def decide(self, gpu_temps, system_temps, now=None):
+        """Return (action, speed, reason), like determine_fan_action()."""
+        now = time.time() if now is None else now
+        max_gpu_temp = max(gpu_temps) if gpu_temps else 0
+        max_system_temp = max(system_temps) if system_temps else 0
+        
+        # GPU Temperature Priority Override logic
+        # If enabled and GPU temps are above the override level, only GPU temps count
+        use_gpu_only = self.gpu_override and gpu_temps and max_gpu_temp >= self.override_temp
+        if use_gpu_only:
+            logger.debug(f"GPU override active: Using GPU temp {max_gpu_temp}°C (System: {max_system_temp}°C)")
+        
+        # If temperatures exceed auto mode threshold, let iDRAC handle it
+        if max_gpu_temp >= self.auto_threshold or max_system_temp >= self.auto_threshold:
+            self.set_level(None, now)
+            reason = f"Temperature exceeds auto mode threshold ({self.auto_threshold}°C): GPU={max_gpu_temp}°C, System={max_system_temp}°C"
+            return ('auto', None, reason)
+        
+        gpu_level = self.level_for(self.gpu_search, max_gpu_temp)
+        system_level = -1 if use_gpu_only else self.level_for(self.system_search, max_system_temp)
+        level = max(gpu_level, system_level)
+        
+        held = None
+        if self.level is not None and max(level, 0) < self.level < len(self.speeds):
+            # Stepping down: only as far as the hysteresis bands and dwell time allow
+            release_level = max(self.level_for(self.gpu_release, max_gpu_temp),
+                                -1 if use_gpu_only else self.level_for(self.system_release, max_system_temp))
+            if self.level_since is not None and now - self.level_since < self.min_dwell:
+                held = 'dwell'
+            elif release_level >= self.level:
+                held = 'hysteresis'
+            else:
+                level = max(level, release_level)
+        if held:
+            level = self.level
+            name = self.names[level]
+            reason = (f"Holding {name} level ({self.speeds[level]}%): GPU={max_gpu_temp}°C, System={max_system_temp}°C "
+                      + (f"within {self.hysteresis[level]:g}°C hysteresis" if held == 'hysteresis'
+                         else f"for minimum dwell ({self.min_dwell:g}s)"))
+            return ('manual', self.speeds[level], reason)
+        
+        self.set_level(max(level, 0), now)
+        override_note = " - GPU override active" if use_gpu_only else ""
+        if level < 0:
+            if use_gpu_only:
+                reason = f"GPU temperature {max_gpu_temp}°C < {self.names[0]} threshold ({self.gpu_levels[0]}°C) - GPU override active"
+            else:
+                reason = f"Temperatures below all thresholds (GPU: {max_gpu_temp}°C, System: {max_system_temp}°C)"
+            return ('manual', self.speeds[0], reason)
+        if gpu_level == level:
+            reason = f"GPU temperature {max_gpu_temp}°C >= {self.names[level]} threshold ({self.gpu_levels[level]}°C){override_note}"
+        else:
+            reason = f"System temperature {max_system_temp}°C >= {self.names[level]} threshold ({self.system_levels[level]}°C)"
+        return ('manual', self.speeds[level], reason)
+
+
+_threshold_engine = None
+
+
+def get_threshold_engine():
+    """Return the process-wide threshold engine (created on first use)."""
+    global _threshold_engine
+    if _threshold_engine is None:
+        _threshold_engine = ThresholdEngine()
+    return _threshold_engine
+
+
+class ContinuousFanController:
+    """
+    Base for the 'curve' and 'pid' controllers: any speed between
+    FAN_CONTROLLER_MIN_SPEED and FAN_CONTROLLER_MAX_SPEED instead of discrete steps,
+    with the output change rate-limited per second and changes smaller than
+    FAN_CONTROLLER_MIN_CHANGE ignored. Subclasses implement target().
+    The AUTO_MODE_THRESHOLD hand-off to iDRAC is checked before the controller runs.
+    The state is saved when the fan speed changes, or every save_interval seconds.
+    """
+    
+    NAME = None
+    
+    def __init__(self, min_speed=None, max_speed=None, rate_up=None, rate_down=None, min_change=None,
+                 auto_threshold=None, gpu_override=None, override_temp=None, state_file=None,
+                 save_interval=None):
+        self.min_speed = FAN_CONTROLLER_MIN_SPEED if min_speed is None else min_speed
+        self.max_speed = FAN_CONTROLLER_MAX_SPEED if max_speed is None else max_speed
+        self.rate_up = FAN_RATE_LIMIT_UP if rate_up is None else rate_up
+        self.rate_down = FAN_RATE_LIMIT_DOWN if rate_down is None else rate_down
+        self.min_change = FAN_CONTROLLER_MIN_CHANGE if min_change is None else min_change
+        self.auto_threshold = AUTO_MODE_THRESHOLD if auto_threshold is None else auto_threshold
+        self.gpu_override = GPU_TEMP_OVERRIDE if gpu_override is None else gpu_override
+        if override_temp is None:
+            override_temp = GPU_TEMP_LEVELS[1] if len(GPU_TEMP_LEVELS) > 1 else GPU_TEMP_LEVELS[0]
+        self.override_temp = override_temp
+        self.state_file = THRESHOLD_STATE_FILE if state_file is None else state_file
+        self.save_interval = FAN_CONTROLLER_SAVE_INTERVAL if save_interval is None else save_interval
+        self.state = {}
+        self.load_state()
+        self.saved_speed = self.speed()  # fan speed in the state file
+        self.saved_at = None             # when it was written by this process
+    
+    def load_state(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('controller') == self.NAME:
+            self.state = state
+    
+    def save_state(self):
+        if not self.state_file:
+            return
+        try:
+            tmp_file = self.state_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(dict(self.state, controller=self.NAME), f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.debug(f"Failed to write controller state file: {e}")
+    
+    def speed(self):
+        output = self.state.get('output')
+        return None if output is None else int(round(output))
+    
+    def save_if_due(self, now):
+        """Save the state if the fan speed changed or it was last saved save_interval ago."""
+        speed = self.speed()
+        if speed == self.saved_speed and self.saved_at is not None and 0 <= now - self.saved_at < self.save_interval:
+            return
+        self.saved_speed, self.saved_at = speed, now
+        self.save_state()
+    
+    def clamp(self, speed):
+        return min(self.max_speed, max(self.min_speed, speed))
+    
+    def limit_rate(self, target, now):
+        """Limit the change from the previous output to rate_up/rate_down percent per second."""
+        last_output, last_time = self.state.get('output'), self.state.get('time')
+        if last_output is None or last_time is None or now <= last_time:
+            return target
+        elapsed = now - last_time
+        if self.rate_up > 0 and target > last_output:
+            return min(target, last_output + self.rate_up * elapsed)
+        if self.rate_down > 0 and target < last_output:
+            return max(target, last_output - self.rate_down * elapsed)
+        return target
+    
+    def target(self, max_gpu_temp, max_system_temp, use_gpu_only, now):
+        """Return (speed, reason) before rate limiting."""
+        raise NotImplementedError
+    
+    def decide(self, gpu_temps, system_temps, now=None):
+        """Return (action, speed, reason), like determine_fan_action()."""
+        now = time.time() if now is None else now
+        max_gpu_temp = max(gpu_temps) if gpu_temps else 0
+        max_system_temp = max(system_temps) if system_temps else 0
         
-        gpu_csv = ','.join(map(str, gpu_temps)) if gpu_temps else ''
-        system_csv = ','.join(map(str, system_temps)) if system_temps else ''
-        fan_csv = ','.join(map(str, fan_speeds)) if fan_speeds else ''
+        # Hard safety override: let iDRAC handle it, whatever the controller says
+        if max_gpu_temp >= self.auto_threshold or max_system_temp >= self.auto_threshold:
+            self.state = {}
+            self.save_if_due(now)
+            reason = f"Temperature exceeds auto mode threshold ({self.auto_threshold}°C): GPU={max_gpu_temp}°C, System={max_system_temp}°C"
+            return ('auto', None, reason)
+        
+        use_gpu_only = bool(self.gpu_override and gpu_temps and max_gpu_temp >= self.override_temp)
+        target, reason = self.target(max_gpu_temp, max_system_temp, use_gpu_only, now)
+        target = self.clamp(target)
+        last_output = self.state.get('output')
+        if last_output is not None and abs(target - last_output) < self.min_change:
+            target = last_output  # Not worth a fan speed write
+        output = self.clamp(self.limit_rate(target, now))
+        if abs(output - target) > 0.05:
+            reason += f" (rate limited from {target:.1f}%)"
+        self.state.update(output=output, time=now)
+        self.save_if_due(now)
+        return ('manual', self.speed(), reason)
+
+
+class FanCurveController(ContinuousFanController):
+    """Piecewise-linear fan curve: speed interpolated between (temp, speed) points."""
+    
+    NAME = 'curve'
+    
+    def __init__(self, gpu_curve=None, system_curve=None, **kwargs):
+        self.gpu_curve = sorted(gpu_curve if gpu_curve is not None else FAN_CURVE_GPU)
+        self.system_curve = sorted(system_curve if system_curve is not None else FAN_CURVE_SYSTEM)
+        if not self.gpu_curve or not self.system_curve:
+            raise ValueError("Fan curves need at least one temp:speed point")
+        super().__init__(**kwargs)
+    
+    @staticmethod
+    def interpolate(curve, temp):
+        temps = [point[0] for point in curve]
+        i = bisect.bisect_right(temps, temp)
+        if i == 0:
+            return curve[0][1]
+        if i == len(curve):
+            return curve[-1][1]
+        (t0, s0), (t1, s1) = curve[i - 1], curve[i]
+        return s0 + (s1 - s0) * (temp - t0) / (t1 - t0)
+    
+    def target(self, max_gpu_temp, max_system_temp, use_gpu_only, now):
+        gpu_speed = self.interpolate(self.gpu_curve, max_gpu_temp)
+        if use_gpu_only:
+            return gpu_speed, f"Curve: GPU {max_gpu_temp}°C -> {gpu_speed:.1f}% - GPU override active"
+        system_speed = self.interpolate(self.system_curve, max_system_temp)
+        if gpu_speed >= system_speed:
+            return gpu_speed, f"Curve: GPU {max_gpu_temp}°C -> {gpu_speed:.1f}% (System {max_system_temp}°C -> {system_speed:.1f}%)"
+        return system_speed, f"Curve: System {max_system_temp}°C -> {system_speed:.1f}% (GPU {max_gpu_temp}°C -> {gpu_speed:.1f}%)"
+
+
+class PidController(ContinuousFanController):
+    """
+    PID loop on the worst temperature error (GPU vs PID_SETPOINT, system vs
+    PID_SYSTEM_SETPOINT). Anti-windup: the integral only accumulates while the
+    output is not saturated in the direction of the error, and is bounded so the
+    output range is always reachable. Gaps longer than max_gap reset the loop.
+    """
+    
+    NAME = 'pid'
+    
+    def __init__(self, setpoint=None, system_setpoint=None, kp=None, ki=None, kd=None,
+                 base_speed=None, max_gap=None, **kwargs):
+        self.setpoint = PID_SETPOINT if setpoint is None else setpoint
+        self.system_setpoint = PID_SYSTEM_SETPOINT if system_setpoint is None else system_setpoint
+        self.kp = PID_KP if kp is None else kp
+        self.ki = PID_KI if ki is None else ki
+        self.kd = PID_KD if kd is None else kd
+        self.base_speed = PID_BASE_SPEED if base_speed is None else base_speed
+        self.max_gap = max(600, 4 * CONTROL_INTERVAL) if max_gap is None else max_gap
+        super().__init__(**kwargs)
+    
+    def target(self, max_gpu_temp, max_system_temp, use_gpu_only, now):
+        gpu_error = max_gpu_temp - self.setpoint
+        system_error = max_system_temp - self.system_setpoint
+        if use_gpu_only or gpu_error >= system_error:
+            source, temp, setpoint, error = 'GPU', max_gpu_temp, self.setpoint, gpu_error
+        else:
+            source, temp, setpoint, error = 'System', max_system_temp, self.system_setpoint, system_error
         
-        log_entry = f"{timestamp}|{max_gpu}|{max_system}|{avg_fan_rpm}|{fan_pct}|{gpu_csv}|{system_csv}|{fan_csv}\n"
+        integral = self.state.get('integral', 0.0)
+        last_error, last_time = self.state.get('error'), self.state.get('time')
+        dt = now - last_time if last_time is not None else None
+        if dt is None or dt <= 0 or dt > self.max_gap:
+            dt, last_error = None, None  # First sample or a long gap: restart the loop
+            integral = 0.0
         
-        # Ensure log directory exists
-        log_dir = os.path.dirname(DATA_LOG_FILE)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir, exist_ok=True)
+        proportional = self.kp * error
+        derivative = self.kd * (error - last_error) / dt if dt and last_error is not None else 0.0
+        if dt:
+            candidate = integral + self.ki * error * dt
+            output = self.base_speed + proportional + candidate + derivative
+            # Anti-windup: don't integrate further into a saturated output
+            if not ((output > self.max_speed and error > 0) or (output < self.min_speed and error < 0)):
+                integral = candidate
+        integral = min(self.max_speed - self.base_speed, max(self.min_speed - self.base_speed, integral))
         
-        # Append to unified data log
-        with open(DATA_LOG_FILE, 'a') as f:
-            f.write(log_entry)
-            
-    except Exception as e:
-        logger.debug(f"Failed to write unified data log: {e}")
+        self.state.update(integral=integral, error=error)
+        speed = self.base_speed + proportional + integral + derivative
+        reason = (f"PID: {source} {temp}°C vs setpoint {setpoint:g}°C "
+                  f"(P={proportional:+.1f} I={integral:+.1f} D={derivative:+.1f}) -> {self.clamp(speed):.1f}%")
+        if use_gpu_only:
+            reason += " - GPU override active"
+        return speed, reason
 
 
-def get_fan_speeds():
+_fan_controller = None
+
+
+def get_fan_controller():
+    """Return the process-wide controller selected by FAN_CONTROLLER (created on first use)."""
+    global _fan_controller
+    if _fan_controller is None:
+        if FAN_CONTROLLER == 'pid':
+            _fan_controller = PidController()
+        elif FAN_CONTROLLER == 'curve':
+            _fan_controller = FanCurveController()
+        else:
+            _fan_controller = get_threshold_engine()
+    return _fan_controller
+
+
+class FeedforwardFloor:
+    """
+    Raises the controller's fan speed to a floor derived from GPU power draw and
+    utilization, which step up tens of seconds before the temperature does.
+    Tracks how much earlier than the temperature-only decision the floor acted.
     """
-    Get current fan speeds from multiple sources.
-    Tries faster methods first (sysfs, sensors), then falls back to ipmitool.
-    """
-    # Try sysfs first (fastest, no network)
-    speeds = get_fan_speeds_sysfs()
-    if speeds:
-        logger.debug("Fan speeds obtained via sysfs")
-        return speeds
-    
-    # Try sensors command (fast, local)
-    speeds = get_fan_speeds_sensors()
-    if speeds:
-        logger.debug("Fan speeds obtained via sensors command")
-        return speeds
-    
-    # Fall back to ipmitool (slower, network-based, but may have more info)
-    logger.debug("Falling back to ipmitool for fan speeds")
-    success, stdout, stderr = run_ipmi_command(['sdr', 'list'])
-    if not success:
-        return []
     
-    speeds = []
-    for line in stdout.split('\n'):
-        if 'Fan' in line:
-            # Try to extract RPM or percentage
-            match = re.search(r'(\d+)\s*(?:RPM|%)', line, re.IGNORECASE)
-            if match:
-                try:
-                    speed = int(match.group(1))
-                    speeds.append(speed)
-                except ValueError:
-                    pass
+    def __init__(self, gain=None, idle_watts=None, util_gain=None, max_speed=None):
+        self.gain = FEEDFORWARD_GAIN if gain is None else gain
+        self.idle_watts = FEEDFORWARD_IDLE_WATTS if idle_watts is None else idle_watts
+        self.util_gain = FEEDFORWARD_UTIL_GAIN if util_gain is None else util_gain
+        self.max_speed = FEEDFORWARD_MAX_SPEED if max_speed is None else max_speed
+        self.lead_start = None   # when feedforward first ran ahead of the temperature decision
+        self.lead_speed = None   # the floor it set then
+        self.last_lead = None    # seconds, most recent completed lead
     
-    if speeds:
-        logger.debug("Fan speeds obtained via ipmitool")
+    def enabled(self):
+        return self.gain > 0 or self.util_gain > 0
     
-    return speeds
+    def floor(self, gpu_load):
+        """Return (floor speed %, max power W, max utilization %) for this cycle's GPU load."""
+        powers = [r['power_w'] for r in gpu_load if r.get('power_w') is not None]
+        utilizations = [r['utilization'] for r in gpu_load if r.get('utilization') is not None]
+        max_power = max(powers) if powers else None
+        max_utilization = max(utilizations) if utilizations else None
+        floor = 0.0
+        if max_power is not None:
+            floor = max(floor, self.gain * (max_power - self.idle_watts))
+        if max_utilization is not None:
+            floor = max(floor, self.util_gain * max_utilization)
+        return int(round(min(self.max_speed, floor))), max_power, max_utilization
+    
+    def apply(self, action, speed, reason, gpu_load, now=None):
+        """Return (action, speed, reason) with the feedforward floor applied to manual decisions."""
+        if action != 'manual' or not gpu_load or not self.enabled():
+            return action, speed, reason
+        now = time.monotonic() if now is None else now
+        floor, max_power, max_utilization = self.floor(gpu_load)
+        
+        if self.lead_start is not None:
+            if speed >= self.lead_speed:
+                # The temperature-only decision has caught up with the floor
+                self.last_lead = now - self.lead_start
+                logger.info(f"Feedforward acted {self.last_lead:.0f}s before the temperature-only decision "
+                            f"reached {self.lead_speed}%")
+                self.lead_start = self.lead_speed = None
+            elif floor <= speed:
+                self.lead_start = self.lead_speed = None  # Load went away before temperatures followed
+        
+        if floor <= speed:
+            return action, speed, reason
+        if self.lead_start is None:
+            self.lead_start, self.lead_speed = now, floor
+        load = f"{max_power:.0f} W" if max_power is not None else "n/a"
+        if max_utilization is not None:
+            load += f", {max_utilization:.0f}% utilization"
+        logger.info(f"Feedforward: GPU load {load} -> fan floor {floor}% (temperature-only: {speed}%)")
+        return action, floor, f"{reason}; feedforward floor {floor}% from GPU load ({load})"
+
 
+_feedforward = None
 
-def determine_fan_action(gpu_temps, system_temps):
+
+def get_feedforward():
+    """Return the process-wide feedforward floor (created on first use)."""
+    global _feedforward
+    if _feedforward is None:
+        _feedforward = FeedforwardFloor()
+    return _feedforward
+
+
+def determine_fan_action(gpu_temps, system_temps, gpu_load=None):
     """
     Determine what action to take based on temperatures.
     Returns: (action, speed, reason)
@@ -591,108 +2622,15 @@ def determine_fan_action(gpu_temps, system_temps):
     - speed: fan speed percentage (only used if action is 'manual')
     - reason: String explaining why this action was chosen
     
-    Uses 7 temperature levels: Very-Low, Low, Medium-Low, Medium, Medium-High, High, Very-High
-    Checks from highest to lowest temperature threshold.
-    """
-    # Get maximum temperatures
-    max_gpu_temp = max(gpu_temps) if gpu_temps else 0
-    max_system_temp = max(system_temps) if system_temps else 0
-    
-    # GPU Temperature Priority Override logic
-    # If enabled and GPU temps are above LOW threshold, prioritize GPU temps
-    if GPU_TEMP_OVERRIDE and gpu_temps and max_gpu_temp >= GPU_TEMP_LOW:
-        # Use GPU temperature for fan control (GPU takes priority)
-        decision_temp = max_gpu_temp
-        temp_source = 'GPU'
-        use_gpu_thresholds = True
-        logger.debug(f"GPU override active: Using GPU temp {max_gpu_temp}°C (System: {max_system_temp}°C)")
-    else:
-        # Use the higher of GPU or system temperature (default behavior)
-        decision_temp = max(max_gpu_temp, max_system_temp)
-        temp_source = 'GPU' if max_gpu_temp >= max_system_temp else 'System'
-        use_gpu_thresholds = False
-    
-    # If temperatures exceed auto mode threshold, let iDRAC handle it
-    if max_gpu_temp >= AUTO_MODE_THRESHOLD or max_system_temp >= AUTO_MODE_THRESHOLD:
-        reason = f"Temperature exceeds auto mode threshold ({AUTO_MODE_THRESHOLD}°C): GPU={max_gpu_temp}°C, System={max_system_temp}°C"
-        return ('auto', None, reason)
-    
-    # Determine fan speed based on 7-level thresholds
-    # Checks from highest to lowest temperature (Very-High down to Very-Low)
-    if use_gpu_thresholds:
-        # Use GPU thresholds when GPU is prioritized
-        if decision_temp >= GPU_TEMP_VERY_HIGH:
-            reason = f"GPU temperature {decision_temp}°C >= VERY-HIGH threshold ({GPU_TEMP_VERY_HIGH}°C) - GPU override active"
-            return ('manual', FAN_SPEED_VERY_HIGH, reason)
-        elif decision_temp >= GPU_TEMP_HIGH:
-            reason = f"GPU temperature {decision_temp}°C >= HIGH threshold ({GPU_TEMP_HIGH}°C) - GPU override active"
-            return ('manual', FAN_SPEED_HIGH, reason)
-        elif decision_temp >= GPU_TEMP_MED_HIGH:
-            reason = f"GPU temperature {decision_temp}°C >= MEDIUM-HIGH threshold ({GPU_TEMP_MED_HIGH}°C) - GPU override active"
-            return ('manual', FAN_SPEED_MED_HIGH, reason)
-        elif decision_temp >= GPU_TEMP_MED:
-            reason = f"GPU temperature {decision_temp}°C >= MEDIUM threshold ({GPU_TEMP_MED}°C) - GPU override active"
-            return ('manual', FAN_SPEED_MED, reason)
-        elif decision_temp >= GPU_TEMP_MED_LOW:
-            reason = f"GPU temperature {decision_temp}°C >= MEDIUM-LOW threshold ({GPU_TEMP_MED_LOW}°C) - GPU override active"
-            return ('manual', FAN_SPEED_MED_LOW, reason)
-        elif decision_temp >= GPU_TEMP_LOW:
-            reason = f"GPU temperature {decision_temp}°C >= LOW threshold ({GPU_TEMP_LOW}°C) - GPU override active"
-            return ('manual', FAN_SPEED_LOW, reason)
-        elif decision_temp >= GPU_TEMP_VERY_LOW:
-            reason = f"GPU temperature {decision_temp}°C >= VERY-LOW threshold ({GPU_TEMP_VERY_LOW}°C) - GPU override active"
-            return ('manual', FAN_SPEED_VERY_LOW, reason)
-        else:
-            reason = f"GPU temperature {decision_temp}°C < VERY-LOW threshold ({GPU_TEMP_VERY_LOW}°C) - GPU override active"
-            return ('manual', FAN_SPEED_VERY_LOW, reason)
-    else:
-        # Use both GPU and system thresholds (check highest of either)
-        # Check from highest to lowest threshold
-        if max_gpu_temp >= GPU_TEMP_VERY_HIGH or max_system_temp >= SYSTEM_TEMP_VERY_HIGH:
-            if max_gpu_temp >= GPU_TEMP_VERY_HIGH:
-                reason = f"GPU temperature {max_gpu_temp}°C >= VERY-HIGH threshold ({GPU_TEMP_VERY_HIGH}°C)"
-            else:
-                reason = f"System temperature {max_system_temp}°C >= VERY-HIGH threshold ({SYSTEM_TEMP_VERY_HIGH}°C)"
-            return ('manual', FAN_SPEED_VERY_HIGH, reason)
-        elif max_gpu_temp >= GPU_TEMP_HIGH or max_system_temp >= SYSTEM_TEMP_HIGH:
-            if max_gpu_temp >= GPU_TEMP_HIGH:
-                reason = f"GPU temperature {max_gpu_temp}°C >= HIGH threshold ({GPU_TEMP_HIGH}°C)"
-            else:
-                reason = f"System temperature {max_system_temp}°C >= HIGH threshold ({SYSTEM_TEMP_HIGH}°C)"
-            return ('manual', FAN_SPEED_HIGH, reason)
-        elif max_gpu_temp >= GPU_TEMP_MED_HIGH or max_system_temp >= SYSTEM_TEMP_MED_HIGH:
-            if max_gpu_temp >= GPU_TEMP_MED_HIGH:
-                reason = f"GPU temperature {max_gpu_temp}°C >= MEDIUM-HIGH threshold ({GPU_TEMP_MED_HIGH}°C)"
-            else:
-                reason = f"System temperature {max_system_temp}°C >= MEDIUM-HIGH threshold ({SYSTEM_TEMP_MED_HIGH}°C)"
-            return ('manual', FAN_SPEED_MED_HIGH, reason)
-        elif max_gpu_temp >= GPU_TEMP_MED or max_system_temp >= SYSTEM_TEMP_MED:
-            if max_gpu_temp >= GPU_TEMP_MED:
-                reason = f"GPU temperature {max_gpu_temp}°C >= MEDIUM threshold ({GPU_TEMP_MED}°C)"
-            else:
-                reason = f"System temperature {max_system_temp}°C >= MEDIUM threshold ({SYSTEM_TEMP_MED}°C)"
-            return ('manual', FAN_SPEED_MED, reason)
-        elif max_gpu_temp >= GPU_TEMP_MED_LOW or max_system_temp >= SYSTEM_TEMP_MED_LOW:
-            if max_gpu_temp >= GPU_TEMP_MED_LOW:
-                reason = f"GPU temperature {max_gpu_temp}°C >= MEDIUM-LOW threshold ({GPU_TEMP_MED_LOW}°C)"
-            else:
-                reason = f"System temperature {max_system_temp}°C >= MEDIUM-LOW threshold ({SYSTEM_TEMP_MED_LOW}°C)"
-            return ('manual', FAN_SPEED_MED_LOW, reason)
-        elif max_gpu_temp >= GPU_TEMP_LOW or max_system_temp >= SYSTEM_TEMP_LOW:
-            if max_gpu_temp >= GPU_TEMP_LOW:
-                reason = f"GPU temperature {max_gpu_temp}°C >= LOW threshold ({GPU_TEMP_LOW}°C)"
-            else:
-                reason = f"System temperature {max_system_temp}°C >= LOW threshold ({SYSTEM_TEMP_LOW}°C)"
-            return ('manual', FAN_SPEED_LOW, reason)
-        elif max_gpu_temp >= GPU_TEMP_VERY_LOW or max_system_temp >= SYSTEM_TEMP_VERY_LOW:
-            if max_gpu_temp >= GPU_TEMP_VERY_LOW:
-                reason = f"GPU temperature {max_gpu_temp}°C >= VERY-LOW threshold ({GPU_TEMP_VERY_LOW}°C)"
-            else:
-                reason = f"System temperature {max_system_temp}°C >= VERY-LOW threshold ({SYSTEM_TEMP_VERY_LOW}°C)"
-            return ('manual', FAN_SPEED_VERY_LOW, reason)
-        else:
-            reason = f"Temperatures below all thresholds (GPU: {max_gpu_temp}°C, System: {max_system_temp}°C)"
-            return ('manual', FAN_SPEED_VERY_LOW, reason)
+    Uses the GPU/system threshold tables (7 levels by default: Very-Low, Low, Medium-Low,
+    Medium, Medium-High, High, Very-High) with hysteresis, see ThresholdEngine, or the
+    curve/pid controller selected by FAN_CONTROLLER. With gpu_load (power/utilization
+    per GPU) the speed is raised to the feedforward floor, see FeedforwardFloor.
+    """
+    action, speed, reason = get_fan_controller().decide(gpu_temps, system_temps)
+    if gpu_load:
+        return get_feedforward().apply(action, speed, reason, gpu_load)
+    return action, speed, reason
 
 
 def check_temperatures():
@@ -781,28 +2719,121 @@ def check_fan_speeds():
     print("=" * 60)
 
 
+HISTORY_READ_BLOCK = 64 * 1024
+LOG_TIMESTAMP_LENGTH = 19  # YYYY-MM-DD HH:MM:SS
+LOG_TIMESTAMP_PATTERN = re.compile(rb'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d')
+ROTATED_LOG_SUFFIX = re.compile(r'^[.-](\d+|\d{8}(\d{2})?)(\.gz)?$')  # .1, .2.gz, -20260115[.gz]
+
+
+def rotated_log_files(path):
+    """LOG_FILE followed by its logrotate siblings (.1, .2.gz, -YYYYMMDD...), newest first."""
+    directory = os.path.dirname(path) or '.'
+    base = os.path.basename(path)
+    siblings = []
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        names = []
+    for name in names:
+        if name.startswith(base) and ROTATED_LOG_SUFFIX.match(name[len(base):]):
+            full_path = os.path.join(directory, name)
+            try:
+                siblings.append((os.path.getmtime(full_path), full_path))
+            except OSError:
+                continue
+    siblings.sort(reverse=True)
+    return ([path] if os.path.exists(path) else []) + [full_path for _, full_path in siblings]
+
+
+def read_lines_reversed(f, end, start=0):
+    """Yield the lines of binary file f between start and end, last line first, reading backwards in blocks."""
+    position = end
+    remainder = b''
+    while position > start:
+        size = min(HISTORY_READ_BLOCK, position - start)
+        position -= size
+        f.seek(position)
+        lines = (f.read(size) + remainder).split(b'\n')
+        remainder = lines[0]
+        for line in reversed(lines[1:]):
+            yield line
+    if remainder:
+        yield remainder
+
+
+def read_gzip_lines_reversed(path):
+    """gzip streams cannot be read backwards; rotated logs are small enough to decompress whole."""
+    with gzip.open(path, 'rb') as f:
+        return reversed(f.read().split(b'\n'))
+
+
+def next_timestamped_line(f, position, end):
+    """(offset, timestamp prefix) of the first timestamped line starting at or after position."""
+    f.seek(max(position - 1, 0))
+    if position > 0:
+        f.readline()  # Finish the line position falls in (a no-op if position is a line start)
+    offset = f.tell()
+    while offset < end:
+        line = f.readline()
+        if not line:
+            break
+        if LOG_TIMESTAMP_PATTERN.match(line):
+            return offset, line[:LOG_TIMESTAMP_LENGTH]
+        offset += len(line)
+    return end, None
+
+
+def find_log_offset(f, end, timestamp):
+    """
+    Offset of the first line logged at or after timestamp (bytes, YYYY-MM-DD HH:MM:SS).
+    Binary search on the timestamp prefix; lines without one (tracebacks) belong to the line above.
+    """
+    low, high = 0, end
+    while low < high:
+        middle = (low + high) // 2
+        _, line_timestamp = next_timestamped_line(f, middle, end)
+        if line_timestamp is None or line_timestamp >= timestamp:
+            high = middle
+        else:
+            low = middle + 1
+    return next_timestamped_line(f, low, end)[0]
+
+
 def show_temperature_history(lines=50):
     """Show temperature history from log file."""
     print("=" * 60)
     print(f"Temperature History (last {lines} entries)")
     print("=" * 60)
     
-    if not os.path.exists(LOG_FILE):
+    log_files = rotated_log_files(LOG_FILE)
+    if not log_files:
         print(f"Log file not found: {LOG_FILE}")
         return
     
     try:
-        with open(LOG_FILE, 'r') as f:
-            all_lines = f.readlines()
-        
-        # Extract temperature entries
+        # Read backwards from the end; older rotated files are only opened if still short of N entries
         temp_entries = []
-        for line in all_lines:
-            if 'GPU Temperatures:' in line or 'System Temperatures:' in line:
-                temp_entries.append(line.strip())
+        for path in log_files:
+            if len(temp_entries) >= lines:
+                break
+            if path.endswith('.gz'):
+                reversed_lines = read_gzip_lines_reversed(path)
+                f = None
+            else:
+                f = open(path, 'rb')
+                reversed_lines = read_lines_reversed(f, os.fstat(f.fileno()).st_size)
+            try:
+                for raw_line in reversed_lines:
+                    if b'GPU Temperatures:' in raw_line or b'System Temperatures:' in raw_line:
+                        temp_entries.append(raw_line.decode('utf-8', 'replace').strip())
+                        if len(temp_entries) >= lines:
+                            break
+            finally:
+                if f is not None:
+                    f.close()
         
         # Show last N entries
-        for entry in temp_entries[-lines:]:
+        for entry in reversed(temp_entries[:lines]):
             print(entry)
         
         if not temp_entries:
@@ -812,67 +2843,87 @@ def show_temperature_history(lines=50):
         print(f"Error reading log file: {e}")
 
 
-def show_detailed_history(hours=24):
+def parse_history_line(line):
+    """(category, timestamp, values) for a GPU/system/fan log line, or None."""
+    if 'GPU Temperatures:' in line:
+        category, match = 'gpu', re.search(r'GPU Temperatures: ([\d\s,]+)°C', line)
+    elif 'System Temperatures:' in line:
+        category, match = 'system', re.search(r'System Temperatures: ([\d\s,]+)°C', line)
+    elif 'Current Fan Speeds:' in line:
+        category, match = 'fans', re.search(r'Current Fan Speeds: ([\d\s,]+)', line)
+    else:
+        return None
+    try:
+        # Log format: YYYY-MM-DD HH:MM:SS,XXX - LEVEL - message
+        timestamp = datetime.strptime(line[:LOG_TIMESTAMP_LENGTH], '%Y-%m-%d %H:%M:%S').timestamp()
+    except ValueError:
+        return None
+    if not match:
+        return None
+    values = [int(v.strip()) for v in match.group(1).split(',') if v.strip().isdigit()]
+    return (category, timestamp, values) if values else None
+
+
+def show_detailed_history(hours=24, entries=20):
     """Show detailed temperature history with timestamps."""
     print("=" * 60)
     print(f"Detailed Temperature History (last {hours} hours)")
     print("=" * 60)
     
-    if not os.path.exists(LOG_FILE):
+    log_files = rotated_log_files(LOG_FILE)
+    if not log_files:
         print(f"Log file not found: {LOG_FILE}")
         return
     
     try:
         cutoff_time = datetime.now().timestamp() - (hours * 3600)
-        gpu_temps_history = []
-        system_temps_history = []
-        fan_speeds_history = []
+        cutoff_prefix = datetime.fromtimestamp(math.ceil(cutoff_time)).strftime('%Y-%m-%d %H:%M:%S').encode()
+        history = {'gpu': [], 'system': [], 'fans': []}  # Newest first while reading
         
-        with open(LOG_FILE, 'r') as f:
-            for line in f:
-                # Parse timestamp
-                try:
-                    # Log format: YYYY-MM-DD HH:MM:SS,XXX - LEVEL - message
-                    timestamp_str = line[:19]  # First 19 chars are YYYY-MM-DD HH:MM:SS
-                    timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S').timestamp()
-                    
+        # Binary search for the start of the window, then read backwards from the end until
+        # every category has its last N entries. Older rotated files are only opened when
+        # the window starts before the newer file does.
+        for path in log_files:
+            if path.endswith('.gz'):
+                f = None
+                reversed_lines = read_gzip_lines_reversed(path)
+                window_continues = True  # Until a line older than the window turns up
+            else:
+                f = open(path, 'rb')
+                end = os.fstat(f.fileno()).st_size
+                window_start = find_log_offset(f, end, cutoff_prefix)
+                window_continues = next_timestamped_line(f, 0, end)[0] == window_start
+                reversed_lines = read_lines_reversed(f, end, window_start)
+            try:
+                for raw_line in reversed_lines:
+                    parsed = parse_history_line(raw_line.decode('utf-8', 'replace'))
+                    if parsed is None:
+                        continue
+                    category, timestamp, values = parsed
                     if timestamp < cutoff_time:
+                        if f is None:
+                            window_continues = False
+                            break
                         continue
-                    
-                    # Extract GPU temps
-                    if 'GPU Temperatures:' in line:
-                        match = re.search(r'GPU Temperatures: ([\d\s,]+)°C', line)
-                        if match:
-                            temps_str = match.group(1)
-                            temps = [int(t.strip()) for t in temps_str.split(',') if t.strip().isdigit()]
-                            if temps:
-                                gpu_temps_history.append((timestamp, temps))
-                    
-                    # Extract system temps
-                    if 'System Temperatures:' in line:
-                        match = re.search(r'System Temperatures: ([\d\s,]+)°C', line)
-                        if match:
-                            temps_str = match.group(1)
-                            temps = [int(t.strip()) for t in temps_str.split(',') if t.strip().isdigit()]
-                            if temps:
-                                system_temps_history.append((timestamp, temps))
-                    
-                    # Extract fan speeds
-                    if 'Current Fan Speeds:' in line:
-                        match = re.search(r'Current Fan Speeds: ([\d\s,]+)', line)
-                        if match:
-                            speeds_str = match.group(1)
-                            speeds = [int(s.strip()) for s in speeds_str.split(',') if s.strip().isdigit()]
-                            if speeds:
-                                fan_speeds_history.append((timestamp, speeds))
-                
-                except (ValueError, IndexError):
-                    continue
+                    if len(history[category]) < entries:
+                        history[category].append((timestamp, values))
+                    if all(len(found) >= entries for found in history.values()):
+                        window_continues = False
+                        break
+            finally:
+                if f is not None:
+                    f.close()
+            if not window_continues:
+                break
+        
+        gpu_temps_history = history['gpu'][::-1]
+        system_temps_history = history['system'][::-1]
+        fan_speeds_history = history['fans'][::-1]
         
         # Display history
         print("\nGPU Temperature History:")
         if gpu_temps_history:
-            for timestamp, temps in gpu_temps_history[-20:]:  # Last 20 entries
+            for timestamp, temps in gpu_temps_history:
                 dt = datetime.fromtimestamp(timestamp)
                 max_temp = max(temps)
                 print(f"  {dt.strftime('%Y-%m-%d %H:%M:%S')}: {', '.join(map(str, temps))}°C (max: {max_temp}°C)")
@@ -881,7 +2932,7 @@ def show_detailed_history(hours=24):
         
         print("\nSystem Temperature History:")
         if system_temps_history:
-            for timestamp, temps in system_temps_history[-20:]:  # Last 20 entries
+            for timestamp, temps in system_temps_history:
                 dt = datetime.fromtimestamp(timestamp)
                 max_temp = max(temps)
                 print(f"  {dt.strftime('%Y-%m-%d %H:%M:%S')}: {', '.join(map(str, temps))}°C (max: {max_temp}°C)")
@@ -890,7 +2941,7 @@ def show_detailed_history(hours=24):
         
         print("\nFan Speed History:")
         if fan_speeds_history:
-            for timestamp, speeds in fan_speeds_history[-20:]:  # Last 20 entries
+            for timestamp, speeds in fan_speeds_history:
                 dt = datetime.fromtimestamp(timestamp)
                 avg_speed = sum(speeds) // len(speeds)
                 print(f"  {dt.strftime('%Y-%m-%d %H:%M:%S')}: {', '.join(map(str, speeds))} RPM (avg: {avg_speed} RPM)")
@@ -903,64 +2954,53 @@ def show_detailed_history(hours=24):
         print(f"Error reading log file: {e}")
 
 
-def main():
-    """Main function - runs once per execution."""
-    parser = argparse.ArgumentParser(
-        description='Dell R730 Fan Control - GPU Aware',
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  %(prog)s                    # Normal operation: check temps and adjust fans
-  %(prog)s --temps            # Check temperatures only (read-only)
-  %(prog)s --fans             # Check fan speeds only (read-only)
-  %(prog)s --history          # Show last 50 temperature log entries
-  %(prog)s --history 100      # Show last 100 temperature log entries
-  %(prog)s --history-detailed # Show detailed history for last 24 hours
-  %(prog)s --history-detailed 12  # Show detailed history for last 12 hours
-        """
-    )
-    
-    parser.add_argument('--temps', '--check-temps', action='store_true',
-                        help='Check and display current temperatures (read-only)')
-    parser.add_argument('--fans', '--check-fans', action='store_true',
-                        help='Check and display current fan speeds (read-only)')
-    parser.add_argument('--history', type=int, nargs='?', const=50, metavar='N',
-                        help='Show temperature history from log (default: 50 entries)')
-    parser.add_argument('--history-detailed', type=int, nargs='?', const=24, metavar='HOURS',
-                        help='Show detailed temperature history (default: 24 hours)')
-    
-    args = parser.parse_args()
-    
-    # Handle different modes
-    if args.temps:
-        setup_logging(read_only=True)
-        check_temperatures()
-        return
-    
-    if args.fans:
-        setup_logging(read_only=True)
-        check_fan_speeds()
-        return
-    
-    if args.history is not None:
-        setup_logging(read_only=True)
-        show_temperature_history(args.history)
-        return
-    
-    if args.history_detailed is not None:
-        setup_logging(read_only=True)
-        show_detailed_history(args.history_detailed)
-        return
-    
-    # Normal operation mode (default)
-    setup_logging(read_only=False)
+def record_cycle_metrics(readings, action, speed, reason):
+    """Set the per-cycle gauges from this cycle's readings and decision (no sensor is read here)."""
+    with metrics_registry.lock:
+        METRIC_TEMPERATURE.clear()
+        for source in ('gpu', 'system'):
+            for i, temp in enumerate(readings[source]):
+                METRIC_TEMPERATURE.set(temp, source=source, sensor=i)
+        METRIC_FAN_RPM.clear()
+        for i, rpm in enumerate(readings['fans']):
+            METRIC_FAN_RPM.set(rpm, fan=i)
+        METRIC_GPU_POWER.clear()
+        METRIC_GPU_UTILIZATION.clear()
+        for i, load in enumerate(gpu_load_readings):
+            if load.get('power_w') is not None:
+                METRIC_GPU_POWER.set(load['power_w'], gpu=i)
+            if load.get('utilization') is not None:
+                METRIC_GPU_UTILIZATION.set(load['utilization'], gpu=i)
+        METRIC_COMMANDED_SPEED.clear()
+        if action == 'manual':
+            METRIC_COMMANDED_SPEED.set(speed)
+        for mode in ('manual', 'auto'):
+            METRIC_MODE.set(1 if action == mode else 0, mode=mode)
+        # Temperatures in the reason would make a new series every cycle
+        METRIC_DECISION.clear()
+        METRIC_DECISION.set(1, action=action, reason=re.sub(r'\d+(\.\d+)?', 'N', reason))
+
+
+def run_control_cycle():
+    """
+    Run one acquire -> decide -> actuate cycle.
+    Returns True on success, False if manual fan mode could not be enabled.
+    """
     logger.info("=" * 60)
     logger.info("Dell R730 Fan Control - GPU Aware - Starting check")
     logger.info(f"iDRAC IP: {IDRAC_IP}")
     
-    # Get temperatures
-    gpu_temps = get_gpu_temperatures()
-    system_temps = get_system_temperatures()
+    # Fresh lm-sensors / IPMI sensor snapshots for this cycle
+    invalidate_sensor_snapshots()
+    
+    # Get temperatures and current fan speeds (concurrently, see SENSOR_ACQUISITION)
+    with trace_span('acquire') as span:
+        readings, timed_out = collect_sensor_readings()
+        if timed_out:
+            span['timed_out'] = timed_out
+    gpu_temps = readings['gpu']
+    system_temps = readings['system']
+    last_cycle_temperatures.update(gpu=gpu_temps, system=system_temps)
     
     # Log temperature readings
     if gpu_temps:
@@ -973,43 +3013,83 @@ Examples:
     else:
         logger.warning("System Temperatures: Unable to read")
     
-    # Get current fan speeds before making changes (for comparison)
-    current_fan_speeds = get_fan_speeds()
+    # Current fan speeds before making changes (for comparison)
+    current_fan_speeds = readings['fans']
     current_fan_speed_pct = None
     if current_fan_speeds:
         avg_current_speed = sum(current_fan_speeds) // len(current_fan_speeds)
         logger.info(f"Current Fan Speeds: {', '.join(map(str, current_fan_speeds))} RPM (avg: {avg_current_speed} RPM)")
     
-    # Determine action
-    action, speed, reason = determine_fan_action(gpu_temps, system_temps)
+    # Determine action (GPU power/utilization from the same read feeds the feedforward floor)
+    with trace_span('decide') as span:
+        action, speed, reason = determine_fan_action(gpu_temps, system_temps, gpu_load_readings)
+        span.update(action=action, speed=speed)
+    record_cycle_metrics(readings, action, speed, reason)
     
     # Log the decision reasoning
     logger.info(f"Decision: {reason}")
     
-    # Execute action
+    # Execute action (skipping writes iDRAC already has - see ACTUATOR_REASSERT_INTERVAL)
+    actuate_start = time.monotonic()
+    cached = cached_actuator_state()
+    writes_sent = 0
+    writes_skipped = 0
     if action == 'auto':
         logger.info(f"ACTION: Switching to AUTOMATIC mode - iDRAC will control fans")
         logger.info(f"Reason: {reason}")
-        enable_automatic_fan_mode()
+        if cached.get('mode') == 'auto':
+            logger.info("Automatic mode already active, skipping IPMI write")
+            writes_skipped += 1
+        else:
+            writes_sent += 1
+            if enable_automatic_fan_mode():
+                save_actuator_state('auto', None)
+            else:
+                clear_actuator_state()
         # Log data even in auto mode
         if current_fan_speeds:
             log_unified_data(gpu_temps, system_temps, current_fan_speeds, None)
     else:
-        # Enable manual mode and set fan speed
-        if enable_manual_fan_mode():
-            # Determine if fan speed is increasing or decreasing
-            speed_change = ""
-            if current_fan_speeds:
-                # Estimate current percentage (rough approximation)
-                # Fan speeds vary, so we'll just note the change
-                speed_change = f" (Target: {speed}%)"
-            
-            logger.info(f"ACTION: Setting fan speed to {speed}%{speed_change}")
-            logger.info(f"Reason: {reason}")
-            
-            if set_fan_speed(speed):
-                # Get fan speeds after change to confirm
-                new_fan_speeds = get_fan_speeds()
+        # Determine if fan speed is increasing or decreasing
+        speed_change = ""
+        if current_fan_speeds:
+            # Estimate current percentage (rough approximation)
+            # Fan speeds vary, so we'll just note the change
+            speed_change = f" (Target: {speed}%)"
+        
+        logger.info(f"ACTION: Setting fan speed to {speed}%{speed_change}")
+        logger.info(f"Reason: {reason}")
+        
+        if cached.get('mode') == 'manual' and cached.get('speed') == speed:
+            logger.info(f"Fan speed already {speed}% in manual mode, skipping IPMI writes")
+            manual_ok, speed_ok = True, True
+            writes_skipped += 2
+        elif cached.get('mode') == 'manual':
+            # Already in manual mode - only the speed changes
+            manual_ok, speed_ok = True, set_fan_speed(speed)
+            mode_written = False
+            writes_sent += 1
+            writes_skipped += 1
+        else:
+            # Enable manual mode and set fan speed (one IPMI round trip with IPMI_TRANSPORT=shell)
+            manual_ok, speed_ok = set_manual_fan_speed(speed)
+            mode_written = True
+            writes_sent += 2 if manual_ok else 1
+        
+        if writes_sent:
+            if manual_ok and speed_ok:
+                save_actuator_state('manual', speed, mode_written)
+            else:
+                clear_actuator_state()
+        
+        if manual_ok:
+            if speed_ok:
+                # Get fan speeds after change to confirm (nothing to confirm if no write was sent)
+                if writes_sent:
+                    invalidate_sensor_snapshots()
+                    new_fan_speeds = get_fan_speeds()
+                else:
+                    new_fan_speeds = current_fan_speeds
                 if new_fan_speeds:
                     avg_new_speed = sum(new_fan_speeds) // len(new_fan_speeds)
                     if current_fan_speeds:
@@ -1032,11 +3112,392 @@ Examples:
                     log_unified_data(gpu_temps, system_temps, current_fan_speeds, None)
         else:
             logger.error("Failed to enable manual mode")
-            sys.exit(1)
+            record_span('actuate', actuate_start, writes_sent=writes_sent, writes_skipped=writes_skipped)
+            log_actuator_stats(writes_sent, writes_skipped)
+            return False
     
+    record_span('actuate', actuate_start, writes_sent=writes_sent, writes_skipped=writes_skipped)
+    log_actuator_stats(writes_sent, writes_skipped)
     logger.info("Check complete")
     logger.info("=" * 60)
+    return True
+
+
+def run_monitored_cycle():
+    """
+    run_control_cycle(), counted and timed in the metrics, which are then published.
+    Its timing spans are kept in last_cycle_trace and logged as one JSON line at DEBUG.
+    """
+    global last_cycle_trace
+    trace = CycleTrace()
+    token = _cycle_trace.set(trace)
+    success = False
+    try:
+        success = run_control_cycle()
+        return success
+    finally:
+        METRIC_CYCLES.inc(result='ok' if success else 'failed')
+        METRIC_CYCLE_DURATION.observe(time.monotonic() - trace.start)
+        METRIC_LAST_CYCLE.set(time.time())
+        write_metrics_textfile()
+        _cycle_trace.reset(token)
+        trace.finish()
+        last_cycle_trace = trace.as_dict()
+        last_cycle_trace['result'] = 'ok' if success else 'failed'
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(last_cycle_trace))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def profile_cycles(cycles):
+    """
+    Run control cycles back to back (they actuate like normal cycles) and print
+    p50/p95/max per phase from their traces, with the backend that answered each source.
+    """
+    traces = []
+    for _ in range(cycles):
+        try:
+            run_monitored_cycle()
+        except Exception as e:
+            logger.exception(f"Control cycle failed: {e}")
+        traces.append(last_cycle_trace)
+    
+    # IPMI attempts are grouped by command and transport; phases are listed in the order they start
+    durations = {'cycle': [trace['duration_ms'] for trace in traces]}
+    first_start = {'cycle': -1}
+    outcomes = defaultdict(lambda: defaultdict(int))
+    for trace in traces:
+        for span in trace['spans']:
+            name = span['name']
+            if name == 'ipmi':
+                name = f"ipmi {span['command']} ({span['transport']})"
+                outcomes[name][span.get('result', 'error')] += 1
+                if span.get('attempt', 1) > 1:
+                    outcomes[name]['retries'] += 1
+                if span.get('retransmits'):
+                    outcomes[name]['retransmits'] += span['retransmits']
+            durations.setdefault(name, []).append(span['ms'])
+            first_start.setdefault(name, span['start_ms'])
+    
+    width = max(len(name) for name in durations)
+    print(f"\nProfile: {len(traces)} cycles")
+    print(f"{'Phase':<{width}}  {'Count':>6}  {'p50 ms':>9}  {'p95 ms':>9}  {'max ms':>9}")
+    for name in sorted(durations, key=first_start.get):
+        values = sorted(durations[name])
+        outcome = ', '.join(f"{result} {count}" for result, count in sorted(outcomes[name].items()))
+        print(f"{name:<{width}}  {len(values):>6}  {percentile(values, 0.5):>9.2f}  {percentile(values, 0.95):>9.2f}  "
+              f"{values[-1]:>9.2f}" + (f"  ({outcome})" if outcome else ''))
+    
+    print("\nBackends that answered:")
+    for source in ('gpu', 'system', 'fans'):
+        counts = defaultdict(int)
+        for trace in traces:
+            counts[trace['backends'].get(source, 'none')] += 1
+        print(f"  {source}: " + ', '.join(f"{backend} {count}/{len(traces)}"
+                                        for backend, count in sorted(counts.items(), key=lambda item: -item[1])))
+
+
+def restore_metrics_textfile():
+    """Carry the counters over from the last METRICS_TEXTFILE, so they survive one-shot runs."""
+    if not METRICS_TEXTFILE:
+        return
+    try:
+        with open(METRICS_TEXTFILE) as f:
+            metrics_registry.restore(f.read())
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not restore metrics from {METRICS_TEXTFILE}: {e}")
+
+
+def write_metrics_textfile():
+    """Atomically rewrite METRICS_TEXTFILE with the current metrics (if configured)."""
+    if not METRICS_TEXTFILE:
+        return
+    try:
+        with trace_span('log.metrics'):
+            metrics_registry.write_textfile(METRICS_TEXTFILE)
+    except OSError as e:
+        logger.warning(f"Could not write metrics textfile {METRICS_TEXTFILE}: {e}")
+
+
+def start_metrics_server():
+    """Serve /metrics on METRICS_ADDRESS:METRICS_PORT (daemon mode). Returns the server or None."""
+    if METRICS_PORT <= 0:
+        return None
+    try:
+        server = metrics.MetricsServer(metrics_registry, METRICS_ADDRESS, METRICS_PORT).start()
+    except OSError as e:
+        logger.error(f"Could not start metrics server on {METRICS_ADDRESS}:{METRICS_PORT}: {e}")
+        return None
+    logger.info(f"Serving metrics on http://{METRICS_ADDRESS}:{server.port}/metrics")
+    return server
+
+
+class AdaptiveInterval:
+    """
+    Picks the delay until the next control cycle from the temperature slope:
+    the minimum interval while any source changes faster than `slope` °C/min or is
+    within `margin` °C of a threshold, otherwise the previous interval times
+    `backoff`, up to the maximum. The slope is measured over at least `window`
+    seconds, so 1°C sensor steps a few seconds apart don't count as fast changes.
+    Counts cycles over the last hour.
+    """
+    
+    def __init__(self, min_interval=None, max_interval=None, backoff=None, slope=None, margin=None,
+                 window=None, thresholds=None):
+        self.min_interval = ADAPTIVE_MIN_INTERVAL if min_interval is None else min_interval
+        self.max_interval = max(self.min_interval, ADAPTIVE_MAX_INTERVAL if max_interval is None else max_interval)
+        self.backoff = ADAPTIVE_BACKOFF if backoff is None else backoff
+        self.slope = ADAPTIVE_SLOPE if slope is None else slope
+        self.margin = ADAPTIVE_MARGIN if margin is None else margin
+        self.window = ADAPTIVE_SLOPE_WINDOW if window is None else window
+        if thresholds is None:
+            # Level thresholds only matter to the steps controller; AUTO_MODE_THRESHOLD to all
+            steps = FAN_CONTROLLER not in ('curve', 'pid')
+            thresholds = {'gpu': (GPU_TEMP_LEVELS if steps else []) + [AUTO_MODE_THRESHOLD],
+                          'system': (SYSTEM_TEMP_LEVELS if steps else []) + [AUTO_MODE_THRESHOLD]}
+        self.thresholds = {source: sorted(levels) for source, levels in thresholds.items()}
+        self.interval = self.min_interval
+        self.history = defaultdict(deque)  # source -> (time, max temperature) covering the window
+        self.samples = deque()  # cycle times within the last hour
+    
+    def near_threshold(self, source, temp):
+        levels = self.thresholds.get(source, [])
+        i = bisect.bisect_left(levels, temp)
+        return any(abs(levels[j] - temp) <= self.margin for j in (i - 1, i) if 0 <= j < len(levels))
+    
+    def update(self, temperatures, now):
+        """Record this cycle's {'gpu': [...], 'system': [...]} and return (interval, why)."""
+        self.samples.append(now)
+        while self.samples and self.samples[0] <= now - 3600:
+            self.samples.popleft()
+        
+        fast = []
+        for source, temps in temperatures.items():
+            if not temps:
+                continue
+            temp = max(temps)
+            history = self.history[source]
+            history.append((now, temp))
+            # Keep the newest sample at least `window` old as the reference point
+            while len(history) > 2 and history[1][0] <= now - self.window:
+                history.popleft()
+            start_time, start_temp = history[0]
+            if now > start_time:
+                rate = (temp - start_temp) / (now - start_time) * 60
+                if abs(rate) >= self.slope:
+                    fast.append(f"{source} {rate:+.1f}°C/min")
+            if self.near_threshold(source, temp):
+                fast.append(f"{source} {temp}°C near a threshold")
+        
+        if fast:
+            self.interval = self.min_interval
+            return self.interval, ', '.join(fast)
+        self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval, 'stable'
+    
+    def samples_per_hour(self):
+        return len(self.samples)
+
+
+def wait_for_next_cycle(stop_event, delay, watchdog_enabled):
+    """Sleep until the next cycle (or stop), pinging the systemd watchdog during long waits."""
+    watchdog_usec = int(os.getenv('WATCHDOG_USEC', '0') or 0)
+    step = watchdog_usec / 2e6 if watchdog_enabled and watchdog_usec else None
+    deadline = time.monotonic() + delay
+    while not stop_event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if stop_event.wait(min(remaining, step) if step else remaining):
+            return
+        if step:
+            sd_notify('WATCHDOG=1')
+
+
+def sd_notify(state):
+    """Send a state string to systemd (Type=notify). No-op when not run by systemd."""
+    notify_socket = os.getenv('NOTIFY_SOCKET')
+    if not notify_socket:
+        return False
+    if notify_socket.startswith('@'):
+        # Abstract namespace socket
+        notify_socket = '\0' + notify_socket[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(notify_socket)
+            sock.sendall(state.encode())
+        return True
+    except OSError as e:
+        logger.debug(f"sd_notify failed: {e}")
+        return False
+
+
+def run_daemon(interval, adaptive=False):
+    """
+    Run the control loop in-process until SIGTERM/SIGINT.
+    Cycles are scheduled on the monotonic clock so wall-clock jumps do not
+    stretch or compress the interval; overrun slots are skipped, not queued.
+    With adaptive=True the interval follows the temperature slope (AdaptiveInterval).
+    """
+    stop_event = threading.Event()
+    
+    def request_stop(signum, frame):
+        logger.info(f"Received signal {signum}, stopping daemon")
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    watchdog_enabled = bool(os.getenv('WATCHDOG_USEC'))
+    restore_metrics_textfile()
+    metrics_server = start_metrics_server()
+    scheduler = AdaptiveInterval() if adaptive else None
+    if scheduler:
+        logger.info(f"Daemon mode started (adaptive interval: {scheduler.min_interval}-{scheduler.max_interval}s, "
+                    f"backoff x{scheduler.backoff})")
+    else:
+        logger.info(f"Daemon mode started (interval: {interval}s)")
+    sd_notify('READY=1')
+    
+    next_run = time.monotonic()
+    next_report = next_run + 3600
+    while not stop_event.is_set():
+        cycle_start = time.monotonic()
+        last_cycle_temperatures.clear()
+        try:
+            run_monitored_cycle()
+        except Exception as e:
+            # Never let one bad cycle kill the daemon
+            logger.exception(f"Control cycle failed: {e}")
+        
+        if watchdog_enabled:
+            sd_notify('WATCHDOG=1')
+        
+        # Rollups and retention of the data log, off the control loop
+        compact_data_log_if_due(background=True)
+        
+        if scheduler:
+            delay, why = scheduler.update(dict(last_cycle_temperatures), cycle_start)
+            logger.info(f"Next cycle in {delay:.1f}s ({why}; {scheduler.samples_per_hour()} samples in the last hour)")
+            if cycle_start >= next_report:
+                logger.info(f"Adaptive polling: {scheduler.samples_per_hour()} samples in the last hour "
+                            f"(a fixed {scheduler.min_interval}s interval would take {int(3600 / scheduler.min_interval)})")
+                next_report = cycle_start + 3600
+            wait_for_next_cycle(stop_event, cycle_start + delay - time.monotonic(), watchdog_enabled)
+            continue
+        
+        next_run += interval
+        now = time.monotonic()
+        if next_run <= now:
+            missed = int((now - next_run) // interval) + 1
+            logger.warning(f"Control cycle overran the {interval}s interval, skipping {missed} slot(s)")
+            next_run += missed * interval
+        wait_for_next_cycle(stop_event, next_run - now, watchdog_enabled)
+    
+    sd_notify('STOPPING=1')
+    if RESTORE_AUTO_ON_EXIT:
+        logger.info("Restoring automatic fan mode before exit")
+        if enable_automatic_fan_mode():
+            save_actuator_state('auto', None)
+        else:
+            clear_actuator_state()
+    if metrics_server:
+        metrics_server.close()
+    logger.info("Daemon stopped")
+
 
+def main():
+    """Main function - runs once per execution, or forever with --daemon."""
+    global FAN_CONTROLLER
+    parser = argparse.ArgumentParser(
+        description='Dell R730 Fan Control - GPU Aware',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s                    # Normal operation: check temps and adjust fans
+  %(prog)s --temps            # Check temperatures only (read-only)
+  %(prog)s --fans             # Check fan speeds only (read-only)
+  %(prog)s --history          # Show last 50 temperature log entries
+  %(prog)s --history 100      # Show last 100 temperature log entries
+  %(prog)s --history-detailed # Show detailed history for last 24 hours
+  %(prog)s --history-detailed 12  # Show detailed history for last 12 hours
+  %(prog)s --daemon           # Run continuously (interval from CONTROL_INTERVAL)
+  %(prog)s --daemon --interval 5  # Run continuously, one cycle every 5 seconds
+  %(prog)s --daemon --interval 5 --controller pid  # Continuous PID control
+  %(prog)s --daemon --adaptive  # Poll every 2s while temps move, back off when stable
+  %(prog)s --profile 20       # Run 20 cycles and print p50/p95/max per phase
+        """
+    )
+    
+    parser.add_argument('--temps', '--check-temps', action='store_true',
+                        help='Check and display current temperatures (read-only)')
+    parser.add_argument('--fans', '--check-fans', action='store_true',
+                        help='Check and display current fan speeds (read-only)')
+    parser.add_argument('--history', type=int, nargs='?', const=50, metavar='N',
+                        help='Show temperature history from log (default: 50 entries)')
+    parser.add_argument('--history-detailed', type=int, nargs='?', const=24, metavar='HOURS',
+                        help='Show detailed temperature history (default: 24 hours)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run continuously instead of once (for Type=notify systemd units)')
+    parser.add_argument('--interval', type=float, default=CONTROL_INTERVAL, metavar='SECONDS',
+                        help=f'Seconds between cycles in daemon mode (default: {CONTROL_INTERVAL})')
+    parser.add_argument('--adaptive', action='store_true', default=ADAPTIVE_INTERVAL,
+                        help='Daemon mode: adapt the interval to the temperature slope (ADAPTIVE_*)')
+    parser.add_argument('--controller', choices=['steps', 'curve', 'pid'],
+                        help=f'Fan controller (default: FAN_CONTROLLER={FAN_CONTROLLER})')
+    parser.add_argument('--profile', type=int, metavar='N',
+                        help='Run N control cycles back to back and print per-phase timings')
+    
+    args = parser.parse_args()
+    if args.interval <= 0:
+        parser.error('--interval must be greater than 0')
+    if args.profile is not None and (args.profile <= 0 or args.daemon):
+        parser.error('--profile needs a positive number of cycles and cannot be combined with --daemon')
+    if args.controller:
+        FAN_CONTROLLER = args.controller
+    
+    # Handle different modes
+    if args.temps:
+        setup_logging(read_only=True)
+        check_temperatures()
+        return
+    
+    if args.fans:
+        setup_logging(read_only=True)
+        check_fan_speeds()
+        return
+    
+    if args.history is not None:
+        setup_logging(read_only=True)
+        show_temperature_history(args.history)
+        return
+    
+    if args.history_detailed is not None:
+        setup_logging(read_only=True)
+        show_detailed_history(args.history_detailed)
+        return
+    
+    # Normal operation mode (default)
+    setup_logging(read_only=False)
+    
+    if args.daemon:
+        run_daemon(args.interval, adaptive=args.adaptive)
+        return
+    
+    restore_metrics_textfile()
+    if args.profile:
+        profile_cycles(args.profile)
+        return
+    if not run_monitored_cycle():
+        sys.exit(1)
+    # Once the fans are set: rollups and retention of the data log
+    compact_data_log_if_due()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+"""
+Fleet mode: control many iDRACs from one process.
+Reads a host inventory (FLEET_INVENTORY, see fleet.example.json) and runs every
+host's acquire -> decide -> actuate cycle concurrently on asyncio, with the same
+controllers as fan_control.py (steps, curve, pid) and per-host thresholds.
+
+- Sensors are read over IPMI ("sdr list", or "sensor reading" for the names in
+  the host's "sensors"); temperature sensors matching "gpu_sensors" count as GPU
+  temperatures, and "gpu_command" can add GPU temperatures from any command that
+  prints one per line (e.g. nvidia-smi over ssh).
+- FLEET_MAX_SESSIONS caps the IPMI commands in flight across the fleet (ipmitool
+  processes or native RMCP+ exchanges); FLEET_HOST_RATE caps each host's commands
+  per second; FLEET_CYCLE_DEADLINE abandons a host's cycle that takes too long.
+- A host without temperature readings, or with FLEET_FAILSAFE_AFTER failed cycles
+  in a row, is handed back to iDRAC automatic fan control.
+
+Usage:
+  python3 fleet.py                      # run until SIGTERM/SIGINT
+  python3 fleet.py --once               # one cycle on every host, then a summary
+  python3 fleet.py --check              # validate the inventory
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import logging
+import concurrent.futures
+
+import fan_control as fc
+import metrics
+
+# Configuration (fan_control.py has loaded .env)
+FLEET_INVENTORY = os.getenv('FLEET_INVENTORY', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fleet.json'))
+FLEET_STATE_DIR = os.getenv('FLEET_STATE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fleet_state'))
+FLEET_INTERVAL = float(os.getenv('FLEET_INTERVAL', str(fc.CONTROL_INTERVAL)))
+FLEET_MAX_SESSIONS = int(os.getenv('FLEET_MAX_SESSIONS', '16'))  # IPMI commands in flight, whole fleet
+FLEET_CYCLE_DEADLINE = float(os.getenv('FLEET_CYCLE_DEADLINE', '20'))  # seconds per host cycle
+FLEET_HOST_RATE = float(os.getenv('FLEET_HOST_RATE', '5'))  # IPMI commands per second per host (0 = unlimited)
+FLEET_FAILSAFE_AFTER = int(os.getenv('FLEET_FAILSAFE_AFTER', '2'))  # failed cycles before automatic mode
+
+FAN_MODE_MANUAL = ['raw', '0x30', '0x30', '0x01', '0x00']
+FAN_MODE_AUTO = ['raw', '0x30', '0x30', '0x01', '0x01']
+
+HOST_KEYS = {'name', 'address', 'port', 'user', 'password', 'password_env', 'cipher_suite', 'transport',
+             'sensors', 'gpu_sensors', 'gpu_command', 'controller', 'controller_options', 'deadline', 'rate'}
+CONTROLLERS = {'steps': fc.ThresholdEngine, 'curve': fc.FanCurveController, 'pid': fc.PidController}
+
+logger = logging.getLogger('fleet')
+
+registry = metrics.Registry()
+METRIC_CYCLES = registry.counter('fan_control_fleet_cycles', 'Host control cycles run', ['host', 'result'])
+METRIC_CYCLE_DURATION = registry.histogram(
+    'fan_control_fleet_cycle_duration_seconds', 'Host control cycle duration', ['host'])
+METRIC_TEMPERATURE = registry.gauge(
+    'fan_control_fleet_temperature_celsius', 'Hottest temperature read this cycle', ['host', 'source'])
+METRIC_COMMANDED_SPEED = registry.gauge(
+    'fan_control_fleet_commanded_fan_speed_percent', 'Fan speed set in manual mode', ['host'])
+METRIC_IPMI_COMMANDS = registry.counter('fan_control_fleet_ipmi_commands', 'IPMI commands run', ['host', 'result'])
+METRIC_SESSIONS = registry.gauge('fan_control_fleet_ipmi_sessions_active', 'IPMI commands in flight')
+
+
+def fan_speed_command(percentage):
+    return ['raw', '0x30', '0x30', '0x02', '0xff', f'0x{max(0, min(100, percentage)):02x}']
+
+
+def parse_gpu_output(output):
+    """GPU temperatures from a command printing one per line (the first number on each line)."""
+    temps = []
+    for line in output.splitlines():
+        match = re.match(r'\s*(-?\d+(?:\.\d+)?)', line)
+        if match:
+            temps.append(int(float(match.group(1))))
+    return temps
+
+
+class RateLimiter:
+    """Token bucket: `rate` requests per second on average, bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FleetHost:
+    """One iDRAC from the inventory: connection settings, controller, and the fan state last applied."""
+
+    def __init__(self, config, defaults, state_dir):
+        config = dict(defaults, **config)
+        unknown = set(config) - HOST_KEYS
+        if unknown:
+            raise ValueError(f"Unknown inventory keys: {', '.join(sorted(unknown))}")
+        if not config.get('address'):
+            raise ValueError(f"Host {config.get('name', '?')} has no address")
+        self.name = str(config.get('name') or config['address'])
+        self.address = config['address']
+        self.port = int(config.get('port', 623))
+        self.user = config.get('user', fc.IDRAC_USER)
+        if config.get('password_env'):
+            self.password = os.getenv(config['password_env'])
+            if self.password is None:
+                raise ValueError(f"{self.name}: ${config['password_env']} is not set")
+        else:
+            self.password = config.get('password', fc.IDRAC_PASS)
+        self.cipher_suite = int(config.get('cipher_suite', fc.IPMI_CIPHER_SUITE))
+        self.transport = config.get('transport', 'native' if fc.IPMI_TRANSPORT == 'native' else 'subprocess')
+        if self.transport not in ('native', 'subprocess'):
+            raise ValueError(f"{self.name}: transport must be native or subprocess, not {self.transport}")
+        self.sensors = list(config.get('sensors', []))
+        self.gpu_sensors = [pattern.lower() for pattern in config.get('gpu_sensors', [])]
+        self.gpu_command = config.get('gpu_command')
+        if self.gpu_command is not None and not (isinstance(self.gpu_command, list) and self.gpu_command):
+            raise ValueError(f"{self.name}: gpu_command must be a non-empty argument list")
+        self.deadline = float(config.get('deadline', FLEET_CYCLE_DEADLINE))
+        self.limiter = RateLimiter(float(config.get('rate', FLEET_HOST_RATE)))
+
+        file_name = re.sub(r'[^A-Za-z0-9_.-]', '_', self.name)
+        self.sdr_cache_file = os.path.join(state_dir, f'{file_name}.sdr')
+        controller = config.get('controller', fc.FAN_CONTROLLER)
+        if controller not in CONTROLLERS:
+            raise ValueError(f"{self.name}: controller must be one of {', '.join(CONTROLLERS)}, not {controller}")
+        try:
+            self.controller = CONTROLLERS[controller](state_file=os.path.join(state_dir, f'{file_name}.json'),
+                                                      **config.get('controller_options', {}))
+        except TypeError as e:
+            raise ValueError(f"{self.name}: invalid controller_options for {controller}: {e}")
+        self.controller_name = controller
+
+        self.client = None
+        self.applied = None  # {'mode', 'speed', 'mode_at'} last written to the BMC, None = unknown
+        self.failures = 0    # consecutive failed cycles
+        self.last = {}       # summary of the last cycle
+
+    def ipmitool_command(self):
+        command = ['ipmitool', '-I', 'lanplus', '-H', self.address, '-U', self.user, '-P', self.password]
+        if self.port != 623:
+            command += ['-p', str(self.port)]
+        if self.cipher_suite != 3:
+            command += ['-C', str(self.cipher_suite)]
+        if os.path.exists(self.sdr_cache_file):
+            command += ['-S', self.sdr_cache_file]
+        return command
+
+    def native_client(self):
+        if self.client is None:
+            import ipmi_lanplus
+            self.client = ipmi_lanplus.LanplusClient(
+                self.address, self.user, self.password, port=self.port, cipher_suite=self.cipher_suite,
+                timeout=min(fc.IPMI_TIMEOUT, 2), retries=fc.IPMI_RETRIES)
+        return self.client
+
+    def native_command(self, cmd_args):
+        """Run on an executor thread; errors become a failed result like ipmitool's."""
+        import ipmi_lanplus
+        try:
+            return fc.run_native_command(self.native_client(), cmd_args)
+        except (ValueError, ipmi_lanplus.IpmiError, OSError) as e:
+            return False, '', str(e)
+
+    def split_readings(self, rows):
+        """(gpu temps, system temps, fan speeds) from parsed sensor rows."""
+        gpu, system, fans = [], [], []
+        for row in rows:
+            if fc.IpmiSdrSnapshot.is_temperature(row):
+                is_gpu = any(pattern in row['name'].lower() for pattern in self.gpu_sensors)
+                (gpu if is_gpu else system).append(int(row['value']))
+            elif fc.IpmiSdrSnapshot.is_fan(row):
+                fans.append(int(row['value']))
+        return gpu, system, fans
+
+
+def load_inventory(path, state_dir=FLEET_STATE_DIR):
+    """
+    Read the inventory JSON: {"defaults": {...}, "hosts": [{"name", "address", ...}]}.
+    Host keys override the defaults. Raises ValueError on invalid entries.
+    """
+    with open(path) as f:
+        inventory = json.load(f)
+    defaults = inventory.get('defaults', {})
+    if 'name' in defaults or 'address' in defaults:
+        raise ValueError("defaults cannot set name or address")
+    os.makedirs(state_dir, exist_ok=True)
+    hosts = [FleetHost(config, defaults, state_dir) for config in inventory.get('hosts', [])]
+    names = [host.name for host in hosts]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate host names: {', '.join(duplicates)}")
+    return hosts
+
+
+class Fleet:
+    """
+    Runs the hosts' control cycles on one event loop. Every IPMI command takes a
+    token from its host's rate limiter, then one of max_sessions fleet-wide slots.
+    """
+
+    def __init__(self, hosts, max_sessions=None, interval=None):
+        self.hosts = hosts
+        self.max_sessions = max_sessions or FLEET_MAX_SESSIONS
+        self.interval = interval or FLEET_INTERVAL
+        self.sessions = asyncio.Semaphore(self.max_sessions)
+        self.active_sessions = 0
+        self.peak_sessions = 0
+        # Native commands block a thread each; a slot is held until its thread is done
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.max_sessions, thread_name_prefix='fleet-ipmi')
+
+    async def acquire_session(self):
+        await self.sessions.acquire()
+        self.active_sessions += 1
+        self.peak_sessions = max(self.peak_sessions, self.active_sessions)
+        METRIC_SESSIONS.set(self.active_sessions)
+
+    def release_session(self):
+        self.active_sessions -= 1
+        METRIC_SESSIONS.set(self.active_sessions)
+        self.sessions.release()
+
+    async def ipmi(self, host, cmd_args, retries=None):
+        """Run one IPMI command on host, returning (success, stdout, stderr)."""
+        retries = fc.IPMI_RETRIES if retries is None else retries
+        if host.transport == 'native':
+            # Retransmits and session re-establishment are handled by the client
+            result = await self.run_native(host, cmd_args)
+        else:
+            for attempt in range(retries + 1):
+                result = await self.run_ipmitool(host, cmd_args)
+                if result[0] or attempt == retries or result[2] == 'ipmitool not found':
+                    break
+                delay = fc.ipmi_backoff(attempt)
+                logger.debug(f"[{host.name}] IPMI command failed (attempt {attempt + 1}/{retries + 1}), "
+                             f"retrying in {delay:.2f}s...")
+                await asyncio.sleep(delay)
+        METRIC_IPMI_COMMANDS.inc(host=host.name, result='ok' if result[0] else 'error')
+        return result
+
+    async def run_native(self, host, cmd_args):
+        await host.limiter.acquire()
+        await self.acquire_session()
+        future = asyncio.get_running_loop().run_in_executor(self.executor, host.native_command, cmd_args)
+        future.add_done_callback(lambda _: self.release_session())
+        # A cancelled cycle stops waiting, but the thread (bounded by the client's timeouts) keeps its slot
+        return await asyncio.shield(future)
+
+    async def run_ipmitool(self, host, cmd_args):
+        await host.limiter.acquire()
+        await self.acquire_session()
+        try:
+            # Cancelling (the cycle was abandoned at its deadline) kills ipmitool
+            returncode, stdout, stderr = await fc.run_process_async(
+                host.ipmitool_command() + cmd_args, fc.IPMI_TIMEOUT)
+        except FileNotFoundError:
+            return False, '', 'ipmitool not found'
+        except OSError as e:
+            return False, '', str(e)
+        finally:
+            self.release_session()
+        if returncode is None:
+            return False, '', f'Command timed out after {fc.IPMI_TIMEOUT}s'
+        return returncode == 0, stdout, stderr
+
+    async def ensure_sdr_cache(self, host):
+        """Dump the host's SDR repository for ipmitool -S if due (see fan_control.sdr_cache_due)."""
+        if not fc.sdr_cache_due(host.sdr_cache_file):
+            return
+        fc.drop_sdr_cache(host.sdr_cache_file)  # Otherwise ipmitool -S would dump the old cache
+        success, _, stderr = await self.ipmi(host, ['sdr', 'dump', host.sdr_cache_file + '.tmp'], retries=0)
+        fc.finish_sdr_dump(host.sdr_cache_file, success)
+        if not success:
+            logger.debug(f"[{host.name}] Failed to cache SDR repository (retrying in {fc.IPMI_SDR_CACHE_RETRY}s): {stderr}")
+
+    async def read_sensors(self, host):
+        """Parsed sensor rows from one IPMI read."""
+        command = ['sensor', 'reading'] + host.sensors if host.sensors else ['sdr', 'list']
+        if host.transport == 'subprocess':
+            await self.ensure_sdr_cache(host)
+        success, stdout, stderr = await self.ipmi(host, command)
+        if (not success and host.transport == 'subprocess' and fc.sdr_cache_error(stderr)
+                and os.path.exists(host.sdr_cache_file)):
+            # A stale or corrupt cache makes ipmitool fail - drop it and read from the BMC
+            fc.drop_sdr_cache(host.sdr_cache_file)
+            success, stdout, stderr = await self.ipmi(host, command)
+        if not success:
+            logger.warning(f"[{host.name}] IPMI sensor read failed: {stderr.strip()}")
+            return []
+        return fc.IpmiSdrSnapshot.parse(stdout)
+
+    async def read_gpu_command(self, host):
+        if not host.gpu_command:
+            return []
+        try:
+            returncode, stdout, _ = await fc.run_process_async(host.gpu_command, fc.IPMI_TIMEOUT)
+        except OSError as e:
+            logger.warning(f"[{host.name}] GPU command failed: {e}")
+            return []
+        if returncode is None:
+            logger.warning(f"[{host.name}] GPU command timed out after {fc.IPMI_TIMEOUT}s")
+            return []
+        if returncode != 0:
+            logger.warning(f"[{host.name}] GPU command exited with status {returncode}")
+            return []
+        return parse_gpu_output(stdout)
+
+    async def actuate(self, host, action, speed):
+        """Apply the decision, skipping writes the BMC already has (see ACTUATOR_REASSERT_INTERVAL)."""
+        now = time.monotonic()
+        applied = host.applied
+        # The mode is re-sent ACTUATOR_REASSERT_INTERVAL after it was last sent, however often the speed changed
+        fresh = applied is not None and now - applied['mode_at'] < fc.ACTUATOR_REASSERT_INTERVAL
+        if action == 'auto':
+            if fresh and applied['mode'] == 'auto':
+                return True, 0
+            success = (await self.ipmi(host, FAN_MODE_AUTO))[0]
+            host.applied = {'mode': 'auto', 'speed': None, 'mode_at': now} if success else None
+            return success, 1
+        if fresh and applied['mode'] == 'manual' and applied['speed'] == speed:
+            return True, 0
+        writes = 1
+        if fresh and applied['mode'] == 'manual':
+            mode_at = applied['mode_at']
+        else:
+            if not (await self.ipmi(host, FAN_MODE_MANUAL))[0]:
+                host.applied = None
+                return False, 1
+            mode_at = now
+            writes += 1
+        success = (await self.ipmi(host, fan_speed_command(speed)))[0]
+        host.applied = {'mode': 'manual', 'speed': speed, 'mode_at': mode_at} if success else None
+        return success, writes
+
+    async def run_cycle(self, host):
+        """One acquire -> decide -> actuate cycle. Returns True if the decision was applied."""
+        rows, gpu_extra = await asyncio.gather(self.read_sensors(host), self.read_gpu_command(host))
+        gpu_temps, system_temps, fan_speeds = host.split_readings(rows)
+        gpu_temps += gpu_extra
+        if not gpu_temps and not system_temps:
+            action, speed, reason = 'auto', None, "No temperatures read - iDRAC controls the fans"
+        else:
+            action, speed, reason = host.controller.decide(gpu_temps, system_temps)
+        success, writes = await self.actuate(host, action, speed)
+
+        max_gpu = max(gpu_temps) if gpu_temps else None
+        max_system = max(system_temps) if system_temps else None
+        for source, temp in (('gpu', max_gpu), ('system', max_system)):
+            if temp is not None:
+                METRIC_TEMPERATURE.set(temp, host=host.name, source=source)
+        if action == 'manual' and success:
+            METRIC_COMMANDED_SPEED.set(speed, host=host.name)
+        host.last.update(action=action, speed=speed, max_gpu=max_gpu, max_system=max_system, writes=writes,
+                         fans=sum(fan_speeds) // len(fan_speeds) if fan_speeds else None)
+        target = f"{speed}%" if action == 'manual' else 'automatic'
+        logger.info(f"[{host.name}] GPU {max_gpu if max_gpu is not None else '-'}°C, "
+                    f"System {max_system if max_system is not None else '-'}°C -> {target}"
+                    f"{'' if success else ' FAILED'} ({reason})")
+        return success
+
+    async def run_host_cycle(self, host):
+        """run_cycle() within the host's deadline; hands the fans to iDRAC after repeated failures."""
+        start = time.monotonic()
+        result = 'failed'
+        try:
+            if await asyncio.wait_for(self.run_cycle(host), host.deadline):
+                result = 'ok'
+        except asyncio.TimeoutError:
+            result = 'deadline'
+            logger.warning(f"[{host.name}] Cycle abandoned at its {host.deadline:g}s deadline")
+            if host.client is not None:
+                host.client.abort()  # Free the session for the next command instead of finishing the scan
+        except Exception as e:
+            logger.exception(f"[{host.name}] Control cycle failed: {e}")
+        duration = time.monotonic() - start
+        METRIC_CYCLES.inc(host=host.name, result=result)
+        METRIC_CYCLE_DURATION.observe(duration, host=host.name)
+        host.last.update(result=result, duration=duration)
+        if result != 'ok':
+            host.last.update(action=None, speed=None)
+
+        host.failures = 0 if result == 'ok' else host.failures + 1
+        if host.failures >= FLEET_FAILSAFE_AFTER and (host.applied is None or host.applied['mode'] != 'auto'):
+            logger.warning(f"[{host.name}] {host.failures} failed cycles in a row, restoring automatic fan mode")
+            await self.restore_automatic(host)
+        return result
+
+    async def restore_automatic(self, host):
+        try:
+            success = (await asyncio.wait_for(self.ipmi(host, FAN_MODE_AUTO), host.deadline))[0]
+        except asyncio.TimeoutError:
+            success = False
+        host.applied = {'mode': 'auto', 'speed': None, 'mode_at': time.monotonic()} if success else None
+        if not success:
+            logger.error(f"[{host.name}] Failed to restore automatic fan mode")
+        return success
+
+    async def run_host(self, host, offset, stop):
+        """Cycle one host every interval until stop is set; overrun slots are skipped, not queued."""
+        if await wait_or_stop(stop, offset):
+            return
+        next_run = time.monotonic()
+        while not stop.is_set():
+            await self.run_host_cycle(host)
+            next_run += self.interval
+            now = time.monotonic()
+            if next_run <= now:
+                missed = int((now - next_run) // self.interval) + 1
+                logger.warning(f"[{host.name}] Cycle overran the {self.interval:g}s interval, skipping {missed} slot(s)")
+                next_run += missed * self.interval
+            if await wait_or_stop(stop, next_run - now):
+                return
+
+    async def run_once(self):
+        """One cycle on every host at once. Returns {host name: result}."""
+        results = await asyncio.gather(*(self.run_host_cycle(host) for host in self.hosts))
+        return {host.name: result for host, result in zip(self.hosts, results)}
+
+    async def run(self):
+        """Run every host until SIGTERM/SIGINT, starts spread evenly over the first interval."""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        metrics_server = None
+        if fc.METRICS_PORT:
+            metrics_server = metrics.MetricsServer(registry, fc.METRICS_ADDRESS, fc.METRICS_PORT).start()
+            logger.info(f"Serving metrics on http://{fc.METRICS_ADDRESS}:{metrics_server.port}/metrics")
+        logger.info(f"Fleet mode started: {len(self.hosts)} hosts, interval {self.interval:g}s, "
+                    f"{self.max_sessions} IPMI sessions, {FLEET_CYCLE_DEADLINE:g}s deadline, "
+                    f"{FLEET_HOST_RATE:g} commands/s per host")
+        fc.sd_notify('READY=1')
+        tasks = [asyncio.create_task(self.run_host(host, self.interval * i / len(self.hosts), stop))
+                 for i, host in enumerate(self.hosts)]
+        tasks.append(asyncio.create_task(self.publish_metrics(stop)))
+        await asyncio.gather(*tasks)
+
+        fc.sd_notify('STOPPING=1')
+        if fc.RESTORE_AUTO_ON_EXIT:
+            logger.info("Restoring automatic fan mode on every host before exit")
+            await asyncio.gather(*(self.restore_automatic(host) for host in self.hosts))
+        if metrics_server:
+            metrics_server.close()
+        log_summary(self)
+        logger.info("Fleet mode stopped")
+
+    async def publish_metrics(self, stop):
+        if not fc.METRICS_TEXTFILE:
+            return
+        while not await wait_or_stop(stop, self.interval):
+            try:
+                registry.write_textfile(fc.METRICS_TEXTFILE)
+            except OSError as e:
+                logger.warning(f"Failed to write metrics textfile {fc.METRICS_TEXTFILE}: {e}")
+
+    async def close(self):
+        """Close native sessions (off the event loop) and the executor."""
+        clients = [host.client for host in self.hosts if host.client is not None]
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, client.close) for client in clients))
+        self.executor.shutdown(wait=False)
+
+
+async def wait_or_stop(stop, delay):
+    """Sleep for delay seconds; returns True early if stop is set."""
+    try:
+        await asyncio.wait_for(stop.wait(), max(0, delay))
+        return True
+    except asyncio.TimeoutError:
+        return stop.is_set()
+
+
+def log_summary(fleet):
+    """One line per host: last result, duration and decision; then the fleet totals."""
+    width = max([len(host.name) for host in fleet.hosts] + [4])
+    lines = [f"{'Host':<{width}}  {'result':<8}  {'cycle':>8}  {'GPU':>4}  {'Sys':>4}  {'fans':>6}  fan mode"]
+    counts = {}
+    for host in fleet.hosts:
+        last = host.last
+        counts[last.get('result')] = counts.get(last.get('result'), 0) + 1
+        mode = {'manual': f"manual {last.get('speed')}%", 'auto': 'automatic'}.get(last.get('action'), '-')
+        gpu, system, fans = (last.get(key) for key in ('max_gpu', 'max_system', 'fans'))
+        lines.append(f"{host.name:<{width}}  {last.get('result', '-'):<8}  {last.get('duration', 0) * 1000:>6.0f}ms  "
+                     f"{'-' if gpu is None else gpu:>4}  {'-' if system is None else system:>4}  "
+                     f"{'-' if fans is None else fans:>6}  {mode}")
+    lines.append(', '.join(f"{count} {result}" for result, count in counts.items() if result) +
+                 f"; peak {fleet.peak_sessions}/{fleet.max_sessions} IPMI sessions")
+    for line in lines:
+        logger.info(line)
+
+
+async def run_fleet(hosts, once=False, max_sessions=None, interval=None):
+    fleet = Fleet(hosts, max_sessions, interval)
+    try:
+        if once:
+            results = await fleet.run_once()
+            log_summary(fleet)
+            return all(result == 'ok' for result in results.values())
+        await fleet.run()
+        return True
+    finally:
+        await fleet.close()
+
+
+def main():
+    global FLEET_CYCLE_DEADLINE, FLEET_HOST_RATE
+    parser = argparse.ArgumentParser(description='Dell R730/R720 fan control for a fleet of iDRACs')
+    parser.add_argument('--inventory', default=FLEET_INVENTORY, help=f'Host inventory JSON (default: {FLEET_INVENTORY})')
+    parser.add_argument('--once', action='store_true', help='Run one cycle on every host and exit')
+    parser.add_argument('--check', action='store_true', help='Validate the inventory and list the hosts')
+    parser.add_argument('--interval', type=float, default=FLEET_INTERVAL, help=f'Seconds between cycles (default: {FLEET_INTERVAL:g})')
+    parser.add_argument('--max-sessions', type=int, default=FLEET_MAX_SESSIONS,
+                        help=f'IPMI commands in flight across the fleet (default: {FLEET_MAX_SESSIONS})')
+    parser.add_argument('--deadline', type=float, help=f'Default per-host cycle deadline in seconds (default: {FLEET_CYCLE_DEADLINE:g})')
+    parser.add_argument('--rate', type=float, help=f'Default IPMI commands per second per host (default: {FLEET_HOST_RATE:g})')
+    args = parser.parse_args()
+    if args.interval <= 0 or args.max_sessions <= 0:
+        parser.error('--interval and --max-sessions must be greater than 0')
+    if args.deadline is not None:
+        FLEET_CYCLE_DEADLINE = args.deadline
+    if args.rate is not None:
+        FLEET_HOST_RATE = args.rate
+
+    try:
+        hosts = load_inventory(args.inventory)
+    except (OSError, ValueError) as e:
+        parser.error(f'{args.inventory}: {e}')
+    if not hosts:
+        parser.error(f'{args.inventory}: no hosts')
+    if args.check:
+        for host in hosts:
+            print(f"{host.name}: {host.address}:{host.port} ({host.transport}), {host.controller_name} controller, "
+                  f"deadline {host.deadline:g}s, {host.limiter.rate:g} commands/s"
+                  + (f", sensors {', '.join(host.sensors)}" if host.sensors else '')
+                  + (", GPU command" if host.gpu_command else ''))
+        return
+
+    fc.setup_logging(read_only=False)
+    if not asyncio.run(run_fleet(hosts, args.once, args.max_sessions, args.interval)):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
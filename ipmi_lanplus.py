@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Native IPMI v2.0 (RMCP+ / lanplus) client
+Talks to the iDRAC over one long-lived UDP socket and reuses the authenticated
+session across commands, instead of starting an ipmitool process (and doing a
+full RMCP+ handshake) for every command. Used by fan_control.py when
+IPMI_TRANSPORT=native.
+
+Supported cipher suites (IPMI_CIPHER_SUITE):
+- 1: RAKP-HMAC-SHA1 authentication, no integrity, no confidentiality
+- 2: RAKP-HMAC-SHA1 authentication, HMAC-SHA1-96 integrity
+- 3: RAKP-HMAC-SHA1 authentication, HMAC-SHA1-96 integrity, AES-CBC-128
+     confidentiality (iDRAC default; requires the optional 'cryptography' package)
+"""
+
+import hashlib
+import hmac
+import os
+import socket
+import struct
+import threading
+import time
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:  # Only needed for cipher suite 3
+    Cipher = None
+
+RMCP_HEADER = bytes([0x06, 0x00, 0xFF, 0x07])  # RMCP v1.0, no ACK, class IPMI
+AUTH_TYPE_RMCPP = 0x06
+
+# RMCP+ payload types
+PAYLOAD_IPMI = 0x00
+PAYLOAD_OPEN_SESSION_REQUEST = 0x10
+PAYLOAD_OPEN_SESSION_RESPONSE = 0x11
+PAYLOAD_RAKP1 = 0x12
+PAYLOAD_RAKP2 = 0x13
+PAYLOAD_RAKP3 = 0x14
+PAYLOAD_RAKP4 = 0x15
+PAYLOAD_ENCRYPTED = 0x80
+PAYLOAD_AUTHENTICATED = 0x40
+
+# Network functions and commands used by fan_control.py
+NETFN_SENSOR = 0x04
+NETFN_APP = 0x06
+NETFN_STORAGE = 0x0A
+CMD_GET_SENSOR_READING = 0x2D
+CMD_SET_SESSION_PRIVILEGE = 0x3B
+CMD_CLOSE_SESSION = 0x3C
+CMD_GET_SDR_REPOSITORY_INFO = 0x20
+CMD_RESERVE_SDR_REPOSITORY = 0x22
+CMD_GET_SDR = 0x23
+
+PRIV_ADMIN = 0x04
+ROLE_NAME_ONLY_LOOKUP = 0x10
+
+BMC_ADDRESS = 0x20
+REMOTE_CONSOLE_ADDRESS = 0x81
+
+# Cipher suite -> (authentication, integrity, confidentiality) algorithm IDs
+CIPHER_SUITES = {
+    1: (0x01, 0x00, 0x00),
+    2: (0x01, 0x01, 0x00),
+    3: (0x01, 0x01, 0x01),
+}
+
+# SDR sensor types and units we decode
+SENSOR_TYPE_TEMPERATURE = 0x01
+SENSOR_TYPE_FAN = 0x04
+SDR_RECORD_FULL_SENSOR = 0x01
+SENSOR_UNITS = {1: 'degrees C', 2: 'degrees F', 18: 'RPM'}
+
+SDR_CHUNK_SIZE = 16
+INTEGRITY_CODE_LENGTH = 12  # HMAC-SHA1-96
+
+
+class IpmiError(Exception):
+    """Raised when the BMC cannot be reached or the session fails."""
+
+
+class IpmiCompletionCodeError(IpmiError):
+    """Raised when the BMC answers a command with a non-zero completion code."""
+
+    def __init__(self, netfn, cmd, code):
+        super().__init__(f"IPMI command netfn=0x{netfn:02x} cmd=0x{cmd:02x} failed with completion code 0x{code:02x}")
+        self.netfn = netfn
+        self.cmd = cmd
+        self.code = code
+
+
+def checksum(data):
+    """IPMI 8-bit two's complement checksum."""
+    return (-sum(data)) & 0xFF
+
+
+def hmac_sha1(key, data):
+    return hmac.new(key, data, hashlib.sha1).digest()
+
+
+def signed_bits(value, bits):
+    """Interpret the low `bits` bits of value as two's complement."""
+    if value & (1 << (bits - 1)):
+        return value - (1 << bits)
+    return value
+
+
+# ---------------------------------------------------------------------------
+# RAKP key exchange (IPMI v2.0 section 13.31/13.32, RAKP-HMAC-SHA1)
+# ---------------------------------------------------------------------------
+
+def rakp2_auth_code(kuid, console_sid, bmc_sid, rm, rc, guid, role, username):
+    return hmac_sha1(kuid, struct.pack('<II', console_sid, bmc_sid) + rm + rc + guid +
+                     bytes([role, len(username)]) + username)
+
+
+def rakp3_auth_code(kuid, rc, console_sid, role, username):
+    return hmac_sha1(kuid, rc + struct.pack('<I', console_sid) + bytes([role, len(username)]) + username)
+
+
+def rakp4_integrity_check(sik, rm, bmc_sid, guid):
+    return hmac_sha1(sik, rm + struct.pack('<I', bmc_sid) + guid)[:INTEGRITY_CODE_LENGTH]
+
+
+def derive_session_keys(kg, rm, rc, role, username):
+    """Return (SIK, K1, K2) for the session."""
+    sik = hmac_sha1(kg, rm + rc + bytes([role, len(username)]) + username)
+    k1 = hmac_sha1(sik, b'\x01' * 20)
+    k2 = hmac_sha1(sik, b'\x02' * 20)
+    return sik, k1, k2
+
+
+def aes_cbc_encrypt(k2, data):
+    """AES-CBC-128 payload encryption: IV || E(data || pad || pad_length)."""
+    if Cipher is None:
+        raise IpmiError("Cipher suite 3 requires the 'cryptography' package (pip install cryptography)")
+    pad_length = (16 - (len(data) + 1) % 16) % 16
+    plaintext = data + bytes(range(1, pad_length + 1)) + bytes([pad_length])
+    iv = os.urandom(16)
+    encryptor = Cipher(algorithms.AES(k2[:16]), modes.CBC(iv)).encryptor()
+    return iv + encryptor.update(plaintext) + encryptor.finalize()
+
+
+def aes_cbc_decrypt(k2, data):
+    if Cipher is None:
+        raise IpmiError("Cipher suite 3 requires the 'cryptography' package (pip install cryptography)")
+    if len(data) < 32 or len(data) % 16:
+        raise IpmiError("Malformed encrypted payload")
+    decryptor = Cipher(algorithms.AES(k2[:16]), modes.CBC(data[:16])).decryptor()
+    plaintext = decryptor.update(data[16:]) + decryptor.finalize()
+    pad_length = plaintext[-1]
+    return plaintext[:-(pad_length + 1)]
+
+
+# ---------------------------------------------------------------------------
+# Packet framing
+# ---------------------------------------------------------------------------
+
+def build_session_packet(payload_type, session_id, sequence, payload, k1=None, k2=None):
+    """Wrap a payload in RMCP + IPMI v2.0 session headers (encrypting/signing if keys are given)."""
+    if k2 is not None:
+        payload = aes_cbc_encrypt(k2, payload)
+        payload_type |= PAYLOAD_ENCRYPTED
+    if k1 is not None:
+        payload_type |= PAYLOAD_AUTHENTICATED
+    session = struct.pack('<BBIIH', AUTH_TYPE_RMCPP, payload_type, session_id, sequence, len(payload)) + payload
+    if k1 is not None:
+        # Integrity pad so that the signed area (incl. pad length + next header) is a multiple of 4
+        pad_length = (4 - (len(session) + 2) % 4) % 4
+        session += b'\xff' * pad_length + bytes([pad_length, 0x07])
+        session += hmac_sha1(k1, session)[:INTEGRITY_CODE_LENGTH]
+    return RMCP_HEADER + session
+
+
+def parse_session_packet(packet, k1=None, k2=None):
+    """
+    Parse an RMCP+ packet.
+    Returns (payload_type, session_id, sequence, payload); raises IpmiError if it is
+    malformed or fails the integrity check.
+    """
+    if len(packet) < 16 or packet[:4] != RMCP_HEADER or packet[4] != AUTH_TYPE_RMCPP:
+        raise IpmiError("Not an RMCP+ packet")
+    payload_type, session_id, sequence, length = struct.unpack('<BIIH', packet[5:16])
+    payload = packet[16:16 + length]
+    if len(payload) != length:
+        raise IpmiError("Truncated RMCP+ packet")
+    if payload_type & PAYLOAD_AUTHENTICATED:
+        if k1 is None:
+            raise IpmiError("Unexpected authenticated packet")
+        signed, auth_code = packet[4:-INTEGRITY_CODE_LENGTH], packet[-INTEGRITY_CODE_LENGTH:]
+        if not hmac.compare_digest(hmac_sha1(k1, signed)[:INTEGRITY_CODE_LENGTH], auth_code):
+            raise IpmiError("RMCP+ integrity check failed")
+    if payload_type & PAYLOAD_ENCRYPTED:
+        if k2 is None:
+            raise IpmiError("Unexpected encrypted packet")
+        payload = aes_cbc_decrypt(k2, payload)
+    return payload_type & 0x3F, session_id, sequence, payload
+
+
+def build_ipmi_request(netfn, cmd, data, rq_seq, lun=0):
+    header = bytes([BMC_ADDRESS, (netfn << 2) | (lun & 0x03)])
+    body = bytes([REMOTE_CONSOLE_ADDRESS, (rq_seq << 2) & 0xFF, cmd]) + bytes(data)
+    return header + bytes([checksum(header)]) + body + bytes([checksum(body)])
+
+
+def build_ipmi_response(request, completion_code, data=b''):
+    """Build the response to a parsed request dict (used by the mock BMC)."""
+    header = bytes([request['rq_addr'], ((request['netfn'] | 1) << 2) | request['rq_lun']])
+    body = bytes([BMC_ADDRESS, (request['rq_seq'] << 2) | request['lun'], request['cmd'], completion_code]) + bytes(data)
+    return header + bytes([checksum(header)]) + body + bytes([checksum(body)])
+
+
+def parse_ipmi_request(message):
+    if len(message) < 7 or checksum(message[:2]) != message[2] or checksum(message[3:-1]) != message[-1]:
+        raise IpmiError("Malformed IPMI request")
+    return {
+        'netfn': message[1] >> 2,
+        'lun': message[1] & 0x03,
+        'rq_addr': message[3],
+        'rq_seq': message[4] >> 2,
+        'rq_lun': message[4] & 0x03,
+        'cmd': message[5],
+        'data': message[6:-1],
+    }
+
+
+def parse_ipmi_response(message):
+    """Returns (netfn, rq_seq, cmd, completion_code, data)."""
+    if len(message) < 8 or checksum(message[:2]) != message[2] or checksum(message[3:-1]) != message[-1]:
+        raise IpmiError("Malformed IPMI response")
+    return message[1] >> 2, message[4] >> 2, message[5], message[6], message[7:-1]
+
+
+# ---------------------------------------------------------------------------
+# SDR decoding
+# ---------------------------------------------------------------------------
+
+def decode_full_sensor_record(record):
+    """
+    Decode a Full Sensor Record (type 0x01) into a dict, or None for records we
+    cannot convert (non-linear, no analog reading, other record types).
+    """
+    if len(record) < 48 or record[3] != SDR_RECORD_FULL_SENSOR:
+        return None
+    analog_format = record[20] >> 6
+    if analog_format == 3 or (record[23] & 0x7F) != 0:  # no analog reading / non-linear
+        return None
+    name_length = record[47] & 0x1F
+    return {
+        'name': record[48:48 + name_length].decode('ascii', 'replace').strip(),
+        'owner': record[5],
+        'lun': record[6] & 0x03,
+        'number': record[7],
+        'type': record[12],
+        'analog_format': analog_format,
+        'percentage': bool(record[20] & 0x01),
+        'unit': SENSOR_UNITS.get(record[21], ''),
+        'm': signed_bits(record[24] | ((record[25] & 0xC0) << 2), 10),
+        'b': signed_bits(record[26] | ((record[27] & 0xC0) << 2), 10),
+        'r_exp': signed_bits(record[29] >> 4, 4),
+        'b_exp': signed_bits(record[29] & 0x0F, 4),
+    }
+
+
+def convert_sensor_reading(sensor, raw):
+    """Apply the linear conversion y = (M*x + B*10^Bexp) * 10^Rexp."""
+    if sensor['analog_format'] == 1:
+        raw = -((~raw) & 0x7F) if raw & 0x80 else raw
+    elif sensor['analog_format'] == 2:
+        raw = signed_bits(raw, 8)
+    return (sensor['m'] * raw + sensor['b'] * (10 ** sensor['b_exp'])) * (10 ** sensor['r_exp'])
+
+
+def format_sdr_list(readings):
+    """Render sensor readings like `ipmitool sdr list` so existing parsers keep working."""
+    lines = []
+    for reading in readings:
+        if reading['value'] is None:
+            lines.append(f"{reading['name']:<16} | no reading        | ns")
+        else:
+            unit = 'percent' if reading['percentage'] else reading['unit']
+            lines.append(f"{reading['name']:<16} | {round(reading['value'])} {unit:<14}| ok")
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+
+def format_sensor_reading(readings):
+    """Render sensor readings like `ipmitool sensor reading <id>...`."""
+    lines = [f"{reading['name']:<16} | {reading['value']:g}" for reading in readings if reading['value'] is not None]
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class LanplusClient:
+    """
+    RMCP+ session to one BMC.
+    The session is opened lazily on first use and reopened transparently if the
+    BMC stops answering (e.g. the iDRAC expired an idle session).
+    """
+
+    def __init__(self, host, username, password, port=623, cipher_suite=3, timeout=2.0, retries=2):
+        if cipher_suite not in CIPHER_SUITES:
+            raise ValueError(f"Unsupported cipher suite {cipher_suite} (supported: {sorted(CIPHER_SUITES)})")
+        self.host = host
+        self.port = port
+        self.username = username.encode()
+        self.kuid = password.encode()[:20]
+        self.cipher_suite = cipher_suite
+        self.timeout = timeout
+        self.retries = retries
+        self.sock = None
+        self.lock = threading.RLock()
+        self.sdr_cache = None
+        self.retransmits = 0  # datagrams re-sent after a timeout, for monitoring
+        self.aborted = threading.Event()
+        self._reset_session()
+
+    def _reset_session(self):
+        self.console_sid = 0
+        self.bmc_sid = 0
+        self.sequence = 0
+        self.rq_seq = 0
+        self.k1 = None
+        self.k2 = None
+        self.active = False
+
+    # -- transport ---------------------------------------------------------
+
+    def _ensure_socket(self):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.connect((self.host, self.port))
+
+    def _exchange(self, build_packet, match, timeout):
+        """
+        Send a packet and wait for a matching response, retransmitting on timeout.
+        build_packet() is called per attempt so each retransmit gets a fresh sequence number.
+        """
+        self._ensure_socket()
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retransmits += 1
+            self.sock.send(build_packet())
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.sock.settimeout(remaining)
+                try:
+                    packet = self.sock.recv(4096)
+                except socket.timeout:
+                    break
+                except ConnectionRefusedError:
+                    raise IpmiError(f"Connection refused by {self.host}:{self.port}")
+                try:
+                    result = match(packet)
+                except IpmiError:
+                    continue  # Stale or corrupt datagram - keep waiting
+                if result is not None:
+                    return result
+        raise IpmiError(f"No response from {self.host}:{self.port} after {self.retries + 1} attempts")
+
+    def _handshake(self, payload_type, payload, response_type, timeout):
+        tag = payload[0]
+
+        def match(packet):
+            ptype, _, _, response = parse_session_packet(packet)
+            if ptype == response_type and response and response[0] == tag:
+                return response
+            return None
+
+        return self._exchange(lambda: build_session_packet(payload_type, 0, 0, payload), match, timeout)
+
+    # -- session -----------------------------------------------------------
+
+    def open(self):
+        """Establish the RMCP+ session (Open Session + RAKP 1-4) and raise it to ADMIN."""
+        with self.lock:
+            if self.active:
+                return
+            self._reset_session()
+            auth_alg, integrity_alg, confidentiality_alg = CIPHER_SUITES[self.cipher_suite]
+            self.console_sid = struct.unpack('<I', os.urandom(4))[0] | 1
+            tag = os.urandom(1)[0]
+
+            request = bytes([tag, PRIV_ADMIN, 0, 0]) + struct.pack('<I', self.console_sid)
+            for payload_kind, algorithm in enumerate((auth_alg, integrity_alg, confidentiality_alg)):
+                request += bytes([payload_kind, 0, 0, 8, algorithm, 0, 0, 0])
+            response = self._handshake(PAYLOAD_OPEN_SESSION_REQUEST, request, PAYLOAD_OPEN_SESSION_RESPONSE, self.timeout)
+            if len(response) < 12 or response[1] != 0:
+                raise IpmiError(f"Open Session rejected (status 0x{response[1]:02x}) - check IPMI_CIPHER_SUITE")
+            self.bmc_sid = struct.unpack('<I', response[8:12])[0]
+
+            role = PRIV_ADMIN | ROLE_NAME_ONLY_LOOKUP
+            rm = os.urandom(16)
+            rakp1 = (bytes([tag, 0, 0, 0]) + struct.pack('<I', self.bmc_sid) + rm +
+                     bytes([role, 0, 0, len(self.username)]) + self.username)
+            rakp2 = self._handshake(PAYLOAD_RAKP1, rakp1, PAYLOAD_RAKP2, self.timeout)
+            if len(rakp2) < 60 or rakp2[1] != 0:
+                raise IpmiError(f"RAKP2 rejected (status 0x{rakp2[1]:02x}) - check IDRAC_USER")
+            rc, guid, auth_code = rakp2[8:24], rakp2[24:40], rakp2[40:60]
+            expected = rakp2_auth_code(self.kuid, self.console_sid, self.bmc_sid, rm, rc, guid, role, self.username)
+            if not hmac.compare_digest(auth_code, expected):
+                raise IpmiError("RAKP2 authentication failed - check IDRAC_USER/IDRAC_PASS")
+
+            rakp3 = (bytes([tag, 0, 0, 0]) + struct.pack('<I', self.bmc_sid) +
+                     rakp3_auth_code(self.kuid, rc, self.console_sid, role, self.username))
+            rakp4 = self._handshake(PAYLOAD_RAKP3, rakp3, PAYLOAD_RAKP4, self.timeout)
+            if len(rakp4) < 8 + INTEGRITY_CODE_LENGTH or rakp4[1] != 0:
+                raise IpmiError(f"RAKP4 rejected (status 0x{rakp4[1]:02x})")
+            sik, k1, k2 = derive_session_keys(self.kuid, rm, rc, role, self.username)
+            if not hmac.compare_digest(rakp4[8:8 + INTEGRITY_CODE_LENGTH], rakp4_integrity_check(sik, rm, self.bmc_sid, guid)):
+                raise IpmiError("RAKP4 integrity check failed")
+            self.k1 = k1 if integrity_alg else None
+            self.k2 = k2 if confidentiality_alg else None
+            self.active = True
+
+            # Sessions start at USER privilege; fan control needs ADMIN
+            self._send_command(NETFN_APP, CMD_SET_SESSION_PRIVILEGE, bytes([PRIV_ADMIN]))
+
+    def close(self):
+        """Close the session (best effort) and the socket."""
+        with self.lock:
+            if self.active:
+                try:
+                    self._send_command(NETFN_APP, CMD_CLOSE_SESSION, struct.pack('<I', self.bmc_sid), retries=0)
+                except IpmiError:
+                    pass
+            self._reset_session()
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+
+    # -- commands ----------------------------------------------------------
+
+    def _send_command(self, netfn, cmd, data=b'', lun=0, retries=None):
+        """Send one IPMI request on the active session and return the response data."""
+        rq_seq = self.rq_seq = (self.rq_seq + 1) & 0x3F
+        message = build_ipmi_request(netfn, cmd, data, rq_seq, lun)
+
+        def build_packet():
+            self.sequence = (self.sequence + 1) & 0xFFFFFFFF or 1
+            return build_session_packet(PAYLOAD_IPMI, self.bmc_sid, self.sequence, message, self.k1, self.k2)
+
+        def match(packet):
+            ptype, session_id, _, payload = parse_session_packet(packet, self.k1, self.k2)
+            if ptype != PAYLOAD_IPMI or session_id != self.console_sid:
+                return None
+            response = parse_ipmi_response(payload)
+            if response[1] != rq_seq or response[2] != cmd:
+                return None
+            return response
+
+        saved_retries = self.retries
+        if retries is not None:
+            self.retries = retries
+        try:
+            _, _, _, completion_code, response_data = self._exchange(build_packet, match, self.timeout)
+        finally:
+            self.retries = saved_retries
+        if completion_code != 0:
+            raise IpmiCompletionCodeError(netfn, cmd, completion_code)
+        return response_data
+
+    def raw(self, netfn, cmd, data=b'', lun=0):
+        """
+        Send a raw command (like `ipmitool raw`), opening the session if needed.
+        A session that stops answering is re-established once before giving up.
+        """
+        with self.lock:
+            for attempt in range(2):
+                self.open()
+                try:
+                    return self._send_command(netfn, cmd, data, lun)
+                except IpmiCompletionCodeError:
+                    raise
+                except IpmiError:
+                    if attempt:
+                        raise
+                    self._reset_session()  # Session probably expired - reconnect
+
+    def abort(self):
+        """
+        Stop an SDR or sensor scan in progress (from another thread) before its next
+        request, with IpmiError. The next scan starts normally.
+        """
+        self.aborted.set()
+
+    def _check_aborted(self):
+        if self.aborted.is_set():
+            self.aborted.clear()
+            raise IpmiError("Aborted")
+
+    def get_sdr_sensors(self, refresh=False):
+        """Read and decode the SDR repository (cached for the lifetime of the client)."""
+        with self.lock:
+            if self.sdr_cache is not None and not refresh:
+                return self.sdr_cache
+            sensors = []
+            reservation = self.raw(NETFN_STORAGE, CMD_RESERVE_SDR_REPOSITORY)[:2]
+            record_id = 0
+            while record_id != 0xFFFF:
+                self._check_aborted()
+                header = self.raw(NETFN_STORAGE, CMD_GET_SDR, reservation + struct.pack('<HBB', record_id, 0, 5))
+                next_id = struct.unpack('<H', header[:2])[0]
+                record = bytearray(header[2:7])
+                length = record[4]
+                while len(record) < length + 5:
+                    chunk = min(SDR_CHUNK_SIZE, length + 5 - len(record))
+                    part = self.raw(NETFN_STORAGE, CMD_GET_SDR, reservation + struct.pack('<HBB', record_id, len(record), chunk))
+                    record += part[2:]
+                sensor = decode_full_sensor_record(bytes(record))
+                if sensor is not None:
+                    sensors.append(sensor)
+                record_id = next_id
+            self.sdr_cache = sensors
+            return sensors
+
+    def read_sensors(self, sensor_types=(SENSOR_TYPE_TEMPERATURE, SENSOR_TYPE_FAN), names=None):
+        """
+        Return [{'name', 'value', 'unit', 'type', 'percentage'}] for the requested
+        sensor types, or only for the sensors with the given names.
+        """
+        readings = []
+        with self.lock:
+            self.aborted.clear()  # An abort() with no scan running is stale
+            for sensor in self.get_sdr_sensors():
+                if names is not None:
+                    if sensor['name'] not in names:
+                        continue
+                elif sensor_types and sensor['type'] not in sensor_types:
+                    continue
+                self._check_aborted()
+                value = None
+                try:
+                    response = self.raw(NETFN_SENSOR, CMD_GET_SENSOR_READING, bytes([sensor['number']]), sensor['lun'])
+                    # Byte 2 bit 5 set = reading unavailable
+                    if len(response) >= 2 and not response[1] & 0x20:
+                        value = convert_sensor_reading(sensor, response[0])
+                except IpmiCompletionCodeError:
+                    pass  # Sensor not present (e.g. empty fan bay)
+                readings.append({
+                    'name': sensor['name'],
+                    'value': value,
+                    'unit': sensor['unit'],
+                    'type': sensor['type'],
+                    'percentage': sensor['percentage'],
+                })
+        return readings
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+NumPy analysis engine for learn_thresholds.py (--engine numpy)
+Loads the analysis window of the unified data log into column arrays once, in
+chunks, and computes the report from them with NumPy instead of a dict per record:
+
+- binary backend: record headers are read straight out of the data file using
+  the index offsets; the per-sensor payloads are only parsed for --sensors
+- sqlite backend: rows are fetched in batches and converted to columns
+- text backend: lines are parsed in batches with np.loadtxt
+
+A text batch np.loadtxt does not accept (blank values, a truncated or partly
+written line, anything but plain numbers) is handed to the pure-Python parser in
+data_store, so both engines see the same records. Means and standard deviations
+are NumPy's, so they can differ from the pure-Python engine's in the last few
+bits; the report, printed to 0.1°C, is the same.
+"""
+
+import io
+import math
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import data_store
+
+CHUNK_BYTES = 4 << 20  # Text read granularity
+CHUNK_RECORDS = 50000  # Binary and sqlite records per chunk
+
+TEXT_COLUMNS = np.dtype([('timestamp', 'S20'), ('max_gpu', 'f8'), ('max_system', 'f8'),
+                         ('avg_fan_rpm', 'i8'), ('fan_speed_pct', 'i8')])
+
+
+def values_matrix(rows):
+    """NaN-padded matrix from lists of numbers."""
+    width = max((len(row) for row in rows), default=0)
+    matrix = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        matrix[i, :len(row)] = row
+    return matrix
+
+
+def csv_matrix(fields):
+    """NaN-padded matrix of the numbers in per-sensor CSV fields, one row per field."""
+    counts = np.array([field.count(',') + 1 if field else 0 for field in fields], dtype=np.int64)
+    try:
+        # One number per line; np.loadtxt skips the blank lines of empty fields
+        values = np.loadtxt(io.StringIO('\n'.join(fields).replace(',', '\n')), comments=None, ndmin=1)
+        if len(values) != counts.sum():
+            raise ValueError("empty value")
+    except ValueError:  # An empty or unparsable value: data_store.split_values() skips it
+        return values_matrix([data_store.split_values(field) for field in fields])
+    matrix = np.full((len(fields), int(counts.max(initial=0))), np.nan)
+    rows = np.repeat(np.arange(len(fields)), counts)
+    matrix[rows, np.arange(len(values)) - np.repeat(np.cumsum(counts) - counts, counts)] = values
+    return matrix
+
+
+def sensor_matrices(gpu_fields, system_fields):
+    """GPU and system temperature matrices from the per-sensor CSV fields."""
+    return csv_matrix(gpu_fields), csv_matrix(system_fields)
+
+
+def local_timestamps(naive):
+    """Epoch seconds for wall-clock seconds (as datetime.timestamp() does), one UTC offset lookup per hour."""
+    hours, inverse = np.unique(naive // 3600, return_inverse=True)
+    epoch = datetime(1970, 1, 1)
+    offsets = np.array([(epoch + timedelta(hours=hour)).timestamp() - hour * 3600 for hour in hours.tolist()])
+    return naive + offsets[inverse.ravel()]
+
+
+def chunk_columns(timestamp, max_temp, avg_fan_rpm, fan_speed_pct, gpu=None, system=None):
+    return {
+        'timestamp': np.asarray(timestamp, dtype=np.float64),
+        'max_temp': np.asarray(max_temp, dtype=np.float64),
+        'avg_fan_rpm': np.asarray(avg_fan_rpm, dtype=np.int64),
+        'fan_speed_pct': np.asarray(fan_speed_pct, dtype=np.int64),
+        'gpu': gpu,
+        'system': system,
+    }
+
+
+def record_columns(records, sensors):
+    """Columns from DataRecords (the pure-Python parser's output)."""
+    gpu = system = None
+    if sensors:
+        gpu, system = sensor_matrices([record.gpu_temps for record in records],
+                                      [record.system_temps for record in records])
+    return chunk_columns([record.timestamp for record in records],
+                         [max(record.max_gpu, record.max_system) for record in records],
+                         [record.avg_fan_rpm for record in records],
+                         [record.fan_speed_pct for record in records], gpu, system)
+
+
+def text_chunk(lines, start_text, sensors):
+    """Columns for complete text log lines with a timestamp >= start_text."""
+    try:
+        fields = np.loadtxt(lines, delimiter='|', usecols=range(5), dtype=TEXT_COLUMNS, comments=None, ndmin=1)
+        if not (np.char.str_len(fields['timestamp']) == 19).all():
+            raise ValueError("unexpected timestamp")
+        if start_text is not None:
+            fields = fields[fields['timestamp'] >= start_text.encode()]
+        naive = fields['timestamp'].astype('datetime64[s]').astype(np.int64)
+        if not (np.isfinite(fields['max_gpu']).all() and np.isfinite(fields['max_system']).all()):
+            raise ValueError("non-finite temperature")
+    except ValueError:
+        # Something only the Python parser handles (the same way query() does)
+        records = []
+        for line in lines:
+            text = line.decode('utf-8', 'replace')
+            if start_text is not None and text[:19] < start_text:
+                continue
+            record = data_store.parse_text_line(text)
+            if record is not None:
+                records.append(record)
+        return record_columns(records, sensors)
+    gpu = system = None
+    if sensors:
+        keep = [line for line in lines if line.strip() and (start_text is None or line[:19] >= start_text.encode())]
+        payloads = [line.rstrip(b'\n').decode('utf-8', 'replace').split('|')[5:7] + ['', ''] for line in keep]
+        gpu, system = sensor_matrices([payload[0] for payload in payloads], [payload[1] for payload in payloads])
+    return chunk_columns(local_timestamps(naive), np.maximum(fields['max_gpu'], fields['max_system']),
+                         fields['avg_fan_rpm'], fields['fan_speed_pct'], gpu, system)
+
+
+def text_chunks(path, start, sensors):
+    start_text = datetime.fromtimestamp(math.ceil(start)).strftime(data_store.TIMESTAMP_FORMAT) if start is not None else None
+    with open(path, 'rb') as f:
+        remainder = b''
+        while True:
+            block = f.read(CHUNK_BYTES)
+            if not block:
+                break
+            data = remainder + block
+            cut = data.rfind(b'\n') + 1
+            remainder = data[cut:]
+            if cut:
+                yield text_chunk(data[:cut].splitlines(keepends=True), start_text, sensors)
+        if remainder:  # The text backend's query() also returns an unterminated last line
+            yield text_chunk([remainder + b'\n'], start_text, sensors)
+
+
+def binary_chunks(store, start, sensors):
+    header_size = store.HEADER.size
+    header_dtype = np.dtype([('timestamp', '<f8'), ('max_gpu', '<f8'), ('max_system', '<f8'),
+                             ('avg_fan_rpm', '<u4'), ('fan_speed_pct', '<u2'), ('length', '<u2')])
+    index = np.fromfile(store.index_path, dtype=np.dtype([('timestamp', '<f8'), ('offset', '<u8')]),
+                        count=store.index_entries())
+    first = int(np.searchsorted(index['timestamp'], start, side='left')) if start is not None else 0
+    for chunk_start in range(first, len(index), CHUNK_RECORDS):
+        offsets = index['offset'][chunk_start:chunk_start + CHUNK_RECORDS].astype(np.int64)
+        last_header = store.HEADER.unpack(os.pread(store.data_fd, header_size, int(offsets[-1])))
+        begin, end = int(offsets[0]), int(offsets[-1]) + header_size + last_header[-1]
+        buffer = np.frombuffer(os.pread(store.data_fd, end - begin, begin), dtype=np.uint8)
+        relative = offsets - begin
+        headers = buffer[relative[:, None] + np.arange(header_size)].view(header_dtype).ravel()
+        gpu = system = None
+        if sensors:
+            data = buffer.tobytes()
+            payloads = [data[offset:offset + length].decode('utf-8', 'replace').split('|') + ['', '']
+                        for offset, length in zip((relative + header_size).tolist(), headers['length'].tolist())]
+            gpu, system = sensor_matrices([payload[0] for payload in payloads], [payload[1] for payload in payloads])
+        yield chunk_columns(headers['timestamp'], np.maximum(headers['max_gpu'], headers['max_system']),
+                            headers['avg_fan_rpm'], headers['fan_speed_pct'], gpu, system)
+
+
+def sqlite_chunks(store, start, sensors):
+    columns = '*' if sensors else 'timestamp, max_gpu, max_system, avg_fan_rpm, fan_speed_pct'
+    cursor = store.connection.execute(f'SELECT {columns} FROM samples WHERE timestamp >= ? ORDER BY timestamp, rowid',
+                                      (start if start is not None else float('-inf'),))
+    while True:
+        rows = cursor.fetchmany(CHUNK_RECORDS)
+        if not rows:
+            break
+        fields = list(zip(*rows))
+        gpu = system = None
+        if sensors:
+            gpu, system = sensor_matrices(fields[5], fields[6])
+        yield chunk_columns(fields[0], np.maximum(np.array(fields[1], dtype=np.float64), np.array(fields[2], dtype=np.float64)),
+                            fields[3], fields[4], gpu, system)
+
+
+def load_chunks(store, start, sensors=False):
+    """Column chunks of the records with timestamp >= start, in the order query() returns them."""
+    if store.backend == 'binary':
+        return binary_chunks(store, start, sensors)
+    if store.backend == 'sqlite':
+        return sqlite_chunks(store, start, sensors)
+    return text_chunks(store.path, start, sensors)
+
+
+class SensorDrivers:
+    """Per fan speed: how often each sensor was the hottest one, and each sensor's readings."""
+
+    def __init__(self):
+        self.hottest = {}  # (fan_pct, sensor) -> samples where sensor was the hottest
+        self.readings = {}  # (fan_pct, sensor) -> [count, sum]
+
+    def add(self, fan_speed_pct, gpu, system):
+        sensors = [('GPU', i + 1) for i in range(gpu.shape[1])] + [('System', i + 1) for i in range(system.shape[1])]
+        if not sensors:
+            return
+        temps = np.hstack((gpu, system))
+        present = ~np.isnan(temps)
+        rows = (fan_speed_pct > 0) & present.any(axis=1)
+        hottest = np.where(present, temps, -np.inf).argmax(axis=1)
+        for fan_pct in np.unique(fan_speed_pct[rows]).tolist():
+            at_speed = rows & (fan_speed_pct == fan_pct)
+            for column, count in enumerate(np.bincount(hottest[at_speed], minlength=len(sensors)).tolist()):
+                if count:
+                    key = (fan_pct, sensors[column])
+                    self.hottest[key] = self.hottest.get(key, 0) + count
+            counts = present[at_speed].sum(axis=0).tolist()
+            totals = np.nansum(temps[at_speed], axis=0).tolist()
+            for sensor, count, total in zip(sensors, counts, totals):
+                if count:
+                    reading = self.readings.setdefault((fan_pct, sensor), [0, 0.0])
+                    reading[0] += count
+                    reading[1] += total
+
+    def result(self):
+        """Same as learn_thresholds.analyze_sensor_drivers()."""
+        by_fan_pct = {}
+        for (fan_pct, sensor), count in self.hottest.items():
+            by_fan_pct.setdefault(fan_pct, []).append((sensor, count))
+        drivers = {}
+        for fan_pct, counts in by_fan_pct.items():
+            samples = sum(count for _, count in counts)
+            if samples < 10:
+                continue
+            counts.sort(key=lambda item: (-item[1], item[0][0] != 'GPU', item[0][1]))
+            drivers[fan_pct] = {'samples': samples, 'drivers': []}
+            for sensor, count in counts[:3]:
+                readings, total = self.readings[(fan_pct, sensor)]
+                drivers[fan_pct]['drivers'].append((f"{sensor[0]} {sensor[1]}", count, total / readings))
+        return drivers
+
+
+def analyze(store, start, sensors=False, trend_samples=20):
+    """
+    (summary, efficiency, trend samples, sensor drivers) for the records with
+    timestamp >= start, as the Python engine computes them. Trend samples maps each
+    fan speed with enough samples to its (oldest, newest) temperatures, or is None
+    below 50 records; sensor drivers is None unless sensors.
+    """
+    drivers = SensorDrivers() if sensors else None
+    parts = {'timestamp': [], 'max_temp': [], 'avg_fan_rpm': [], 'fan_speed_pct': []}
+    for chunk in load_chunks(store, start, sensors):
+        for name in parts:
+            parts[name].append(chunk[name])
+        if drivers is not None:
+            drivers.add(chunk['fan_speed_pct'], chunk['gpu'], chunk['system'])
+    columns = {name: np.concatenate(arrays) if arrays else np.zeros(0) for name, arrays in parts.items()}
+    order = np.argsort(columns['timestamp'], kind='stable')
+    timestamp, max_temp = columns['timestamp'][order], columns['max_temp'][order]
+    avg_fan_rpm, fan_speed_pct = columns['avg_fan_rpm'][order], columns['fan_speed_pct'][order]
+    count = len(timestamp)
+
+    if not count:
+        return {'count': 0}, {}, None, (drivers.result() if drivers else None)
+    summary = {
+        'count': count,
+        'first': datetime.fromtimestamp(timestamp[0]),
+        'last': datetime.fromtimestamp(timestamp[-1]),
+        'avg_temp': float(max_temp.mean()),
+        'min_temp': float(max_temp.min()),
+        'max_temp': float(max_temp.max()),
+    }
+
+    efficiency, trends = {}, ({} if count >= 50 else None)
+    for fan_pct in np.unique(fan_speed_pct[fan_speed_pct > 0]).tolist():
+        at_speed = fan_speed_pct == fan_pct
+        temps = max_temp[at_speed]
+        samples = len(temps)
+        if samples >= 10:
+            efficiency[fan_pct] = {
+                'avg_temp': float(temps.mean()),
+                'temp_std': float(temps.std(ddof=1)),
+                'avg_rpm': float(avg_fan_rpm[at_speed].mean()),
+                'sample_count': samples,
+                'temp_range': (float(temps.min()), float(temps.max())),
+            }
+        if trends is not None and samples >= trend_samples:
+            recent_temps = temps[-trend_samples:].tolist()
+            older_temps = temps[:trend_samples if samples >= 2 * trend_samples else samples // 2].tolist()
+            trends[fan_pct] = (older_temps, recent_temps)
+    return summary, efficiency, trends, (drivers.result() if drivers else None)
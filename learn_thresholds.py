@@ -7,20 +7,44 @@ Analyzes historical temperature and fan speed data to suggest optimal thresholds
 import os
 import sys
 import csv
+import json
+import math
+import argparse
 import statistics
 from datetime import datetime, timedelta
 from collections import defaultdict
 from dotenv import load_dotenv
 
+import data_store
+
+try:
+    import learn_numpy
+except ImportError:  # NumPy not installed: pure-Python engine only
+    learn_numpy = None
+
 # Load environment variables
 load_dotenv()
 
 # Configuration
-DATA_LOG_FILE = os.getenv('DATA_LOG_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fan_control_data.log'))
+DATA_LOG_BACKEND = os.getenv('DATA_LOG_BACKEND', 'text').lower()
+DATA_LOG_FILE = os.getenv('DATA_LOG_FILE') or data_store.default_data_log_file(DATA_LOG_BACKEND)
 MIN_DATA_POINTS = 100  # Minimum data points required for learning
 ANALYSIS_DAYS = 7  # Analyze last N days of data
 TEMP_STABILITY_THRESHOLD = 2  # Temperature variation considered "stable" (°C)
 FAN_EFFICIENCY_THRESHOLD = 5  # RPM change considered significant
+TREND_SAMPLES = 20  # Oldest/newest samples compared by the trend analysis
+
+# Incremental mode (--incremental): running aggregates per time bucket, persisted between runs
+LEARN_CHECKPOINT_FILE = os.getenv('LEARN_CHECKPOINT_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fan_control_learn_checkpoint.json'))
+BUCKET_SECONDS = 3600  # Samples age out of the ANALYSIS_DAYS window one bucket at a time
+
+# Rollup tiers of the data log, written by its compaction (data_store.py compact / DATA_COMPACT_INTERVAL)
+DATA_ROLLUP_FILE = os.getenv('DATA_ROLLUP_FILE') or data_store.default_rollup_file(DATA_LOG_FILE)
+DATA_RAW_DAYS = float(os.getenv('DATA_RAW_DAYS', str(data_store.RAW_DAYS)))  # Raw records the compaction keeps (0 = all)
+
+# Analysis engine for full runs: auto (numpy when installed), python, numpy
+LEARN_ENGINE = os.getenv('LEARN_ENGINE', 'auto').lower()
+SENSOR_DRIVERS_SHOWN = 3  # Hottest sensors listed per fan speed (--sensors)
 
 # Target temperature ranges for optimization
 TARGET_TEMP_RANGES = {
@@ -34,8 +58,8 @@ TARGET_TEMP_RANGES = {
 }
 
 
-def parse_data_log():
-    """Parse the unified data log file."""
+def parse_data_log(days=ANALYSIS_DAYS, sensors=False):
+    """Read the last `days` of the unified data log (any DATA_LOG_BACKEND); sensors adds the per-sensor temperatures."""
     data = []
     
     if not os.path.exists(DATA_LOG_FILE):
@@ -44,37 +68,25 @@ def parse_data_log():
         return []
     
     try:
-        with open(DATA_LOG_FILE, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Format: timestamp|max_gpu|max_system|avg_fan_rpm|fan_speed_pct|gpu_temps_csv|system_temps_csv|fan_speeds_csv
-                parts = line.split('|')
-                if len(parts) >= 5:
-                    try:
-                        timestamp_str = parts[0]
-                        max_gpu = float(parts[1]) if parts[1] else 0
-                        max_system = float(parts[2]) if parts[2] else 0
-                        avg_fan_rpm = int(parts[3]) if parts[3] else 0
-                        fan_speed_pct = int(parts[4]) if parts[4] else 0
-                        
-                        timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                        
-                        # Only include recent data
-                        cutoff_date = datetime.now() - timedelta(days=ANALYSIS_DAYS)
-                        if timestamp >= cutoff_date:
-                            data.append({
-                                'timestamp': timestamp,
-                                'max_gpu': max_gpu,
-                                'max_system': max_system,
-                                'avg_fan_rpm': avg_fan_rpm,
-                                'fan_speed_pct': fan_speed_pct,
-                                'max_temp': max(max_gpu, max_system)
-                            })
-                    except (ValueError, IndexError) as e:
-                        continue
+        # Only the requested window is read from the sqlite and binary backends
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        store = data_store.open_data_store(DATA_LOG_FILE, DATA_LOG_BACKEND, readonly=True)
+        try:
+            for record in store.query(start=cutoff):
+                entry = {
+                    'timestamp': datetime.fromtimestamp(record.timestamp),
+                    'max_gpu': float(record.max_gpu),
+                    'max_system': float(record.max_system),
+                    'avg_fan_rpm': record.avg_fan_rpm,
+                    'fan_speed_pct': record.fan_speed_pct,
+                    'max_temp': float(max(record.max_gpu, record.max_system))
+                }
+                if sensors:
+                    entry['gpu_temps'] = data_store.split_values(record.gpu_temps)
+                    entry['system_temps'] = data_store.split_values(record.system_temps)
+                data.append(entry)
+        finally:
+            store.close()
     except Exception as e:
         print(f"Error reading data log: {e}")
         return []
@@ -115,15 +127,27 @@ def analyze_fan_efficiency(data):
     return efficiency_analysis
 
 
-def suggest_threshold_adjustments(data, current_thresholds):
-    """Suggest threshold adjustments based on historical data."""
+def summarize_data(data):
+    """Totals shown at the top of the report."""
+    if not data:
+        return {'count': 0}
+    temps = [d['max_temp'] for d in data]
+    return {
+        'count': len(data),
+        'first': data[0]['timestamp'],
+        'last': data[-1]['timestamp'],
+        'avg_temp': statistics.mean(temps),
+        'min_temp': min(temps),
+        'max_temp': max(temps),
+    }
+
+
+def suggest_threshold_adjustments(sample_count, efficiency, current_thresholds):
+    """Suggest threshold adjustments from the fan efficiency analysis of sample_count points."""
     suggestions = []
     
-    if len(data) < MIN_DATA_POINTS:
-        return suggestions, f"Insufficient data: {len(data)} points (need {MIN_DATA_POINTS})"
-    
-    # Analyze temperature stability at different fan speeds
-    efficiency = analyze_fan_efficiency(data)
+    if sample_count < MIN_DATA_POINTS:
+        return suggestions, f"Insufficient data: {sample_count} points (need {MIN_DATA_POINTS})"
     
     # Find optimal temperature ranges for each fan speed level
     fan_speed_levels = [10, 15, 25, 35, 50, 65, 80]  # Current 7 levels
@@ -170,7 +194,7 @@ def suggest_threshold_adjustments(data, current_thresholds):
                             'confidence': 'high' if eff['sample_count'] > 50 else 'medium'
                         })
     
-    return suggestions, f"Analyzed {len(data)} data points"
+    return suggestions, f"Analyzed {sample_count} data points"
 
 
 def analyze_temperature_trends(data):
@@ -187,39 +211,357 @@ def analyze_temperature_trends(data):
     trends = {}
     
     for fan_pct, entries in by_fan_pct.items():
-        if len(entries) < 20:
+        if len(entries) < TREND_SAMPLES:
             continue
         
         temps = [e['max_temp'] for e in entries]
         
         # Check if temperatures are rising over time (fan too low)
-        recent_temps = temps[-20:]  # Last 20 entries
-        older_temps = temps[:20] if len(temps) >= 40 else temps[:len(temps)//2]
+        recent_temps = temps[-TREND_SAMPLES:]  # Last 20 entries
+        older_temps = temps[:TREND_SAMPLES] if len(temps) >= 2 * TREND_SAMPLES else temps[:len(temps)//2]
         
-        if len(recent_temps) > 0 and len(older_temps) > 0:
-            recent_avg = statistics.mean(recent_temps)
-            older_avg = statistics.mean(older_temps)
-            
-            temp_increase = recent_avg - older_avg
-            
-            if temp_increase > 3:  # Temperature rising significantly
-                trends[fan_pct] = {
-                    'issue': 'fan_too_low',
-                    'temp_increase': temp_increase,
-                    'current_avg': recent_avg,
-                    'suggestion': f"Consider increasing fan speed from {fan_pct}% or lowering temperature threshold"
-                }
-            elif temp_increase < -3:  # Temperature decreasing (fan might be too high)
-                trends[fan_pct] = {
-                    'issue': 'fan_too_high',
-                    'temp_decrease': abs(temp_increase),
-                    'current_avg': recent_avg,
-                    'suggestion': f"Consider decreasing fan speed from {fan_pct}% or raising temperature threshold"
-                }
+        trend = classify_trend(fan_pct, older_temps, recent_temps)
+        if trend:
+            trends[fan_pct] = trend
     
     return trends
 
 
+def analyze_sensor_drivers(data):
+    """
+    Which individual sensor is the hottest reading at each fan speed: per fan speed
+    (with at least 10 samples), the SENSOR_DRIVERS_SHOWN sensors that were the
+    hottest most often, with how often and their average temperature at that speed.
+    """
+    hottest = defaultdict(lambda: defaultdict(int))
+    readings = defaultdict(lambda: defaultdict(list))
+    
+    for entry in data:
+        if entry['fan_speed_pct'] <= 0:
+            continue
+        sensors = ([(('GPU', i + 1), temp) for i, temp in enumerate(entry['gpu_temps'])] +
+                   [(('System', i + 1), temp) for i, temp in enumerate(entry['system_temps'])])
+        if not sensors:
+            continue
+        for sensor, temp in sensors:
+            readings[entry['fan_speed_pct']][sensor].append(temp)
+        # Ties go to the first sensor (GPUs before system sensors)
+        hottest[entry['fan_speed_pct']][max(sensors, key=lambda sensor: sensor[1])[0]] += 1
+    
+    drivers = {}
+    for fan_pct, counts in hottest.items():
+        samples = sum(counts.values())
+        if samples < 10:
+            continue
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0][0] != 'GPU', item[0][1]))
+        drivers[fan_pct] = {
+            'samples': samples,
+            'drivers': [(f"{kind} {number}", count, statistics.mean(readings[fan_pct][(kind, number)]))
+                        for (kind, number), count in ranked[:SENSOR_DRIVERS_SHOWN]],
+        }
+    
+    return drivers
+
+
+def classify_trend(fan_pct, older_temps, recent_temps):
+    """Compare the oldest and newest samples at one fan speed; None if there is no clear trend."""
+    if len(recent_temps) > 0 and len(older_temps) > 0:
+        recent_avg = statistics.mean(recent_temps)
+        older_avg = statistics.mean(older_temps)
+        
+        temp_increase = recent_avg - older_avg
+        
+        if temp_increase > 3:  # Temperature rising significantly
+            return {
+                'issue': 'fan_too_low',
+                'temp_increase': temp_increase,
+                'current_avg': recent_avg,
+                'suggestion': f"Consider increasing fan speed from {fan_pct}% or lowering temperature threshold"
+            }
+        elif temp_increase < -3:  # Temperature decreasing (fan might be too high)
+            return {
+                'issue': 'fan_too_high',
+                'temp_decrease': abs(temp_increase),
+                'current_avg': recent_avg,
+                'suggestion': f"Consider decreasing fan speed from {fan_pct}% or raising temperature threshold"
+            }
+    return None
+
+
+class RunningStats:
+    """Welford accumulator (count, mean, M2, min, max); buckets are combined with merge()."""
+    
+    def __init__(self, count=0, mean=0.0, m2=0.0, minimum=None, maximum=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = minimum
+        self.max = maximum
+    
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+    
+    def merge(self, other):
+        """Fold another accumulator in (Chan et al. parallel variance)."""
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    
+    def stdev(self):
+        """Sample standard deviation, like statistics.stdev (0 for a single sample)."""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0
+    
+    def to_list(self):
+        return [self.count, self.mean, self.m2, self.min, self.max]
+    
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+
+class IncrementalAnalysis:
+    """
+    Running aggregates for --incremental, persisted in LEARN_CHECKPOINT_FILE.
+    The checkpoint holds the data log position read so far and, per BUCKET_SECONDS
+    time bucket, Welford accumulators of the max temperature (overall and per fan
+    speed %), the fan RPM, and the first/last TREND_SAMPLES temperatures per fan speed
+    for the trend analysis. Each run reads only the records appended since the last
+    one and drops buckets that have left the ANALYSIS_DAYS window, so the window edge
+    moves in whole buckets. When the compaction has pruned the log into a new file,
+    reading resumes after the timestamp of the last record read.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, checkpoint_file=None):
+        self.checkpoint_file = checkpoint_file or LEARN_CHECKPOINT_FILE
+        self.source = None
+        self.position = 0
+        self.last_timestamp = None  # timestamp of the last record read
+        self.last_repeats = 0       # records read with that timestamp
+        self.buckets = {}
+        self.records_read = 0
+    
+    @staticmethod
+    def same_log(source, other):
+        """True if two data_log_source() values are the same data log, possibly replaced since."""
+        return source.rsplit(':', 1)[0] == other.rsplit(':', 1)[0]
+    
+    def load(self, source):
+        """Load the checkpoint if it was written for this data log (source) and window."""
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if checkpoint.get('version') != self.VERSION or checkpoint.get('bucket_seconds') != BUCKET_SECONDS \
+                or checkpoint.get('analysis_days', 0) < ANALYSIS_DAYS:
+            return False
+        if checkpoint.get('source') != source and not (checkpoint.get('last_timestamp') is not None
+                                                       and self.same_log(checkpoint.get('source', ''), source)):
+            return False
+        self.source = checkpoint['source']
+        self.position = checkpoint['position']
+        self.last_timestamp = checkpoint.get('last_timestamp')
+        self.last_repeats = checkpoint.get('last_repeats', 0)
+        self.buckets = {int(start): self.bucket_from_json(bucket) for start, bucket in checkpoint['buckets'].items()}
+        return True
+    
+    def save(self):
+        checkpoint = {
+            'version': self.VERSION,
+            'source': self.source,
+            'position': self.position,
+            'last_timestamp': self.last_timestamp,
+            'last_repeats': self.last_repeats,
+            'analysis_days': ANALYSIS_DAYS,
+            'bucket_seconds': BUCKET_SECONDS,
+            'buckets': {str(start): self.bucket_to_json(bucket) for start, bucket in self.buckets.items()},
+        }
+        tmp_path = self.checkpoint_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_file)
+    
+    @staticmethod
+    def new_bucket():
+        return {'first': None, 'last': None, 'temp': RunningStats(), 'fans': {}}
+    
+    @staticmethod
+    def new_fan_stats():
+        return {'temp': RunningStats(), 'rpm': RunningStats(), 'head': [], 'tail': []}
+    
+    @staticmethod
+    def bucket_to_json(bucket):
+        return {
+            'first': bucket['first'],
+            'last': bucket['last'],
+            'temp': bucket['temp'].to_list(),
+            'fans': {str(pct): {'temp': fan['temp'].to_list(), 'rpm': fan['rpm'].to_list(),
+                                'head': fan['head'], 'tail': fan['tail']}
+                     for pct, fan in bucket['fans'].items()},
+        }
+    
+    @staticmethod
+    def bucket_from_json(data):
+        return {
+            'first': data['first'],
+            'last': data['last'],
+            'temp': RunningStats.from_list(data['temp']),
+            'fans': {int(pct): {'temp': RunningStats.from_list(fan['temp']), 'rpm': RunningStats.from_list(fan['rpm']),
+                                'head': fan['head'], 'tail': fan['tail']}
+                     for pct, fan in data['fans'].items()},
+        }
+    
+    def add(self, record):
+        start = int(record.timestamp // BUCKET_SECONDS * BUCKET_SECONDS)
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            bucket = self.buckets[start] = self.new_bucket()
+        max_temp = float(max(record.max_gpu, record.max_system))
+        bucket['first'] = record.timestamp if bucket['first'] is None else min(bucket['first'], record.timestamp)
+        bucket['last'] = record.timestamp if bucket['last'] is None else max(bucket['last'], record.timestamp)
+        bucket['temp'].add(max_temp)
+        if record.fan_speed_pct > 0:
+            fan = bucket['fans'].get(record.fan_speed_pct)
+            if fan is None:
+                fan = bucket['fans'][record.fan_speed_pct] = self.new_fan_stats()
+            fan['temp'].add(max_temp)
+            fan['rpm'].add(record.avg_fan_rpm)
+            # head: first TREND_SAMPLES temperatures; tail: last TREND_SAMPLES after the head
+            if len(fan['head']) < TREND_SAMPLES:
+                fan['head'].append(max_temp)
+            else:
+                fan['tail'].append(max_temp)
+                del fan['tail'][:-TREND_SAMPLES]
+    
+    def update(self, store, source, cutoff):
+        """Read what was appended since the checkpoint and drop buckets older than cutoff."""
+        skip = 0
+        if self.source != source and self.last_timestamp is not None and self.same_log(self.source, source):
+            # Pruned into a new file: only records older than the window were dropped, so the
+            # buckets still hold; resume at the last record read (skipping those already read)
+            self.source, self.position = source, store.position_at(self.last_timestamp)
+            skip = self.last_repeats
+        elif self.source != source or self.position > store.end_position():
+            # Different or truncated data log: start over
+            self.source, self.position, self.buckets = source, 0, {}
+            self.last_timestamp, self.last_repeats = None, 0
+        for record, position in store.read_after(self.position):
+            self.position = position
+            if skip and record.timestamp == self.last_timestamp:
+                skip -= 1
+                continue
+            skip = 0
+            if record.timestamp >= cutoff:
+                self.add(record)
+            if record.timestamp == self.last_timestamp:
+                self.last_repeats += 1
+            else:
+                self.last_timestamp, self.last_repeats = record.timestamp, 1
+            self.records_read += 1
+        for start in [start for start in self.buckets if start + BUCKET_SECONDS <= cutoff]:
+            del self.buckets[start]
+    
+    def ordered_buckets(self):
+        return [self.buckets[start] for start in sorted(self.buckets)]
+    
+    def summary(self):
+        buckets = self.ordered_buckets()
+        temp = RunningStats()
+        for bucket in buckets:
+            temp.merge(bucket['temp'])
+        if not temp.count:
+            return {'count': 0}
+        return {
+            'count': temp.count,
+            'first': datetime.fromtimestamp(min(bucket['first'] for bucket in buckets)),
+            'last': datetime.fromtimestamp(max(bucket['last'] for bucket in buckets)),
+            'avg_temp': temp.mean,
+            'min_temp': temp.min,
+            'max_temp': temp.max,
+        }
+    
+    def fan_speeds(self):
+        """fan speed % -> that fan speed's stats in each bucket, oldest first."""
+        by_fan_pct = defaultdict(list)
+        for bucket in self.ordered_buckets():
+            for pct, fan in bucket['fans'].items():
+                by_fan_pct[pct].append(fan)
+        return by_fan_pct
+    
+    def efficiency(self):
+        """Same result as analyze_fan_efficiency() on the window."""
+        efficiency_analysis = {}
+        for fan_pct, fans in self.fan_speeds().items():
+            temp, rpm = RunningStats(), RunningStats()
+            for fan in fans:
+                temp.merge(fan['temp'])
+                rpm.merge(fan['rpm'])
+            if temp.count < 10:  # Need minimum entries for analysis
+                continue
+            efficiency_analysis[fan_pct] = {
+                'avg_temp': temp.mean,
+                'temp_std': temp.stdev(),
+                'avg_rpm': rpm.mean,
+                'sample_count': temp.count,
+                'temp_range': (temp.min, temp.max)
+            }
+        return efficiency_analysis
+    
+    @staticmethod
+    def first_samples(fans, count):
+        """The first `count` (<= TREND_SAMPLES) temperatures across buckets."""
+        samples = []
+        for fan in fans:
+            samples.extend((fan['head'] + fan['tail'])[:count - len(samples)])
+            if len(samples) >= count:
+                break
+        return samples
+    
+    @staticmethod
+    def last_samples(fans, count):
+        """The last `count` (<= TREND_SAMPLES) temperatures across buckets."""
+        samples = []
+        for fan in reversed(fans):
+            # A tail shorter than TREND_SAMPLES means head + tail is the whole bucket
+            needed = count - len(samples)
+            samples[:0] = (fan['head'] + fan['tail'])[-needed:]
+            if len(samples) >= count:
+                break
+        return samples
+    
+    def trends(self):
+        """Same result as analyze_temperature_trends() on the window."""
+        trends = {}
+        if self.summary()['count'] < 50:
+            return None
+        for fan_pct, fans in self.fan_speeds().items():
+            count = sum(fan['temp'].count for fan in fans)
+            if count < TREND_SAMPLES:
+                continue
+            recent_temps = self.last_samples(fans, TREND_SAMPLES)
+            older_temps = self.first_samples(fans, TREND_SAMPLES if count >= 2 * TREND_SAMPLES else count // 2)
+            trend = classify_trend(fan_pct, older_temps, recent_temps)
+            if trend:
+                trends[fan_pct] = trend
+        return trends
+
+
 def load_current_thresholds():
     """Load current thresholds from .env file."""
     thresholds = {}
@@ -244,28 +586,26 @@ def load_current_thresholds():
     return thresholds
 
 
-def generate_report(data, suggestions, trends):
-    """Generate a learning report."""
+def generate_report(summary, efficiency, suggestions, trends, drivers=None):
+    """Generate a learning report (drivers: analyze_sensor_drivers(), for --sensors)."""
     print("=" * 70)
     print("Fan Control Threshold Learning Report")
     print("=" * 70)
     print()
     
-    if not data:
+    if not summary['count']:
         print("No data available for analysis.")
         print("Run fan_control.py normally to start collecting data.")
         return
     
     print(f"Data Analysis:")
-    print(f"  Total data points: {len(data)}")
-    if data:
-        print(f"  Date range: {data[0]['timestamp'].strftime('%Y-%m-%d %H:%M:%S')} to {data[-1]['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"  Average max temperature: {statistics.mean([d['max_temp'] for d in data]):.1f}°C")
-        print(f"  Temperature range: {min([d['max_temp'] for d in data]):.1f}°C - {max([d['max_temp'] for d in data]):.1f}°C")
+    print(f"  Total data points: {summary['count']}")
+    print(f"  Date range: {summary['first'].strftime('%Y-%m-%d %H:%M:%S')} to {summary['last'].strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"  Average max temperature: {summary['avg_temp']:.1f}°C")
+    print(f"  Temperature range: {summary['min_temp']:.1f}°C - {summary['max_temp']:.1f}°C")
     print()
     
     # Efficiency analysis
-    efficiency = analyze_fan_efficiency(data)
     if efficiency:
         print("Fan Speed Efficiency Analysis:")
         for fan_pct in sorted(efficiency.keys()):
@@ -274,6 +614,16 @@ def generate_report(data, suggestions, trends):
                   f"Avg RPM {eff['avg_rpm']:.0f}, Samples: {eff['sample_count']}")
         print()
     
+    # Per-sensor breakdown
+    if drivers:
+        print("Hottest Sensor per Fan Speed:")
+        for fan_pct in sorted(drivers.keys()):
+            samples = drivers[fan_pct]['samples']
+            print(f"  {fan_pct:3d}%: " + ", ".join(
+                f"{name} {count / samples * 100:.0f}% (avg {avg_temp:.1f}°C)"
+                for name, count, avg_temp in drivers[fan_pct]['drivers']))
+        print()
+    
     # Temperature trends
     if trends:
         print("Temperature Trend Analysis:")
@@ -297,26 +647,226 @@ def generate_report(data, suggestions, trends):
     print("=" * 70)
 
 
+def analyze_numpy(days=ANALYSIS_DAYS, sensors=False):
+    """
+    The full analysis with the NumPy engine (learn_numpy); returns (summary,
+    efficiency, trends, drivers), the same as the pure-Python functions, or None.
+    """
+    if not os.path.exists(DATA_LOG_FILE):
+        print(f"Data log file not found: {DATA_LOG_FILE}")
+        print("Run fan_control.py normally to start collecting data.")
+        return None
+    
+    try:
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        store = data_store.open_data_store(DATA_LOG_FILE, DATA_LOG_BACKEND, readonly=True)
+        try:
+            summary, efficiency, trend_samples, drivers = learn_numpy.analyze(store, cutoff, sensors, TREND_SAMPLES)
+        finally:
+            store.close()
+    except Exception as e:
+        print(f"Error reading data log: {e}")
+        return None
+    
+    trends = None
+    if trend_samples is not None:
+        trends = {}
+        for fan_pct, (older_temps, recent_temps) in trend_samples.items():
+            trend = classify_trend(fan_pct, older_temps, recent_temps)
+            if trend:
+                trends[fan_pct] = trend
+    return summary, efficiency, trends, drivers
+
+
+def bucket_samples(rows, count):
+    """The first `count` samples of rows, each bucket standing in with its mean temperature."""
+    samples = []
+    for row in rows:
+        samples.extend([row.temp_mean] * min(row.count, count - len(samples)))
+        if len(samples) >= count:
+            break
+    return samples
+
+
+def analyze_rollups(days=ANALYSIS_DAYS):
+    """
+    (summary, efficiency, trends) from the rollup tiers: hourly and 1-minute rollups
+    where the data log has been compacted, the raw records after that (see
+    data_store.read_window()). Counts, means, standard deviations and ranges are the
+    raw samples' (up to float rounding); the trend analysis compares the means of
+    the first and last buckets instead of individual samples. None on errors.
+    """
+    if not os.path.exists(DATA_LOG_FILE):
+        print(f"Data log file not found: {DATA_LOG_FILE}")
+        print("Run fan_control.py normally to start collecting data.")
+        return None
+    
+    try:
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        store = data_store.open_data_store(DATA_LOG_FILE, DATA_LOG_BACKEND, readonly=True)
+        rollups = data_store.RollupStore(DATA_ROLLUP_FILE, readonly=True)
+        try:
+            rows = data_store.read_window(store, rollups, cutoff)
+        finally:
+            store.close()
+            rollups.close()
+    except Exception as e:
+        print(f"Error reading data log rollups: {e}")
+        return None
+    
+    print(f"Rollups: {len(rows)} buckets (rollup file: {DATA_ROLLUP_FILE})")
+    print()
+    
+    temp = RunningStats()
+    by_fan_pct = defaultdict(list)
+    for row in rows:
+        temp.merge(RunningStats(row.count, row.temp_mean, row.temp_m2, row.temp_min, row.temp_max))
+        if row.fan_speed_pct > 0:
+            by_fan_pct[row.fan_speed_pct].append(row)
+    if not temp.count:
+        return {'count': 0}, {}, None
+    summary = {
+        'count': temp.count,
+        'first': datetime.fromtimestamp(min(row.first for row in rows)),
+        'last': datetime.fromtimestamp(max(row.last for row in rows)),
+        'avg_temp': temp.mean,
+        'min_temp': temp.min,
+        'max_temp': temp.max,
+    }
+    
+    efficiency = {}
+    trends = {} if temp.count >= 50 else None
+    for fan_pct, fan_rows in by_fan_pct.items():
+        stats = RunningStats()
+        rpm_total = 0
+        for row in fan_rows:
+            stats.merge(RunningStats(row.count, row.temp_mean, row.temp_m2, row.temp_min, row.temp_max))
+            rpm_total += row.rpm_mean * row.count
+        if stats.count >= 10:  # Need minimum entries for analysis
+            efficiency[fan_pct] = {
+                'avg_temp': stats.mean,
+                'temp_std': stats.stdev(),
+                'avg_rpm': rpm_total / stats.count,
+                'sample_count': stats.count,
+                'temp_range': (stats.min, stats.max)
+            }
+        if trends is not None and stats.count >= TREND_SAMPLES:
+            recent_temps = bucket_samples(reversed(fan_rows), TREND_SAMPLES)
+            older_temps = bucket_samples(fan_rows, TREND_SAMPLES if stats.count >= 2 * TREND_SAMPLES else stats.count // 2)
+            trend = classify_trend(fan_pct, older_temps, recent_temps)
+            if trend:
+                trends[fan_pct] = trend
+    return summary, efficiency, trends
+
+
+def data_log_source():
+    """Identifies the data log a checkpoint was built from (a replaced file has a new inode)."""
+    return f"{DATA_LOG_BACKEND}:{os.path.abspath(DATA_LOG_FILE)}:{os.stat(DATA_LOG_FILE).st_ino}"
+
+
+def analyze_incremental(rebuild=False):
+    """Update the checkpoint with new records; returns (summary, efficiency, trends) or None."""
+    if not os.path.exists(DATA_LOG_FILE):
+        print(f"Data log file not found: {DATA_LOG_FILE}")
+        print("Run fan_control.py normally to start collecting data.")
+        return None
+    
+    try:
+        analysis = IncrementalAnalysis()
+        if not rebuild:
+            analysis.load(data_log_source())
+        cutoff = (datetime.now() - timedelta(days=ANALYSIS_DAYS)).timestamp()
+        store = data_store.open_data_store(DATA_LOG_FILE, DATA_LOG_BACKEND, readonly=True)
+        try:
+            analysis.update(store, data_log_source(), cutoff)
+        finally:
+            store.close()
+        analysis.save()
+    except Exception as e:
+        print(f"Error reading data log: {e}")
+        return None
+    
+    print(f"Incremental: read {analysis.records_read} new records (checkpoint: {LEARN_CHECKPOINT_FILE})")
+    print()
+    return analysis.summary(), analysis.efficiency(), analysis.trends()
+
+
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description='Suggest fan control thresholds from the unified data log')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only read records appended since the last run (running aggregates in LEARN_CHECKPOINT_FILE)')
+    parser.add_argument('--rebuild', action='store_true', help='With --incremental: discard the checkpoint and start over')
+    parser.add_argument('--engine', choices=('auto', 'python', 'numpy'), default=LEARN_ENGINE,
+                        help='Full analysis engine (default: LEARN_ENGINE, auto = numpy when installed)')
+    parser.add_argument('--days', type=float, default=ANALYSIS_DAYS, help=f'Days of history to analyze (default: {ANALYSIS_DAYS})')
+    parser.add_argument('--sensors', action='store_true',
+                        help='Also report which individual sensor is the hottest at each fan speed (reads the raw records, '
+                             f'which the compaction keeps for DATA_RAW_DAYS = {DATA_RAW_DAYS:g} days; 0 = all)')
+    parser.add_argument('--tier', choices=('auto', 'raw', 'rollup'), default='auto',
+                        help='Read raw records or the rollup tiers (default: auto = rollups once the data log has been compacted)')
+    args = parser.parse_args()
+    if args.incremental and (args.sensors or args.days != ANALYSIS_DAYS):
+        parser.error('--sensors and --days are not available with --incremental')
+    if args.tier == 'rollup' and (args.incremental or args.sensors):
+        parser.error('--incremental and --sensors read the raw records (--tier raw)')
+    if args.tier == 'rollup' and not os.path.exists(DATA_ROLLUP_FILE):
+        parser.error(f'No rollups yet ({DATA_ROLLUP_FILE}); run: python3 data_store.py compact {DATA_LOG_FILE}')
+    use_rollups = args.tier == 'rollup' or (args.tier == 'auto' and not (args.incremental or args.sensors)
+                                            and os.path.exists(DATA_ROLLUP_FILE))
+    if (not use_rollups and not args.incremental and 0 < DATA_RAW_DAYS < args.days
+            and os.path.exists(DATA_ROLLUP_FILE)):
+        print(f"Warning: the compaction keeps only {DATA_RAW_DAYS:g} days of raw records (DATA_RAW_DAYS), "
+              f"so this raw analysis covers at most {DATA_RAW_DAYS:g} of the {args.days:g} days asked for.")
+        print("         Use the rollups (--tier rollup, without --sensors) for the whole window, "
+              "or raise DATA_RAW_DAYS to keep more raw history.")
+        print()
+    engine = args.engine
+    if engine == 'auto':
+        engine = 'numpy' if learn_numpy else 'python'
+    elif engine == 'numpy' and learn_numpy is None:
+        parser.error('--engine numpy needs NumPy (pip3 install numpy)')
+    
     print("Analyzing fan control data for threshold optimization...")
     print()
     
     # Load current thresholds
     current_thresholds = load_current_thresholds()
     
-    # Parse data
-    data = parse_data_log()
-    
-    if not data:
-        return
+    drivers = None
+    if args.incremental:
+        result = analyze_incremental(args.rebuild)
+        if result is None:
+            return
+        summary, efficiency, trends = result
+    elif use_rollups:
+        result = analyze_rollups(args.days)
+        if result is None or not result[0]['count']:
+            return
+        summary, efficiency, trends = result
+    elif engine == 'numpy':
+        result = analyze_numpy(args.days, args.sensors)
+        if result is None or not result[0]['count']:
+            return
+        summary, efficiency, trends, drivers = result
+    else:
+        # Parse data
+        data = parse_data_log(args.days, args.sensors)
+        
+        if not data:
+            return
+        
+        summary = summarize_data(data)
+        efficiency = analyze_fan_efficiency(data)
+        trends = analyze_temperature_trends(data)
+        if args.sensors:
+            drivers = analyze_sensor_drivers(data)
     
     # Analyze
-    suggestions, analysis_msg = suggest_threshold_adjustments(data, current_thresholds)
-    trends = analyze_temperature_trends(data)
+    suggestions, analysis_msg = suggest_threshold_adjustments(summary['count'], efficiency, current_thresholds)
     
     # Generate report
-    generate_report(data, suggestions, trends)
+    generate_report(summary, efficiency, suggestions, trends, drivers)
     
     print(f"\nAnalysis: {analysis_msg}")
 
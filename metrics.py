@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Prometheus/OpenMetrics exposition for fan_control.py
+A small metrics registry (counters, gauges, histograms with labels) that the control
+loop fills from the readings and decisions it already has, so monitoring never reads
+a sensor itself. The registry can be served over HTTP or written as a textfile:
+
+- MetricsServer: GET /metrics on a local address, in a daemon thread. Scrapers that
+  ask for application/openmetrics-text get OpenMetrics 1.0.0, everyone else the
+  Prometheus text format 0.0.4.
+- write_textfile(): an atomic rewrite (temp file + rename) for the node_exporter
+  textfile collector. restore() loads the counters and histograms back from the
+  previous file, so they keep counting across one-shot (timer/cron) runs.
+
+Only the standard library is used.
+"""
+
+import math
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers sysfs reads (~ms) up to IPMI over a slow network (~tens of s)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+SAMPLE_PATTERN = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)')
+LABEL_PATTERN = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def format_value(value):
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def unescape_label(value):
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), value)
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    """
+    One metric family. Series are keyed by their label values, given as keyword
+    arguments: requests.inc(transport='shell', result='ok').
+    """
+
+    def __init__(self, registry, kind, name, help_text, labelnames=(), buckets=None):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS)) if kind == 'histogram' else None
+        self.series = {}
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        """Add to a counter (or gauge)."""
+        key = self.key(labels)
+        with self.registry.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        """Set a gauge."""
+        key = self.key(labels)
+        with self.registry.lock:
+            self.series[key] = value
+
+    def observe(self, value, **labels):
+        """Record one histogram observation."""
+        key = self.key(labels)
+        with self.registry.lock:
+            state = self.series.get(key)
+            if state is None:
+                state = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def clear(self):
+        """Drop every series (e.g. before setting this cycle's sensors, so removed ones disappear)."""
+        with self.registry.lock:
+            self.series.clear()
+
+    def render(self, openmetrics):
+        if not self.series:
+            return []
+        counter = self.kind == 'counter'
+        # OpenMetrics names the counter family without _total; 0.0.4 wants the sample name
+        family = self.name + ('_total' if counter and not openmetrics else '')
+        lines = [f'# HELP {family} {self.help}', f'# TYPE {family} {self.kind}']
+        for key, value in sorted(self.series.items()):
+            if self.kind == 'histogram':
+                counts, total, count = value
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = format_labels(self.labelnames, key, [('le', repr(float(bound)))])
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = format_labels(self.labelnames, key, [('le', '+Inf')])
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = format_labels(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {format_value(total)}')
+                lines.append(f'{self.name}_count{labels} {count}')
+            else:
+                suffix = '_total' if counter else ''
+                lines.append(f'{self.name}{suffix}{format_labels(self.labelnames, key)} {format_value(value)}')
+        return lines
+
+
+class Registry:
+    """The metric families of one process, rendered in registration order."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics = {}
+
+    def register(self, kind, name, help_text, labelnames=(), buckets=None):
+        metric = Metric(self, kind, name, help_text, labelnames, buckets)
+        with self.lock:
+            if name in self.metrics:
+                raise ValueError(f"Metric {name} is already registered")
+            self.metrics[name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        """A counter; name without the _total suffix, which the exposition adds."""
+        return self.register('counter', name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.register('gauge', name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=None):
+        return self.register('histogram', name, help_text, labelnames, buckets)
+
+    def render(self, openmetrics=False):
+        """The whole registry in the OpenMetrics or Prometheus 0.0.4 text format."""
+        with self.lock:
+            lines = [line for metric in self.metrics.values() for line in metric.render(openmetrics)]
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Write the Prometheus text format to path atomically (node_exporter ignores *.tmp files)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.render())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def restore(self, text):
+        """
+        Load counter and histogram values from an earlier render() (either format).
+        Gauges describe the current cycle and are not restored. Returns the number of
+        series loaded.
+        """
+        histograms = {}
+        loaded = 0
+        with self.lock:
+            for line in text.splitlines():
+                match = SAMPLE_PATTERN.match(line)
+                if not match:
+                    continue
+                sample, label_text, value = match.groups()
+                labels = {name: unescape_label(v) for name, v in LABEL_PATTERN.findall(label_text or '')}
+                try:
+                    value = float(value)
+                except ValueError:
+                    continue
+                for suffix in ('_total', '_bucket', '_sum', '_count'):
+                    metric = self.metrics.get(sample[:-len(suffix)]) if sample.endswith(suffix) else None
+                    if metric is not None:
+                        break
+                else:
+                    continue
+                le = labels.pop('le', None)
+                if set(labels) != set(metric.labelnames):
+                    continue
+                key = metric.key(labels)
+                if metric.kind == 'counter' and suffix == '_total':
+                    metric.series[key] = value
+                    loaded += 1
+                elif metric.kind == 'histogram' and suffix != '_total':
+                    histograms.setdefault((metric, key), {})[le if suffix == '_bucket' else suffix] = value
+            for (metric, key), values in histograms.items():
+                try:
+                    counts = [int(values[repr(float(bound))]) for bound in metric.buckets]
+                    metric.series[key] = [counts, values['_sum'], int(values['_count'])]
+                    loaded += 1
+                except KeyError:
+                    continue  # Bucket layout changed since the file was written
+        return loaded
+
+
+class MetricsServer:
+    """Serves a Registry at http://address:port/metrics from a daemon thread."""
+
+    def __init__(self, registry, address='127.0.0.1', port=9101):
+        self.registry = registry
+        self.address = address
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+                body = registry.render(openmetrics).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # One line per scrape would flood the log
+
+        self.server = ThreadingHTTPServer((self.address, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None